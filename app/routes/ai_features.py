@@ -51,6 +51,11 @@ def _parse_json(text: str, default):
 
 
 
+def _months_ago(months: int) -> str:
+    """Start date matching yfinance's period='<n>mo'."""
+    return (datetime.now() - timedelta(days=months * 31)).strftime('%Y-%m-%d')
+
+
 def _get_user_watchlist_symbols(user_id):
     service = ensure_watchlist_service()
     wl = service.get_watchlist(user_id, limit=500)
@@ -91,24 +96,20 @@ def morning_brief():
 
     try:
         import yfinance as yf
-        import pandas as pd
 
         symbols = _get_user_watchlist_symbols(user.id)
         if not symbols:
             return jsonify({'error': 'Your watchlist is empty. Add some stocks first.'}), 422
 
         # ── 1. Watchlist movers ──────────────────────────────────────────────
-        data = yf.download(symbols, period='5d', progress=False, threads=True)
-        closes = data['Close'] if 'Close' in data.columns else data
+        closes = yahoo_finance_api.get_recent_closes(symbols, trading_days=5)
 
         movers = []
         for sym in symbols:
             try:
-                col = closes[sym] if sym in closes.columns else closes
-                if hasattr(col, 'dropna'):
-                    col = col.dropna()
-                else:
+                if sym not in closes.columns:
                     continue
+                col = closes[sym].dropna()
                 if len(col) < 2:
                     continue
                 pct = ((col.iloc[-1] - col.iloc[0]) / col.iloc[0]) * 100
@@ -131,8 +132,7 @@ def morning_brief():
         INDEX_SYMBOLS = {'^GSPC': 'S&P 500', '^IXIC': 'Nasdaq', '^DJI': 'Dow Jones', '^VIX': 'VIX'}
         market_indices = []
         try:
-            idx_data = yf.download(list(INDEX_SYMBOLS.keys()), period='2d', progress=False, threads=True)
-            idx_closes = idx_data['Close'] if 'Close' in idx_data.columns else idx_data
+            idx_closes = yahoo_finance_api.get_recent_closes(list(INDEX_SYMBOLS.keys()), trading_days=2)
             for sym, label in INDEX_SYMBOLS.items():
                 try:
                     col = idx_closes[sym].dropna()
@@ -395,8 +395,6 @@ def health_score():
             return jsonify(cached)
 
     try:
-        import yfinance as yf
-        import pandas as pd
         import numpy as np
 
         symbols = _get_user_watchlist_symbols(user.id)
@@ -404,8 +402,7 @@ def health_score():
             return jsonify({'error': 'Your watchlist is empty. Add some stocks first.'}), 422
 
         # Batch 3mo price data
-        data = yf.download(symbols, period='3mo', progress=False, threads=True)
-        closes = data['Close'] if 'Close' in data.columns else data
+        closes = yahoo_finance_api.get_close_frame(symbols, _months_ago(3))
 
         # Compute annualized volatility per stock
         volatilities = {}
@@ -563,12 +560,8 @@ def sector_rotation():
             return jsonify(cached)
 
     try:
-        import yfinance as yf
-        import pandas as pd
-
         etfs = list(SECTOR_ETFS.keys())
-        data = yf.download(etfs, period='3mo', progress=False, threads=True)
-        closes = data['Close'] if 'Close' in data.columns else data
+        closes = yahoo_finance_api.get_close_frame(etfs, _months_ago(3))
 
         sectors_raw = []
         for etf, sector_name in SECTOR_ETFS.items():
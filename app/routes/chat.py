@@ -9,7 +9,7 @@ from flask_socketio import emit
 
 from app.extensions import socketio
 from app.services.firebase_service import get_firestore_client
-from app.services.services import authenticate_request, yahoo_finance_api, news_api
+from app.services.services import authenticate_request, quote_service, news_api
 from app.services.cache_service import cache_get, cache_set
 from app.services.ai_gateway import generate as ai_generate
 
@@ -382,7 +382,7 @@ def get_stock_ai_analysis(symbol):
             cached['cached'] = True
             return jsonify(cached)
 
-        stock_data = yahoo_finance_api.get_real_time_data(symbol)
+        stock_data = quote_service.get_real_time_data(symbol)
         if not stock_data:
             return jsonify({
                 'success': False,
@@ -8,8 +8,12 @@ from app.config import Config
 from app.services.services import (
     authenticate_request, get_watchlist_service_lazy, ensure_watchlist_service,
     connected_users, USE_ALPACA_API, alpaca_api, watchlist_service,
+    quote_service, asset_catalog, subscription_registry, watchlist_push_tracker,
+    price_fetch_scheduler, bar_store, returns_matrix,
 )
 from app.services.firebase_service import FirebaseService, FirebaseUser
+from app.services.stock import get_cache_stats
+from app.services.http_client import get_http_stats
 
 logger = logging.getLogger(__name__)
 
@@ -64,9 +68,30 @@ def get_api_stats():
         stats = {
             'connected_users': len(connected_users),
             'alpaca_enabled': USE_ALPACA_API,
+            'quotes': quote_service.get_stats(),
+            'asset_catalog': asset_catalog.stats(),
+            'caches': get_cache_stats(),
+            'subscriptions': subscription_registry.stats(),
+            'watchlist_push': watchlist_push_tracker.stats(),
+            'price_fetch': price_fetch_scheduler.stats(),
+            'http': get_http_stats(),
+            'bar_store': bar_store.stats(),
+            'returns_matrix': returns_matrix.stats(),
             'timestamp': datetime.now().isoformat()
         }
 
+        try:
+            from app.socketio_events import finnhub_feed
+            stats['finnhub'] = finnhub_feed.stats()
+        except Exception as e:
+            logger.warning("Failed to get Finnhub stats: %s", e)
+
+        try:
+            from app.routes.market import market_overview
+            stats['market_overview'] = market_overview.stats()
+        except Exception as e:
+            logger.warning("Failed to get market overview stats: %s", e)
+
         if USE_ALPACA_API and alpaca_api and hasattr(alpaca_api, 'get_queue_stats'):
             try:
                 alpaca_stats = alpaca_api.get_queue_stats()
@@ -3,39 +3,46 @@ import os
 import re
 from datetime import datetime, timedelta, timezone
 
-try:
-    import zoneinfo
-except ImportError:
-    try:
-        from backports import zoneinfo
-    except ImportError:
-        zoneinfo = None
-
 from flask import Blueprint, request, jsonify
 
 from app.services.services import (
     authenticate_request, ensure_watchlist_service,
-    yahoo_finance_api, finnhub_api,
+    yahoo_finance_api, finnhub_api, shared_cache_backend, get_market_status, returns_matrix,
+    sp500_constituents,
 )
+from app.services import market_calendar
+from app.services.stock import SmartCache
+from app.services.refresh_ahead import RefreshAheadCache
 
 logger = logging.getLogger(__name__)
 
 market_bp = Blueprint('market', __name__, url_prefix='/api')
 
-# Cache for market data (10 minute TTL)
-_market_data_cache = {
-    'top_movers': {'data': None, 'timestamp': None},
-    'sector_performance': {'data': None, 'timestamp': None}
-}
+# Cache for market data (10 minute TTL), shared across workers when configured
 _CACHE_TTL_SECONDS = 600
-
-
-def _is_cache_valid(cache_key):
-    cache = _market_data_cache.get(cache_key, {})
-    if cache.get('data') is None or cache.get('timestamp') is None:
-        return False
-    age = (datetime.now() - cache['timestamp']).total_seconds()
-    return age < _CACHE_TTL_SECONDS
+# Overview values are recomputed this long before they expire...
+_REFRESH_AHEAD_SECONDS = 120
+# ...and an expired one is still served (while a refresh runs) for up to this long
+_STALE_RETENTION_SECONDS = 6 * 3600
+_market_data_cache = SmartCache(default_ttl=_CACHE_TTL_SECONDS, namespace='market', shared=shared_cache_backend,
+                                retention=_STALE_RETENTION_SECONDS)
+
+# Shown only before the first successful computation
+_FALLBACK_TOP_MOVERS = [
+    {'symbol': 'NVDA', 'change': 8.5, 'sector': 'Technology', 'price': 950.00, 'ai_reason': 'Strong AI chip demand and data center growth driving momentum.'},
+    {'symbol': 'TSLA', 'change': 5.2, 'sector': 'Consumer Cyclical', 'price': 250.00, 'ai_reason': 'EV delivery numbers exceeded expectations this quarter.'},
+    {'symbol': 'META', 'change': 4.8, 'sector': 'Technology', 'price': 500.00, 'ai_reason': 'Ad revenue growth and AI investments boosting investor confidence.'},
+    {'symbol': 'AAPL', 'change': -2.1, 'sector': 'Technology', 'price': 180.00, 'ai_reason': 'iPhone sales concerns in China weighing on shares.'},
+    {'symbol': 'GOOGL', 'change': 3.3, 'sector': 'Technology', 'price': 175.00, 'ai_reason': 'Cloud growth and AI search integration driving gains.'}
+]
+
+_FALLBACK_SECTOR_PERFORMANCE = [
+    {'name': 'Technology', 'change': 3.5, 'symbol': 'XLK'},
+    {'name': 'Energy', 'change': 2.8, 'symbol': 'XLE'},
+    {'name': 'Healthcare', 'change': 1.5, 'symbol': 'XLV'},
+    {'name': 'Financials', 'change': -0.5, 'symbol': 'XLF'},
+    {'name': 'Consumer Discretionary', 'change': 1.2, 'symbol': 'XLY'}
+]
 
 
 def generate_ai_reasons_for_movers(movers):
@@ -78,128 +85,125 @@ SYMBOL: reason
         return movers
 
 
-def get_real_top_movers():
-    """Fetch real top movers using batch download (FAST)"""
-    if _is_cache_valid('top_movers'):
-        logger.debug("Using cached top movers data")
-        return _market_data_cache['top_movers']['data']
-
-    try:
-        import yfinance as yf
-
-        stock_universe = [
-            'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA', 'NVDA', 'AMD',
-            'JPM', 'BAC', 'XOM', 'JNJ', 'V', 'WMT', 'DIS', 'NFLX'
-        ]
-
-        sector_map = {
-            'AAPL': 'Technology', 'MSFT': 'Technology', 'GOOGL': 'Technology',
-            'AMZN': 'Consumer Cyclical', 'META': 'Technology', 'TSLA': 'Consumer Cyclical',
-            'NVDA': 'Technology', 'AMD': 'Technology', 'JPM': 'Financial Services',
-            'BAC': 'Financial Services', 'XOM': 'Energy', 'JNJ': 'Healthcare',
-            'V': 'Financial Services', 'WMT': 'Consumer Defensive', 'DIS': 'Communication Services',
-            'NFLX': 'Communication Services'
-        }
+def _compute_top_movers():
+    """Top movers from one batch download plus AI reasons; raises when no data comes back"""
+    stock_universe = [
+        'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA', 'NVDA', 'AMD',
+        'JPM', 'BAC', 'XOM', 'JNJ', 'V', 'WMT', 'DIS', 'NFLX'
+    ]
 
-        logger.info("Fetching top movers for %s stocks (batch)...", len(stock_universe))
-        data = yf.download(stock_universe, period='5d', progress=False, threads=True)
+    sector_map = {
+        'AAPL': 'Technology', 'MSFT': 'Technology', 'GOOGL': 'Technology',
+        'AMZN': 'Consumer Cyclical', 'META': 'Technology', 'TSLA': 'Consumer Cyclical',
+        'NVDA': 'Technology', 'AMD': 'Technology', 'JPM': 'Financial Services',
+        'BAC': 'Financial Services', 'XOM': 'Energy', 'JNJ': 'Healthcare',
+        'V': 'Financial Services', 'WMT': 'Consumer Defensive', 'DIS': 'Communication Services',
+        'NFLX': 'Communication Services'
+    }
 
-        top_movers = []
-        for symbol in stock_universe:
-            try:
-                if symbol in data['Close'].columns:
-                    closes = data['Close'][symbol].dropna()
-                    if len(closes) >= 2:
-                        first_close = closes.iloc[0]
-                        last_close = closes.iloc[-1]
-                        pct_change = ((last_close - first_close) / first_close) * 100
-
-                        top_movers.append({
-                            'symbol': symbol,
-                            'change': round(pct_change, 2),
-                            'sector': sector_map.get(symbol, 'Unknown'),
-                            'price': round(last_close, 2)
-                        })
-            except Exception:
-                continue
+    logger.info("Fetching top movers for %s stocks (batch)...", len(stock_universe))
+    closes_5d = yahoo_finance_api.get_recent_closes(stock_universe, trading_days=5)
 
-        top_movers.sort(key=lambda x: abs(x['change']), reverse=True)
-        result = top_movers[:5]
+    top_movers = []
+    for symbol in stock_universe:
+        try:
+            if symbol in closes_5d.columns:
+                closes = closes_5d[symbol].dropna()
+                if len(closes) >= 2:
+                    first_close = closes.iloc[0]
+                    last_close = closes.iloc[-1]
+                    pct_change = ((last_close - first_close) / first_close) * 100
+
+                    top_movers.append({
+                        'symbol': symbol,
+                        'change': round(pct_change, 2),
+                        'sector': sector_map.get(symbol, 'Unknown'),
+                        'price': round(last_close, 2)
+                    })
+        except Exception:
+            continue
 
-        result = generate_ai_reasons_for_movers(result)
+    top_movers.sort(key=lambda x: abs(x['change']), reverse=True)
+    result = top_movers[:5]
 
-        _market_data_cache['top_movers'] = {'data': result, 'timestamp': datetime.now()}
-        logger.info("Cached top movers: %s", [m['symbol'] for m in result])
+    if not result:
+        raise ValueError('no top movers data')
 
-        return result
+    result = generate_ai_reasons_for_movers(result)
 
-    except Exception as e:
-        logger.error("Error fetching top movers: %s", e)
-        return [
-            {'symbol': 'NVDA', 'change': 8.5, 'sector': 'Technology', 'price': 950.00, 'ai_reason': 'Strong AI chip demand and data center growth driving momentum.'},
-            {'symbol': 'TSLA', 'change': 5.2, 'sector': 'Consumer Cyclical', 'price': 250.00, 'ai_reason': 'EV delivery numbers exceeded expectations this quarter.'},
-            {'symbol': 'META', 'change': 4.8, 'sector': 'Technology', 'price': 500.00, 'ai_reason': 'Ad revenue growth and AI investments boosting investor confidence.'},
-            {'symbol': 'AAPL', 'change': -2.1, 'sector': 'Technology', 'price': 180.00, 'ai_reason': 'iPhone sales concerns in China weighing on shares.'},
-            {'symbol': 'GOOGL', 'change': 3.3, 'sector': 'Technology', 'price': 175.00, 'ai_reason': 'Cloud growth and AI search integration driving gains.'}
-        ]
+    logger.info("Computed top movers: %s", [m['symbol'] for m in result])
+    return result
 
 
-def get_real_sector_performance():
-    """Fetch real sector performance using batch download (FAST)"""
-    if _is_cache_valid('sector_performance'):
-        logger.debug("Using cached sector performance data")
-        return _market_data_cache['sector_performance']['data']
+def get_real_top_movers():
+    """Cached top movers; refreshed in the background before it expires"""
+    value = market_overview.get('top_movers')
+    if value is None:
+        logger.warning("No top movers data yet, serving fallback")
+        return list(_FALLBACK_TOP_MOVERS)
+    return value
+
+
+def _compute_sector_performance():
+    """Sector ETF performance from one batch download; raises when no data comes back"""
+    sector_etfs = {
+        'XLK': 'Technology', 'XLF': 'Financials', 'XLE': 'Energy',
+        'XLV': 'Healthcare', 'XLY': 'Consumer Discretionary',
+        'XLP': 'Consumer Staples', 'XLI': 'Industrials',
+        'XLB': 'Materials', 'XLU': 'Utilities',
+        'XLRE': 'Real Estate', 'XLC': 'Communication Services'
+    }
 
-    try:
-        import yfinance as yf
+    symbols = list(sector_etfs.keys())
 
-        sector_etfs = {
-            'XLK': 'Technology', 'XLF': 'Financials', 'XLE': 'Energy',
-            'XLV': 'Healthcare', 'XLY': 'Consumer Discretionary',
-            'XLP': 'Consumer Staples', 'XLI': 'Industrials',
-            'XLB': 'Materials', 'XLU': 'Utilities',
-            'XLRE': 'Real Estate', 'XLC': 'Communication Services'
-        }
+    logger.info("Fetching sector performance for %s ETFs (batch)...", len(symbols))
+    closes_5d = yahoo_finance_api.get_recent_closes(symbols, trading_days=5)
 
-        symbols = list(sector_etfs.keys())
-
-        logger.info("Fetching sector performance for %s ETFs (batch)...", len(symbols))
-        data = yf.download(symbols, period='5d', progress=False, threads=True)
+    sector_performance = []
+    for symbol, sector_name in sector_etfs.items():
+        try:
+            if symbol in closes_5d.columns:
+                closes = closes_5d[symbol].dropna()
+                if len(closes) >= 2:
+                    first_close = closes.iloc[0]
+                    last_close = closes.iloc[-1]
+                    pct_change = ((last_close - first_close) / first_close) * 100
+
+                    sector_performance.append({
+                        'name': sector_name,
+                        'change': round(pct_change, 2),
+                        'symbol': symbol
+                    })
+        except Exception:
+            continue
 
-        sector_performance = []
-        for symbol, sector_name in sector_etfs.items():
-            try:
-                if symbol in data['Close'].columns:
-                    closes = data['Close'][symbol].dropna()
-                    if len(closes) >= 2:
-                        first_close = closes.iloc[0]
-                        last_close = closes.iloc[-1]
-                        pct_change = ((last_close - first_close) / first_close) * 100
-
-                        sector_performance.append({
-                            'name': sector_name,
-                            'change': round(pct_change, 2),
-                            'symbol': symbol
-                        })
-            except Exception:
-                continue
+    if not sector_performance:
+        raise ValueError('no sector performance data')
 
-        sector_performance.sort(key=lambda x: x['change'], reverse=True)
+    sector_performance.sort(key=lambda x: x['change'], reverse=True)
 
-        _market_data_cache['sector_performance'] = {'data': sector_performance, 'timestamp': datetime.now()}
-        logger.info("Cached sector performance: %s sectors", len(sector_performance))
+    logger.info("Computed sector performance: %s sectors", len(sector_performance))
+    return sector_performance
 
-        return sector_performance
 
-    except Exception as e:
-        logger.error("Error fetching sector performance: %s", e)
-        return [
-            {'name': 'Technology', 'change': 3.5, 'symbol': 'XLK'},
-            {'name': 'Energy', 'change': 2.8, 'symbol': 'XLE'},
-            {'name': 'Healthcare', 'change': 1.5, 'symbol': 'XLV'},
-            {'name': 'Financials', 'change': -0.5, 'symbol': 'XLF'},
-            {'name': 'Consumer Discretionary', 'change': 1.2, 'symbol': 'XLY'}
-        ]
+def get_real_sector_performance():
+    """Cached sector performance; refreshed in the background before it expires"""
+    value = market_overview.get('sector_performance')
+    if value is None:
+        logger.warning("No sector performance data yet, serving fallback")
+        return list(_FALLBACK_SECTOR_PERFORMANCE)
+    return value
+
+
+# Top movers and sector performance: stale-while-revalidate, one recompute at a time,
+# plus a scheduler that refreshes them before they expire while the regular session
+# is open and someone has read them recently (the movers recompute calls the LLM)
+market_overview = RefreshAheadCache(
+    _market_data_cache, ttl=_CACHE_TTL_SECONDS, refresh_ahead=_REFRESH_AHEAD_SECONDS, name='market-overview',
+    active=lambda: market_calendar.current_session() == market_calendar.SESSION_REGULAR,
+)
+market_overview.register('top_movers', _compute_top_movers)
+market_overview.register('sector_performance', _compute_sector_performance)
 
 
 @market_bp.route('/market-status')
@@ -209,28 +213,10 @@ def market_status():
     logger.debug("GET /api/market-status request from origin: %s", origin)
 
     try:
-        if zoneinfo:
-            try:
-                et_tz = zoneinfo.ZoneInfo("America/New_York")
-            except:
-                et_tz = timezone(timedelta(hours=-4))
-        else:
-            et_tz = timezone(timedelta(hours=-4))
-
-        now_et = datetime.now(et_tz)
-
-        is_weekday = now_et.weekday() < 5
-        current_time = now_et.time()
-        market_open_time = now_et.replace(hour=9, minute=30, second=0, microsecond=0).time()
-        market_close_time = now_et.replace(hour=16, minute=0, second=0, microsecond=0).time()
-
-        is_market_hours = market_open_time <= current_time <= market_close_time
-        is_open = is_weekday and is_market_hours
-
+        status = get_market_status()
         return jsonify({
-            'isOpen': is_open,
-            'is_open': is_open,
-            'status': 'Market is Open' if is_open else 'Market is Closed'
+            **status,
+            'is_open': status['isOpen'],
         })
     except Exception as e:
         logger.error("Error in market_status endpoint: %s", e)
@@ -260,7 +246,7 @@ def get_market_analysis():
     }
 
     try:
-        import requests as http_requests
+        from app.services import http_client
 
         today_str = datetime.now().strftime('%B %d, %Y')
 
@@ -305,7 +291,7 @@ RULES:
         if not xai_api_key:
             raise Exception("XAI_API_KEY not configured")
 
-        groq_response = http_requests.post(
+        groq_response = http_client.post(
             'https://api.x.ai/v1/chat/completions',
             headers={
                 'Authorization': f'Bearer {xai_api_key}',
@@ -379,10 +365,8 @@ def get_top_performer_by_date():
             symbols = [item.get('symbol') or item.get('id') for item in wl if item.get('symbol') or item.get('id')]
             symbols = [s.upper() for s in symbols if isinstance(s, str) and len(s) > 0]
         elif universe == 'sp500':
-            constituents = finnhub_api.get_index_constituents('^GSPC') or []
-            symbols = [s.upper() for s in constituents if isinstance(s, str) and len(s) > 0]
-            if not symbols:
-                symbols = ['AAPL', 'MSFT', 'NVDA', 'AMZN', 'META', 'GOOGL', 'TSLA', 'AVGO', 'BRK.B', 'LLY']
+            # Same daily-refreshed list the returns matrix is built from
+            symbols = sp500_constituents.get()
         else:
             return jsonify({'error': "universe must be 'watchlist' or 'sp500'"}), 400
 
@@ -396,15 +380,13 @@ def get_top_performer_by_date():
         best_change = None
 
         evaluated = 0
-        for symbol in symbols:
-            try:
-                change_pct = yahoo_finance_api.get_day_change_percent(symbol, date_str)
-                evaluated += 1
-                if best_change is None or change_pct > best_change:
-                    best_change = change_pct
-                    best_symbol = symbol
-            except Exception:
-                continue
+        # Completed sessions come from the precomputed returns matrix; the rest in one batch download
+        changes = returns_matrix.day_changes(symbols, date_str, fallback=yahoo_finance_api.get_day_change_percents)
+        for symbol, change_pct in changes.items():
+            evaluated += 1
+            if best_change is None or change_pct > best_change:
+                best_change = change_pct
+                best_symbol = symbol
 
         if best_symbol is None:
             return jsonify({'error': 'Could not compute top performer for requested date'}), 502
@@ -655,18 +637,18 @@ def stock_screener(screener_type):
             results.sort(key=lambda x: x['earnings_date'])
             return jsonify({'screener': screener_type, 'results': results[:20]})
 
-        # For price-based screeners fetch 2d of data in batch
-        data = yf.download(STOCK_UNIVERSE, period='2d', progress=False, threads=True)
-        closes = data.get('Close', data.get('Adj Close'))
-        volumes = data.get('Volume')
+        # For price-based screeners take the last 2 sessions from one batch download
+        start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+        history = yahoo_finance_api.get_history_batch(STOCK_UNIVERSE, start_date)
 
-        if closes is None:
+        if all(hist.empty for hist in history.values()):
             return jsonify({'error': 'Could not fetch market data'}), 502
 
         results = []
         for symbol in STOCK_UNIVERSE:
             try:
-                sym_closes = closes[symbol].dropna() if symbol in closes.columns else None
+                hist = history.get(symbol)
+                sym_closes = hist['Close'].dropna() if hist is not None else None
                 if sym_closes is None or len(sym_closes) < 2:
                     continue
                 prev = float(sym_closes.iloc[-2])
@@ -675,10 +657,9 @@ def stock_screener(screener_type):
                     continue
                 change_pct = round((curr - prev) / prev * 100, 2)
                 vol = 0
-                if volumes is not None and symbol in volumes.columns:
-                    vol_vals = volumes[symbol].dropna()
-                    if len(vol_vals) > 0:
-                        vol = int(vol_vals.iloc[-1])
+                vol_vals = hist['Volume'].dropna()
+                if len(vol_vals) > 0:
+                    vol = int(vol_vals.iloc[-1])
                 results.append({
                     'symbol': symbol,
                     'name': symbol,
@@ -761,8 +742,6 @@ def get_stock_correlation():
     if len(symbols) < 2:
         return jsonify({'error': 'At least 2 symbols required'}), 400
 
-    import pandas as pd
-
     clean_symbols = []
     for s in symbols:
         s = s.upper().strip()
@@ -772,20 +751,24 @@ def get_stock_correlation():
     if len(clean_symbols) < 2:
         return jsonify({'error': 'At least 2 valid symbols required'}), 400
 
+    clean_symbols = list(dict.fromkeys(clean_symbols))
+    precomputed = returns_matrix.correlation(clean_symbols)
+    if precomputed is not None:
+        return jsonify({
+            'symbols': clean_symbols,
+            'matrix': precomputed.tolist(),
+            'period': '90d'
+        })
+
     try:
         end_date = datetime.now().strftime('%Y-%m-%d')
         start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
 
-        price_series = {}
-        for sym in clean_symbols:
-            hist = yahoo_finance_api.get_historical_data(sym, start_date, end_date)
-            if hist and len(hist) > 0:
-                price_series[sym] = {entry['date']: entry['close'] for entry in hist}
+        df = yahoo_finance_api.get_close_frame(clean_symbols, start_date, end_date)
 
-        if len(price_series) < 2:
+        if len(df.columns) < 2:
             return jsonify({'error': 'Not enough historical data available'}), 400
 
-        df = pd.DataFrame(price_series)
         df = df.dropna()
 
         if len(df) < 5:
@@ -1,21 +1,46 @@
+import hashlib
 import logging
 import re
 from datetime import datetime, timedelta
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_login import current_user
 
-from app.services.stock import Stock
+from app.services.stock import Stock, SmartCache
+from app.services.chart_downsample import downsample, METHODS as DOWNSAMPLE_METHODS, MIN_POINTS
+from app.services.ohlcv_serializer import ohlcv_columns, ohlcv_records
+from app.services.typo_matcher import TypoMatcher, typo_budget
 from app.services.firebase_service import FirebaseService
 from app.services.services import (
-    authenticate_request, yahoo_finance_api, company_info_service,
-    get_stock_with_fallback, get_stock_alpaca_only, stock_symbol_index_service,
+    authenticate_request, yahoo_finance_api, company_info_service, bar_store,
+    get_stock_with_fallback, get_stock_alpaca_only, stock_symbol_index_service, shared_cache_backend,
+    rate_limiter,
 )
 
 logger = logging.getLogger(__name__)
 
 stock_data_bp = Blueprint('stock_data', __name__, url_prefix='/api')
 
+# Downsampled chart payloads, keyed by (symbol, range, points, method, format)
+_CHART_CACHE_TTL_SECONDS = 900
+_INTRADAY_CHART_CACHE_TTL_SECONDS = 60
+_MAX_CHART_POINTS = 5000
+_chart_cache = SmartCache(default_ttl=_CHART_CACHE_TTL_SECONDS, namespace='chart', shared=shared_cache_backend)
+
+# POST /api/history/batch limits
+_MAX_BATCH_HISTORY_SYMBOLS = 50
+_BATCH_HISTORY_INTERVALS = ('1d', '1wk', '1mo', '5m', '15m', '30m', '1h')
+# Longest start..end span per interval; Yahoo serves intraday bars for the last 60 days only
+_BATCH_HISTORY_MAX_DAYS = {'5m': 60, '15m': 60, '30m': 60, '1h': 60, '1d': 3660, '1wk': 7320, '1mo': 18300}
+_HISTORY_SYMBOL_RE = re.compile(r'^[A-Z^][A-Z0-9.\-=^]{0,14}$')
+
+# GET /api/search/typeahead: 1-3 character prefixes are precomputed and change
+# only when the symbol index refreshes, so shared caches may hold them longer
+_TYPEAHEAD_SHORT_PREFIX = 3
+_TYPEAHEAD_SHORT_CACHE_CONTROL = 'public, max-age=3600, stale-while-revalidate=86400'
+_TYPEAHEAD_CACHE_CONTROL = 'public, max-age=300, stale-while-revalidate=3600'
+_TYPEAHEAD_MAX_LIMIT = 50
+
 
 _COMPANY_NETWORK_LIBRARY = {
     'F': {
@@ -366,6 +391,40 @@ def search_stocks():
         })
 
 
+@stock_data_bp.route('/search/typeahead', methods=['GET'])
+def search_typeahead():
+    """Search-as-you-type over the symbol index; cacheable by browsers and CDNs"""
+    from app.utils.validation import sanitize_search_query, validate_search_length
+
+    query = request.args.get('q', '').strip()
+    if not validate_search_length(query, min_length=1, max_length=100):
+        return jsonify({'error': 'Search query must be between 1 and 100 characters'}), 400
+    query = sanitize_search_query(query)
+    if not query:
+        return jsonify({'error': 'Please provide a search query'}), 400
+
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), _TYPEAHEAD_MAX_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    # The ETag only depends on the index contents, so a revalidation is answered without searching
+    etag = hashlib.sha1(f"{stock_symbol_index_service.version}|{query.upper()}|{limit}".encode('utf-8')).hexdigest()[:20]
+    cache_control = _TYPEAHEAD_SHORT_CACHE_CONTROL if len(query) <= _TYPEAHEAD_SHORT_PREFIX else _TYPEAHEAD_CACHE_CONTROL
+
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify({
+            'results': stock_symbol_index_service.typeahead(query, limit=limit),
+            'query': query,
+            'source': 'symbol_index',
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
 _CEO_INDEX = [
     {"ceo_name": "Tim Cook", "company_name": "Apple Inc.", "symbol": "AAPL"},
     {"ceo_name": "Satya Nadella", "company_name": "Microsoft Corporation", "symbol": "MSFT"},
@@ -455,9 +514,45 @@ _CEO_INDEX = [
 ]
 
 
+def _ceo_words(text: str):
+    return re.sub(r'[^A-Z0-9 ]', ' ', text.upper()).split()
+
+
+# Typo-tolerant lookup over CEO name words ("jensn huang", "satya nadela")
+_CEO_NAME_WORDS = [set(_ceo_words(entry['ceo_name'])) for entry in _CEO_INDEX]
+_CEO_TYPOS = TypoMatcher(word for words in _CEO_NAME_WORDS for word in words)
+
+
+def _ceo_typo_matches(query: str):
+    """(distance, entry) for CEOs with a name word close to every query word, closest first."""
+    terms = _ceo_words(query)
+    close = {}
+    for term in terms:
+        if typo_budget(term):
+            close[term] = dict(_CEO_TYPOS.lookup(term))
+    if not terms or not close:
+        return []
+
+    matches = []
+    for entry, words in zip(_CEO_INDEX, _CEO_NAME_WORDS):
+        total = 0
+        for term in terms:
+            if term in close:
+                distance = min((close[term][word] for word in words if word in close[term]), default=None)
+            else:
+                distance = 0 if any(word.startswith(term) for word in words) else None
+            if distance is None:
+                break
+            total += distance
+        else:
+            matches.append((total, entry))
+    matches.sort(key=lambda match: match[0])
+    return matches
+
+
 @stock_data_bp.route('/search/ceo', methods=['GET'])
 def search_ceo():
-    """Search CEOs by name with fuzzy matching"""
+    """Search CEOs by name, falling back to typo-tolerant matching"""
     query = request.args.get('q', '').strip().lower()
     if not query or len(query) < 2:
         return jsonify([])
@@ -470,6 +565,9 @@ def search_ceo():
         elif all(part in name_lower for part in query.split()):
             results.append(entry)
 
+    if len(results) < 5:
+        results.extend(entry for _, entry in _ceo_typo_matches(query) if entry not in results)
+
     # Deduplicate by (ceo_name, symbol) while preserving order
     seen = set()
     deduped = []
@@ -536,6 +634,15 @@ def get_chart_data(symbol):
     symbol = symbol.upper()
 
     time_range = request.args.get('range', '1M')
+    # format=columnar returns {t, o, h, l, c, v} arrays instead of one object per bar
+    columnar = request.args.get('format') == 'columnar'
+    # points=N downsamples to at most N bars (method=lttb for lines, ohlc for candles)
+    points = request.args.get('points', type=int)
+    method = request.args.get('method', 'lttb')
+    if points is not None:
+        if points < MIN_POINTS or method not in DOWNSAMPLE_METHODS:
+            return jsonify({'error': f'points must be >= {MIN_POINTS} and method one of {", ".join(DOWNSAMPLE_METHODS)}'}), 400
+        points = min(points, _MAX_CHART_POINTS)
 
     now = datetime.now()
     interval = '1d'
@@ -577,6 +684,15 @@ def get_chart_data(symbol):
 
     end_date = now.strftime("%Y-%m-%d")
 
+    intraday = interval in ['5m', '15m', '30m', '1h']
+    cache_key = None
+    if points is not None:
+        cache_key = f"{symbol}:{time_range}:{points}:{method}:{'columnar' if columnar else 'records'}"
+        max_age = _INTRADAY_CHART_CACHE_TTL_SECONDS if intraday else _CHART_CACHE_TTL_SECONDS
+        cached = _chart_cache.get(cache_key, max_age=max_age)
+        if cached:
+            return jsonify(cached)
+
     try:
         import yfinance as yf
         ticker = yf.Ticker(symbol)
@@ -584,7 +700,8 @@ def get_chart_data(symbol):
         if period:
             hist = ticker.history(period=period, interval=interval)
         else:
-            hist = ticker.history(start=start_date, end=end_date, interval=interval)
+            # Date ranges are served from the local bar store; only the new tail hits yfinance
+            hist = bar_store.get_frame(symbol, interval, start_date, end_date)
 
         if hist.empty:
             if period:
@@ -592,26 +709,19 @@ def get_chart_data(symbol):
             if hist.empty:
                 return jsonify({'error': 'No chart data available'}), 404
 
-        ohlcv_data = []
-        for date, row in hist.iterrows():
-            if interval in ['5m', '15m', '30m', '1h']:
-                date_str = date.strftime('%Y-%m-%d %H:%M')
-            else:
-                date_str = date.strftime('%Y-%m-%d')
-
-            ohlcv_data.append({
-                'date': date_str,
-                'open': float(row['Open']),
-                'high': float(row['High']),
-                'low': float(row['Low']),
-                'close': float(row['Close']),
-                'volume': int(row['Volume']) if row['Volume'] else 0
-            })
+        if points is not None:
+            hist = downsample(hist, points, method)
 
-        if ohlcv_data:
-            return jsonify(ohlcv_data)
+        if columnar:
+            payload = ohlcv_columns(hist, intraday)
         else:
-            return jsonify({'error': 'No chart data available'}), 404
+            payload = ohlcv_records(hist, intraday)
+            if not payload:
+                return jsonify({'error': 'No chart data available'}), 404
+
+        if cache_key:
+            _chart_cache.set(cache_key, payload)
+        return jsonify(payload)
 
     except Exception as e:
         logger.error("[Chart API] Error fetching data for %s: %s", symbol, e)
@@ -626,6 +736,76 @@ def get_chart_data(symbol):
         return jsonify({'error': 'Could not retrieve chart data'}), 404
 
 
+@stock_data_bp.route('/history/batch', methods=['POST'])
+def get_history_batch():
+    """OHLCV history for many symbols in one request, backed by a single yfinance download.
+
+    Body: {"symbols": [...], "start": "YYYY-MM-DD", "end": "YYYY-MM-DD" (optional),
+           "interval": "1d" (optional), "format": "columnar" (optional)}
+    """
+    client = current_user.id if current_user.is_authenticated else request.remote_addr
+    if not rate_limiter.is_allowed(f'history-batch:{client}'):
+        logger.warning("Rate limit exceeded for /api/history/batch: %s", client)
+        return jsonify({'error': 'Rate limit exceeded. Please try again later.'}), 429
+
+    data = request.get_json(silent=True) or {}
+    symbols = data.get('symbols')
+    if not symbols or not isinstance(symbols, list):
+        return jsonify({'error': 'Please provide a list of symbols'}), 400
+    if len(symbols) > _MAX_BATCH_HISTORY_SYMBOLS:
+        return jsonify({'error': f'Maximum {_MAX_BATCH_HISTORY_SYMBOLS} symbols allowed'}), 400
+
+    clean_symbols = []
+    for s in symbols:
+        s = str(s).upper().strip()
+        if _HISTORY_SYMBOL_RE.match(s) and s not in clean_symbols:
+            clean_symbols.append(s)
+    if not clean_symbols:
+        return jsonify({'error': 'No valid symbols provided'}), 400
+
+    interval = data.get('interval') or '1d'
+    if interval not in _BATCH_HISTORY_INTERVALS:
+        return jsonify({'error': f'interval must be one of {", ".join(_BATCH_HISTORY_INTERVALS)}'}), 400
+
+    start_date = data.get('start') or (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    end_date = data.get('end')
+    try:
+        start_day = datetime.strptime(start_date, '%Y-%m-%d')
+        end_day = datetime.strptime(end_date, '%Y-%m-%d') if end_date is not None else datetime.now()
+    except (TypeError, ValueError):
+        return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+    if end_day < start_day:
+        return jsonify({'error': 'end must not be before start'}), 400
+    max_days = _BATCH_HISTORY_MAX_DAYS[interval]
+    if (end_day - start_day).days > max_days:
+        return jsonify({'error': f'{interval} history is limited to {max_days} days per request'}), 400
+
+    columnar = data.get('format') == 'columnar'
+    intraday = interval in ['5m', '15m', '30m', '1h']
+    try:
+        history = yahoo_finance_api.get_history_batch(clean_symbols, start_date, end_date, interval=interval)
+    except Exception as e:
+        logger.error("[History API] Batch fetch failed for %s symbols: %s", len(clean_symbols), e)
+        return jsonify({'error': 'Could not retrieve history'}), 502
+
+    result = {}
+    missing = []
+    for symbol in clean_symbols:
+        hist = history.get(symbol)
+        if hist is None or hist.empty:
+            missing.append(symbol)
+            continue
+        result[symbol] = ohlcv_columns(hist, intraday) if columnar else ohlcv_records(hist, intraday)
+
+    return jsonify({
+        'interval': interval,
+        'start': start_date,
+        'end': end_date,
+        'data': result,
+        'missing': missing,
+    })
+
+
 @stock_data_bp.route('/company/<symbol>')
 def get_company_info(symbol):
     symbol = symbol.upper()
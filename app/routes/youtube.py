@@ -12,7 +12,7 @@ youtube_bp = Blueprint('youtube', __name__, url_prefix='/api/youtube')
 @youtube_bp.route('/search', methods=['GET'])
 def youtube_search():
     """Search YouTube for videos about a person (CEO)"""
-    import requests as http_requests
+    from app.services import http_client
 
     query = request.args.get('q', '').strip()
     max_results = min(int(request.args.get('max_results', 5)), 10)
@@ -42,7 +42,7 @@ def youtube_search():
             'safeSearch': 'moderate'
         }
 
-        response = http_requests.get(youtube_url, params=params, timeout=10)
+        response = http_client.get(youtube_url, params=params, timeout=10)
 
         if response.status_code != 200:
             logger.error("YouTube API error: %s - %s", response.status_code, response.text)
@@ -1,8 +1,9 @@
 from app.services.firebase_service import FirebaseService, FirebaseUser, get_firestore_client
 from app.services.watchlist_service import WatchlistService, get_watchlist_service
 from app.services.stock import Stock, YahooFinanceAPI, NewsAPI, FinnhubAPI, AlpacaAPI, CompanyInfoService, StocktwitsAPI
+from app.services.quote_service import QuoteService
 from app.services.services import (
-    yahoo_finance_api, news_api, stocktwits_api, finnhub_api,
+    yahoo_finance_api, quote_service, news_api, stocktwits_api, finnhub_api,
     company_info_service, alpaca_api, USE_ALPACA_API,
     authenticate_request, ensure_watchlist_service,
     get_watchlist_service_lazy, get_stock_with_fallback,
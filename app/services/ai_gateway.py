@@ -22,7 +22,7 @@ Token logging: writes to Firestore ai_token_usage/{user_id} — fails silently.
 
 import logging
 import os
-import requests as http_requests
+from app.services import http_client
 from datetime import datetime, timezone
 from typing import List, Optional, Tuple
 
@@ -49,7 +49,7 @@ def _call_grok(prompt: str, max_tokens: int, temperature: float) -> Tuple[str, i
     api_key = os.environ.get('XAI_API_KEY')
     if not api_key:
         raise RuntimeError("XAI_API_KEY not configured")
-    resp = http_requests.post(
+    resp = http_client.post(
         _GROK_URL,
         headers={'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'},
         json={
@@ -71,7 +71,7 @@ def _call_groq(prompt: str, max_tokens: int, temperature: float) -> Tuple[str, i
     api_key = os.environ.get('GROQ_API_KEY')
     if not api_key:
         raise RuntimeError("GROQ_API_KEY not configured")
-    resp = http_requests.post(
+    resp = http_client.post(
         _GROQ_URL,
         headers={'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'},
         json={
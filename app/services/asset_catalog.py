@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.services import http_client
+
+logger = logging.getLogger(__name__)
+
+
+class AssetCatalog:
+    """
+    Bulk-loaded symbol -> company name catalogue for Alpaca assets.
+
+    The full `/assets` list is fetched in one call, persisted to disk and
+    refreshed in the background, so name lookups on the quote path never touch
+    the network. Symbols Alpaca does not know fall back to the SEC-backed
+    StockSymbolIndexService entries.
+    """
+
+    def __init__(self, api_key=None, secret_key=None, trading_url=None, symbol_index=None, autostart=True):
+        self.api_key = api_key or os.getenv('ALPACA_API_KEY')
+        self.secret_key = secret_key or os.getenv('ALPACA_SECRET_KEY')
+        self.trading_url = trading_url or os.getenv('ALPACA_TRADING_URL', 'https://paper-api.alpaca.markets/v2')
+        self.symbol_index = symbol_index
+
+        self._lock = threading.RLock()
+        self._names: Dict[str, str] = {}
+        self._last_refresh_ts: float = 0.0
+        self._last_refresh_source: str = "empty"
+
+        self._refresh_interval_seconds = int(os.getenv("ASSET_CATALOG_REFRESH_SECONDS", "86400"))
+        self._request_timeout_seconds = float(os.getenv("ASSET_CATALOG_REQUEST_TIMEOUT_SECONDS", "20"))
+        self._cache_path = Path(os.getenv("ASSET_CATALOG_CACHE_PATH", "/tmp/alpaca_asset_catalog.json"))
+
+        self._load_from_cache_file()
+        if autostart and self.api_key and self.secret_key:
+            self._start_background_refresh()
+
+    def get_name(self, symbol: str) -> Optional[str]:
+        """Return the company name for a symbol, or None if unknown. Never hits the network."""
+        symbol = (symbol or '').strip().upper()
+        if not symbol:
+            return None
+
+        with self._lock:
+            name = self._names.get(symbol)
+        if name:
+            return name
+
+        if self.symbol_index is not None:
+            entry = self.symbol_index.get_entry(symbol)
+            if entry:
+                return entry.get('name') or None
+        return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._names),
+                "last_refresh_ts": self._last_refresh_ts,
+                "last_refresh_source": self._last_refresh_source,
+            }
+
+    def refresh_now(self) -> bool:
+        names = self._fetch_alpaca_assets()
+        if not names:
+            logger.warning("[ASSET-CATALOG] Alpaca refresh failed, retaining existing catalogue")
+            return False
+
+        self._set_names(names, source="alpaca_assets")
+        self._save_to_cache_file(names, source="alpaca_assets")
+        logger.info("[ASSET-CATALOG] Refreshed %s assets from Alpaca", len(names))
+        return True
+
+    def _start_background_refresh(self) -> None:
+        def loop():
+            with self._lock:
+                age = time.time() - self._last_refresh_ts
+            if age >= self._refresh_interval_seconds:
+                self.refresh_now()
+            while True:
+                time.sleep(max(300, self._refresh_interval_seconds))
+                self.refresh_now()
+
+        thread = threading.Thread(target=loop, daemon=True, name="asset-catalog-refresh")
+        thread.start()
+
+    def _fetch_alpaca_assets(self) -> Dict[str, str]:
+        try:
+            response = http_client.get(
+                f"{self.trading_url}/assets",
+                params={"status": "active", "asset_class": "us_equity"},
+                headers={
+                    'APCA-API-KEY-ID': self.api_key,
+                    'APCA-API-SECRET-KEY': self.secret_key,
+                },
+                timeout=self._request_timeout_seconds,
+            )
+            response.raise_for_status()
+            payload = response.json()
+            if not isinstance(payload, list):
+                return {}
+
+            names = {}
+            for asset in payload:
+                if not isinstance(asset, dict):
+                    continue
+                symbol = str(asset.get("symbol", "")).strip().upper()
+                name = str(asset.get("name", "")).strip()
+                if symbol and name:
+                    names[symbol] = name
+            return names
+        except Exception as exc:
+            logger.warning("[ASSET-CATALOG] Failed Alpaca assets fetch: %s", exc)
+            return {}
+
+    def _set_names(self, names: Dict[str, str], source: str, refreshed_at: float = None) -> None:
+        with self._lock:
+            self._names = names
+            self._last_refresh_ts = time.time() if refreshed_at is None else refreshed_at
+            self._last_refresh_source = source
+
+    def _load_from_cache_file(self) -> int:
+        if not self._cache_path.exists():
+            return 0
+
+        try:
+            payload = json.loads(self._cache_path.read_text(encoding="utf-8"))
+            names = payload.get("names", {})
+            if not isinstance(names, dict) or not names:
+                return 0
+            self._set_names(
+                {str(k).upper(): str(v) for k, v in names.items() if k and v},
+                source=payload.get("source", "cache_file"),
+                refreshed_at=float(payload.get("refreshed_at", 0)),
+            )
+            logger.info("[ASSET-CATALOG] Loaded %s assets from cache file", len(names))
+            return len(names)
+        except Exception as exc:
+            logger.warning("[ASSET-CATALOG] Failed to load cache file: %s", exc)
+            return 0
+
+    def _save_to_cache_file(self, names: Dict[str, str], source: str) -> None:
+        payload = {
+            "refreshed_at": time.time(),
+            "source": source,
+            "names": names,
+        }
+
+        try:
+            self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._cache_path.write_text(json.dumps(payload), encoding="utf-8")
+        except Exception as exc:
+            logger.warning("[ASSET-CATALOG] Failed to write cache file: %s", exc)
@@ -0,0 +1,453 @@
+"""
+On-disk OHLCV bar store keyed by (symbol, interval).
+
+Bars live in one NumPy structured array per key, saved as `.npy` and
+memory-mapped on read, with a small JSON sidecar recording how far back the
+history goes and when the tail was last checked. A range query only calls
+yfinance for what is missing: the tail since the last stored bar and, if
+an older start is requested, the gap before the first stored bar.
+Everything else is served from disk.
+
+Bars are split/dividend adjusted, and a new corporate action rescales all
+earlier bars. The tail fetch therefore starts one complete bar before the
+last stored one (which may itself have been partial); if that re-fetched
+bar no longer matches the stored one, the whole key is re-fetched instead
+of appending new-basis bars to old-basis history.
+
+Multi-symbol queries gather the gaps of every key: warm keys that only need
+their tail share one threaded `yf.download`, while cold keys and head gaps
+are downloaded per distinct range, so one new symbol does not pull full
+history for the rest. Symbols that return no bars at all are remembered for
+a while instead of being retried on every query.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BAR_DTYPE = np.dtype([
+    ('t', 'i8'),   # bar open, epoch seconds UTC
+    ('o', 'f8'),
+    ('h', 'f8'),
+    ('l', 'f8'),
+    ('c', 'f8'),
+    ('v', 'i8'),
+])
+
+INTRADAY_INTERVALS = {'1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h'}
+MARKET_TZ = 'America/New_York'
+
+BAR_STORE_DIR = os.getenv('BAR_STORE_DIR', '/tmp/ohlcv_bar_store')
+# How long a key's tail is trusted before yfinance is asked for newer bars
+BAR_STORE_REFRESH_SECONDS = int(os.getenv('BAR_STORE_REFRESH_SECONDS', '900'))
+BAR_STORE_INTRADAY_REFRESH_SECONDS = int(os.getenv('BAR_STORE_INTRADAY_REFRESH_SECONDS', '60'))
+# How long a (daily) symbol that returned no bars is skipped before yfinance is asked again
+BAR_STORE_NO_DATA_SECONDS = int(os.getenv('BAR_STORE_NO_DATA_SECONDS', '21600'))
+# Keys hash onto a fixed pool of locks, so the lock table does not grow with the universe
+BAR_STORE_LOCK_STRIPES = 64
+
+DateLike = Union[str, datetime, None]
+# fetcher(symbol, interval, start_ts, end_ts or None) -> bars
+Fetcher = Callable[[str, str, int, Optional[int]], np.ndarray]
+# batch_fetcher(symbols, interval, start_ts, end_ts or None) -> {symbol: bars}
+BatchFetcher = Callable[[List[str], str, int, Optional[int]], Dict[str, np.ndarray]]
+
+
+def _to_ts(value: DateLike) -> Optional[int]:
+    """'YYYY-MM-DD' or datetime -> epoch seconds (naive values are UTC)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], '%Y-%m-%d')
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _ts_to_date(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def frame_to_bars(hist: Optional[pd.DataFrame]) -> np.ndarray:
+    """yfinance history DataFrame -> BAR_DTYPE array (vectorised)."""
+    if hist is None or len(hist) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    index = pd.DatetimeIndex(hist.index)
+    index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+    bars = np.empty(len(hist), dtype=BAR_DTYPE)
+    bars['t'] = np.asarray(index.tz_localize(None), dtype='datetime64[s]').astype('int64')
+    bars['o'] = hist['Open'].to_numpy(dtype='f8')
+    bars['h'] = hist['High'].to_numpy(dtype='f8')
+    bars['l'] = hist['Low'].to_numpy(dtype='f8')
+    bars['c'] = hist['Close'].to_numpy(dtype='f8')
+    bars['v'] = np.nan_to_num(hist['Volume'].to_numpy(dtype='f8')).astype('i8')
+    return bars
+
+
+def bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    """BAR_DTYPE array -> DataFrame shaped like yfinance history (market-time index)."""
+    index = pd.to_datetime(np.asarray(bars['t']), unit='s', utc=True).tz_convert(MARKET_TZ)
+    return pd.DataFrame({
+        'Open': np.asarray(bars['o']),
+        'High': np.asarray(bars['h']),
+        'Low': np.asarray(bars['l']),
+        'Close': np.asarray(bars['c']),
+        'Volume': np.asarray(bars['v']),
+    }, index=index)
+
+
+def merge_bars(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Union of two bar arrays sorted by time; bars in `new` replace same-time bars in `old`."""
+    if len(old) == 0:
+        combined = new
+    elif len(new) == 0:
+        return old
+    else:
+        combined = np.concatenate([new, old])
+    _, first = np.unique(combined['t'], return_index=True)
+    return combined[first]
+
+
+def _slice(bars: np.ndarray, start_ts: int, end_ts: Optional[int]) -> np.ndarray:
+    lo = np.searchsorted(bars['t'], start_ts, side='left')
+    hi = len(bars) if end_ts is None else np.searchsorted(bars['t'], end_ts, side='left')
+    return bars[lo:hi]
+
+
+def _tail_start(bars: np.ndarray, meta: Dict) -> int:
+    """Tail fetch start: the last complete stored bar, so the fetch overlaps one bar known to be final."""
+    if len(bars) >= 2:
+        return int(bars['t'][-2])
+    return int(bars['t'][-1]) if len(bars) else meta['start']
+
+
+def _rebased(bars: np.ndarray, tail: np.ndarray) -> bool:
+    """True if the tail re-fetched the last complete stored bar at a different price.
+
+    History is split/dividend adjusted, so a corporate action since the last
+    fetch rescales every earlier bar; appending the tail would leave a fake jump.
+    """
+    if len(bars) < 2 or len(tail) == 0:
+        return False
+    anchor = bars[-2]
+    i = int(np.searchsorted(tail['t'], anchor['t']))
+    if i >= len(tail) or tail['t'][i] != anchor['t']:
+        return False
+    return not np.isclose(tail['c'][i], anchor['c'], rtol=1e-6, atol=0.0)
+
+
+def yfinance_fetch(symbol: str, interval: str, start_ts: int, end_ts: Optional[int]) -> np.ndarray:
+    import yfinance as yf
+    kwargs = {'start': _ts_to_date(start_ts), 'interval': interval}
+    if end_ts is not None:
+        kwargs['end'] = _ts_to_date(end_ts)
+    return frame_to_bars(yf.Ticker(symbol).history(**kwargs))
+
+
+def split_download(data: Optional[pd.DataFrame], symbols: List[str]) -> Dict[str, pd.DataFrame]:
+    """Per-symbol frames from a `yf.download(..., group_by='ticker')` result."""
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        return {symbols[0]: data.dropna(how='all')} if len(symbols) == 1 else {}
+    tickers = set(data.columns.get_level_values(0))
+    return {symbol: data[symbol].dropna(how='all') for symbol in symbols if symbol in tickers}
+
+
+def yfinance_download(symbols: List[str], interval: str, start: DateLike, end: DateLike = None) -> Dict[str, pd.DataFrame]:
+    """One threaded yf.download for many symbols, split into per-symbol history frames."""
+    import yfinance as yf
+    # auto_adjust/ignore_tz match Ticker.history, so bars line up with single-symbol fetches
+    data = yf.download(symbols, start=start, end=end, interval=interval, group_by='ticker',
+                       auto_adjust=True, ignore_tz=False, threads=True, progress=False)
+    return split_download(data, symbols)
+
+
+def yfinance_fetch_batch(symbols: List[str], interval: str, start_ts: int, end_ts: Optional[int]) -> Dict[str, np.ndarray]:
+    end = _ts_to_date(end_ts) if end_ts is not None else None
+    frames = yfinance_download(symbols, interval, _ts_to_date(start_ts), end)
+    return {symbol: frame_to_bars(frame) for symbol, frame in frames.items()}
+
+
+class BarStore:
+    """Disk-backed OHLCV history with incremental tail fetches."""
+
+    def __init__(self, root: Optional[str] = None, fetcher: Optional[Fetcher] = None,
+                 refresh_seconds: Optional[int] = None, clock: Callable[[], float] = time.time,
+                 batch_fetcher: Optional[BatchFetcher] = None, no_data_seconds: Optional[int] = None,
+                 lock_stripes: int = BAR_STORE_LOCK_STRIPES):
+        self.root = Path(root or BAR_STORE_DIR)
+        self.fetcher = fetcher or yfinance_fetch
+        # A custom single fetcher without a batch one is called once per symbol
+        self.batch_fetcher = batch_fetcher or (yfinance_fetch_batch if fetcher is None else self._fetch_each)
+        self.refresh_seconds = refresh_seconds
+        self.no_data_seconds = BAR_STORE_NO_DATA_SECONDS if no_data_seconds is None else no_data_seconds
+        self._clock = clock
+        self._locks = [threading.Lock() for _ in range(max(1, lock_stripes))]
+        # Guards the counters and the no-data memo, which keys on different stripes share
+        self._locks_guard = threading.Lock()
+        # (symbol, interval) -> (checked_at, start_ts) of a cold fetch that returned no bars
+        self._no_data: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        self.stats_counters = {'queries': 0, 'disk_hits': 0, 'tail_fetches': 0, 'head_fetches': 0,
+                               'batch_fetches': 0, 'adjust_refetches': 0, 'no_data_skips': 0, 'errors': 0}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get_bars(self, symbol: str, interval: str, start: DateLike, end: DateLike = None) -> np.ndarray:
+        """Bars with start <= t < end (end omitted = up to now), fetching only what is missing."""
+        symbol = symbol.upper()
+        start_ts = _to_ts(start)
+        end_ts = _to_ts(end)
+        self._count('queries')
+
+        with self._lock_for(symbol, interval):
+            bars, meta = self._load(symbol, interval)
+            changed = False
+            now = self._clock()
+
+            if bars is None:
+                if self._recently_empty(symbol, interval, start_ts, now):
+                    self._count('no_data_skips')
+                    return np.empty(0, dtype=BAR_DTYPE)
+                fetched = self._fetch(symbol, interval, start_ts, None, 'head_fetches')
+                if fetched is None:
+                    return np.empty(0, dtype=BAR_DTYPE)
+                if len(fetched) == 0:
+                    # Unknown, delisted or not yet listed: not coverage worth persisting
+                    self._remember_empty(symbol, interval, start_ts, now)
+                    return fetched
+                bars = merge_bars(np.empty(0, dtype=BAR_DTYPE), fetched)
+                meta = {'start': start_ts, 'checked_at': now}
+                changed = True
+            else:
+                if start_ts < meta['start']:
+                    head = self._fetch(symbol, interval, start_ts, meta['start'], 'head_fetches')
+                    if head is not None:
+                        bars = merge_bars(bars, head)
+                        meta['start'] = start_ts
+                        changed = True
+                last_t = int(bars['t'][-1]) if len(bars) else meta['start']
+                wants_tail = end_ts is None or end_ts > last_t
+                if wants_tail and now - meta['checked_at'] >= self._refresh_for(interval):
+                    tail = self._fetch(symbol, interval, _tail_start(bars, meta), None, 'tail_fetches')
+                    if tail is not None and _rebased(bars, tail):
+                        tail = self._fetch(symbol, interval, meta['start'], None, 'adjust_refetches')
+                        if tail is not None:
+                            bars = np.empty(0, dtype=BAR_DTYPE)
+                    if tail is not None:
+                        bars = merge_bars(bars, tail)
+                        meta['checked_at'] = now
+                        changed = True
+                if not changed:
+                    self._count('disk_hits')
+
+            if changed:
+                self._save(symbol, interval, bars, meta)
+
+        return _slice(bars, start_ts, end_ts)
+
+    def get_bars_batch(self, symbols: Iterable[str], interval: str, start: DateLike,
+                       end: DateLike = None) -> Dict[str, np.ndarray]:
+        """`get_bars` for many symbols; missing or stale keys are filled with as few batch fetches as possible."""
+        symbols = sorted({s.upper() for s in symbols if s})
+        start_ts = _to_ts(start)
+        end_ts = _to_ts(end)
+        self._count('queries', len(symbols))
+
+        # Distinct stripes in index order; single-symbol queries only ever hold one of them
+        stripes = sorted({self._stripe_for(symbol, interval) for symbol in symbols})
+        locks = [self._locks[stripe] for stripe in stripes]
+        for lock in locks:
+            lock.acquire()
+        try:
+            now = self._clock()
+            loaded = {}
+            metas = {}
+            gaps = {}
+            groups: Dict[object, List[str]] = {}
+            for symbol in symbols:
+                bars, meta = self._load(symbol, interval)
+                loaded[symbol], metas[symbol] = bars, meta
+                if bars is None and self._recently_empty(symbol, interval, start_ts, now):
+                    self._count('no_data_skips')
+                    continue
+                gap = self._missing_range(interval, bars, meta, start_ts, end_ts, now)
+                if gap is None:
+                    self._count('disk_hits')
+                    continue
+                gaps[symbol] = gap
+                # Tail-only gaps of warm keys share one download from the oldest tail;
+                # cold and head gaps reach much further back, so each range is its own download
+                tail_only = bars is not None and len(bars) > 0 and gap[1] is None and gap[0] >= meta['start']
+                groups.setdefault('tail' if tail_only else gap, []).append(symbol)
+
+            for group, members in groups.items():
+                fetch_start, fetch_end = (min(gaps[s][0] for s in members), None) if group == 'tail' else group
+                fetched = self._fetch_batch(members, interval, fetch_start, fetch_end)
+                if fetched is None:
+                    continue
+                rebased: Dict[int, List[str]] = {}
+                for symbol in members:
+                    new = np.asarray(fetched.get(symbol, np.empty(0, dtype=BAR_DTYPE)), dtype=BAR_DTYPE)
+                    bars, meta = loaded[symbol], metas[symbol]
+                    if bars is None and len(new) == 0:
+                        # Unknown, delisted or not yet listed: not coverage worth persisting
+                        self._remember_empty(symbol, interval, fetch_start, now)
+                        continue
+                    if group == 'tail' and _rebased(bars, new):
+                        rebased.setdefault(meta['start'], []).append(symbol)
+                        continue
+                    bars = merge_bars(bars if bars is not None else np.empty(0, dtype=BAR_DTYPE), new)
+                    meta = dict(meta) if meta else {'start': fetch_start, 'checked_at': now}
+                    meta['start'] = min(meta['start'], fetch_start)
+                    if fetch_end is None:
+                        meta['checked_at'] = now
+                    loaded[symbol] = bars
+                    self._save(symbol, interval, bars, meta)
+
+                # A split or dividend rescaled these keys' history: replace it, not just the tail
+                for history_start, stale in rebased.items():
+                    self._count('adjust_refetches')
+                    refetched = self._fetch_batch(stale, interval, history_start, None)
+                    if refetched is None:
+                        continue
+                    for symbol in stale:
+                        bars = merge_bars(np.empty(0, dtype=BAR_DTYPE),
+                                          np.asarray(refetched.get(symbol, np.empty(0, dtype=BAR_DTYPE)), dtype=BAR_DTYPE))
+                        if len(bars) == 0:
+                            continue
+                        meta = dict(metas[symbol], checked_at=now)
+                        loaded[symbol] = bars
+                        self._save(symbol, interval, bars, meta)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        empty = np.empty(0, dtype=BAR_DTYPE)
+        return {symbol: _slice(bars, start_ts, end_ts) if bars is not None else empty
+                for symbol, bars in loaded.items()}
+
+    def get_frame(self, symbol: str, interval: str, start: DateLike, end: DateLike = None) -> pd.DataFrame:
+        """`get_bars` as a yfinance-style DataFrame (Open/High/Low/Close/Volume)."""
+        return bars_to_frame(self.get_bars(symbol, interval, start, end))
+
+    def stats(self) -> Dict:
+        with self._locks_guard:
+            return dict(self.stats_counters)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _refresh_for(self, interval: str) -> int:
+        if self.refresh_seconds is not None:
+            return self.refresh_seconds
+        return BAR_STORE_INTRADAY_REFRESH_SECONDS if interval in INTRADAY_INTERVALS else BAR_STORE_REFRESH_SECONDS
+
+    def _missing_range(self, interval, bars, meta, start_ts, end_ts, now) -> Optional[Tuple[int, Optional[int]]]:
+        """(start_ts, end_ts or None) still to fetch for a key, or None when disk covers the query."""
+        if bars is None:
+            return start_ts, None
+        head = start_ts < meta['start']
+        last_t = int(bars['t'][-1]) if len(bars) else meta['start']
+        tail = (end_ts is None or end_ts > last_t) and now - meta['checked_at'] >= self._refresh_for(interval)
+        if tail:
+            return (start_ts if head else _tail_start(bars, meta)), None
+        if head:
+            return start_ts, meta['start']
+        return None
+
+    def _recently_empty(self, symbol: str, interval: str, start_ts: int, now: float) -> bool:
+        """True if a fetch from start_ts or earlier found no bars for this key not long ago."""
+        with self._locks_guard:
+            seen = self._no_data.get((symbol, interval))
+        if seen is None:
+            return False
+        ttl = self._refresh_for(interval) if interval in INTRADAY_INTERVALS else self.no_data_seconds
+        return start_ts >= seen[1] and now - seen[0] < ttl
+
+    def _remember_empty(self, symbol: str, interval: str, start_ts: int, now: float) -> None:
+        with self._locks_guard:
+            if len(self._no_data) >= 4096:
+                horizon = max(self.no_data_seconds, BAR_STORE_INTRADAY_REFRESH_SECONDS)
+                for key, (checked_at, _) in list(self._no_data.items()):
+                    if now - checked_at >= horizon:
+                        del self._no_data[key]
+            self._no_data[(symbol, interval)] = (now, start_ts)
+
+    def _stripe_for(self, symbol: str, interval: str) -> int:
+        return hash((symbol, interval)) % len(self._locks)
+
+    def _lock_for(self, symbol: str, interval: str) -> threading.Lock:
+        return self._locks[self._stripe_for(symbol, interval)]
+
+    def _count(self, counter: str, n: int = 1) -> None:
+        with self._locks_guard:
+            self.stats_counters[counter] += n
+
+    def _fetch(self, symbol, interval, start_ts, end_ts, counter) -> Optional[np.ndarray]:
+        """Fetched bars, or None if the fetch failed (nothing is stored then)."""
+        self._count(counter)
+        try:
+            bars = self.fetcher(symbol, interval, start_ts, end_ts)
+        except Exception as e:
+            self._count('errors')
+            logger.warning("[BARS] Fetch failed for %s %s: %s", symbol, interval, e)
+            return None
+        return np.asarray(bars, dtype=BAR_DTYPE)
+
+    def _fetch_batch(self, symbols, interval, start_ts, end_ts) -> Optional[Dict[str, np.ndarray]]:
+        """{symbol: bars} from one batch fetch, or None if it failed (nothing is stored then)."""
+        self._count('batch_fetches')
+        try:
+            return self.batch_fetcher(symbols, interval, start_ts, end_ts)
+        except Exception as e:
+            self._count('errors')
+            logger.warning("[BARS] Batch fetch failed for %s symbols %s: %s", len(symbols), interval, e)
+            return None
+
+    def _fetch_each(self, symbols, interval, start_ts, end_ts) -> Dict[str, np.ndarray]:
+        return {symbol: self.fetcher(symbol, interval, start_ts, end_ts) for symbol in symbols}
+
+    def _paths(self, symbol: str, interval: str) -> Tuple[Path, Path]:
+        safe = re.sub(r'[^A-Z0-9._^=-]', '_', symbol)
+        directory = self.root / interval
+        return directory / f"{safe}.npy", directory / f"{safe}.meta.json"
+
+    def _load(self, symbol: str, interval: str):
+        data_path, meta_path = self._paths(symbol, interval)
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+            bars = np.load(data_path, mmap_mode='r')
+            if bars.dtype != BAR_DTYPE:
+                return None, None
+            return bars, meta
+        except (OSError, ValueError):
+            return None, None
+
+    def _save(self, symbol: str, interval: str, bars: np.ndarray, meta: Dict) -> None:
+        data_path, meta_path = self._paths(symbol, interval)
+        try:
+            data_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_data = data_path.with_suffix('.tmp.npy')
+            np.save(tmp_data, np.ascontiguousarray(bars))
+            os.replace(tmp_data, data_path)
+            tmp_meta = meta_path.with_suffix('.tmp')
+            tmp_meta.write_text(json.dumps(meta), encoding='utf-8')
+            os.replace(tmp_meta, meta_path)
+        except OSError as e:
+            self._count('errors')
+            logger.warning("[BARS] Could not persist %s %s: %s", symbol, interval, e)
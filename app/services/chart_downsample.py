@@ -0,0 +1,74 @@
+"""
+Server-side downsampling of OHLCV history for charts.
+
+Two methods, both returning a yfinance-style DataFrame that the OHLCV
+serializer can emit unchanged:
+
+    lttb  Largest-Triangle-Three-Buckets on the close series. Keeps the bars
+          that best preserve the visual shape of a line chart; every output
+          bar is a real bar.
+    ohlc  Fixed-size buckets aggregated as candles (first open, max high,
+          min low, last close, summed volume), for candlestick charts.
+
+Points are spaced by bar position rather than wall time, matching how the
+dashboard plots bars (no gaps for nights and weekends).
+"""
+
+import numpy as np
+import pandas as pd
+
+MIN_POINTS = 3
+METHODS = ('lttb', 'ohlc')
+
+
+def lttb_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Positions of the `threshold` points LTTB keeps from series y (x = position)."""
+    n = len(y)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype='f8')
+    x = np.arange(n, dtype='f8')
+    # Bucket edges over the interior points; first and last points are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+        # Twice the triangle area for every candidate in this bucket
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def ohlc_buckets(hist: pd.DataFrame, points: int) -> pd.DataFrame:
+    """Aggregate consecutive bars into `points` candles, each stamped with its first bar's time."""
+    n = len(hist)
+    if points >= n or points < 1:
+        return hist
+    starts = np.linspace(0, n, points + 1).astype(np.int64)[:-1]
+    starts = np.unique(starts)
+    return pd.DataFrame({
+        'Open': hist['Open'].to_numpy(dtype='f8')[starts],
+        'High': np.maximum.reduceat(hist['High'].to_numpy(dtype='f8'), starts),
+        'Low': np.minimum.reduceat(hist['Low'].to_numpy(dtype='f8'), starts),
+        'Close': hist['Close'].to_numpy(dtype='f8')[np.append(starts[1:], n) - 1],
+        'Volume': np.add.reduceat(np.nan_to_num(hist['Volume'].to_numpy(dtype='f8')), starts),
+    }, index=hist.index[starts])
+
+
+def downsample(hist: pd.DataFrame, points: int, method: str = 'lttb') -> pd.DataFrame:
+    """Reduce hist to at most `points` bars; unchanged when it is already small enough."""
+    if hist is None or points is None or len(hist) <= points:
+        return hist
+    if method == 'ohlc':
+        return ohlc_buckets(hist, points)
+    return hist.iloc[lttb_indices(hist['Close'].to_numpy(dtype='f8'), points)]
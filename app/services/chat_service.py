@@ -7,11 +7,12 @@ import os
 import json
 import time
 import uuid
-import requests as http_requests
+from app.services import http_client
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from app.services.firebase_service import FirebaseService, get_firestore_client
 from app.services.stock import Stock, YahooFinanceAPI, NewsAPI, FinnhubAPI
+from app.services.services import yahoo_finance_api, quote_service, returns_matrix, sp500_constituents
 import logging
 
 # Configure logging
@@ -37,7 +38,8 @@ class ChatService:
         """Initialize the chat service with xAI Grok API and Firebase"""
         self.firebase_service = FirebaseService()
         self.firestore_client = get_firestore_client()
-        self.stock_api = YahooFinanceAPI()
+        self.stock_api = yahoo_finance_api
+        self.quote_service = quote_service
         self.finnhub_api = FinnhubAPI()
         self.news_api = NewsAPI()
 
@@ -79,7 +81,7 @@ class ChatService:
 
         last_resp = None
         for attempt in range(3):
-            last_resp = http_requests.post(
+            last_resp = http_client.post(
                 GROK_API_URL,
                 headers={
                     'Authorization': f'Bearer {self.xai_api_key}',
@@ -128,9 +130,9 @@ class ChatService:
         try:
             logger.info(f"Getting user context for user: {user_id}")
             
-            # Use the same approach as the working API endpoint
-            from app.services.watchlist_service import WatchlistService
-            watchlist_service = WatchlistService(self.firestore_client)
+            # Shared service so connected users are served from their live in-memory watchlist
+            from app.services.watchlist_service import get_watchlist_service
+            watchlist_service = get_watchlist_service(self.firestore_client)
             
             logger.info(f"🔍 WatchlistService initialized, Firestore client: {watchlist_service.db is not None}")
             
@@ -580,7 +582,7 @@ INSTRUCTIONS: Present this as a personalized portfolio analysis. Say things like
             
             if function_name == "get_stock_price":
                 symbol = arguments.get("symbol", "").upper()
-                stock_data = self.stock_api.get_real_time_data(symbol)
+                stock_data = self.quote_service.get_real_time_data(symbol)
                 if stock_data:
                     return {
                         "success": True,
@@ -728,7 +730,7 @@ INSTRUCTIONS: Present this as a personalized portfolio analysis. Say things like
                 for symbol in symbols[:5]:  # Limit to 5 stocks
                     try:
                         symbol_upper = symbol.upper().strip()
-                        stock_data = self.stock_api.get_real_time_data(symbol_upper)
+                        stock_data = self.quote_service.get_real_time_data(symbol_upper)
                         if stock_data and stock_data.get("price"):
                             comparison_data.append({
                                 "symbol": symbol_upper,
@@ -777,13 +779,8 @@ INSTRUCTIONS: Present this as a personalized portfolio analysis. Say things like
                     wl = context.get('watchlist', [])
                     symbols = [item.get('symbol') for item in wl if item.get('symbol')]
                 elif universe == "sp500":
-                    # Use Finnhub constituents helper; fallback to popular tickers
-                    try:
-                        symbols = self.finnhub_api.get_index_constituents('^GSPC') or []
-                    except Exception:
-                        symbols = []
-                    if not symbols:
-                        symbols = ['AAPL', 'MSFT', 'NVDA', 'AMZN', 'META', 'GOOGL', 'TSLA', 'AVGO', 'BRK.B', 'LLY']
+                    # Same daily-refreshed list the returns matrix is built from
+                    symbols = sp500_constituents.get()
                 else:
                     return {"success": False, "data": None, "message": "universe must be 'watchlist' or 'sp500'"}
 
@@ -801,15 +798,13 @@ INSTRUCTIONS: Present this as a personalized portfolio analysis. Say things like
                 best_change: Optional[float] = None
                 evaluated = 0
 
-                for sym in symbols:
-                    try:
-                        change_pct = self.stock_api.get_day_change_percent(sym, date_str)
-                        evaluated += 1
-                        if best_change is None or change_pct > best_change:
-                            best_change = change_pct
-                            best_symbol = sym
-                    except Exception:
-                        continue
+                # Completed sessions come from the precomputed returns matrix; the rest in one batch download
+                changes = returns_matrix.day_changes(symbols, date_str, fallback=self.stock_api.get_day_change_percents)
+                for sym, change_pct in changes.items():
+                    evaluated += 1
+                    if best_change is None or change_pct > best_change:
+                        best_change = change_pct
+                        best_symbol = sym
 
                 if best_symbol is None:
                     return {"success": False, "data": None, "message": "Could not compute top performer for requested date"}
@@ -897,7 +892,7 @@ INSTRUCTIONS: Present this as a personalized portfolio analysis. Say things like
                 
                 # Get current stock price to set as original_price
                 logger.info(f"Fetching stock data for {symbol}...")
-                stock_data = self.stock_api.get_real_time_data(symbol)
+                stock_data = self.quote_service.get_real_time_data(symbol)
                 
                 if not stock_data:
                     logger.error(f"Could not fetch stock data for {symbol}")
@@ -1526,7 +1521,7 @@ The analysis should be based on the most recent data you have when the user requ
             payload['tools'] = tools
 
         try:
-            resp = http_requests.post(
+            resp = http_client.post(
                 GROK_API_URL,
                 headers={
                     'Authorization': f'Bearer {self.xai_api_key}',
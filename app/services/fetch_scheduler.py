@@ -0,0 +1,173 @@
+"""
+Parallel price fetch scheduler for the socket poll loop.
+
+Batch quote calls and the per-symbol fallback run on a small bounded worker
+pool instead of one after another with fixed sleeps. Symbols users are
+actively viewing are always submitted first, and the number of upstream
+calls issued per cycle is capped by the headroom left in the Alpaca
+RequestQueue, so the poll loop never spends budget interactive routes need.
+Cycle and fetch durations are kept for /api/stats.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRICE_FETCH_WORKERS = int(os.getenv('PRICE_FETCH_WORKERS', '4'))
+
+BatchFetch = Callable[[List[str]], Dict[str, Dict]]
+SingleFetch = Callable[[str], Optional[Dict]]
+
+
+def _percentiles(samples: Iterable[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0, 'samples': 0}
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+    return {'p50_ms': pct(0.50), 'p95_ms': pct(0.95), 'max_ms': round(ordered[-1] * 1000, 1),
+            'samples': len(ordered)}
+
+
+class PriceFetchScheduler:
+    """
+    Runs one poll cycle's batch and fallback fetches on a shared worker pool.
+
+    `budget` is anything with `available_requests()` (the Alpaca
+    RequestQueue); each batch or single fetch counts as one request. Work
+    that does not fit in the remaining budget is deferred to a later cycle,
+    regular symbols before priority ones. `lane(is_priority)` returns a
+    context manager each fetch runs in, so upstream calls can be queued in
+    the matching rate-limit lane.
+    """
+
+    def __init__(self, budget=None, max_workers: int = PRICE_FETCH_WORKERS, batch_size: int = 50,
+                 max_individual: int = 50, history: int = 500,
+                 lane: Optional[Callable[[bool], ContextManager]] = None):
+        self.budget = budget
+        self.lane = lane
+        self.max_workers = max(1, max_workers)
+        self.batch_size = batch_size
+        self.max_individual = max_individual
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._fetch_durations = deque(maxlen=history)
+        self._cycle_durations = deque(maxlen=history)
+        self.stats_counters = {
+            'runs': 0,
+            'batch_calls': 0,
+            'single_calls': 0,
+            'deferred': 0,
+            'errors': 0,
+        }
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='PriceFetch')
+            return self._pool
+
+    def _headroom(self) -> Optional[int]:
+        if self.budget is None:
+            return None
+        try:
+            return max(0, int(self.budget.available_requests()))
+        except Exception as e:
+            logger.debug("[REALTIME] Budget check failed: %s", e)
+            return None
+
+    def _call(self, fn, arg, is_priority: bool):
+        with self.lane(is_priority) if self.lane else nullcontext():
+            return fn(arg)
+
+    def _chunks(self, symbols: List[str]) -> List[List[str]]:
+        return [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+
+    def run(self, priority: Iterable[str], regular: Iterable[str],
+            fetch_batch: Optional[BatchFetch] = None, fetch_one: Optional[SingleFetch] = None) -> Dict[str, Dict]:
+        """
+        Fetch prices for priority then regular symbols. Batches run first;
+        symbols a batch did not return fall back to fetch_one. Returns
+        {symbol: data} for every symbol that resolved.
+        """
+        started = time.perf_counter()
+        priority = list(dict.fromkeys(priority))
+        seen = set(priority)
+        regular = [s for s in dict.fromkeys(regular) if s not in seen]
+        headroom = self._headroom()
+        results: Dict[str, Dict] = {}
+        pool = self._executor()
+
+        failed = priority + regular
+        if fetch_batch is not None and failed:
+            # Priority symbols get their own batches so they are never queued behind regular ones
+            batches = self._chunks(priority) + self._chunks(regular)
+            if headroom is not None:
+                deferred = batches[headroom:]
+                batches = batches[:headroom]
+                headroom -= len(batches)
+                self.stats_counters['deferred'] += sum(len(b) for b in deferred)
+            futures = {pool.submit(self._call, fetch_batch, batch, batch[0] in seen): batch for batch in batches}
+            self.stats_counters['batch_calls'] += len(futures)
+            for future in as_completed(futures):
+                try:
+                    for symbol, data in (future.result() or {}).items():
+                        if data and (data.get('price') or 0) > 0:
+                            results[symbol] = data
+                except Exception as e:
+                    self.stats_counters['errors'] += 1
+                    logger.error("[REALTIME] Batch fetch failed: %s", e)
+            batched = {s for batch in batches for s in batch}
+            failed = [s for s in failed if s in batched and s not in results]
+
+        if fetch_one is not None and failed:
+            limit = self.max_individual if headroom is None else min(self.max_individual, headroom)
+            singles = failed[:limit]
+            self.stats_counters['deferred'] += len(failed) - len(singles)
+            if singles:
+                logger.info("[REALTIME] Fetching %s symbols individually (%s priority)...",
+                            len(singles), sum(1 for s in singles if s in seen))
+            futures = {pool.submit(self._call, fetch_one, symbol, symbol in seen): symbol for symbol in singles}
+            self.stats_counters['single_calls'] += len(futures)
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    self.stats_counters['errors'] += 1
+                    logger.error("Error updating %s: %s", symbol, e)
+                    continue
+                if data:
+                    results[symbol] = data
+
+        self.stats_counters['runs'] += 1
+        self._fetch_durations.append(time.perf_counter() - started)
+        return results
+
+    def record_cycle(self, seconds: float) -> None:
+        """Record the duration of a whole poll cycle (fetch plus push)."""
+        self._cycle_durations.append(seconds)
+
+    def stats(self) -> Dict:
+        return {
+            **self.stats_counters,
+            'workers': self.max_workers,
+            'budget_headroom': self._headroom(),
+            'fetch_time': _percentiles(self._fetch_durations),
+            'cycle_time': _percentiles(self._cycle_durations),
+        }
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
@@ -0,0 +1,147 @@
+"""
+Finnhub websocket subscription planning beyond the per-connection symbol cap.
+
+Each Finnhub key allows one websocket with a limited number of symbols
+(50 on the free tier). FinnhubSubscriptionManager ranks every wanted symbol
+by whether someone is actively viewing it, how many users watch it and how
+recently interest was last shown, keeps the hottest ones subscribed across
+all configured connections and rotates colder ones out. Symbols that do not
+fit stay on the Alpaca/Yahoo poll path; `coverage()` reports the ratio.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (connection index, symbol)
+SubscriptionChange = Tuple[int, str]
+
+
+class FinnhubSubscriptionManager:
+    """
+    Decides which symbols each websocket connection should be subscribed to.
+
+    The manager only plans; the caller sends the resulting subscribe and
+    unsubscribe messages. A symbol subscribed less than `min_hold_seconds`
+    ago is not rotated out for a hotter one, which stops churn when scores
+    are close. Socket handlers touch/forget symbols while the rebalance
+    thread plans, so every method holds the manager's lock.
+    """
+
+    def __init__(self, connections: int = 1, capacity_per_connection: int = 50,
+                 min_hold_seconds: float = 30.0, clock: Callable[[], float] = time.time):
+        self.connections = max(1, connections)
+        self.capacity_per_connection = capacity_per_connection
+        self.min_hold_seconds = min_hold_seconds
+        self._clock = clock
+        self._wanted: Dict[str, float] = {}       # symbol -> last interest time
+        self._assigned: Dict[str, int] = {}       # symbol -> connection index
+        self._assigned_at: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self.rotations = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.connections * self.capacity_per_connection
+
+    def touch(self, symbols: Iterable[str], now: Optional[float] = None) -> None:
+        """Record interest in symbols (refreshes their recency)."""
+        now = self._clock() if now is None else now
+        with self._lock:
+            for symbol in symbols:
+                if symbol:
+                    self._wanted[symbol] = now
+
+    def forget(self, symbol: str) -> None:
+        """Symbol is no longer wanted by anyone."""
+        with self._lock:
+            self._wanted.pop(symbol, None)
+
+    def is_subscribed(self, symbol: str) -> bool:
+        with self._lock:
+            return symbol in self._assigned
+
+    def subscribed(self, connection: Optional[int] = None) -> Set[str]:
+        with self._lock:
+            if connection is None:
+                return set(self._assigned)
+            return {symbol for symbol, conn in self._assigned.items() if conn == connection}
+
+    def plan(self, watchers: Callable[[str], int], active: Iterable[str] = (),
+             now: Optional[float] = None) -> Tuple[List[SubscriptionChange], List[SubscriptionChange]]:
+        """
+        Rebalance assignments. Returns (subscribe, unsubscribe) lists of
+        (connection index, symbol); unsubscribes should be sent first.
+        """
+        now = self._clock() if now is None else now
+        active = set(active)
+        with self._lock:
+            return self._plan(watchers, active, now)
+
+    def _plan(self, watchers, active, now):
+        self.touch(active, now)
+
+        ranked = sorted(
+            self._wanted,
+            key=lambda s: (s in active, watchers(s), self._wanted[s]),
+            reverse=True,
+        )
+        hot = set(ranked[:self.capacity])
+
+        unsubscribe: List[SubscriptionChange] = []
+        # Drop anything no longer wanted at all
+        for symbol in [s for s in self._assigned if s not in self._wanted]:
+            unsubscribe.append((self._release(symbol), symbol))
+
+        # Rotate out cold symbols that have been held long enough, coldest first
+        waiting = [s for s in ranked if s in hot and s not in self._assigned]
+        free = self.capacity - len(self._assigned)
+        if len(waiting) > free:
+            cold = [s for s in reversed(ranked) if s in self._assigned and s not in hot
+                    and now - self._assigned_at[s] >= self.min_hold_seconds]
+            for symbol in cold[:len(waiting) - free]:
+                unsubscribe.append((self._release(symbol), symbol))
+                self.rotations += 1
+
+        subscribe: List[SubscriptionChange] = []
+        load = [0] * self.connections
+        for conn in self._assigned.values():
+            load[conn] += 1
+        for symbol in waiting:
+            conn = min(range(self.connections), key=lambda c: load[c])
+            if load[conn] >= self.capacity_per_connection:
+                break
+            load[conn] += 1
+            self._assigned[symbol] = conn
+            self._assigned_at[symbol] = now
+            subscribe.append((conn, symbol))
+
+        if subscribe or unsubscribe:
+            logger.debug("[Finnhub] Rebalanced: +%s -%s (coverage %.0f%%)",
+                         len(subscribe), len(unsubscribe), self.coverage() * 100)
+        return subscribe, unsubscribe
+
+    def coverage(self) -> float:
+        """Share of wanted symbols currently on a websocket."""
+        with self._lock:
+            if not self._wanted:
+                return 1.0
+            return sum(1 for s in self._wanted if s in self._assigned) / len(self._wanted)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'connections': self.connections,
+                'capacity': self.capacity,
+                'wanted': len(self._wanted),
+                'subscribed': len(self._assigned),
+                'coverage': round(self.coverage(), 3),
+                'rotations': self.rotations,
+            }
+
+    def _release(self, symbol: str) -> int:
+        self._assigned_at.pop(symbol, None)
+        return self._assigned.pop(symbol)
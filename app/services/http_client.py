@@ -0,0 +1,180 @@
+"""
+Shared upstream HTTP client with pooled keep-alive connections.
+
+Every outbound call to Alpaca, Finnhub, Stocktwits, Yahoo, SEC and the AI
+providers goes through one `requests.Session` whose adapter keeps a
+connection pool per host, so repeated calls reuse an open TCP+TLS
+connection instead of handshaking each time. Per-host call counts, errors
+and latency percentiles are recorded for /api/stats.
+
+Usage:
+    from app.services import http_client
+
+    response = http_client.get(url, params=params, timeout=5)
+
+An async variant backed by httpx (HTTP/2 when the `h2` package is present)
+is available through `get_async_client()` when httpx is installed.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '16'))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+LATENCY_SAMPLES = 1000
+
+
+class _HostStats:
+    __slots__ = ('calls', 'errors', 'latencies')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.latencies)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1) if ordered else 0.0
+
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'p50_ms': pct(0.50),
+            'p95_ms': pct(0.95),
+            'p99_ms': pct(0.99),
+        }
+
+
+class LatencyRecorder:
+    """Per-host call, error and latency counters shared by the sync and async clients."""
+
+    def __init__(self):
+        self._hosts: Dict[str, _HostStats] = defaultdict(_HostStats)
+        self._lock = threading.Lock()
+
+    def record(self, url: str, seconds: float, failed: bool) -> None:
+        host = urlsplit(url).netloc or url
+        with self._lock:
+            stats = self._hosts[host]
+            stats.calls += 1
+            stats.latencies.append(seconds)
+            if failed:
+                stats.errors += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {host: stats.summary() for host, stats in sorted(self._hosts.items())}
+
+
+class HttpClient:
+    """
+    Thread-safe pooled session. Responses with a 5xx status count as errors
+    in the stats but are returned to the caller unchanged, exactly as
+    `requests.get` would.
+    """
+
+    def __init__(self, pool_hosts: int = HTTP_POOL_HOSTS, pool_size: int = HTTP_POOL_SIZE,
+                 recorder: Optional[LatencyRecorder] = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.recorder = recorder or LatencyRecorder()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.recorder.record(url, time.perf_counter() - started, failed)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncHttpClient:
+    """httpx.AsyncClient wrapper with the same latency instrumentation."""
+
+    def __init__(self, recorder: LatencyRecorder, pool_size: int = HTTP_POOL_SIZE):
+        try:
+            import httpx
+        except ImportError as e:
+            raise RuntimeError("httpx is required for the async HTTP client (pip install httpx)") from e
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        self.http2 = http2
+        self.recorder = recorder
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(max_connections=pool_size * HTTP_POOL_HOSTS,
+                                max_keepalive_connections=pool_size),
+        )
+
+    async def request(self, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.recorder.record(url, time.perf_counter() - started, failed)
+
+    async def get(self, url: str, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_recorder = LatencyRecorder()
+_client = HttpClient(recorder=_recorder)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return _client.get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return _client.post(url, **kwargs)
+
+
+def get_async_client() -> AsyncHttpClient:
+    """
+    New async client sharing the module's latency stats. Create one per event
+    loop and close it with `await client.aclose()`; raises RuntimeError if
+    httpx is not installed.
+    """
+    return AsyncHttpClient(_recorder)
+
+
+def get_http_stats() -> Dict[str, Dict]:
+    """Per-host upstream call stats for /api/stats."""
+    return _recorder.stats()
@@ -0,0 +1,265 @@
+"""
+NYSE trading calendar and market-hours-aware cache/poll timings.
+
+Holidays and early closes are derived from the exchange's published rules,
+so no calendar data has to be downloaded or kept up to date. Sessions (ET):
+
+  pre      04:00 - 09:30
+  regular  09:30 - 16:00   (13:00 on early-close days)
+  post     close - 20:00   (17:00 on early-close days)
+  closed   otherwise, and all day on weekends and holidays
+
+Quote TTLs follow the session: short while the regular market trades, longer
+in extended hours, and while closed a quote written after the last session
+ended stays valid until the next one starts.
+"""
+
+import logging
+import os
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+try:
+    import zoneinfo
+except ImportError:
+    try:
+        from backports import zoneinfo
+    except ImportError:
+        zoneinfo = None
+
+logger = logging.getLogger(__name__)
+
+SESSION_PRE = 'pre'
+SESSION_REGULAR = 'regular'
+SESSION_POST = 'post'
+SESSION_CLOSED = 'closed'
+
+PRE_MARKET_OPEN = dtime(4, 0)
+REGULAR_OPEN = dtime(9, 30)
+REGULAR_CLOSE = dtime(16, 0)
+EARLY_CLOSE = dtime(13, 0)
+POST_MARKET_CLOSE = dtime(20, 0)
+EARLY_POST_MARKET_CLOSE = dtime(17, 0)
+
+QUOTE_TTL_REGULAR_SECONDS = int(os.getenv('QUOTE_TTL_REGULAR_SECONDS', '30'))
+QUOTE_TTL_EXTENDED_SECONDS = int(os.getenv('QUOTE_TTL_EXTENDED_SECONDS', '120'))
+POLL_INTERVAL_REGULAR_SECONDS = int(os.getenv('POLL_INTERVAL_REGULAR_SECONDS', '30'))
+POLL_INTERVAL_EXTENDED_SECONDS = int(os.getenv('POLL_INTERVAL_EXTENDED_SECONDS', '60'))
+POLL_INTERVAL_CLOSED_SECONDS = int(os.getenv('POLL_INTERVAL_CLOSED_SECONDS', '300'))
+
+_STATUS_TEXT = {
+    SESSION_PRE: 'Pre-Market',
+    SESSION_REGULAR: 'Market is Open',
+    SESSION_POST: 'After Hours',
+    SESSION_CLOSED: 'Market is Closed',
+}
+
+
+def _eastern_tz():
+    if zoneinfo:
+        try:
+            return zoneinfo.ZoneInfo("America/New_York")
+        except Exception:
+            pass
+    return timezone(timedelta(hours=-4))
+
+
+ET = _eastern_tz()
+
+
+# ---------------------------------------------------------------------------
+# Holiday rules
+# ---------------------------------------------------------------------------
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th (1-based) given weekday of a month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + timedelta(days=offset + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day: date) -> date:
+    """Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=32)
+def holidays(year: int) -> Dict[date, str]:
+    """NYSE full-day closures for a year."""
+    days = {
+        _nth_weekday(year, 1, 0, 3): "Martin Luther King Jr. Day",
+        _nth_weekday(year, 2, 0, 3): "Presidents' Day",
+        _easter(year) - timedelta(days=2): "Good Friday",
+        _nth_weekday(year, 5, 0, -1): "Memorial Day",
+        _observed(date(year, 7, 4)): "Independence Day",
+        _nth_weekday(year, 9, 0, 1): "Labor Day",
+        _nth_weekday(year, 11, 3, 4): "Thanksgiving Day",
+        _observed(date(year, 12, 25)): "Christmas Day",
+    }
+    # A Saturday New Year's Day is not observed on the preceding Friday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days[_observed(new_year)] = "New Year's Day"
+    if year >= 2022:
+        days[_observed(date(year, 6, 19))] = "Juneteenth"
+    return days
+
+
+@lru_cache(maxsize=32)
+def early_closes(year: int) -> Dict[date, str]:
+    """NYSE 1:00 PM early-close days for a year."""
+    full = holidays(year)
+    candidates = {
+        date(year, 7, 3): "Independence Day Eve",
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1): "Day after Thanksgiving",
+        date(year, 12, 24): "Christmas Eve",
+    }
+    return {d: name for d, name in candidates.items() if d.weekday() < 5 and d not in full}
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def session_times(day: date) -> Optional[Tuple[datetime, datetime, datetime, datetime]]:
+    """(pre_open, regular_open, regular_close, post_close) in ET, or None when closed all day."""
+    if not is_trading_day(day):
+        return None
+    early = day in early_closes(day.year)
+    close = EARLY_CLOSE if early else REGULAR_CLOSE
+    post_close = EARLY_POST_MARKET_CLOSE if early else POST_MARKET_CLOSE
+    return tuple(datetime.combine(day, t, tzinfo=ET) for t in (PRE_MARKET_OPEN, REGULAR_OPEN, close, post_close))
+
+
+# ---------------------------------------------------------------------------
+# Sessions
+# ---------------------------------------------------------------------------
+
+def _now_et(now: Optional[datetime] = None) -> datetime:
+    if now is None:
+        return datetime.now(ET)
+    if now.tzinfo is None:
+        return now.replace(tzinfo=ET)
+    return now.astimezone(ET)
+
+
+def current_session(now: Optional[datetime] = None) -> str:
+    now = _now_et(now)
+    times = session_times(now.date())
+    if times is None:
+        return SESSION_CLOSED
+    pre_open, regular_open, regular_close, post_close = times
+    if regular_open <= now < regular_close:
+        return SESSION_REGULAR
+    if pre_open <= now < regular_open:
+        return SESSION_PRE
+    if regular_close <= now < post_close:
+        return SESSION_POST
+    return SESSION_CLOSED
+
+
+def next_regular_open(now: Optional[datetime] = None) -> datetime:
+    now = _now_et(now)
+    day = now.date()
+    for _ in range(15):
+        times = session_times(day)
+        if times and times[1] > now:
+            return times[1]
+        day += timedelta(days=1)
+    raise RuntimeError("No trading day found in the next 15 days")
+
+
+def next_session_start(now: Optional[datetime] = None) -> datetime:
+    """Start of the next pre-market session after `now`."""
+    now = _now_et(now)
+    day = now.date()
+    for _ in range(15):
+        times = session_times(day)
+        if times and times[0] > now:
+            return times[0]
+        day += timedelta(days=1)
+    raise RuntimeError("No trading day found in the next 15 days")
+
+
+def last_session_end(now: Optional[datetime] = None) -> datetime:
+    """End of the most recent extended-hours session before `now`."""
+    now = _now_et(now)
+    day = now.date()
+    for _ in range(15):
+        times = session_times(day)
+        if times and times[3] <= now:
+            return times[3]
+        day -= timedelta(days=1)
+    return now - timedelta(days=1)
+
+
+def market_status(now: Optional[datetime] = None) -> Dict:
+    """Session summary used by get_market_status() and /api/market-status."""
+    now = _now_et(now)
+    session = current_session(now)
+    status = {
+        'isOpen': session == SESSION_REGULAR,
+        'session': session,
+        'status': _STATUS_TEXT[session],
+        'next_open': next_regular_open(now).isoformat(),
+        'last_updated': now.isoformat(),
+    }
+    holiday = holidays(now.year).get(now.date())
+    if holiday:
+        status['holiday'] = holiday
+    times = session_times(now.date())
+    if session == SESSION_REGULAR and times:
+        status['next_close'] = times[2].isoformat()
+    return status
+
+
+# ---------------------------------------------------------------------------
+# Adaptive timings
+# ---------------------------------------------------------------------------
+
+def quote_ttl(now: Optional[datetime] = None) -> int:
+    """Maximum age in seconds for a cached quote to still be served."""
+    now = _now_et(now)
+    session = current_session(now)
+    if session == SESSION_REGULAR:
+        return QUOTE_TTL_REGULAR_SECONDS
+    if session in (SESSION_PRE, SESSION_POST):
+        return QUOTE_TTL_EXTENDED_SECONDS
+    # Closed: anything written after the last session ended is still current
+    quiet_for = int((now - last_session_end(now)).total_seconds())
+    return max(QUOTE_TTL_EXTENDED_SECONDS, quiet_for)
+
+
+def poll_interval(now: Optional[datetime] = None) -> int:
+    """Seconds the price poll loop should sleep before its next cycle."""
+    now = _now_et(now)
+    session = current_session(now)
+    if session == SESSION_REGULAR:
+        return POLL_INTERVAL_REGULAR_SECONDS
+    if session in (SESSION_PRE, SESSION_POST):
+        return POLL_INTERVAL_EXTENDED_SECONDS
+    until_next = int((next_session_start(now) - now).total_seconds())
+    return max(POLL_INTERVAL_REGULAR_SECONDS, min(POLL_INTERVAL_CLOSED_SECONDS, until_next))
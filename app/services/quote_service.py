@@ -0,0 +1,192 @@
+"""
+Unified price lookup service.
+
+Every route, the socket poll loop and the chat tools resolve prices through a
+single QuoteService. Concurrent requests for the same (source, symbol) are
+coalesced into one upstream call whose result is fanned out to every waiter,
+so a burst of users opening the same ticker costs one Alpaca/Yahoo request.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SOURCE_AUTO = 'auto'
+SOURCE_ALPACA = 'alpaca'
+SOURCE_YAHOO = 'yahoo'
+
+
+class QuoteSource:
+    """Adapter exposing one QuoteService source through the `Stock` api interface."""
+
+    def __init__(self, quote_service: 'QuoteService', source: str):
+        self._quote_service = quote_service
+        self.source = source
+
+    def get_real_time_data(self, symbol):
+        return self._quote_service.get_real_time_data(symbol, source=self.source)
+
+
+class QuoteService:
+    """
+    Single entry point for real-time quotes with in-flight request coalescing.
+
+    The first caller for a key becomes the leader and performs the upstream
+    fetch; callers arriving while it is in flight wait on the same Future.
+    Results are not cached here - the underlying API clients keep their own
+    short-TTL caches - so coalescing only removes duplicate concurrent work.
+    """
+
+    def __init__(self, yahoo_api, alpaca_api=None, wait_timeout=15):
+        self.yahoo_api = yahoo_api
+        self.alpaca_api = alpaca_api
+        self.wait_timeout = wait_timeout
+        self._inflight: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'upstream_fetches': 0,
+            'coalesced': 0,
+            'errors': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def source(self, source: str) -> QuoteSource:
+        """Return a `Stock`-compatible api object bound to a single source."""
+        return QuoteSource(self, source)
+
+    def get_real_time_data(self, symbol: str, source: str = SOURCE_AUTO) -> Optional[Dict]:
+        """
+        Get {'name', 'price'} for a symbol.
+
+        source='alpaca' uses Alpaca only, 'yahoo' uses Yahoo only and 'auto'
+        tries Alpaca (when enabled) before falling back to Yahoo.
+        """
+        symbol = (symbol or '').strip().upper()
+        if not symbol:
+            return None
+
+        if source == SOURCE_AUTO:
+            if self.alpaca_api:
+                data = self.get_real_time_data(symbol, source=SOURCE_ALPACA)
+                if data and data.get('price'):
+                    return data
+            return self.get_real_time_data(symbol, source=SOURCE_YAHOO)
+
+        api = self._api_for(source)
+        if api is None:
+            return None
+
+        return self._coalesce((source, symbol), lambda: api.get_real_time_data(symbol))
+
+    def get_batch_quotes(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Get Alpaca quotes for many symbols with one batch snapshot call.
+
+        Symbols already being fetched by another caller are awaited instead of
+        re-requested; the remainder are registered as in flight for the
+        duration of the batch so concurrent single lookups join it.
+        """
+        if not self.alpaca_api or not symbols:
+            return {}
+
+        owned: Dict[str, Future] = {}
+        joined: Dict[str, Future] = {}
+        with self._lock:
+            for symbol in dict.fromkeys(s.strip().upper() for s in symbols if s):
+                key = (SOURCE_ALPACA, symbol)
+                self.stats['requests'] += 1
+                future = self._inflight.get(key)
+                if future is not None:
+                    self.stats['coalesced'] += 1
+                    joined[symbol] = future
+                else:
+                    future = Future()
+                    self._inflight[key] = future
+                    owned[symbol] = future
+
+        results: Dict[str, Dict] = {}
+        if owned:
+            batch_results = {}
+            try:
+                with self._lock:
+                    self.stats['upstream_fetches'] += 1
+                batch_results = self.alpaca_api.get_batch_snapshots(list(owned)) or {}
+            except Exception as e:
+                logger.error("[QUOTES] Batch fetch failed: %s", e)
+                with self._lock:
+                    self.stats['errors'] += 1
+            finally:
+                with self._lock:
+                    for symbol in owned:
+                        self._inflight.pop((SOURCE_ALPACA, symbol), None)
+                for symbol, future in owned.items():
+                    data = batch_results.get(symbol)
+                    future.set_result(data)
+                    if data:
+                        results[symbol] = data
+
+        for symbol, future in joined.items():
+            try:
+                data = future.result(timeout=self.wait_timeout)
+            except Exception:
+                data = None
+            if data:
+                results[symbol] = data
+
+        return results
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, 'in_flight': len(self._inflight)}
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _api_for(self, source: str):
+        if source == SOURCE_ALPACA:
+            return self.alpaca_api
+        if source == SOURCE_YAHOO:
+            return self.yahoo_api
+        raise ValueError(f"Unknown quote source: {source}")
+
+    def _coalesce(self, key: tuple, fetch):
+        with self._lock:
+            self.stats['requests'] += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                self.stats['upstream_fetches'] += 1
+                leader = True
+
+        if not leader:
+            try:
+                return future.result(timeout=self.wait_timeout)
+            except Exception as e:
+                logger.warning("[QUOTES] Coalesced wait failed for %s: %s", key, e)
+                return None
+
+        try:
+            result = fetch()
+        except Exception as e:
+            logger.error("[QUOTES] Upstream fetch failed for %s: %s", key, e)
+            with self._lock:
+                self.stats['errors'] += 1
+            result = None
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        future.set_result(result)
+        return result
@@ -0,0 +1,152 @@
+"""
+Refresh-ahead wrapper around SmartCache for expensive, shared values.
+
+Each registered key has a compute function. Readers never wait for a
+recompute when any previous value exists:
+
+    fresh   (age < ttl)                 returned as is
+    stale   (age >= ttl, value present) returned immediately; one background
+                                        refresh is kicked off
+    cold    (nothing cached)            computed inline; concurrent readers
+                                        share that single computation
+
+A scheduler thread also recomputes keys `refresh_ahead` seconds before they
+would expire, so in steady state readers only ever see fresh values. It only
+does so for keys read within the last `ttl` seconds, and only while
+`active()` is true (e.g. during market hours); idle keys are left to go
+stale and are refreshed by the next read.
+Single-flight is per process; with a shared cache backend other workers pick
+up the result through SmartCache's shared read.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshAheadCache:
+    """Keeps registered keys warm in a SmartCache with single-flight recomputes."""
+
+    def __init__(self, cache, ttl: int, refresh_ahead: int, check_seconds: int = 30,
+                 wait_timeout: float = 60, name: str = 'refresh-ahead',
+                 active: Optional[Callable[[], bool]] = None):
+        self.cache = cache
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.check_seconds = check_seconds
+        self.wait_timeout = wait_timeout
+        self.name = name
+        self.active = active
+        self._computes: Dict[str, Callable[[], Any]] = {}
+        self._last_read: Dict[str, float] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.stats_counters = {'fresh': 0, 'stale': 0, 'cold': 0, 'coalesced': 0,
+                               'refreshes': 0, 'scheduled_refreshes': 0, 'errors': 0}
+
+    def register(self, key: str, compute: Callable[[], Any]) -> None:
+        """compute() returns the value to cache; raising or returning None keeps the old one."""
+        self._computes[key] = compute
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key (possibly stale), or None if it was never computed successfully."""
+        self._last_read[key] = time.monotonic()
+        value = self.cache.get(key, max_age=self.ttl)
+        if value is not None:
+            self._count('fresh')
+            return value
+
+        stale = self.cache.get_stale(key)
+        if stale is not None:
+            self._count('stale')
+            self.refresh_async(key)
+            return stale
+
+        self._count('cold')
+        return self.refresh(key)
+
+    def refresh(self, key: str) -> Optional[Any]:
+        """Recompute key now, or wait for the recompute already in flight."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.stats_counters['coalesced'] += 1
+
+        if not leader:
+            try:
+                return future.result(timeout=self.wait_timeout)
+            except Exception as e:
+                logger.warning("[%s] Wait for %s refresh failed: %s", self.name, key, e)
+                return self.cache.get_stale(key)
+
+        result = None
+        try:
+            self._count('refreshes')
+            result = self._computes[key]()
+            if result is not None:
+                self.cache.set(key, result)
+        except Exception as e:
+            self._count('errors')
+            logger.error("[%s] Refresh of %s failed: %s", self.name, key, e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        if result is None:
+            result = self.cache.get_stale(key)
+        future.set_result(result)
+        return result
+
+    def refresh_async(self, key: str) -> None:
+        """Start a background refresh unless one is already running."""
+        with self._lock:
+            if key in self._inflight:
+                return
+        threading.Thread(target=self.refresh, args=(key,), daemon=True,
+                         name=f"{self.name}-{key}").start()
+
+    def refresh_due(self) -> None:
+        """Recompute every recently read key that is within `refresh_ahead` seconds of expiring."""
+        if self.active is not None and not self.active():
+            return
+        now = time.monotonic()
+        for key in list(self._computes):
+            read_at = self._last_read.get(key)
+            if read_at is None or now - read_at > self.ttl:
+                continue
+            if self.cache.get(key, max_age=self.ttl - self.refresh_ahead) is None:
+                self._count('scheduled_refreshes')
+                self.refresh(key)
+
+    def start(self) -> None:
+        """Start the scheduler thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats_counters, 'in_flight': len(self._inflight), 'keys': len(self._computes)}
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logger.error("[%s] Scheduled refresh failed: %s", self.name, e)
+            time.sleep(self.check_seconds)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.stats_counters[counter] += 1
@@ -0,0 +1,328 @@
+"""
+Precomputed daily-returns matrix for cross-sectional queries.
+
+A background job keeps a dense symbol x trading-day matrix of close-to-close
+percent changes for the S&P 500 plus every watchlisted symbol, together with
+the correlation matrix of their closes over the trailing 90 days. Both are
+saved as `.npy` files and memory-mapped, so:
+
+    top performer on date D   one fancy-indexed read of the session's column
+    correlation of N symbols  an (N x N) slice of the precomputed matrix
+
+Only completed sessions are answered from the matrix; anything newer (or any
+symbol not yet in the universe) is left to the caller's live path. Symbols
+that returned no closes (delisted, typos) are recorded as unresolved, so
+they do not force a rebuild every hour; the next daily rebuild retries them.
+
+The full universe (which scans every user's watchlist) is only read when a
+new session has closed. The hourly checks in between ask the cheaper
+`recent_symbols_provider` for symbols added since then.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services import market_calendar
+
+logger = logging.getLogger(__name__)
+
+RETURNS_MATRIX_DIR = os.getenv('RETURNS_MATRIX_DIR', '/tmp/returns_matrix')
+# How often the refresh job checks for a newly closed session or new watchlist symbols
+RETURNS_MATRIX_CHECK_SECONDS = int(os.getenv('RETURNS_MATRIX_CHECK_SECONDS', '3600'))
+RETURNS_MATRIX_HISTORY_DAYS = int(os.getenv('RETURNS_MATRIX_HISTORY_DAYS', '400'))
+CORRELATION_WINDOW_DAYS = 90
+CORRELATION_MIN_PERIODS = 5
+
+# close_provider(symbols, start_date) -> DataFrame of closes, one column per symbol
+CloseProvider = Callable[[List[str], str], pd.DataFrame]
+
+
+class _Snapshot(NamedTuple):
+    rows: Dict[str, int]
+    days: np.ndarray          # datetime64[D], ascending
+    returns: np.ndarray       # (symbols, days) percent change, NaN where no bar
+    correlation: np.ndarray   # (symbols, symbols) close correlation, NaN if < 5 overlapping days
+    complete_through: date
+    built_at: float
+    unresolved: frozenset = frozenset()  # requested symbols that returned no closes
+
+
+def last_closed_session(now: Optional[datetime] = None) -> Optional[date]:
+    """Most recent trading day whose regular session has closed by `now`."""
+    now = (now or datetime.now(market_calendar.ET)).astimezone(market_calendar.ET)
+    day = now.date()
+    for _ in range(15):
+        times = market_calendar.session_times(day)
+        if times and times[2] <= now:
+            return day
+        day -= timedelta(days=1)
+    return None
+
+
+def _last_trading_day_on_or_before(day: date) -> date:
+    for _ in range(15):
+        if market_calendar.is_trading_day(day):
+            return day
+        day -= timedelta(days=1)
+    return day
+
+
+def build_matrices(closes: pd.DataFrame, window_days: int = CORRELATION_WINDOW_DAYS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(days, returns, correlation) from a closes frame indexed by bar time."""
+    closes = closes.copy()
+    index = pd.DatetimeIndex(closes.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    closes.index = index.normalize()
+    closes = closes.groupby(level=0).last().sort_index()
+
+    # Percent change against the symbol's previous available close, like get_day_change_percent
+    previous = closes.ffill().shift(1)
+    returns = ((closes / previous - 1.0) * 100.0).to_numpy(dtype='f8').T
+
+    window = closes[closes.index >= closes.index[-1] - pd.Timedelta(days=window_days)] if len(closes) else closes
+    correlation = window.corr(min_periods=CORRELATION_MIN_PERIODS).to_numpy(dtype='f8')
+    days = closes.index.to_numpy(dtype='datetime64[D]')
+    return days, np.ascontiguousarray(returns), np.ascontiguousarray(correlation)
+
+
+class ReturnsMatrix:
+    """Memory-mapped returns/correlation matrices, rebuilt after each session close."""
+
+    def __init__(self, root: Optional[str] = None, close_provider: Optional[CloseProvider] = None,
+                 universe_provider: Optional[Callable[[], Iterable[str]]] = None,
+                 recent_symbols_provider: Optional[Callable[[], Iterable[str]]] = None,
+                 history_days: int = RETURNS_MATRIX_HISTORY_DAYS,
+                 check_seconds: int = RETURNS_MATRIX_CHECK_SECONDS,
+                 now: Callable[[], datetime] = lambda: datetime.now(market_calendar.ET)):
+        self.root = Path(root or RETURNS_MATRIX_DIR)
+        self.close_provider = close_provider
+        self.universe_provider = universe_provider
+        self.recent_symbols_provider = recent_symbols_provider
+        self.history_days = history_days
+        self.check_seconds = check_seconds
+        self._now = now
+        self._build_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.stats_counters = {'builds': 0, 'build_errors': 0, 'day_queries': 0, 'correlation_queries': 0,
+                               'misses': 0}
+        self._last_build_seconds = None
+        self._snapshot: Optional[_Snapshot] = self._load()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def day_changes(self, symbols: Iterable[str], date_str: str,
+                    fallback: Optional[Callable[[List[str], str], Dict[str, float]]] = None) -> Dict[str, float]:
+        """{symbol: percent change} for the session on or before date_str.
+
+        Symbols the matrix cannot answer (not in the universe yet, or a date
+        newer than its last completed session) go to `fallback` in one call.
+        """
+        symbols = list(dict.fromkeys(s.upper() for s in symbols if s))
+        snap = self._snapshot
+        self.stats_counters['day_queries'] += 1
+        column = self._column_for(snap, date_str)
+        if column is None:
+            known, unknown = [], symbols
+        else:
+            known = [s for s in symbols if s in snap.rows]
+            unknown = [s for s in symbols if s not in snap.rows]
+
+        changes = {}
+        if known:
+            values = snap.returns[[snap.rows[s] for s in known], column]
+            # A symbol without a bar that session counts as flat, as on the live path
+            changes = dict(zip(known, np.nan_to_num(values, nan=0.0).tolist()))
+        if unknown:
+            self.stats_counters['misses'] += 1
+            if fallback is not None:
+                changes.update(fallback(unknown, date_str))
+        return {s: changes[s] for s in symbols if s in changes}
+
+    def correlation(self, symbols: Iterable[str]) -> Optional[np.ndarray]:
+        """Trailing 90-day close correlation for symbols (in order), or None if any pair is unknown."""
+        symbols = [s.upper() for s in symbols]
+        snap = self._snapshot
+        self.stats_counters['correlation_queries'] += 1
+        if snap is None or any(s not in snap.rows for s in symbols):
+            self.stats_counters['misses'] += 1
+            return None
+        rows = [snap.rows[s] for s in symbols]
+        matrix = snap.correlation[np.ix_(rows, rows)]
+        if np.isnan(matrix).any():
+            self.stats_counters['misses'] += 1
+            return None
+        return matrix
+
+    def stats(self) -> Dict:
+        snap = self._snapshot
+        return {
+            **self.stats_counters,
+            'symbols': len(snap.rows) if snap else 0,
+            'unresolved': len(snap.unresolved) if snap else 0,
+            'days': len(snap.days) if snap else 0,
+            'complete_through': snap.complete_through.isoformat() if snap else None,
+            'built_at': snap.built_at if snap else None,
+            'last_build_seconds': self._last_build_seconds,
+        }
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def rebuild(self, symbols: Optional[Iterable[str]] = None) -> bool:
+        """Recompute both matrices for `symbols` (default: the universe provider) and swap them in."""
+        if self.close_provider is None:
+            return False
+        with self._build_lock:
+            started = time.time()
+            try:
+                if symbols is None:
+                    symbols = self.universe_provider() if self.universe_provider else []
+                symbols = sorted({s.upper() for s in symbols if s})
+                if not symbols:
+                    return False
+                now = self._now()
+                start_date = (now - timedelta(days=self.history_days)).strftime('%Y-%m-%d')
+                closes = self.close_provider(symbols, start_date)
+                closes = closes[[s for s in symbols if s in closes.columns]]
+                if closes.empty:
+                    raise ValueError('no closes returned')
+                days, returns, correlation = build_matrices(closes)
+            except Exception as e:
+                self.stats_counters['build_errors'] += 1
+                logger.warning("[RETURNS] Rebuild failed: %s", e)
+                return False
+
+            # Never past the data actually returned (a missing or partial latest bar stays live)
+            last_day = days[-1].astype(object)
+            closed = last_closed_session(now)
+            snap = _Snapshot(
+                rows={s: i for i, s in enumerate(closes.columns)},
+                days=days,
+                returns=returns,
+                correlation=correlation,
+                complete_through=min(closed, last_day) if closed else last_day,
+                built_at=time.time(),
+                unresolved=frozenset(s for s in symbols if s not in closes.columns),
+            )
+            self._save(snap)
+            self._snapshot = self._load() or snap
+            self._last_build_seconds = round(time.time() - started, 3)
+            self.stats_counters['builds'] += 1
+            logger.info("[RETURNS] Rebuilt %s symbols x %s days in %.1fs",
+                        len(snap.rows), len(days), self._last_build_seconds)
+            return True
+
+    def needs_rebuild(self, universe: Optional[Iterable[str]] = None) -> bool:
+        snap = self._snapshot
+        if snap is None:
+            return True
+        closed = last_closed_session(self._now())
+        if closed is not None and closed > snap.complete_through:
+            return True
+        # Symbols the last build could not resolve wait for the next session's rebuild
+        return universe is not None and any(
+            s.upper() not in snap.rows and s.upper() not in snap.unresolved for s in universe)
+
+    def refresh(self) -> bool:
+        """One refresh check; returns True if the matrices were rebuilt."""
+        snap = self._snapshot
+        if snap is None or self.recent_symbols_provider is None or self.needs_rebuild():
+            universe = list(self.universe_provider()) if self.universe_provider else []
+            return self.needs_rebuild(universe) and self.rebuild(universe)
+        # Same session: only symbols added since the last full read can be missing
+        recent = [s.upper() for s in self.recent_symbols_provider() if s]
+        if not self.needs_rebuild(recent):
+            return False
+        return self.rebuild(list(snap.rows) + sorted(snap.unresolved) + recent)
+
+    def start(self) -> None:
+        """Start the refresh job (idempotent)."""
+        if self._thread is not None or self.close_provider is None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning("[RETURNS] Refresh check failed: %s", e)
+                time.sleep(self.check_seconds)
+
+        self._thread = threading.Thread(target=loop, daemon=True, name="returns-matrix-refresh")
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _column_for(snap: Optional[_Snapshot], date_str: str) -> Optional[int]:
+        if snap is None:
+            return None
+        try:
+            target = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return None
+        session = _last_trading_day_on_or_before(target)
+        if session > snap.complete_through:
+            return None
+        column = int(np.searchsorted(snap.days, np.datetime64(session, 'D'), side='right')) - 1
+        if column < 1:
+            # The first day has no previous close to compare against
+            return None
+        return column
+
+    def _save(self, snap: _Snapshot) -> None:
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            for name, array in (('returns', snap.returns), ('correlation', snap.correlation),
+                                ('days', snap.days.astype('i8'))):
+                tmp = self.root / f"{name}.tmp.npy"
+                np.save(tmp, array)
+                os.replace(tmp, self.root / f"{name}.npy")
+            meta = {
+                'symbols': sorted(snap.rows, key=snap.rows.get),
+                'complete_through': snap.complete_through.isoformat(),
+                'built_at': snap.built_at,
+                'unresolved': sorted(snap.unresolved),
+            }
+            # The sidecar is written last so a reader never pairs it with older arrays' shapes
+            tmp_meta = self.root / 'meta.tmp'
+            tmp_meta.write_text(json.dumps(meta), encoding='utf-8')
+            os.replace(tmp_meta, self.root / 'meta.json')
+        except OSError as e:
+            logger.warning("[RETURNS] Could not persist matrices: %s", e)
+
+    def _load(self) -> Optional[_Snapshot]:
+        try:
+            meta = json.loads((self.root / 'meta.json').read_text(encoding='utf-8'))
+            returns = np.load(self.root / 'returns.npy', mmap_mode='r')
+            correlation = np.load(self.root / 'correlation.npy', mmap_mode='r')
+            days = np.load(self.root / 'days.npy').astype('datetime64[D]')
+        except (OSError, ValueError):
+            return None
+        symbols = meta.get('symbols') or []
+        if returns.shape != (len(symbols), len(days)) or correlation.shape != (len(symbols), len(symbols)):
+            return None
+        return _Snapshot(
+            rows={s: i for i, s in enumerate(symbols)},
+            days=days,
+            returns=returns,
+            correlation=correlation,
+            complete_through=date.fromisoformat(meta['complete_through']),
+            built_at=meta.get('built_at', 0.0),
+            unresolved=frozenset(meta.get('unresolved') or ()),
+        )
@@ -7,21 +7,26 @@ from functools import wraps
 from collections import defaultdict, OrderedDict
 from datetime import datetime, timedelta, timezone
 
-try:
-    import zoneinfo
-except ImportError:
-    try:
-        from backports import zoneinfo
-    except ImportError:
-        zoneinfo = None
-
 from flask import request, jsonify
 from flask_login import current_user
 
-from app.services.stock import Stock, YahooFinanceAPI, NewsAPI, FinnhubAPI, AlpacaAPI, CompanyInfoService, StocktwitsAPI
+from app.services.stock import (
+    Stock, SmartCache, YahooFinanceAPI, NewsAPI, FinnhubAPI, AlpacaAPI, CompanyInfoService, StocktwitsAPI,
+    request_lane, LANE_SOCKET_PRIORITY, LANE_BACKGROUND,
+)
 from app.services.stock_symbol_index import StockSymbolIndexService
+from app.services.quote_service import QuoteService, SOURCE_ALPACA, SOURCE_YAHOO
+from app.services.asset_catalog import AssetCatalog
+from app.services.shared_cache import get_shared_cache_backend
+from app.services.bar_store import BarStore
+from app.services import market_calendar
 from app.services.firebase_service import FirebaseService, get_firestore_client, FirebaseUser
-from app.services.watchlist_service import get_watchlist_service
+from app.services.watchlist_service import get_watchlist_service, register_change_listener
+from app.services.subscription_registry import SubscriptionRegistry
+from app.services.watchlist_push import WatchlistPushTracker
+from app.services.fetch_scheduler import PriceFetchScheduler
+from app.services.returns_matrix import ReturnsMatrix
+from app.services.index_constituents import ConstituentCache
 from app.config import Config
 
 logger = logging.getLogger(__name__)
@@ -29,15 +34,23 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 # API instances
 # ---------------------------------------------------------------------------
-yahoo_finance_api = YahooFinanceAPI()
-stock_symbol_index_service = StockSymbolIndexService()
+shared_cache_backend = get_shared_cache_backend()
+bar_store = BarStore()
+# One LRU for search results: symbol-index queries and the Yahoo search fallback
+search_cache = SmartCache(
+    default_ttl=300, namespace='search', shared=shared_cache_backend,
+    max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '2000')),
+)
+yahoo_finance_api = YahooFinanceAPI(shared_cache=shared_cache_backend, bar_store=bar_store, search_cache=search_cache)
+stock_symbol_index_service = StockSymbolIndexService(query_cache=search_cache)
 news_api = NewsAPI()
-stocktwits_api = StocktwitsAPI()
+stocktwits_api = StocktwitsAPI(shared_cache=shared_cache_backend)
 finnhub_api = FinnhubAPI()
 company_info_service = CompanyInfoService()
 
 USE_ALPACA_API = os.getenv('USE_ALPACA_API', 'false').lower() == 'true'
-alpaca_api = AlpacaAPI() if USE_ALPACA_API else None
+asset_catalog = AssetCatalog(symbol_index=stock_symbol_index_service, autostart=USE_ALPACA_API)
+alpaca_api = AlpacaAPI(asset_catalog=asset_catalog, shared_cache=shared_cache_backend) if USE_ALPACA_API else None
 
 if USE_ALPACA_API:
     has_keys = alpaca_api and alpaca_api.api_key and alpaca_api.secret_key
@@ -58,6 +71,69 @@ else:
     logger.info("To enable Alpaca, set USE_ALPACA_API=true in environment variables")
     logger.info("=" * 60)
 
+# All price lookups (routes, socket loop, chat tools) go through this instance
+# so concurrent requests for the same symbol share one upstream call.
+quote_service = QuoteService(yahoo_finance_api, alpaca_api if USE_ALPACA_API else None)
+
+# Poll-loop fetches run in parallel but draw from the same Alpaca request budget,
+# queued behind interactive route requests
+price_fetch_scheduler = PriceFetchScheduler(
+    budget=alpaca_api.request_queue if alpaca_api else None,
+    lane=lambda is_priority: request_lane(LANE_SOCKET_PRIORITY if is_priority else LANE_BACKGROUND),
+)
+
+
+# Finnhub constituents are premium-only; asked once a day, with a static S&P 500 fallback
+sp500_constituents = ConstituentCache(lambda: finnhub_api.get_index_constituents('^GSPC'))
+
+
+# Symbols added to watchlists since the last full universe read; between daily
+# rebuilds the returns matrix checks these instead of scanning every watchlist
+_recent_watchlist_symbols = set()
+_recent_watchlist_lock = threading.Lock()
+
+
+def _record_watchlist_symbols(user_id, event, symbol=None, item=None):
+    if event == 'added' and symbol:
+        symbols = [symbol]
+    elif event == 'snapshot':
+        symbols = [entry.get('symbol') for entry in item or []]
+    else:
+        return
+    with _recent_watchlist_lock:
+        _recent_watchlist_symbols.update(s.strip().upper() for s in symbols if s)
+
+
+def _returns_matrix_universe():
+    """S&P 500 constituents plus every symbol on any user's watchlist."""
+    symbols = set(sp500_constituents.get())
+    service = get_watchlist_service_lazy()
+    if service is not None:
+        with _recent_watchlist_lock:
+            seen = set(_recent_watchlist_symbols)
+        symbols.update(service.get_all_symbols())
+        with _recent_watchlist_lock:
+            _recent_watchlist_symbols.difference_update(seen)
+    return sorted(symbols)
+
+
+def _returns_matrix_recent_symbols():
+    """Watchlist symbols seen since the last full read, plus those of connected users."""
+    with _recent_watchlist_lock:
+        symbols = set(_recent_watchlist_symbols)
+    return sorted(symbols | subscription_registry.all_symbols())
+
+
+# Daily returns / correlation matrices for top-performer and correlation queries;
+# the refresh job is started with the other background tasks
+returns_matrix = ReturnsMatrix(
+    close_provider=yahoo_finance_api.get_close_frame,
+    universe_provider=_returns_matrix_universe,
+    recent_symbols_provider=_returns_matrix_recent_symbols,
+)
+register_change_listener(_record_watchlist_symbols)
+
+
 # ---------------------------------------------------------------------------
 # Stock helpers
 # ---------------------------------------------------------------------------
@@ -77,7 +153,7 @@ def get_stock_with_fallback(symbol):
     if USE_ALPACA_API and alpaca_api:
         try:
             logger.debug("[ALPACA] Attempting to fetch %s from Alpaca API...", symbol)
-            stock = Stock(symbol, alpaca_api)
+            stock = Stock(symbol, quote_service.source(SOURCE_ALPACA))
             stock.retrieve_data()
             if stock.name and stock.price and 'not found' not in stock.name.lower():
                 logger.info("[ALPACA] Successfully fetched %s from Alpaca: $%.2f (%s)", symbol, stock.price, stock.name)
@@ -92,7 +168,7 @@ def get_stock_with_fallback(symbol):
 
     try:
         logger.debug("[YAHOO] Fetching %s from Yahoo Finance (fallback)...", symbol)
-        stock = Stock(symbol, yahoo_finance_api)
+        stock = Stock(symbol, quote_service.source(SOURCE_YAHOO))
         stock.retrieve_data()
         if stock.name and stock.price:
             logger.info("[YAHOO] Successfully fetched %s from Yahoo: $%.2f (%s)", symbol, stock.price, stock.name)
@@ -116,7 +192,7 @@ def get_stock_alpaca_only(symbol):
 
     try:
         logger.debug("[WATCHLIST-ALPACA] Fetching %s from Alpaca API only (no Yahoo fallback)...", symbol)
-        stock = Stock(symbol, alpaca_api)
+        stock = Stock(symbol, quote_service.source(SOURCE_ALPACA))
         stock.retrieve_data()
         if stock.name and stock.price and 'not found' not in stock.name.lower():
             logger.info("[WATCHLIST-ALPACA] Successfully fetched %s from Alpaca: $%.2f (%s)", symbol, stock.price, stock.name)
@@ -179,6 +255,22 @@ active_stocks = defaultdict(set)
 active_stocks_timestamps = defaultdict(dict)
 ACTIVE_STOCK_TIMEOUT = 60
 
+# symbol -> subscribers for connected users; kept current from watchlist writes
+subscription_registry = SubscriptionRegistry()
+register_change_listener(subscription_registry.apply_change)
+
+
+def _release_watchlist_listener(user_id):
+    """Detach the user's Firestore watchlist listener once their last socket is gone."""
+    if watchlist_service is not None:
+        watchlist_service.detach_listener(user_id)
+
+
+subscription_registry.set_user_hook(_release_watchlist_listener)
+
+# Last `watchlist_updated` entries sent per room, for delta-only pushes
+watchlist_push_tracker = WatchlistPushTracker()
+
 
 def cleanup_inactive_connections():
     """Clean up inactive WebSocket connections and associated data"""
@@ -195,6 +287,7 @@ def cleanup_inactive_connections():
             del connected_users[sid]
         if sid in connection_timestamps:
             del connection_timestamps[sid]
+        subscription_registry.remove_connection(sid)
         if user_id:
             if user_id in active_stocks:
                 del active_stocks[user_id]
@@ -217,6 +310,7 @@ def limit_connections():
                 del connected_users[sid]
             if sid in connection_timestamps:
                 del connection_timestamps[sid]
+            subscription_registry.remove_connection(sid)
             if user_id:
                 if user_id in active_stocks:
                     del active_stocks[user_id]
@@ -367,37 +461,9 @@ def authenticate_request():
 # ---------------------------------------------------------------------------
 
 def get_market_status():
-    """Get current market status in Eastern Time"""
+    """Get current market status in Eastern Time, honouring exchange holidays and early closes"""
     try:
-        if zoneinfo:
-            try:
-                et_tz = zoneinfo.ZoneInfo("America/New_York")
-            except:
-                et_tz = timezone(timedelta(hours=-4))
-        else:
-            et_tz = timezone(timedelta(hours=-4))
-
-        now_et = datetime.now(et_tz)
-
-        is_weekday = now_et.weekday() < 5
-        current_time = now_et.time()
-        market_open = now_et.replace(hour=9, minute=30, second=0, microsecond=0).time()
-        market_close = now_et.replace(hour=16, minute=0, second=0, microsecond=0).time()
-
-        is_market_hours = market_open <= current_time <= market_close
-
-        if is_weekday and is_market_hours:
-            return {
-                'isOpen': True,
-                'status': 'Market is Open',
-                'last_updated': now_et.isoformat()
-            }
-        else:
-            return {
-                'isOpen': False,
-                'status': 'Market is Closed',
-                'last_updated': now_et.isoformat()
-            }
+        return market_calendar.market_status()
     except Exception as e:
         logger.error("Error getting market status: %s", e)
         return {
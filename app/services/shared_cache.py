@@ -0,0 +1,174 @@
+"""
+Shared (L2) cache backends for SmartCache.
+
+SmartCache keeps a per-process L1 dict; when a shared backend is configured,
+writes are mirrored to it and L1 misses are filled from it, so several
+gunicorn workers warm one cache instead of one each.
+
+Backends store JSON envelopes {"t": <write timestamp>, "v": <value>} so readers
+can apply their own max_age against the original write time.
+
+Selection (SHARED_CACHE_BACKEND):
+  redis   – Redis at REDIS_URL (default when REDIS_URL is set)
+  memory  – in-process stand-in with the same semantics (tests / single worker)
+  none    – L1 only
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'smartcache'
+DEFAULT_SHARED_TTL_SECONDS = int(os.getenv('SHARED_CACHE_TTL_SECONDS', '3600'))
+
+
+def _encode(value, timestamp: float) -> Optional[str]:
+    try:
+        return json.dumps({'t': timestamp, 'v': value})
+    except (TypeError, ValueError):
+        return None
+
+
+def _decode(raw) -> Optional[Tuple[object, float]]:
+    if raw is None:
+        return None
+    try:
+        envelope = json.loads(raw)
+        return envelope['v'], float(envelope['t'])
+    except Exception:
+        return None
+
+
+class InMemoryCacheBackend:
+    """Process-local stand-in for Redis with the same get/set/delete semantics."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._store = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[object, float]]:
+        with self._lock:
+            item = self._store.get(key)
+            if item is None:
+                return None
+            raw, expires_at = item
+            if expires_at <= time.time():
+                del self._store[key]
+                return None
+        return _decode(raw)
+
+    def set(self, key: str, value, timestamp: float, ttl: int) -> bool:
+        raw = _encode(value, timestamp)
+        if raw is None:
+            return False
+        with self._lock:
+            self._store[key] = (raw, time.time() + ttl)
+        return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._store.pop(key, None)
+
+    def clear(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._store if k.startswith(prefix)]:
+                del self._store[key]
+
+
+class RedisCacheBackend:
+    """Redis-backed shared cache. Failures degrade to L1-only behaviour."""
+
+    name = 'redis'
+
+    def __init__(self, url: str, socket_timeout: float = 0.5):
+        self._client = redis.Redis.from_url(
+            url,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+        )
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[Tuple[object, float]]:
+        try:
+            return _decode(self._client.get(key))
+        except Exception as e:
+            self.errors += 1
+            logger.debug("[SHARED-CACHE] Redis get failed for %s: %s", key, e)
+            return None
+
+    def set(self, key: str, value, timestamp: float, ttl: int) -> bool:
+        raw = _encode(value, timestamp)
+        if raw is None:
+            return False
+        try:
+            self._client.set(key, raw, ex=max(1, int(ttl)))
+            return True
+        except Exception as e:
+            self.errors += 1
+            logger.debug("[SHARED-CACHE] Redis set failed for %s: %s", key, e)
+            return False
+
+    def delete(self, key: str) -> None:
+        try:
+            self._client.delete(key)
+        except Exception as e:
+            self.errors += 1
+            logger.debug("[SHARED-CACHE] Redis delete failed for %s: %s", key, e)
+
+    def clear(self, prefix: str) -> None:
+        try:
+            keys = list(self._client.scan_iter(match=f"{prefix}*", count=500))
+            if keys:
+                self._client.delete(*keys)
+        except Exception as e:
+            self.errors += 1
+            logger.debug("[SHARED-CACHE] Redis clear failed for %s: %s", prefix, e)
+
+
+_backend = None
+_backend_initialized = False
+_backend_lock = threading.Lock()
+
+
+def get_shared_cache_backend():
+    """Return the process-wide shared cache backend, or None when disabled."""
+    global _backend, _backend_initialized
+    if _backend_initialized:
+        return _backend
+
+    with _backend_lock:
+        if _backend_initialized:
+            return _backend
+
+        redis_url = os.getenv('REDIS_URL', '')
+        choice = os.getenv('SHARED_CACHE_BACKEND', 'redis' if redis_url else 'none').lower()
+
+        if choice == 'redis':
+            if redis is None:
+                logger.warning("[SHARED-CACHE] redis package not installed - using L1 cache only")
+            elif not redis_url:
+                logger.warning("[SHARED-CACHE] REDIS_URL not set - using L1 cache only")
+            else:
+                try:
+                    _backend = RedisCacheBackend(redis_url)
+                    logger.info("[SHARED-CACHE] Using Redis shared cache")
+                except Exception as e:
+                    logger.error("[SHARED-CACHE] Failed to initialize Redis backend: %s", e)
+        elif choice == 'memory':
+            _backend = InMemoryCacheBackend()
+            logger.info("[SHARED-CACHE] Using in-memory shared cache stand-in")
+
+        _backend_initialized = True
+        return _backend
@@ -3,12 +3,26 @@ from datetime import datetime, timedelta
 import json
 import requests
 import os
+import re
 import time
+import sys
 import threading
-from collections import deque, defaultdict
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from collections import deque, defaultdict, OrderedDict
+from itertools import islice
 from typing import Dict, List, Optional, Tuple
 import logging
 
+import pandas as pd
+
+from app.services import http_client
+from app.services.bar_store import bars_to_frame, yfinance_download
+from app.services.ohlcv_serializer import ohlcv_records, close_records
+from app.services.shared_cache import KEY_PREFIX, DEFAULT_SHARED_TTL_SECONDS
+from app.services.market_calendar import quote_ttl
+
 logger = logging.getLogger(__name__)
 
 # =============================================================================
@@ -80,17 +94,79 @@ class ImprovedCircuitBreaker:
 # REQUEST QUEUE FOR RATE LIMIT MANAGEMENT
 # =============================================================================
 
+# Priority lanes, highest first: a user waiting on an HTTP route, the socket
+# poll loop's actively-viewed symbols, then everything else it refreshes.
+LANE_INTERACTIVE = 0
+LANE_SOCKET_PRIORITY = 1
+LANE_BACKGROUND = 2
+LANE_NAMES = ('interactive', 'socket_priority', 'background')
+
+# How long each lane waits for a token before the request is dropped. Interactive
+# requests run on one of the few route threads, so they never wait: with no free
+# token they fail fast and the caller serves cached data or falls back.
+RATE_LIMIT_WAIT_SECONDS = (0.0, 5.0, 5.0)
+
+# Upper bounds (ms) of the queue wait-time histogram buckets
+WAIT_BUCKETS_MS = (0, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_lane_context = threading.local()
+
+
+@contextmanager
+def request_lane(lane):
+    """Run upstream calls made by this thread in the given priority lane."""
+    previous = getattr(_lane_context, 'lane', None)
+    _lane_context.lane = lane
+    try:
+        yield
+    finally:
+        _lane_context.lane = previous
+
+
+def current_lane():
+    lane = getattr(_lane_context, 'lane', None)
+    return LANE_INTERACTIVE if lane is None else lane
+
+
+class _QueuedRequest:
+    __slots__ = ('future', 'fn', 'lane', 'enqueued_at')
+
+    def __init__(self, future, fn, lane, enqueued_at):
+        self.future = future
+        self.fn = fn
+        self.lane = lane
+        self.enqueued_at = enqueued_at
+
+
 class RequestQueue:
     """
-    Smart request queue that manages rate limits and prioritizes requests.
+    Token-bucket rate limiter with strict-priority lanes.
     Designed for Alpaca free tier: 200 requests/minute
+
+    Tokens refill continuously at max_requests_per_minute / 60 per second up
+    to `burst`. A request that finds a token and an empty queue runs at once;
+    otherwise it waits in its lane and a single pacer thread hands out tokens
+    as they refill, interactive lane first. `submit` returns a Future and
+    runs the call on the queue's worker pool, so callers are not tied up
+    while it is paced; `try_submit` only runs it if a token is free now;
+    `acquire` is the blocking form for code that makes the call itself.
     """
-    def __init__(self, max_requests_per_minute=180):  # Leave buffer for safety
+    def __init__(self, max_requests_per_minute=180, burst=None, workers=4, clock=time.monotonic):  # Leave buffer for safety
         self.max_requests_per_minute = max_requests_per_minute
+        self.rate = max_requests_per_minute / 60.0
+        self.burst = burst if burst is not None else max(1, max_requests_per_minute // 6)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._refilled_at = clock()
         self.request_times = deque()
-        self.priority_requests = deque()
-        self.normal_requests = deque()
-        self._lock = threading.Lock()
+        self._lanes = tuple(deque() for _ in LANE_NAMES)
+        self._cond = threading.Condition(threading.Lock())
+        self._pacer = None
+        self._workers = workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._max_depth = [0] * len(LANE_NAMES)
+        self._wait_histograms = [[0] * (len(WAIT_BUCKETS_MS) + 1) for _ in LANE_NAMES]
         self.stats = {
             'total_requests': 0,
             'queued_requests': 0,
@@ -98,115 +174,422 @@ class RequestQueue:
             'rate_limited': 0
         }
 
-    def can_make_request(self):
-        """Check if we can make a request without exceeding rate limit"""
-        with self._lock:
-            now = time.time()
-            # Remove requests older than 1 minute
-            while self.request_times and now - self.request_times[0] > 60:
-                self.request_times.popleft()
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, fn, lane=LANE_BACKGROUND):
+        """Queue fn() behind the rate limit; returns a Future for its result."""
+        future = Future()
+        with self._cond:
+            if self._take_token_locked():
+                self._record_wait_locked(lane, 0.0)
+                granted = True
+            else:
+                self._enqueue_locked(_QueuedRequest(future, fn, lane, self._clock()))
+                granted = False
+        if granted and future.set_running_or_notify_cancel():
+            self._pool().submit(self._run, future, fn)
+        return future
 
-            return len(self.request_times) < self.max_requests_per_minute
+    def try_submit(self, fn, lane=LANE_INTERACTIVE):
+        """
+        Run fn() on the worker pool if a token is free now and nothing of equal
+        or higher priority is queued; otherwise None (counted as dropped).
+        """
+        with self._cond:
+            self._refill_locked()
+            if self._tokens < 1 or any(self._lanes[:lane + 1]):
+                self.stats['dropped_requests'] += 1
+                return None
+            self._tokens -= 1
+            self._record_wait_locked(lane, 0.0)
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self._pool().submit(self._run, future, fn)
+        return future
+
+    def acquire(self, lane=None, timeout=None):
+        """Block until a token is granted in lane. Returns False on timeout (request dropped)."""
+        lane = current_lane() if lane is None else lane
+        with self._cond:
+            if self._take_token_locked():
+                self._record_wait_locked(lane, 0.0)
+                return True
+            future = Future()
+            queued = _QueuedRequest(future, None, lane, self._clock())
+            self._enqueue_locked(queued)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            # False only if still queued; otherwise it was granted between the timeout and the cancel
+            return not self.cancel(future)
+
+    def cancel(self, future):
+        """Withdraw a still-queued request (counted as dropped). False once it was granted."""
+        with self._cond:
+            if not future.cancel():
+                return False
+            for lane in self._lanes:
+                for queued in lane:
+                    if queued.future is future:
+                        lane.remove(queued)
+                        break
+            self.stats['dropped_requests'] += 1
+            return True
 
     def record_request(self):
         """Record a request was made"""
-        with self._lock:
+        with self._cond:
             self.request_times.append(time.time())
             self.stats['total_requests'] += 1
 
-    def get_wait_time(self):
-        """Calculate how long to wait before next request"""
-        with self._lock:
-            if not self.request_times:
-                return 0
-
-            now = time.time()
-            oldest_request = self.request_times[0]
-            time_since_oldest = now - oldest_request
+    def note_rate_limited(self):
+        """Upstream answered 429: empty the bucket so queued callers back off."""
+        with self._cond:
+            self.stats['rate_limited'] += 1
+            self._tokens = 0.0
+            self._refilled_at = self._clock()
 
-            if len(self.request_times) >= self.max_requests_per_minute:
-                # Need to wait until oldest request expires
-                return max(0, 60 - time_since_oldest)
+    def can_make_request(self):
+        """Check if we can make a request without waiting"""
+        with self._cond:
+            return self._can_request_locked()
 
-            return 0
+    def get_wait_time(self):
+        """Seconds until the next token is available"""
+        with self._cond:
+            return self._wait_time_locked()
 
-    def add_request(self, request_data, priority=False):
-        """Add request to queue"""
-        with self._lock:
-            if priority:
-                self.priority_requests.append(request_data)
-            else:
-                self.normal_requests.append(request_data)
-            self.stats['queued_requests'] += 1
+    def available_requests(self):
+        """Requests that can start now without waiting: whole tokens not already claimed by queued requests"""
+        with self._cond:
+            self._refill_locked()
+            return max(0, int(self._tokens) - sum(len(lane) for lane in self._lanes))
 
-    def get_next_request(self):
-        """Get next request from queue (priority first)"""
-        with self._lock:
-            if self.priority_requests:
-                self.stats['queued_requests'] -= 1
-                return self.priority_requests.popleft()
-            elif self.normal_requests:
-                self.stats['queued_requests'] -= 1
-                return self.normal_requests.popleft()
-            return None
+    def queue_depth(self):
+        with self._cond:
+            return sum(len(lane) for lane in self._lanes)
 
     def get_stats(self):
         """Get queue statistics"""
-        with self._lock:
-            now = time.time()
-            recent_requests = sum(1 for t in self.request_times if now - t < 60)
+        with self._cond:
+            lanes = {}
+            for index, name in enumerate(LANE_NAMES):
+                histogram = self._wait_histograms[index]
+                labels = [f"<={b}ms" for b in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+                lanes[name] = {
+                    'depth': len(self._lanes[index]),
+                    'max_depth': self._max_depth[index],
+                    'wait_histogram': dict(zip(labels, histogram)),
+                }
             return {
                 **self.stats,
-                'requests_last_minute': recent_requests,
-                'can_request': self.can_make_request(),
-                'wait_time': self.get_wait_time()
+                'queued_requests': sum(len(lane) for lane in self._lanes),
+                'requests_last_minute': self._recent_locked(),
+                'can_request': self._can_request_locked(),
+                'wait_time': self._wait_time_locked(),
+                'tokens': round(self._tokens, 2),
+                'lanes': lanes,
             }
 
+    # ------------------------------------------------------------------
+    # Internals (callers hold self._cond)
+    # ------------------------------------------------------------------
+
+    def _refill_locked(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _take_token_locked(self):
+        """Fast path: a token is free and nobody is queued ahead."""
+        if any(self._lanes):
+            return False
+        self._refill_locked()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def _can_request_locked(self):
+        self._refill_locked()
+        return self._tokens >= 1 and not any(self._lanes)
+
+    def _wait_time_locked(self):
+        self._refill_locked()
+        return 0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def _recent_locked(self):
+        now = time.time()
+        while self.request_times and now - self.request_times[0] > 60:
+            self.request_times.popleft()
+        return len(self.request_times)
+
+    def _enqueue_locked(self, queued):
+        lane = self._lanes[queued.lane]
+        lane.append(queued)
+        self._max_depth[queued.lane] = max(self._max_depth[queued.lane], len(lane))
+        if self._pacer is None or not self._pacer.is_alive():
+            self._pacer = threading.Thread(target=self._pace, daemon=True, name="AlpacaRequestPacer")
+            self._pacer.start()
+        self._cond.notify()
+
+    def _record_wait_locked(self, lane, seconds):
+        waited_ms = seconds * 1000
+        for index, bound in enumerate(WAIT_BUCKETS_MS):
+            if waited_ms <= bound:
+                break
+        else:
+            index = len(WAIT_BUCKETS_MS)
+        self._wait_histograms[lane][index] += 1
+
+    def _pace(self):
+        while True:
+            with self._cond:
+                while not any(self._lanes):
+                    self._cond.wait()
+                self._refill_locked()
+                if self._tokens < 1:
+                    self._cond.wait((1 - self._tokens) / self.rate)
+                    continue
+                queued = next(lane for lane in self._lanes if lane).popleft()
+                if not queued.future.set_running_or_notify_cancel():
+                    continue  # caller gave up; keep the token
+                self._tokens -= 1
+                self._record_wait_locked(queued.lane, self._clock() - queued.enqueued_at)
+            if queued.fn is None:
+                queued.future.set_result(True)
+            else:
+                self._pool().submit(self._run, queued.future, queued.fn)
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='AlpacaRequest')
+            return self._executor
+
+    @staticmethod
+    def _run(future, fn):
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
 # =============================================================================
 # SMART CACHE SYSTEM
 # =============================================================================
 
+SMART_CACHE_MAX_ENTRIES = int(os.getenv('SMART_CACHE_MAX_ENTRIES', '5000'))
+SMART_CACHE_MAX_BYTES = int(os.getenv('SMART_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+SMART_CACHE_SWEEP_SECONDS = int(os.getenv('SMART_CACHE_SWEEP_SECONDS', '60'))
+
+# Every SmartCache registers here so one sweeper thread can expire them all
+_smart_caches = weakref.WeakSet()
+_sweeper_lock = threading.Lock()
+_sweeper_started = False
+
+
+_SIZE_SAMPLE_ITEMS = 16
+_SIZE_MAX_DEPTH = 6
+
+
+def _estimate_size(value, depth=0):
+    """
+    Approximate the serialized size of a cached value in bytes.
+
+    Containers are measured from their first few items and scaled by their
+    length, so the cost stays flat however large the payload is.
+    """
+    if isinstance(value, str):
+        return len(value) + 2
+    if value is None or isinstance(value, (bool, int, float)):
+        return len(repr(value))
+    if depth >= _SIZE_MAX_DEPTH:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = list(islice(value.items(), _SIZE_SAMPLE_ITEMS))
+        sampled = sum(_estimate_size(k, depth + 1) + _estimate_size(v, depth + 1) + 2 for k, v in items)
+    elif isinstance(value, (list, tuple)):
+        items = value[:_SIZE_SAMPLE_ITEMS]
+        sampled = sum(_estimate_size(v, depth + 1) + 1 for v in items)
+    else:
+        return sys.getsizeof(value)
+    if not items:
+        return 2
+    return 2 + sampled * len(value) // len(items)
+
+
+def _start_cache_sweeper():
+    global _sweeper_started
+    with _sweeper_lock:
+        if _sweeper_started:
+            return
+        _sweeper_started = True
+
+    def loop():
+        while True:
+            time.sleep(SMART_CACHE_SWEEP_SECONDS)
+            for cache in list(_smart_caches):
+                try:
+                    cache.sweep()
+                except Exception as e:
+                    logger.warning("[CACHE] Sweep failed for %s: %s", cache.namespace, e)
+
+    thread = threading.Thread(target=loop, daemon=True, name="smart-cache-sweeper")
+    thread.start()
+
+
+def get_cache_stats():
+    """Stats for every live SmartCache, keyed by namespace."""
+    return {cache.namespace: cache.stats() for cache in list(_smart_caches)}
+
+
 class SmartCache:
     """
-    Cache with staleness detection and intelligent invalidation
+    Bounded LRU cache with staleness detection and intelligent invalidation.
+
+    Two tiers: a per-process dict (L1) and an optional shared backend (L2,
+    see shared_cache.py). Writes go to both; L1 misses are filled from L2 so
+    entries warmed by another worker are reused with their original timestamp.
+
+    L1 is capped at `max_entries` items and roughly `max_bytes` of payload;
+    the least recently used entries are evicted first, and a background
+    sweep drops entries that no caller would still accept as fresh.
     """
-    def __init__(self, default_ttl=30):
-        self.cache = {}
+    def __init__(self, default_ttl=30, namespace='default', shared=None, retention=None,
+                 shared_ttl=None, max_entries=None, max_bytes=None, sweep=True):
+        self.cache = OrderedDict()
         self.default_ttl = default_ttl
+        self.namespace = namespace
+        self.shared = shared
+        # Entries older than `retention` are dropped when read; None keeps the
+        # original behaviour of dropping anything older than the caller's max_age.
+        self.retention = retention
+        self.shared_ttl = shared_ttl or max(DEFAULT_SHARED_TTL_SECONDS, retention or 0)
+        self.max_entries = max_entries or SMART_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or SMART_CACHE_MAX_BYTES
+        self._sizes = {}
+        self._bytes = 0
+        # Longest max_age callers asked for since the last sweep, and in the sweep
+        # window before it; the sweep keeps entries younger than either
+        self._window_max_age = default_ttl
+        self._previous_max_age = default_ttl
         self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'shared_hits': 0, 'evictions': 0, 'expirations': 0}
+
+        _smart_caches.add(self)
+        if sweep:
+            _start_cache_sweeper()
+
+    def _shared_key(self, key):
+        return f"{KEY_PREFIX}:{self.namespace}:{key}"
+
+    # Callers must hold self._lock for the helpers below
+
+    def _store(self, key, value, timestamp):
+        self._discard(key)
+        size = _estimate_size(value)
+        self.cache[key] = (value, timestamp)
+        self._sizes[key] = size
+        self._bytes += size
+        while self.cache and (len(self.cache) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self.cache))
+            if oldest == key and len(self.cache) == 1:
+                break
+            self._discard(oldest)
+            self.counters['evictions'] += 1
+
+    def _discard(self, key):
+        if self.cache.pop(key, None) is not None:
+            self._bytes -= self._sizes.pop(key, 0)
+
+    def _read_shared(self, key):
+        """Fill L1 from L2. Returns (value, timestamp) or None."""
+        if self.shared is None:
+            return None
+        item = self.shared.get(self._shared_key(key))
+        if item is None:
+            return None
+        value, timestamp = item
+        with self._lock:
+            current = self.cache.get(key)
+            if current is None or current[1] < timestamp:
+                self._store(key, value, timestamp)
+        return value, timestamp
 
     def get(self, key, max_age=None):
         """Get cached value if not stale"""
+        max_age = max_age or self.default_ttl
+        now = time.time()
         with self._lock:
-            if key not in self.cache:
-                return None
-
-            data, timestamp = self.cache[key]
-            age = time.time() - timestamp
-            max_age = max_age or self.default_ttl
+            if max_age > self._window_max_age:
+                self._window_max_age = max_age
+            entry = self.cache.get(key)
+            if entry is not None:
+                data, timestamp = entry
+                age = now - timestamp
+                if age < max_age:
+                    self.cache.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return data
+                if age >= (self.retention or max_age):
+                    # Stale data, remove it
+                    self._discard(key)
+                    self.counters['expirations'] += 1
+
+        item = self._read_shared(key)
+        with self._lock:
+            if item is not None and now - item[1] < max_age:
+                self.counters['shared_hits'] += 1
+                return item[0]
+            self.counters['misses'] += 1
+        return None
 
-            if age < max_age:
-                return data
-            else:
-                # Stale data, remove it
-                del self.cache[key]
-                return None
+    def get_stale(self, key):
+        """Get cached value regardless of age (used as a fallback on upstream errors)"""
+        with self._lock:
+            entry = self.cache.get(key)
+        if entry is not None:
+            return entry[0]
+        item = self._read_shared(key)
+        return item[0] if item is not None else None
 
     def set(self, key, value):
         """Set cached value with current timestamp"""
+        timestamp = time.time()
         with self._lock:
-            self.cache[key] = (value, time.time())
+            self._store(key, value, timestamp)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), value, timestamp, self.shared_ttl)
 
     def invalidate(self, key):
         """Manually invalidate a cache entry"""
         with self._lock:
-            if key in self.cache:
-                del self.cache[key]
+            self._discard(key)
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(key))
 
     def clear(self):
         """Clear entire cache"""
         with self._lock:
             self.cache.clear()
+            self._sizes.clear()
+            self._bytes = 0
+        if self.shared is not None:
+            self.shared.clear(f"{KEY_PREFIX}:{self.namespace}:")
+
+    def sweep(self):
+        """Drop local entries older than any caller would accept. Returns the number removed."""
+        with self._lock:
+            horizon = time.time() - (self.retention or max(self._window_max_age, self._previous_max_age))
+            self._previous_max_age = self._window_max_age
+            self._window_max_age = self.default_ttl
+            expired = [key for key, (_, timestamp) in self.cache.items() if timestamp <= horizon]
+            for key in expired:
+                self._discard(key)
+            self.counters['expirations'] += len(expired)
+        return len(expired)
 
     def get_age(self, key):
         """Get age of cached item in seconds"""
@@ -216,6 +599,19 @@ class SmartCache:
             _, timestamp = self.cache[key]
             return time.time() - timestamp
 
+    def stats(self):
+        with self._lock:
+            lookups = self.counters['hits'] + self.counters['shared_hits'] + self.counters['misses']
+            hits = self.counters['hits'] + self.counters['shared_hits']
+            return {
+                **self.counters,
+                'entries': len(self.cache),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+            }
+
 class NewsAPI:
     def __init__(self):
         self.api_key = os.getenv('FINNHUB_API_KEY', 'demo')
@@ -252,7 +648,7 @@ class NewsAPI:
         try:
             url = f'{self.base_url}/news'
             params = {'category': 'general', 'token': self.api_key}
-            response = requests.get(url, params=params, timeout=5)
+            response = http_client.get(url, params=params, timeout=5)
             if response.status_code == 200:
                 articles = response.json()
                 if not isinstance(articles, list):
@@ -291,7 +687,7 @@ class NewsAPI:
                 'to': to_date,
                 'token': self.api_key
             }
-            response = requests.get(url, params=params, timeout=5)
+            response = http_client.get(url, params=params, timeout=5)
             if response.status_code == 200:
                 articles = response.json()
                 if not isinstance(articles, list):
@@ -338,10 +734,12 @@ class StocktwitsAPI:
     Free API - no authentication required for public streams.
     """
 
-    def __init__(self):
+    def __init__(self, shared_cache=None):
         self.base_url = "https://api.stocktwits.com/api/2"
-        self.cache = {}
         self.cache_ttl = 60  # Cache for 60 seconds to avoid rate limiting
+        # Expired entries are kept for an hour so rate-limited requests can fall back to them
+        self.cache = SmartCache(default_ttl=self.cache_ttl, namespace='stocktwits',
+                                shared=shared_cache, retention=3600)
 
     def get_stock_messages(self, symbol, limit=15, max_id=None):
         """
@@ -359,9 +757,9 @@ class StocktwitsAPI:
         cache_key = f"stocktwits:{symbol}"
 
         # Only use cache for initial load (no max_id), not for pagination
-        if max_id is None and cache_key in self.cache:
-            cached_data, cached_time = self.cache[cache_key]
-            if time.time() - cached_time < self.cache_ttl:
+        if max_id is None:
+            cached_data = self.cache.get(cache_key)
+            if cached_data:
                 messages = cached_data['messages'][:limit]
                 return {
                     'messages': messages,
@@ -379,7 +777,7 @@ class StocktwitsAPI:
                 'User-Agent': 'StockWatchlistApp/1.0'
             }
 
-            response = requests.get(url, headers=headers, params=params, timeout=5)
+            response = http_client.get(url, headers=headers, params=params, timeout=5)
 
             if response.status_code == 200:
                 data = response.json()
@@ -430,7 +828,7 @@ class StocktwitsAPI:
 
                 # Cache the results (only for initial load, not pagination)
                 if max_id is None:
-                    self.cache[cache_key] = ({'messages': messages}, time.time())
+                    self.cache.set(cache_key, {'messages': messages})
 
                 # Get cursor for next page (last message ID)
                 result_messages = messages[:limit]
@@ -467,7 +865,7 @@ class StocktwitsAPI:
                 'User-Agent': 'StockWatchlistApp/1.0'
             }
 
-            response = requests.get(url, headers=headers, timeout=5)
+            response = http_client.get(url, headers=headers, timeout=5)
 
             if response.status_code == 200:
                 data = response.json()
@@ -498,7 +896,7 @@ class StocktwitsAPI:
                 'User-Agent': 'StockWatchlistApp/1.0'
             }
 
-            response = requests.get(url, headers=headers, timeout=5)
+            response = http_client.get(url, headers=headers, timeout=5)
 
             if response.status_code == 200:
                 data = response.json()
@@ -566,15 +964,15 @@ class StocktwitsAPI:
 
     def _get_cached_or_empty(self, cache_key, limit):
         """Return cached data if available, otherwise empty list"""
-        if cache_key in self.cache:
-            cached_data, _ = self.cache[cache_key]
+        cached_data = self.cache.get_stale(cache_key)
+        if cached_data:
             return cached_data[:limit]
         return []
 
     def _get_cached_or_empty_dict(self, cache_key, limit):
         """Return cached data in dict format if available, otherwise empty dict"""
-        if cache_key in self.cache:
-            cached_data, _ = self.cache[cache_key]
+        cached_data = self.cache.get_stale(cache_key)
+        if cached_data:
             messages = cached_data.get('messages', [])[:limit]
             return {
                 'messages': messages,
@@ -588,15 +986,34 @@ class StocktwitsAPI:
 # YAHOO FINANCE API (unchanged core, added caching)
 # =============================================================================
 
+_SHARE_CLASS = re.compile(r'^([A-Z]+)\.([A-Z])$')
+
+
+def yahoo_symbol(symbol):
+    """Yahoo ticker for a symbol: share classes are BRK.B on Finnhub/watchlists but BRK-B on Yahoo"""
+    return _SHARE_CLASS.sub(r'\1-\2', symbol)
+
+
 class YahooFinanceAPI:
-    def __init__(self):
-        self.cache = SmartCache(default_ttl=30)  # 30s cache for real-time data consistency
+    def __init__(self, shared_cache=None, bar_store=None, search_cache=None):
+        # 30s cache for real-time data consistency
+        self.cache = SmartCache(default_ttl=30, namespace='yahoo', shared=shared_cache)
+        # Search results; shared with the symbol index's query cache when one is passed in
+        self.search_cache = search_cache or self.cache
+        # Local OHLCV history; only the missing tail is fetched from yfinance
+        self.bar_store = bar_store
+
+    def _history(self, symbol, start_date, end_date, interval='1d'):
+        """Daily/intraday history as a yfinance-style DataFrame, via the bar store when configured"""
+        if self.bar_store is not None:
+            return self.bar_store.get_frame(symbol, interval, start_date, end_date)
+        return yf.Ticker(symbol).history(start=start_date, end=end_date, interval=interval)
 
     def search_stocks(self, query, limit=10):
         """Search stocks by name or symbol"""
-        cache_key = f"search:{query}:{limit}"
+        cache_key = f"yahoo:{query}:{limit}"
         # Search results can be cached longer (5min) as they change less frequently
-        cached = self.cache.get(cache_key, max_age=300)
+        cached = self.search_cache.get(cache_key, max_age=300)
         if cached:
             return cached
 
@@ -608,7 +1025,7 @@ class YahooFinanceAPI:
                 "newsCount": 0,
                 "lang": "en"
             }
-            response = requests.get(url, params=params, timeout=3)
+            response = http_client.get(url, params=params, timeout=3)
             if response.status_code == 200:
                 data = response.json()
                 results = []
@@ -625,7 +1042,7 @@ class YahooFinanceAPI:
                     print("Yahoo API returned no results, using fallback")
                     results = self.get_fallback_search_results(query, limit)
 
-                self.cache.set(cache_key, results)
+                self.search_cache.set(cache_key, results)
                 return results
             else:
                 print("Yahoo search error:", response.status_code)
@@ -662,7 +1079,7 @@ class YahooFinanceAPI:
     def get_real_time_data(self, symbol):
         """Get real-time data with caching"""
         cache_key = f"price:{symbol}"
-        cached = self.cache.get(cache_key, max_age=30)  # 30s cache for prices
+        cached = self.cache.get(cache_key, max_age=quote_ttl())  # Market-hours-aware price TTL
         if cached:
             return cached
 
@@ -730,21 +1147,13 @@ class YahooFinanceAPI:
     def get_historical_data(self, symbol, start_date, end_date):
         """Get historical data"""
         try:
-            stock = yf.Ticker(symbol)
-            hist = stock.history(start=start_date, end=end_date)
+            hist = self._history(symbol, start_date, end_date)
 
             if hist.empty:
                 print(f"No historical data available for {symbol}")
                 return None
 
-            historical_data = []
-            for date, row in hist.iterrows():
-                historical_data.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'close': float(row['Close'])
-                })
-
-            return historical_data
+            return close_records(hist)
 
         except Exception as e:
             print(f"Error retrieving historical data for {symbol}: {e}")
@@ -753,55 +1162,81 @@ class YahooFinanceAPI:
     def get_ohlcv_data(self, symbol, start_date, end_date, interval='1d'):
         """Get OHLCV (Open, High, Low, Close, Volume) historical data for charts"""
         try:
-            stock = yf.Ticker(symbol)
-            hist = stock.history(start=start_date, end=end_date, interval=interval)
+            hist = self._history(symbol, start_date, end_date, interval=interval)
 
             if hist.empty:
                 print(f"No OHLCV data available for {symbol}")
                 return None
 
-            ohlcv_data = []
-            for date, row in hist.iterrows():
-                ohlcv_data.append({
-                    'date': date.strftime('%Y-%m-%d') if interval == '1d' else date.strftime('%Y-%m-%d %H:%M'),
-                    'open': float(row['Open']),
-                    'high': float(row['High']),
-                    'low': float(row['Low']),
-                    'close': float(row['Close']),
-                    'volume': int(row['Volume']) if row['Volume'] else 0
-                })
-
-            return ohlcv_data
+            return ohlcv_records(hist, intraday=interval != '1d')
 
         except Exception as e:
             print(f"Error retrieving OHLCV data for {symbol}: {e}")
             return None
 
+    def get_history_batch(self, symbols, start_date, end_date=None, interval='1d') -> Dict[str, pd.DataFrame]:
+        """{symbol: history DataFrame} for many symbols from one batch download (via the bar store)"""
+        symbols = list(dict.fromkeys(s.upper() for s in symbols if s))
+        if not symbols:
+            return {}
+        tickers = {symbol: yahoo_symbol(symbol) for symbol in symbols}
+        if self.bar_store is not None:
+            bars = self.bar_store.get_bars_batch(tickers.values(), interval, start_date, end_date)
+            return {symbol: bars_to_frame(bars[ticker]) for symbol, ticker in tickers.items()}
+        frames = yfinance_download(list(dict.fromkeys(tickers.values())), interval, start_date, end_date)
+        return {symbol: frames[ticker] for symbol, ticker in tickers.items() if ticker in frames}
+
+    def get_close_frame(self, symbols, start_date, end_date=None) -> pd.DataFrame:
+        """Daily closes with one column per symbol (symbols without data are left out)"""
+        frames = self.get_history_batch(symbols, start_date, end_date)
+        return pd.DataFrame({symbol: hist['Close'] for symbol, hist in frames.items() if not hist.empty})
+
+    def get_recent_closes(self, symbols, trading_days: int) -> pd.DataFrame:
+        """Closes for the last `trading_days` sessions (what yf.download(period='Nd') returned)"""
+        # Calendar lookback wide enough to cover weekends and a holiday or two
+        start_date = (datetime.now() - timedelta(days=trading_days * 7 // 5 + 5)).strftime("%Y-%m-%d")
+        return self.get_close_frame(symbols, start_date).tail(trading_days)
+
+    @staticmethod
+    def _day_window(date_str):
+        target_date = datetime.strptime(date_str, "%Y-%m-%d")
+        end_date = (target_date + timedelta(days=1)).strftime("%Y-%m-%d")
+        start_date = (target_date - timedelta(days=10)).strftime("%Y-%m-%d")
+        return start_date, end_date
+
+    @staticmethod
+    def _last_change_percent(hist) -> float:
+        if hist is None or hist.empty or len(hist) < 2:
+            return 0.0
+        closes = hist["Close"].dropna()
+        if len(closes) < 2:
+            return 0.0
+        close_today = closes.iloc[-1]
+        close_prev = closes.iloc[-2]
+        if close_prev and close_prev > 0:
+            return float((close_today / close_prev - 1.0) * 100.0)
+        return 0.0
+
     def get_day_change_percent(self, symbol: str, date_str: str) -> float:
         """Compute close-to-close percent change for a specific trading date"""
         try:
-            target_date = datetime.strptime(date_str, "%Y-%m-%d")
-            end_date = (target_date + timedelta(days=1)).strftime("%Y-%m-%d")
-            start_date = (target_date - timedelta(days=10)).strftime("%Y-%m-%d")
-
-            stock = yf.Ticker(symbol)
-            hist = stock.history(start=start_date, end=end_date)
-            if hist is None or hist.empty or len(hist) < 2:
-                return 0.0
-
-            closes = hist["Close"].dropna()
-            if len(closes) < 2:
-                return 0.0
-
-            close_today = closes.iloc[-1]
-            close_prev = closes.iloc[-2]
-            if close_prev and close_prev > 0:
-                return float((close_today / close_prev - 1.0) * 100.0)
-            return 0.0
+            start_date, end_date = self._day_window(date_str)
+            return self._last_change_percent(self._history(symbol, start_date, end_date))
         except Exception as e:
             print(f"Error computing day change percent for {symbol} on {date_str}: {e}")
             return 0.0
 
+    def get_day_change_percents(self, symbols, date_str: str) -> Dict[str, float]:
+        """get_day_change_percent for many symbols with a single batch download"""
+        symbols = list(dict.fromkeys(s.upper() for s in symbols if s))
+        try:
+            start_date, end_date = self._day_window(date_str)
+            frames = self.get_history_batch(symbols, start_date, end_date)
+        except Exception as e:
+            print(f"Error computing day change percents on {date_str}: {e}")
+            frames = {}
+        return {symbol: self._last_change_percent(frames.get(symbol)) for symbol in symbols}
+
 # =============================================================================
 # STOCK CLASS (unchanged)
 # =============================================================================
@@ -853,7 +1288,7 @@ class ImprovedAlpacaAPI:
     - Optimized retry logic
     - Batch request support
     """
-    def __init__(self, api_key=None, secret_key=None, base_url=None):
+    def __init__(self, api_key=None, secret_key=None, base_url=None, asset_catalog=None, shared_cache=None):
         self.api_key = api_key or os.getenv('ALPACA_API_KEY')
         self.secret_key = secret_key or os.getenv('ALPACA_SECRET_KEY')
         self.base_url = base_url or os.getenv('ALPACA_DATA_URL', 'https://data.alpaca.markets/v2')
@@ -861,8 +1296,8 @@ class ImprovedAlpacaAPI:
         # Initialize improved components
         self.request_queue = RequestQueue(max_requests_per_minute=180)  # Stay under 200 limit
         self.circuit_breaker = ImprovedCircuitBreaker(failure_threshold=3, recovery_timeout=30)
-        self.cache = SmartCache(default_ttl=30)  # 30s cache for prices
-        self._company_name_cache = {}
+        self.cache = SmartCache(default_ttl=30, namespace='alpaca', shared=shared_cache)  # 30s cache for prices
+        self.asset_catalog = asset_catalog  # bulk-loaded names, no per-symbol HTTP
 
         if not self.api_key or not self.secret_key:
             print("[ALPACA] Warning: API keys not set")
@@ -877,12 +1312,29 @@ class ImprovedAlpacaAPI:
             'APCA-API-SECRET-KEY': self.secret_key
         }
 
-    def _wait_for_rate_limit(self):
-        """Wait if necessary to respect rate limits"""
-        wait_time = self.request_queue.get_wait_time()
-        if wait_time > 0:
-            print(f"⏳ [ALPACA] Rate limit - waiting {wait_time:.1f}s")
-            time.sleep(wait_time)
+    def _submit(self, fn, request_timeout, default=None):
+        """
+        Run fn() through the request queue in the calling thread's lane and wait
+        for its result: up to the lane's token wait plus the request's own timeout.
+        A request still queued at the deadline is dropped and `default` returned;
+        lanes that do not wait (interactive) get `default` at once when no token is free.
+        """
+        lane = current_lane()
+        if not RATE_LIMIT_WAIT_SECONDS[lane]:
+            future = self.request_queue.try_submit(fn, lane)
+            if future is None:
+                print(f"⏳ [ALPACA] Rate limit - no token for {LANE_NAMES[lane]} request, not waiting")
+                return default
+        else:
+            future = self.request_queue.submit(fn, lane)
+        try:
+            return future.result(timeout=RATE_LIMIT_WAIT_SECONDS[lane] + request_timeout)
+        except FutureTimeout:
+            if self.request_queue.cancel(future):
+                print(f"⏳ [ALPACA] Rate limit - dropped {LANE_NAMES[lane]} request after {RATE_LIMIT_WAIT_SECONDS[lane]}s")
+            else:
+                print(f"⏳ [ALPACA] Request still running after {RATE_LIMIT_WAIT_SECONDS[lane] + request_timeout}s")
+            return default
 
     def get_real_time_data(self, symbol, use_cache=True):
         """
@@ -894,7 +1346,7 @@ class ImprovedAlpacaAPI:
         # Check cache first
         if use_cache:
             cache_key = f"price:{symbol}"
-            cached = self.cache.get(cache_key, max_age=30)
+            cached = self.cache.get(cache_key, max_age=quote_ttl())
             if cached:
                 print(f"📦 [ALPACA] Cache hit for {symbol}")
                 return cached
@@ -905,12 +1357,10 @@ class ImprovedAlpacaAPI:
             print(f"🚫 [ALPACA] Circuit breaker OPEN for {symbol}")
             return None
 
-        # Wait for rate limit
-        self._wait_for_rate_limit()
+        timeout = 4  # Reduced from 8-10s
 
         def _fetch():
             # Single attempt with optimized timeout
-            timeout = 4  # Reduced from 8-10s
             print(f"🔵 [ALPACA] Fetching {symbol} (timeout: {timeout}s)...")
 
             # Try snapshot endpoint (most reliable)
@@ -918,7 +1368,7 @@ class ImprovedAlpacaAPI:
                 url = f'{self.base_url}/stocks/{symbol}/snapshot'
                 headers = self._get_headers()
 
-                response = requests.get(url, headers=headers, timeout=timeout)
+                response = http_client.get(url, headers=headers, timeout=timeout)
                 self.request_queue.record_request()
 
                 if response.status_code == 200:
@@ -931,7 +1381,7 @@ class ImprovedAlpacaAPI:
                         price = daily_bar.get('c')
 
                     if price:
-                        name = self._get_company_name(symbol, timeout)
+                        name = self._get_company_name(symbol)
                         result = {
                             'name': name or symbol,
                             'price': float(price)
@@ -953,7 +1403,7 @@ class ImprovedAlpacaAPI:
 
                 elif response.status_code == 429:
                     print(f"[ALPACA] Rate limited for {symbol}")
-                    self.request_queue.stats['rate_limited'] += 1
+                    self.request_queue.note_rate_limited()
                     raise Exception(f"Rate limited: {response.status_code}")
 
                 else:
@@ -965,7 +1415,10 @@ class ImprovedAlpacaAPI:
                 raise Exception(f"Timeout after {timeout}s")
 
         try:
-            return self.circuit_breaker.call(_fetch, endpoint_key=endpoint_key)
+            # Paced by the request queue and run on its workers; when throttled the last
+            # known price is served (or None, and the caller falls back to Yahoo)
+            return self._submit(lambda: self.circuit_breaker.call(_fetch, endpoint_key=endpoint_key), timeout,
+                                default=self.cache.get_stale(f"price:{symbol}"))
         except Exception as e:
             print(f"🚫 [ALPACA] Failed for {symbol}: {e}")
             return None
@@ -988,7 +1441,7 @@ class ImprovedAlpacaAPI:
         if use_cache:
             for symbol in symbols:
                 cache_key = f"price:{symbol}"
-                cached = self.cache.get(cache_key, max_age=30)
+                cached = self.cache.get(cache_key, max_age=quote_ttl())
                 if cached:
                     results[symbol] = cached
                 else:
@@ -1004,11 +1457,11 @@ class ImprovedAlpacaAPI:
         if self.circuit_breaker.get_state(endpoint_key) == 'OPEN':
             return results
 
-        # Wait for rate limit
-        self._wait_for_rate_limit()
+        timeout = 6  # Optimized timeout
 
         def _batch_fetch():
-            timeout = 6  # Optimized timeout
+            # Own dict: after a timeout the caller returns while this may still run
+            fetched = {}
             symbols_str = ','.join(symbols_to_fetch)
             url = f'{self.base_url}/stocks/snapshots'
             params = {'symbols': symbols_str}
@@ -1016,7 +1469,7 @@ class ImprovedAlpacaAPI:
 
             print(f"🔵 [ALPACA BATCH] Fetching {len(symbols_to_fetch)} symbols...")
 
-            response = requests.get(url, headers=headers, params=params, timeout=timeout)
+            response = http_client.get(url, headers=headers, params=params, timeout=timeout)
             self.request_queue.record_request()
 
             if response.status_code == 200:
@@ -1035,23 +1488,23 @@ class ImprovedAlpacaAPI:
                         price = daily_bar.get('c')
 
                     if price:
-                        name = self._get_company_name(symbol, timeout)
+                        name = self._get_company_name(symbol)
                         result = {
                             'name': name or symbol,
                             'price': float(price)
                         }
-                        results[symbol] = result
+                        fetched[symbol] = result
 
                         # Cache the result
                         cache_key = f"price:{symbol}"
                         self.cache.set(cache_key, result)
 
-                print(f"[ALPACA BATCH] Fetched {len(results)}/{len(symbols_to_fetch)} symbols")
-                return results
+                print(f"[ALPACA BATCH] Fetched {len(fetched)}/{len(symbols_to_fetch)} symbols")
+                return fetched
 
             elif response.status_code == 429:
                 print(f"[ALPACA BATCH] Rate limited")
-                self.request_queue.stats['rate_limited'] += 1
+                self.request_queue.note_rate_limited()
                 raise Exception("Rate limited")
 
             else:
@@ -1059,31 +1512,19 @@ class ImprovedAlpacaAPI:
                 raise Exception(f"API error: {response.status_code}")
 
         try:
-            self.circuit_breaker.call(_batch_fetch, endpoint_key=endpoint_key)
+            results.update(self._submit(lambda: self.circuit_breaker.call(_batch_fetch, endpoint_key=endpoint_key),
+                                        timeout, default={}))
             return results
         except Exception as e:
             print(f"🚫 [ALPACA BATCH] Failed: {e}")
             return results
 
-    def _get_company_name(self, symbol, timeout=3):
-        """Get company name with caching"""
-        if symbol in self._company_name_cache:
-            return self._company_name_cache[symbol]
-
-        try:
-            url = f'{self.base_url}/assets/{symbol}'
-            headers = self._get_headers()
-            response = requests.get(url, headers=headers, timeout=timeout)
-
-            if response.status_code == 200:
-                data = response.json()
-                name = data.get('name', symbol)
-                self._company_name_cache[symbol] = name
+    def _get_company_name(self, symbol):
+        """Get company name from the asset catalogue (never touches the network)"""
+        if self.asset_catalog is not None:
+            name = self.asset_catalog.get_name(symbol)
+            if name:
                 return name
-        except Exception as e:
-            print(f"[ALPACA] Error getting name for {symbol}: {e}")
-
-        self._company_name_cache[symbol] = symbol
         return symbol
 
     def get_info(self, symbol):
@@ -1094,13 +1535,13 @@ class ImprovedAlpacaAPI:
         try:
             url = f'{self.base_url}/assets/{symbol}'
             headers = self._get_headers()
-            response = requests.get(url, headers=headers, timeout=3)
+            response = http_client.get(url, headers=headers, timeout=3)
 
             if response.status_code == 200:
                 asset_data = response.json()
 
                 snapshot_url = f'{self.base_url}/stocks/{symbol}/snapshot'
-                snapshot_response = requests.get(snapshot_url, headers=headers, timeout=3)
+                snapshot_response = http_client.get(snapshot_url, headers=headers, timeout=3)
 
                 info = {
                     'name': asset_data.get('name', symbol),
@@ -1151,7 +1592,7 @@ class FinnhubAPI:
         try:
             url = f'{self.base_url}stock/profile2'
             params = {'symbol': symbol, 'token': self.api_key}
-            response = requests.get(url, params=params, timeout=5)
+            response = http_client.get(url, params=params, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 if data and isinstance(data, dict) and len(data) > 0:
@@ -1187,7 +1628,7 @@ class FinnhubAPI:
 
             url = f'{self.base_url}calendar/earnings'
             params = {'from': from_date, 'to': to_date, 'token': self.api_key}
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 earnings = data.get('earningsCalendar', [])
@@ -1199,12 +1640,28 @@ class FinnhubAPI:
             print(f'Error fetching Finnhub earnings calendar: {e}')
             return []
 
+    def get_index_constituents(self, symbol):
+        """Get the constituent symbols of an index (e.g. ^GSPC) from Finnhub API"""
+        try:
+            url = f'{self.base_url}index/constituents'
+            params = {'symbol': symbol, 'token': self.api_key}
+            response = http_client.get(url, params=params, timeout=10)
+            if response.status_code == 200:
+                data = response.json()
+                return data.get('constituents', []) if isinstance(data, dict) else []
+            else:
+                print(f'Finnhub index constituents error: {response.status_code}')
+                return []
+        except Exception as e:
+            print(f'Error fetching Finnhub index constituents for {symbol}: {e}')
+            return []
+
     def get_insider_transactions(self, symbol):
         """Get insider transactions for a symbol from Finnhub API"""
         try:
             url = f'{self.base_url}stock/insider-transactions'
             params = {'symbol': symbol, 'token': self.api_key}
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 transactions = data.get('data', [])
@@ -1221,7 +1678,7 @@ class FinnhubAPI:
         try:
             url = f'{self.base_url}stock/recommendation'
             params = {'symbol': symbol, 'token': self.api_key}
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 return data if data else []
@@ -1237,7 +1694,7 @@ class FinnhubAPI:
         try:
             url = f'{self.base_url}stock/price-target'
             params = {'symbol': symbol, 'token': self.api_key}
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 return data if data else {}
@@ -1262,7 +1719,7 @@ class AlphaVantageAPI:
                 'symbol': symbol,
                 'apikey': self.api_key
             }
-            response = requests.get(self.base_url, params=params, timeout=5)
+            response = http_client.get(self.base_url, params=params, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 if data and 'Symbol' in data:
@@ -1292,7 +1749,7 @@ class FinancialModelingPrepAPI:
         try:
             url = f'{self.base_url}/profile/{symbol}'
             params = {'apikey': self.api_key}
-            response = requests.get(url, params=params, timeout=5)
+            response = http_client.get(url, params=params, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 if isinstance(data, list) and len(data) > 0:
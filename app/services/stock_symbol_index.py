@@ -4,14 +4,32 @@ import os
 import re
 import threading
 import time
-from difflib import SequenceMatcher
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-import requests
+from app.services import http_client
+from app.services.stock import SmartCache
+from app.services.symbol_search_index import SymbolSearchIndex
+from app.services.symbol_table import SymbolTable, load_arrays, save_arrays
 
 logger = logging.getLogger(__name__)
 
+_ALIASES = {
+    "GOOGLE": "GOOGL",
+    "FACEBOOK": "META",
+    "MICROSOFT": "MSFT",
+    "APPLE": "AAPL",
+    "TESLA": "TSLA",
+    "NVIDIA": "NVDA",
+    "AMAZON": "AMZN",
+    "NETFLIX": "NFLX",
+}
+
+
+# Bonus for a typo match, less per edit (replaces a SequenceMatcher ratio of 0.74-1.0 * 220)
+_TYPO_SCORE = 220
+_TYPO_DISTANCE_PENALTY = 40
+
 
 class StockSymbolIndexService:
     """Server-side stock symbol/name index with SEC-backed refresh and fuzzy search."""
@@ -19,10 +37,12 @@ class StockSymbolIndexService:
     SEC_TICKERS_EXCHANGE_URL = "https://www.sec.gov/files/company_tickers_exchange.json"
     SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
 
-    def __init__(self):
+    def __init__(self, autostart: bool = True, query_cache: Optional[SmartCache] = None):
         self._lock = threading.RLock()
-        self._entries: List[Dict] = []
-        self._query_cache: Dict[str, tuple] = {}
+        self._table = SymbolTable.empty()
+        self._index = SymbolSearchIndex(self._table, _ALIASES)
+        self._version = "0"
+        self._warm_typeahead = autostart
         self._last_refresh_ts: float = 0.0
         self._last_refresh_source: str = "seed"
 
@@ -30,14 +50,22 @@ class StockSymbolIndexService:
         self._query_cache_ttl_seconds = int(os.getenv("SYMBOL_INDEX_QUERY_CACHE_SECONDS", "300"))
         self._request_timeout_seconds = float(os.getenv("SYMBOL_INDEX_REQUEST_TIMEOUT_SECONDS", "8"))
         self._max_cache_entries = int(os.getenv("SYMBOL_INDEX_MAX_QUERY_CACHE_ENTRIES", "1000"))
-        self._cache_path = Path(os.getenv("SYMBOL_INDEX_CACHE_PATH", "/tmp/stock_symbol_index_cache.json"))
+        # O(1) LRU with TTL; keys carry the index version, so a refresh needs no clear
+        self._query_cache = query_cache or SmartCache(
+            default_ttl=self._query_cache_ttl_seconds,
+            namespace="symbol_search",
+            max_entries=self._max_cache_entries,
+            sweep=autostart,
+        )
+        self._cache_path = Path(os.getenv("SYMBOL_INDEX_CACHE_PATH", "/tmp/stock_symbol_index_cache.bin"))
         self._user_agent = os.getenv(
             "SEC_API_USER_AGENT",
             "AIStockSage/1.0 (support@aistocksage.com)",
         )
 
         self._bootstrap()
-        self._start_background_refresh()
+        if autostart:
+            self._start_background_refresh()
 
     def search(self, query: str, limit: int = 10) -> List[Dict]:
         query = (query or "").strip()
@@ -49,51 +77,60 @@ class StockSymbolIndexService:
             return []
 
         limit = max(1, min(limit, 50))
-        cache_key = f"{normalized_query}:{limit}"
-        now = time.time()
-
         with self._lock:
-            cached = self._query_cache.get(cache_key)
-            if cached and (now - cached[0]) <= self._query_cache_ttl_seconds:
-                return cached[1]
-            entries = list(self._entries)
+            index, version = self._index, self._version
 
-        if not entries:
+        cache_key = f"index:{version}:{normalized_query}:{limit}"
+        cached = self._query_cache.get(cache_key, max_age=self._query_cache_ttl_seconds)
+        if cached is not None:
+            return cached
+
+        if not len(index):
             return []
 
-        scored_results = []
-        for entry in entries:
-            score = self._score_entry(entry, normalized_query)
-            if score <= 0:
-                continue
-            scored_results.append((score, entry))
+        # Only the candidates the index proposes are scored, not every entry
+        scored_results = index.search(normalized_query, limit, self._score_entry)
+        results = [index.table.public(item[1]) for item in scored_results]
 
-        scored_results.sort(
-            key=lambda pair: (
-                -pair[0],
-                pair[1]["symbol"],
-                pair[1]["name"],
-            )
-        )
+        self._query_cache.set(cache_key, results)
+        return results
 
-        results = [self._public_entry(item[1]) for item in scored_results[:limit]]
+    def typeahead(self, query: str, limit: int = 10) -> List[Dict]:
+        """Search-as-you-type: precomputed 1-3 character prefixes, narrowed longer ones."""
+        normalized_query = self._normalize_text((query or "").strip())
+        if not normalized_query:
+            return []
 
+        limit = max(1, min(limit, 50))
         with self._lock:
-            if len(self._query_cache) >= self._max_cache_entries:
-                # Drop oldest item to keep memory bounded.
-                oldest_key = min(self._query_cache.items(), key=lambda kv: kv[1][0])[0]
-                self._query_cache.pop(oldest_key, None)
-            self._query_cache[cache_key] = (now, results)
+            index = self._index
+        if not len(index):
+            return []
 
-        return results
+        return [index.table.public(item[1]) for item in index.typeahead(normalized_query, limit, self._score_entry)]
+
+    @property
+    def version(self) -> str:
+        """Content fingerprint of the current entries; identical across workers with the same data."""
+        with self._lock:
+            return self._version
+
+    def get_entry(self, symbol: str) -> Optional[Dict]:
+        symbol = (symbol or "").strip().upper()
+        with self._lock:
+            table = self._table
+        i = table.find(symbol)
+        return table.public(i) if i is not None else None
 
     def stats(self) -> Dict:
         with self._lock:
             return {
-                "entries": len(self._entries),
+                "entries": len(self._table),
                 "last_refresh_ts": self._last_refresh_ts,
                 "last_refresh_source": self._last_refresh_source,
-                "query_cache_entries": len(self._query_cache),
+                "query_cache": self._query_cache.stats(),
+                "version": self._version,
+                "typeahead": self._index.typeahead_stats(),
             }
 
     def refresh_now(self) -> bool:
@@ -141,13 +178,13 @@ class StockSymbolIndexService:
             return False
 
         self._set_entries(entries, source=source)
-        self._save_to_cache_file(entries, source=source)
+        self._save_to_cache_file()
         logger.info("[SYMBOL-INDEX] Refreshed %s entries from %s", len(entries), source)
         return True
 
     def _fetch_sec_exchange_index(self) -> List[Dict]:
         try:
-            response = requests.get(
+            response = http_client.get(
                 self.SEC_TICKERS_EXCHANGE_URL,
                 timeout=self._request_timeout_seconds,
                 headers={"User-Agent": self._user_agent, "Accept": "application/json"},
@@ -193,7 +230,7 @@ class StockSymbolIndexService:
 
     def _fetch_sec_tickers_index(self) -> List[Dict]:
         try:
-            response = requests.get(
+            response = http_client.get(
                 self.SEC_TICKERS_URL,
                 timeout=self._request_timeout_seconds,
                 headers={"User-Agent": self._user_agent, "Accept": "application/json"},
@@ -229,56 +266,68 @@ class StockSymbolIndexService:
             return 0
 
         try:
-            payload = json.loads(self._cache_path.read_text(encoding="utf-8"))
-            entries = payload.get("entries", [])
-            source = payload.get("source", "cache_file")
-            refreshed_at = float(payload.get("refreshed_at", 0))
-            prepared = self._dedupe_and_prepare(entries)
-            if not prepared:
+            loaded = load_arrays(self._cache_path)
+            if loaded is None:
+                # JSON cache written before the binary format; replaced on the next refresh
+                return self._load_from_json_cache_file()
+
+            meta, arrays = loaded
+            table = SymbolTable.from_arrays(meta, arrays)
+            if not len(table):
                 return 0
-
-            with self._lock:
-                self._entries = prepared
-                self._query_cache.clear()
-                self._last_refresh_ts = refreshed_at or time.time()
-                self._last_refresh_source = source
-            return len(prepared)
+            index = SymbolSearchIndex(table, _ALIASES, arrays=arrays)
+            self._install(table, index, meta.get("source", "cache_file"), float(meta.get("refreshed_at") or time.time()))
+            return len(table)
         except Exception as exc:
             logger.warning("[SYMBOL-INDEX] Failed to load cache file: %s", exc)
             return 0
 
-    def _save_to_cache_file(self, entries: List[Dict], source: str) -> None:
-        payload = {
-            "refreshed_at": time.time(),
-            "source": source,
-            "entries": [
-                {
-                    "symbol": item.get("symbol", ""),
-                    "name": item.get("name", ""),
-                    "exchange": item.get("exchange", ""),
-                    "type": item.get("type", "EQUITY"),
-                }
-                for item in entries
-            ],
-        }
+    def _load_from_json_cache_file(self) -> int:
+        payload = json.loads(self._cache_path.read_text(encoding="utf-8"))
+        rows = self._dedupe_and_prepare(payload.get("entries", []))
+        if not rows:
+            return 0
 
+        table = SymbolTable.from_rows(rows, self._normalize_text)
+        refreshed_at = float(payload.get("refreshed_at", 0)) or time.time()
+        self._install(table, SymbolSearchIndex(table, _ALIASES), payload.get("source", "cache_file"), refreshed_at)
+        return len(table)
+
+    def _save_to_cache_file(self) -> None:
+        with self._lock:
+            table, index = self._table, self._index
+            meta = {"refreshed_at": self._last_refresh_ts, "source": self._last_refresh_source}
+
+        table_meta, arrays = table.to_arrays()
         try:
             self._cache_path.parent.mkdir(parents=True, exist_ok=True)
-            self._cache_path.write_text(json.dumps(payload), encoding="utf-8")
+            save_arrays(self._cache_path, {**meta, **table_meta}, {**arrays, **index.to_arrays()})
         except Exception as exc:
             logger.warning("[SYMBOL-INDEX] Failed to write cache file: %s", exc)
 
     def _set_entries(self, entries: List[Dict], source: str) -> None:
-        prepared = self._dedupe_and_prepare(entries)
-        if not prepared:
+        rows = self._dedupe_and_prepare(entries)
+        if not rows:
             return
 
+        # The table and search index are built outside the lock and swapped in together
+        table = SymbolTable.from_rows(rows, self._normalize_text)
+        self._install(table, SymbolSearchIndex(table, _ALIASES), source, time.time())
+
+    def _install(self, table: SymbolTable, index: SymbolSearchIndex, source: str, refreshed_at: float) -> None:
+        version = table.fingerprint()
         with self._lock:
-            self._entries = prepared
-            self._query_cache.clear()
-            self._last_refresh_ts = time.time()
+            self._table = table
+            self._index = index
+            self._version = version
+            self._last_refresh_ts = refreshed_at
             self._last_refresh_source = source
 
+        if self._warm_typeahead:
+            threading.Thread(
+                target=index.warm_typeahead, args=(self._score_entry,), daemon=True, name="symbol-typeahead-warm"
+            ).start()
+
     def _dedupe_and_prepare(self, entries: List[Dict]) -> List[Dict]:
         seen = {}
         for entry in entries:
@@ -287,7 +336,8 @@ class StockSymbolIndexService:
             exchange = str(entry.get("exchange", "")).strip().upper() or "US"
             asset_type = str(entry.get("type", "EQUITY")).strip().upper() or "EQUITY"
 
-            if not symbol or not name:
+            # Tickers are ASCII; the symbol table stores them as bytes
+            if not symbol or not name or not symbol.isascii():
                 continue
 
             key = symbol
@@ -311,30 +361,17 @@ class StockSymbolIndexService:
                     "type": asset_type,
                 }
 
-        prepared = []
-        for row in seen.values():
-            name_norm = self._normalize_text(row["name"])
-            symbol_norm = self._normalize_text(row["symbol"])
-            prepared.append(
-                {
-                    **row,
-                    "_name_norm": name_norm,
-                    "_symbol_norm": symbol_norm,
-                    "_tokens": [token for token in name_norm.split() if token],
-                }
-            )
+        return sorted(seen.values(), key=lambda item: item["symbol"])
 
-        prepared.sort(key=lambda item: (item["symbol"], item["name"]))
-        return prepared
+    def _score_entry(self, symbol: str, name: str, query_norm: str, typo_distance: Optional[int] = None) -> int:
+        """Score of one entry given its normalised symbol and name.
 
-    def _score_entry(self, entry: Dict, query_norm: str) -> int:
-        symbol = entry.get("_symbol_norm", "")
-        name = entry.get("_name_norm", "")
-        tokens = entry.get("_tokens", [])
+        typo_distance is the summed edit distance between the query tokens and
+        the entry's closest words, when the index found one within budget.
+        """
         score = 0
 
-        aliases = self._aliases()
-        alias_symbol = aliases.get(query_norm)
+        alias_symbol = _ALIASES.get(query_norm)
         if alias_symbol and symbol == alias_symbol:
             score += 500
 
@@ -352,7 +389,8 @@ class StockSymbolIndexService:
         elif query_norm in name:
             score += 360
 
-        token_prefix_hits = sum(1 for token in tokens if token.startswith(query_norm))
+        # A token can only start with the query if the name contains it
+        token_prefix_hits = sum(1 for token in name.split() if token.startswith(query_norm)) if query_norm in name else 0
         if token_prefix_hits:
             score += min(token_prefix_hits, 3) * 170
 
@@ -361,21 +399,11 @@ class StockSymbolIndexService:
             token_match = sum(1 for token in query_tokens if token in name)
             score += token_match * 130
 
-        if score < 350 and len(query_norm) >= 3:
-            ratio = SequenceMatcher(None, query_norm, name[: max(40, len(query_norm) * 3)]).ratio()
-            if ratio >= 0.74:
-                score += int(ratio * 220)
+        if score < 350 and typo_distance is not None:
+            score += max(0, _TYPO_SCORE - _TYPO_DISTANCE_PENALTY * typo_distance)
 
         return score
 
-    def _public_entry(self, entry: Dict) -> Dict:
-        return {
-            "symbol": entry.get("symbol", ""),
-            "name": entry.get("name", ""),
-            "exchange": entry.get("exchange", ""),
-            "type": entry.get("type", "EQUITY"),
-        }
-
     def _seed_entries(self) -> List[Dict]:
         return [
             {"symbol": "AAPL", "name": "Apple Inc.", "exchange": "NASDAQ", "type": "EQUITY"},
@@ -411,16 +439,3 @@ class StockSymbolIndexService:
     @staticmethod
     def _normalize_text(value: str) -> str:
         return re.sub(r"\s+", " ", re.sub(r"[^A-Z0-9 ]", " ", value.upper())).strip()
-
-    @staticmethod
-    def _aliases() -> Dict[str, str]:
-        return {
-            "GOOGLE": "GOOGL",
-            "FACEBOOK": "META",
-            "MICROSOFT": "MSFT",
-            "APPLE": "AAPL",
-            "TESLA": "TSLA",
-            "NVIDIA": "NVDA",
-            "AMAZON": "AMZN",
-            "NETFLIX": "NFLX",
-        }
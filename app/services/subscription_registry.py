@@ -0,0 +1,290 @@
+"""
+In-memory symbol -> subscriber registry for real-time price pushes.
+
+A user's watchlist is loaded from Firestore once, when their first socket joins
+`watchlist_{user_id}`, and is then kept current from WatchlistService change
+events and realtime listener snapshots. The price poll loop and the Finnhub
+fan-out read from here instead of querying Firestore for every connected
+socket on every cycle.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Fields the push path needs from a watchlist item
+_TRACKED_FIELDS = ('symbol', 'original_price', 'category', 'priority')
+
+
+def _symbol_of(item: Dict) -> Optional[str]:
+    symbol = item.get('symbol') or item.get('id')
+    return symbol.strip().upper() if symbol else None
+
+
+def _slim(item: Dict, symbol: str) -> Dict:
+    slim = {field: item.get(field) for field in _TRACKED_FIELDS if field in item}
+    slim['symbol'] = symbol
+    return slim
+
+
+class SubscriptionRegistry:
+    """
+    Tracks which connected users watch which symbols.
+
+    Users are reference-counted by socket id so several tabs share one
+    watchlist copy; the copy is dropped when the last socket leaves. Hooks
+    fire when a symbol gains its first subscriber or loses its last one, so
+    the Finnhub feed can subscribe/unsubscribe without scanning, and when a
+    socket should join or leave per-symbol rooms.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sid_user: Dict[str, str] = {}
+        self._user_sids: Dict[str, Set[str]] = defaultdict(set)
+        self._watchlists: Dict[str, Dict[str, Dict]] = {}
+        self._symbol_users: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._on_symbols_added: Optional[Callable[[List[str]], None]] = None
+        self._on_symbol_removed: Optional[Callable[[str], None]] = None
+        self._on_user_released: Optional[Callable[[str], None]] = None
+        self._on_join_rooms: Optional[Callable[[str, List[str]], None]] = None
+        self._on_leave_rooms: Optional[Callable[[str, List[str]], None]] = None
+        self.stats_counters = {'loads': 0, 'changes_applied': 0}
+
+    def set_symbol_hooks(self, on_symbols_added=None, on_symbol_removed=None) -> None:
+        self._on_symbols_added = on_symbols_added
+        self._on_symbol_removed = on_symbol_removed
+
+    def set_user_hook(self, on_user_released=None) -> None:
+        """Called with a user_id once that user's last socket has gone."""
+        self._on_user_released = on_user_released
+
+    def set_room_hooks(self, on_join=None, on_leave=None) -> None:
+        """Called with (sid, symbols) when a socket should join/leave those symbols' rooms."""
+        self._on_join_rooms = on_join
+        self._on_leave_rooms = on_leave
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+
+    def add_connection(self, sid: str, user_id: str) -> bool:
+        """Attach a socket to a user. Returns True if the user's watchlist still needs loading."""
+        with self._lock:
+            previous = self._sid_user.get(sid)
+            if previous and previous != user_id:
+                released, orphaned = self._detach_locked(sid)
+            else:
+                released, orphaned = None, []
+            self._sid_user[sid] = user_id
+            self._user_sids[user_id].add(sid)
+            needs_load = user_id not in self._watchlists
+            joins = [] if needs_load else [(sid, list(self._watchlists[user_id]))]
+        self._fire_removed(orphaned)
+        self._fire_released(released)
+        self._fire_rooms(joins, [])
+        return needs_load
+
+    def remove_connection(self, sid: str) -> Optional[str]:
+        """Detach a socket; drops the user's watchlist when it was their last one."""
+        with self._lock:
+            user_id = self._sid_user.get(sid)
+            released, orphaned = self._detach_locked(sid)
+        self._fire_removed(orphaned)
+        self._fire_released(released)
+        return user_id
+
+    def is_loaded(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._watchlists
+
+    def load_watchlist(self, user_id: str, items: Iterable[Dict]) -> List[str]:
+        """Replace a connected user's watchlist. Returns the user's symbols."""
+        with self._lock:
+            if not self._user_sids.get(user_id):
+                return []
+            self.stats_counters['loads'] += 1
+            before = set(self._symbol_users)
+            old_symbols = set(self._watchlists.get(user_id, {}))
+            self._drop_user_symbols_locked(user_id)
+            watchlist = {}
+            for item in items or []:
+                symbol = _symbol_of(item)
+                if symbol:
+                    watchlist[symbol] = _slim(item, symbol)
+            self._watchlists[user_id] = watchlist
+            for symbol, item in watchlist.items():
+                self._symbol_users[symbol][user_id] = self._original_price(item)
+            after = set(self._symbol_users)
+            joins, leaves = self._room_changes_locked(user_id, set(watchlist) - old_symbols, old_symbols - set(watchlist))
+        self._fire_removed(sorted(before - after))
+        self._fire_added(sorted(after - before))
+        self._fire_rooms(joins, leaves)
+        return list(watchlist)
+
+    # ------------------------------------------------------------------
+    # Watchlist change events (from WatchlistService)
+    # ------------------------------------------------------------------
+
+    def apply_change(self, user_id: str, event: str, symbol: Optional[str] = None, item: Optional[Dict] = None) -> None:
+        """Apply an 'added' / 'updated' / 'removed' / 'cleared' / 'snapshot' watchlist event for a loaded user."""
+        if event == 'snapshot':
+            if self.is_loaded(user_id):
+                self.load_watchlist(user_id, item or [])
+            return
+
+        added: List[str] = []
+        orphaned: List[str] = []
+        joined: Set[str] = set()
+        left: Set[str] = set()
+        with self._lock:
+            watchlist = self._watchlists.get(user_id)
+            if watchlist is None:
+                return
+            self.stats_counters['changes_applied'] += 1
+            symbol = symbol.strip().upper() if symbol else None
+
+            if event == 'cleared':
+                left = set(watchlist)
+                orphaned = self._drop_user_symbols_locked(user_id)
+                watchlist.clear()
+            elif event == 'removed' and symbol:
+                if watchlist.pop(symbol, None) is not None:
+                    left.add(symbol)
+                if self._remove_subscriber_locked(symbol, user_id):
+                    orphaned.append(symbol)
+            elif event in ('added', 'updated') and symbol:
+                current = watchlist.get(symbol)
+                if current is None and event == 'updated':
+                    return
+                merged = {**(current or {}), **_slim(item or {}, symbol)}
+                watchlist[symbol] = merged
+                if current is None:
+                    joined.add(symbol)
+                if symbol not in self._symbol_users:
+                    added.append(symbol)
+                self._symbol_users[symbol][user_id] = self._original_price(merged)
+            joins, leaves = self._room_changes_locked(user_id, joined, left)
+        self._fire_removed(orphaned)
+        self._fire_added(added)
+        self._fire_rooms(joins, leaves)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def user_watchlists(self) -> Dict[str, List[Dict]]:
+        """Snapshot of {user_id: [items]} for every connected, loaded user."""
+        with self._lock:
+            return {user_id: list(items.values()) for user_id, items in self._watchlists.items() if items}
+
+    def all_symbols(self) -> Set[str]:
+        with self._lock:
+            return set(self._symbol_users)
+
+    def users_for(self, symbol: str) -> Dict[str, float]:
+        """{user_id: original_price} for a symbol."""
+        with self._lock:
+            return dict(self._symbol_users.get(symbol, {}))
+
+    def watcher_count(self, symbol: str) -> int:
+        with self._lock:
+            return len(self._symbol_users.get(symbol, ()))
+
+    def connected_user_ids(self) -> Set[str]:
+        with self._lock:
+            return {user_id for user_id, sids in self._user_sids.items() if sids}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats_counters,
+                'connections': len(self._sid_user),
+                'users': len(self._watchlists),
+                'symbols': len(self._symbol_users),
+            }
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold self._lock)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _original_price(item: Dict) -> float:
+        try:
+            return float(item.get('original_price') or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _detach_locked(self, sid: str):
+        """Returns (released_user_id or None, orphaned symbols)."""
+        user_id = self._sid_user.pop(sid, None)
+        if not user_id:
+            return None, []
+        sids = self._user_sids.get(user_id)
+        if sids is not None:
+            sids.discard(sid)
+            if sids:
+                return None, []
+            del self._user_sids[user_id]
+        orphaned = self._drop_user_symbols_locked(user_id)
+        self._watchlists.pop(user_id, None)
+        return user_id, orphaned
+
+    def _room_changes_locked(self, user_id: str, joined: Set[str], left: Set[str]):
+        sids = self._user_sids.get(user_id, ())
+        joins = [(sid, sorted(joined)) for sid in sids] if joined else []
+        leaves = [(sid, sorted(left)) for sid in sids] if left else []
+        return joins, leaves
+
+    def _drop_user_symbols_locked(self, user_id: str) -> List[str]:
+        orphaned = []
+        for symbol in list(self._watchlists.get(user_id, {})):
+            if self._remove_subscriber_locked(symbol, user_id):
+                orphaned.append(symbol)
+        return orphaned
+
+    def _remove_subscriber_locked(self, symbol: str, user_id: str) -> bool:
+        users = self._symbol_users.get(symbol)
+        if users is None:
+            return False
+        users.pop(user_id, None)
+        if users:
+            return False
+        del self._symbol_users[symbol]
+        return True
+
+    def _fire_added(self, symbols: List[str]) -> None:
+        if symbols and self._on_symbols_added:
+            try:
+                self._on_symbols_added(symbols)
+            except Exception as e:
+                logger.warning("[SUBSCRIPTIONS] on_symbols_added hook failed: %s", e)
+
+    def _fire_rooms(self, joins, leaves) -> None:
+        for hook, changes in ((self._on_join_rooms, joins), (self._on_leave_rooms, leaves)):
+            if not hook:
+                continue
+            for sid, symbols in changes:
+                try:
+                    hook(sid, symbols)
+                except Exception as e:
+                    logger.warning("[SUBSCRIPTIONS] Room hook failed for %s: %s", sid, e)
+
+    def _fire_released(self, user_id: Optional[str]) -> None:
+        if user_id and self._on_user_released:
+            try:
+                self._on_user_released(user_id)
+            except Exception as e:
+                logger.warning("[SUBSCRIPTIONS] on_user_released hook failed for %s: %s", user_id, e)
+
+    def _fire_removed(self, symbols: List[str]) -> None:
+        if not self._on_symbol_removed:
+            return
+        for symbol in symbols:
+            try:
+                self._on_symbol_removed(symbol)
+            except Exception as e:
+                logger.warning("[SUBSCRIPTIONS] on_symbol_removed hook failed for %s: %s", symbol, e)
@@ -0,0 +1,338 @@
+"""
+Candidate index for StockSymbolIndexService.search.
+
+Built once per entry list (on every `_set_entries`) and swapped in whole, so
+readers never see a half-built index. A query only scores the entries the
+index proposes instead of the full SEC list:
+
+    symbol prefix   sorted normalised symbols; a prefix is one searchsorted
+                    range (a flattened trie)
+    token prefix    sorted (name token, entry) pairs; same lookup
+    n-gram          postings of every 1-3 character gram of "symbol|name";
+                    an entry containing a query as a substring holds all of
+                    its grams
+    typos           a TypoMatcher over every name token and symbol; entries
+                    whose words are within a bounded Damerau-Levenshtein
+                    distance of every (4+ character) query token are the
+                    fuzzy-match candidates
+
+Every structure is a flat NumPy array (postings in CSR form: sorted gram
+keys, offsets, ids) so the index is saved next to its SymbolTable and
+memory-mapped back on cold start.
+
+Exact-match scoring (prefix / substring / multi-token) keeps full recall:
+for short queries the broad substring postings are only scored when the
+narrower candidates cannot fill the result list on their own. Typo-only
+candidates are capped at the TYPO_MAX_CANDIDATES closest.
+
+Typeahead queries (one growing token per keystroke) skip fuzzy candidates.
+The top K for every 1-3 character prefix is computed once per index, and a
+longer prefix only re-checks the entries that matched the prefix one
+keystroke shorter: an entry containing "APPL" must contain "APP".
+"""
+
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.symbol_table import SymbolTable
+from app.services.typo_matcher import TypoMatcher, typo_budget
+
+GRAM_SIZE = 3
+TYPO_MAX_CANDIDATES = 500
+# Score of an entry whose only match is a short query token inside its name
+# (mirrors the weights in StockSymbolIndexService._score_entry)
+NAME_SUBSTRING_SCORE = 360
+QUERY_TOKEN_SCORE = 130
+
+# Typeahead: prefixes up to this length are answered from a per-index top K
+TYPEAHEAD_PREFIX_MAX = 3
+TYPEAHEAD_TOP_K = 50
+# Matching-entry sets kept for prefixes longer than TYPEAHEAD_PREFIX_MAX
+TYPEAHEAD_NARROWED_SETS = 512
+
+# Score callback: (normalised symbol, normalised name, normalised query,
+# summed typo distance of the query tokens or None) -> score
+ScoreFn = Callable[[str, str, str, Optional[int]], int]
+
+_EMPTY = np.empty(0, dtype=np.int32)
+_ARRAYS = ('symbol_keys', 'symbol_ids', 'token_keys', 'token_ids',
+           'gram_keys', 'gram_offsets', 'gram_ids',
+           'symbol_gram_keys', 'symbol_gram_offsets', 'symbol_gram_ids')
+
+
+def _grams(text: str, max_n: int = GRAM_SIZE) -> set:
+    return {text[i:i + n] for n in range(1, max_n + 1) for i in range(len(text) - n + 1)}
+
+
+def _sorted_keys(pairs) -> Tuple[np.ndarray, np.ndarray]:
+    pairs = sorted(pairs)
+    keys = np.array([key.encode("ascii") for key, _ in pairs], dtype=bytes) if pairs else np.empty(0, dtype="S1")
+    return keys, np.fromiter((i for _, i in pairs), dtype=np.int32, count=len(pairs))
+
+
+def _csr(postings: Dict[str, List[int]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    grams = sorted(postings)
+    keys = np.array([gram.encode("ascii") for gram in grams], dtype=bytes) if grams else np.empty(0, dtype="S1")
+    offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum([len(postings[gram]) for gram in grams], out=offsets[1:])
+    ids = np.fromiter((i for gram in grams for i in postings[gram]), dtype=np.int32, count=int(offsets[-1]))
+    return keys, offsets, ids
+
+
+def _prefix_range(keys: np.ndarray, prefix: str) -> Tuple[int, int]:
+    prefix = prefix.encode("ascii")
+    # '\x7f' sorts after every normalised character (A-Z, 0-9, space)
+    return int(np.searchsorted(keys, prefix)), int(np.searchsorted(keys, prefix + b"\x7f"))
+
+
+def _exact_range(keys: np.ndarray, key: str) -> Tuple[int, int]:
+    key = key.encode("ascii")
+    return int(np.searchsorted(keys, key, side="left")), int(np.searchsorted(keys, key, side="right"))
+
+
+def _lookup(keys: np.ndarray, offsets: np.ndarray, ids: np.ndarray, gram: str) -> np.ndarray:
+    gram = gram.encode("ascii")
+    i = int(np.searchsorted(keys, gram))
+    if i < len(keys) and keys[i] == gram:
+        return ids[offsets[i]:offsets[i + 1]]
+    return _EMPTY
+
+
+class SymbolSearchIndex:
+    """Immutable candidate index over a SymbolTable."""
+
+    def __init__(self, table: SymbolTable, aliases: Optional[Dict[str, str]] = None,
+                 arrays: Optional[Dict[str, np.ndarray]] = None):
+        self.table = table
+        self.aliases = aliases or {}
+        arrays = arrays if arrays is not None else self._build(table)
+        for name in _ARRAYS:
+            setattr(self, f"_{name}", arrays[name])
+        if "typo_words" in arrays:
+            self.typos = TypoMatcher(arrays=arrays)
+        else:
+            # Cache files written before the typo dictionary existed
+            vocabulary = np.unique(np.concatenate([self._token_keys, self._symbol_keys]))
+            self.typos = TypoMatcher(word.decode("ascii") for word in vocabulary)
+
+        self._prefix_top: Dict[str, List[Tuple[int, int]]] = {}
+        self._narrowed: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._narrowed_lock = threading.Lock()
+        self.typeahead_counters = {'prefix_top': 0, 'narrowed': 0, 'from_postings': 0}
+
+    @staticmethod
+    def _build(table: SymbolTable) -> Dict[str, np.ndarray]:
+        symbol_pairs, token_pairs = [], set()
+        postings, symbol_postings = defaultdict(list), defaultdict(list)
+        for i in range(len(table)):
+            symbol, name = table.normalized(i)
+            symbol_pairs.append((symbol, i))
+            token_pairs.update((token, i) for token in name.split())
+            for gram in _grams(f"{symbol}|{name}"):
+                postings[gram].append(i)
+            for gram in _grams(symbol, 2):
+                symbol_postings[gram].append(i)
+
+        arrays = {}
+        arrays['symbol_keys'], arrays['symbol_ids'] = _sorted_keys(symbol_pairs)
+        arrays['token_keys'], arrays['token_ids'] = _sorted_keys(token_pairs)
+        arrays['gram_keys'], arrays['gram_offsets'], arrays['gram_ids'] = _csr(postings)
+        arrays['symbol_gram_keys'], arrays['symbol_gram_offsets'], arrays['symbol_gram_ids'] = _csr(symbol_postings)
+        vocabulary = {token for token, _ in token_pairs} | {symbol for symbol, _ in symbol_pairs}
+        arrays.update(TypoMatcher(vocabulary).to_arrays())
+        return arrays
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {**{name: getattr(self, f"_{name}") for name in _ARRAYS}, **self.typos.to_arrays()}
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def search(self, query_norm: str, limit: int, score: ScoreFn) -> List[Tuple[int, int]]:
+        """Top `limit` (score, row id) pairs for a normalised query, best first."""
+        typos = self.typo_matches(query_norm)
+        primary, secondary, bound = self.candidates(query_norm, typos)
+        scored = self._score(primary, query_norm, score, typos)
+        if secondary is not None and sum(1 for s, _ in scored if s > bound) < limit:
+            # Entries only reachable through broad substring postings can still make the list
+            extra = np.setdiff1d(secondary, primary, assume_unique=True)
+            scored.extend(self._score(extra, query_norm, score, typos))
+        # Rows are sorted by symbol, so the row id is the tie-break
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return scored[:limit]
+
+    def candidates(self, query_norm: str, typos: Optional[Dict[int, int]] = None
+                   ) -> Tuple[np.ndarray, Optional[np.ndarray], int]:
+        """(primary ids, secondary ids or None, best score any secondary-only entry can reach)."""
+        typos = self.typo_matches(query_norm) if typos is None else typos
+        parts = [self._alias_ids(query_norm), self._typo_ids(typos)]
+        secondary = None
+        bound = 0
+        tokens = query_norm.split()
+
+        if len(tokens) > 1:
+            parts.append(self._substring_ids(query_norm))
+            short = [token for token in tokens if len(token) < GRAM_SIZE]
+            parts.extend(self._substring_ids(token) for token in tokens if len(token) >= GRAM_SIZE)
+            if short:
+                secondary = np.unique(np.concatenate([self._substring_ids(token) for token in short]))
+                bound = QUERY_TOKEN_SCORE * len(short)
+        elif len(query_norm) >= GRAM_SIZE:
+            parts.append(self._substring_ids(query_norm))
+        else:
+            parts.append(self._symbol_ids[slice(*_prefix_range(self._symbol_keys, query_norm))])
+            parts.append(self._token_ids[slice(*_prefix_range(self._token_keys, query_norm))])
+            parts.append(_lookup(self._symbol_gram_keys, self._symbol_gram_offsets, self._symbol_gram_ids, query_norm))
+            secondary = self._postings(query_norm)
+            bound = NAME_SUBSTRING_SCORE
+
+        primary = np.unique(np.concatenate(parts)) if parts else _EMPTY
+        return primary, secondary, bound
+
+    def typeahead(self, query_norm: str, limit: int, score: ScoreFn) -> List[Tuple[int, int]]:
+        """Top `limit` (score, row id) pairs for a prefix being typed; no fuzzy-only matches."""
+        if " " in query_norm:
+            return self.search(query_norm, limit, score)
+        if len(query_norm) <= TYPEAHEAD_PREFIX_MAX:
+            self.typeahead_counters['prefix_top'] += 1
+            top = self._prefix_top.get(query_norm)
+            if top is None:
+                top = self._rank(self._matching_ids(query_norm), query_norm, TYPEAHEAD_TOP_K, score)
+                self._prefix_top[query_norm] = top
+            return top[:limit]
+        return self._rank(self._matching_ids(query_norm), query_norm, limit, score)
+
+    def warm_typeahead(self, score: ScoreFn) -> int:
+        """Precompute the top K for every 1-3 character symbol / name-token prefix."""
+        prefixes = set()
+        for i in range(len(self.table)):
+            symbol, name = self.table.normalized(i)
+            for word in (symbol, *name.split()):
+                prefixes.update(word[:n] for n in range(1, min(len(word), TYPEAHEAD_PREFIX_MAX) + 1))
+        for prefix in sorted(prefixes, key=len):
+            if prefix not in self._prefix_top:
+                self._prefix_top[prefix] = self._rank(self._matching_ids(prefix), prefix, TYPEAHEAD_TOP_K, score)
+        return len(prefixes)
+
+    def typo_matches(self, query_norm: str) -> Dict[int, int]:
+        """Entry id -> summed typo distance, for entries with a word close to every 4+ character query token."""
+        tokens = [token for token in dict.fromkeys(query_norm.split()) if typo_budget(token)]
+        ids = distances = None
+        for token in tokens:
+            token_ids, token_distances = [], []
+            for word, distance in self.typos.lookup(token):
+                for keys, key_ids in ((self._token_keys, self._token_ids), (self._symbol_keys, self._symbol_ids)):
+                    lo, hi = _exact_range(keys, word)
+                    token_ids.append(key_ids[lo:hi])
+                    token_distances.append(np.full(hi - lo, distance, dtype=np.int32))
+            if not token_ids:
+                return {}
+            # Closest word per entry for this token
+            found, found_distances = np.concatenate(token_ids), np.concatenate(token_distances)
+            order = np.lexsort((found_distances, found))
+            found, found_distances = found[order], found_distances[order]
+            first = np.ones(len(found), dtype=bool)
+            first[1:] = found[1:] != found[:-1]
+            found, found_distances = found[first], found_distances[first]
+
+            if ids is None:
+                ids, distances = found, found_distances
+            else:
+                ids, left, right = np.intersect1d(ids, found, assume_unique=True, return_indices=True)
+                distances = distances[left] + found_distances[right]
+            if not len(ids):
+                return {}
+        return dict(zip(ids.tolist(), distances.tolist())) if ids is not None else {}
+
+    def typeahead_stats(self) -> Dict:
+        return {**self.typeahead_counters, 'prefixes': len(self._prefix_top), 'narrowed_sets': len(self._narrowed)}
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _score(self, ids: np.ndarray, query_norm: str, score: ScoreFn,
+               typos: Optional[Dict[int, int]] = None) -> List[Tuple[int, int]]:
+        table = self.table
+        hay = table.haystack
+        starts = table.hay_offsets[ids].tolist()
+        ends = table.hay_offsets[ids + 1].tolist()
+        cuts = table.symbol_len[ids].tolist()
+        typos = typos or {}
+        scored = []
+        for i, start, end, cut in zip(ids.tolist(), starts, ends, cuts):
+            value = score(hay[start:start + cut], hay[start + cut + 1:end], query_norm, typos.get(i))
+            if value > 0:
+                scored.append((value, i))
+        return scored
+
+    def _rank(self, ids: np.ndarray, query_norm: str, limit: int, score: ScoreFn) -> List[Tuple[int, int]]:
+        ids = np.union1d(ids, self._alias_ids(query_norm))
+        scored = self._score(ids, query_norm, score)
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return scored[:limit]
+
+    def _postings(self, gram: str) -> np.ndarray:
+        return _lookup(self._gram_keys, self._gram_offsets, self._gram_ids, gram)
+
+    def _matching_ids(self, query_norm: str) -> np.ndarray:
+        """Entries whose "symbol|name" contains a single-token query, narrowed from a shorter prefix."""
+        if len(query_norm) <= GRAM_SIZE:
+            return self._postings(query_norm)
+
+        parent = None
+        with self._narrowed_lock:
+            for end in range(len(query_norm) - 1, GRAM_SIZE, -1):
+                parent = self._narrowed.get(query_norm[:end])
+                if parent is not None:
+                    self._narrowed.move_to_end(query_norm[:end])
+                    break
+        if parent is None:
+            self.typeahead_counters['from_postings'] += 1
+            parent = self._postings(query_norm[:GRAM_SIZE])
+        else:
+            self.typeahead_counters['narrowed'] += 1
+
+        hay, offsets = self.table.haystack, self.table.hay_offsets
+        ids = np.fromiter(
+            (i for i, start, end in zip(parent.tolist(), offsets[parent].tolist(), offsets[parent + 1].tolist())
+             if query_norm in hay[start:end]),
+            dtype=np.int32,
+        )
+        with self._narrowed_lock:
+            self._narrowed[query_norm] = ids
+            self._narrowed.move_to_end(query_norm)
+            while len(self._narrowed) > TYPEAHEAD_NARROWED_SETS:
+                self._narrowed.popitem(last=False)
+        return ids
+
+    def _alias_ids(self, query_norm: str) -> np.ndarray:
+        target = self.aliases.get(query_norm)
+        if not target:
+            return _EMPTY
+        lo, hi = _prefix_range(self._symbol_keys, target)
+        exact = [int(i) for key, i in zip(self._symbol_keys[lo:hi], self._symbol_ids[lo:hi])
+                 if key == target.encode("ascii")]
+        return np.asarray(exact, dtype=np.int32)
+
+    def _typo_ids(self, typos: Dict[int, int]) -> np.ndarray:
+        """Entries matched only through a typo (distance >= 1), closest first up to the cap."""
+        ids = np.fromiter((i for i, distance in typos.items() if distance), dtype=np.int32)
+        if len(ids) > TYPO_MAX_CANDIDATES:
+            distances = np.fromiter((typos[i] for i in ids.tolist()), dtype=np.int32, count=len(ids))
+            ids = ids[np.lexsort((ids, distances))[:TYPO_MAX_CANDIDATES]]
+        return ids
+
+    def _substring_ids(self, text: str) -> np.ndarray:
+        """Superset of the entries whose "symbol|name" contains text."""
+        if len(text) <= GRAM_SIZE:
+            return self._postings(text)
+        grams = {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+        lists = [self._postings(gram) for gram in grams]
+        if not all(len(ids) for ids in lists):
+            return _EMPTY
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.table))
+        return np.flatnonzero(counts == len(grams)).astype(np.int32)
@@ -0,0 +1,197 @@
+"""
+Columnar storage for the stock symbol index.
+
+The ~10k SEC entries used to be one dict (plus a token list) each. A
+SymbolTable keeps them in a handful of arrays instead:
+
+    records     NumPy structured array: symbol (ASCII bytes), exchange and
+                type as codes into small interned string lists
+    names       UTF-8 display names in one buffer, sliced by name_offsets
+    haystack    normalised "SYMBOL|NAME" strings in one str, sliced by
+                hay_offsets; symbol_len marks the "|"
+
+Row i is the i-th symbol in sorted order, so row ids double as the
+(symbol, name) tie-break the search ranking uses.
+
+The table and the search index arrays are written to one binary file
+(`save_arrays`) that `load_arrays` memory-maps, so a cold start reads a
+few arrays instead of parsing JSON and rebuilding postings.
+"""
+
+import json
+import mmap
+import os
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"SYMIDX01"
+_ALIGN = 64
+
+
+class SymbolTable:
+    """Immutable, array-backed list of symbol entries sorted by symbol."""
+
+    def __init__(self, records: np.ndarray, exchanges: List[str], types: List[str],
+                 names: bytes, name_offsets: np.ndarray, haystack: str,
+                 hay_offsets: np.ndarray, symbol_len: np.ndarray):
+        self.records = records
+        self.exchanges = exchanges
+        self.types = types
+        self.names = names
+        self.name_offsets = name_offsets
+        self.haystack = haystack
+        self.hay_offsets = hay_offsets
+        self.symbol_len = symbol_len
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict], normalize: Callable[[str], str]) -> "SymbolTable":
+        """rows: deduplicated {symbol, name, exchange, type} dicts sorted by symbol."""
+        exchanges = sorted({row["exchange"] for row in rows})
+        types = sorted({row["type"] for row in rows})
+        exchange_codes = {value: code for code, value in enumerate(exchanges)}
+        type_codes = {value: code for code, value in enumerate(types)}
+
+        width = max((len(row["symbol"]) for row in rows), default=1)
+        records = np.empty(len(rows), dtype=[("symbol", f"S{width}"), ("exchange", "u2"), ("type", "u1")])
+        records["symbol"] = [row["symbol"].encode("ascii") for row in rows]
+        records["exchange"] = [exchange_codes[row["exchange"]] for row in rows]
+        records["type"] = [type_codes[row["type"]] for row in rows]
+
+        encoded = [row["name"].encode("utf-8") for row in rows]
+        symbol_norms = [normalize(row["symbol"]) for row in rows]
+        hays = [f"{symbol_norm}|{normalize(row['name'])}" for symbol_norm, row in zip(symbol_norms, rows)]
+
+        return cls(
+            records,
+            exchanges,
+            types,
+            b"".join(encoded),
+            _offsets(len(name) for name in encoded),
+            "".join(hays),
+            _offsets(len(hay) for hay in hays),
+            np.fromiter((len(s) for s in symbol_norms), dtype=np.uint8, count=len(rows)),
+        )
+
+    @classmethod
+    def empty(cls) -> "SymbolTable":
+        return cls.from_rows([], str)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def find(self, symbol: str) -> Optional[int]:
+        """Row id of an exact (upper-case) symbol, or None."""
+        try:
+            key = symbol.encode("ascii")
+        except UnicodeEncodeError:
+            return None
+        i = int(np.searchsorted(self.records["symbol"], key))
+        if i < len(self.records) and self.records["symbol"][i] == key:
+            return i
+        return None
+
+    def normalized(self, i: int) -> Tuple[str, str]:
+        """(normalised symbol, normalised name) of row i."""
+        start, end = int(self.hay_offsets[i]), int(self.hay_offsets[i + 1])
+        cut = start + int(self.symbol_len[i])
+        return self.haystack[start:cut], self.haystack[cut + 1:end]
+
+    def public(self, i: int) -> Dict:
+        record = self.records[i]
+        return {
+            "symbol": record["symbol"].decode("ascii"),
+            "name": self.names[self.name_offsets[i]:self.name_offsets[i + 1]].decode("utf-8"),
+            "exchange": self.exchanges[record["exchange"]],
+            "type": self.types[record["type"]],
+        }
+
+    def fingerprint(self) -> str:
+        """Content hash, identical across processes holding the same entries."""
+        crc = zlib.crc32(self.records["symbol"].tobytes())
+        return f"{len(self)}-{zlib.crc32(self.names, crc):08x}"
+
+    def to_arrays(self) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        meta = {"exchanges": self.exchanges, "types": self.types}
+        return meta, {
+            "records": self.records,
+            "names": np.frombuffer(self.names, dtype=np.uint8),
+            "name_offsets": self.name_offsets,
+            "haystack": np.frombuffer(self.haystack.encode("ascii"), dtype=np.uint8),
+            "hay_offsets": self.hay_offsets,
+            "symbol_len": self.symbol_len,
+        }
+
+    @classmethod
+    def from_arrays(cls, meta: Dict, arrays: Dict[str, np.ndarray]) -> "SymbolTable":
+        return cls(
+            arrays["records"],
+            meta["exchanges"],
+            meta["types"],
+            arrays["names"].tobytes(),
+            arrays["name_offsets"],
+            arrays["haystack"].tobytes().decode("ascii"),
+            arrays["hay_offsets"],
+            arrays["symbol_len"],
+        )
+
+
+def _offsets(lengths) -> np.ndarray:
+    lengths = np.fromiter(lengths, dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def save_arrays(path: Path, meta: Dict, arrays: Dict[str, np.ndarray]) -> None:
+    """Write arrays to one file: magic, header length, JSON header, 64-byte aligned blobs.
+
+    Written to a temp file and renamed, so readers holding a map of the
+    previous file keep a consistent view.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": np.lib.format.dtype_to_descr(array.dtype), "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+
+    header = json.dumps({"meta": meta, "arrays": layout}).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+
+
+def load_arrays(path: Path) -> Optional[Tuple[Dict, Dict[str, np.ndarray]]]:
+    """(meta, arrays) memory-mapped from a file written by save_arrays; None for any other file."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        header_len = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_len))
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    data_start = -(-(len(MAGIC) + 8 + header_len) // _ALIGN) * _ALIGN
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.lib.format.descr_to_dtype(_descr(spec["dtype"]))
+        if not np.prod(spec["shape"]):
+            arrays[name] = np.empty(tuple(spec["shape"]), dtype=dtype)
+            continue
+        arrays[name] = np.ndarray(tuple(spec["shape"]), dtype=dtype, buffer=buffer,
+                                  offset=data_start + spec["offset"])
+    return header["meta"], arrays
+
+
+def _descr(descr):
+    # JSON turns the (name, format) pairs of a structured dtype into lists
+    return [tuple(field) for field in descr] if isinstance(descr, list) else descr
@@ -0,0 +1,214 @@
+"""
+Tick ingestion pipeline for the Finnhub trade feed.
+
+The websocket reader thread only parses messages and writes the newest price
+per symbol into a lock-striped ConflationMap. A TickDispatcher thread drains
+the map at a fixed cadence and emits one update per changed symbol, so a
+burst of trades never blocks the socket reader and intermediate prices for
+the same symbol are conflated away.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_INTERVAL_SECONDS = float(os.getenv('FINNHUB_DISPATCH_INTERVAL_MS', '100')) / 1000.0
+DEFAULT_STRIPES = 16
+
+# (price, ingest time of the oldest not-yet-emitted tick for the symbol)
+PendingTick = Tuple[float, float]
+
+
+class _Stripe:
+    __slots__ = ('lock', 'pending', 'latest', 'ticks_in', 'ticks_conflated')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: Dict[str, PendingTick] = {}
+        self.latest: Dict[str, float] = {}
+        # Counted under the stripe's lock; ConflationMap sums them
+        self.ticks_in = 0
+        self.ticks_conflated = 0
+
+
+class ConflationMap:
+    """Latest tick per symbol, sharded across independently locked stripes."""
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self._stripes = [_Stripe() for _ in range(max(1, stripes))]
+
+    @property
+    def ticks_in(self) -> int:
+        return sum(stripe.ticks_in for stripe in self._stripes)
+
+    @property
+    def ticks_conflated(self) -> int:
+        return sum(stripe.ticks_conflated for stripe in self._stripes)
+
+    def _stripe(self, symbol: str) -> _Stripe:
+        return self._stripes[hash(symbol) % len(self._stripes)]
+
+    def put(self, symbol: str, price: float, ingested_at: Optional[float] = None) -> None:
+        ingested_at = time.perf_counter() if ingested_at is None else ingested_at
+        stripe = self._stripe(symbol)
+        with stripe.lock:
+            stripe.latest[symbol] = price
+            pending = stripe.pending.get(symbol)
+            if pending is None:
+                stripe.pending[symbol] = (price, ingested_at)
+            else:
+                # Keep the oldest ingest time so latency covers the whole wait
+                stripe.pending[symbol] = (price, pending[1])
+                stripe.ticks_conflated += 1
+            stripe.ticks_in += 1
+
+    def requeue(self, symbol: str, tick: PendingTick) -> None:
+        """Put back a drained tick that was not emitted, unless a newer one has arrived."""
+        stripe = self._stripe(symbol)
+        with stripe.lock:
+            pending = stripe.pending.get(symbol)
+            stripe.pending[symbol] = tick if pending is None else (pending[0], tick[1])
+
+    def drain(self) -> Dict[str, PendingTick]:
+        """Take every pending tick, leaving the map empty."""
+        drained = {}
+        for stripe in self._stripes:
+            with stripe.lock:
+                if stripe.pending:
+                    pending, stripe.pending = stripe.pending, {}
+                else:
+                    continue
+            drained.update(pending)
+        return drained
+
+    def forget(self, symbol: str) -> None:
+        """Drop a symbol's latest and pending tick (it lost its last watcher)."""
+        stripe = self._stripe(symbol)
+        with stripe.lock:
+            stripe.latest.pop(symbol, None)
+            stripe.pending.pop(symbol, None)
+
+    def latest(self, symbol: str) -> Optional[float]:
+        stripe = self._stripe(symbol)
+        with stripe.lock:
+            return stripe.latest.get(symbol)
+
+    def pending_count(self) -> int:
+        total = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                total += len(stripe.pending)
+        return total
+
+    def __len__(self) -> int:
+        total = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                total += len(stripe.latest)
+        return total
+
+
+class TickDispatcher:
+    """
+    Drains a ConflationMap every `interval` seconds and calls emit(symbol, price).
+
+    Symbols emitted less than `min_emit_interval` ago stay pending until they
+    are due, so the final price of a burst is always delivered. Emit times
+    older than that no longer matter and are pruned each cycle.
+    """
+
+    def __init__(self, ticks: ConflationMap, emit: Callable[[str, float], None],
+                 interval: float = DISPATCH_INTERVAL_SECONDS, min_emit_interval: float = 0.0,
+                 latency_samples: int = 10000):
+        self.ticks = ticks
+        self.emit = emit
+        self.interval = interval
+        self.min_emit_interval = min_emit_interval
+        self._last_emit: Dict[str, float] = {}
+        self._latencies = deque(maxlen=latency_samples)
+        self._stop = threading.Event()
+        self._thread = None
+        self.emitted = 0
+        self.emit_errors = 0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="FinnhubDispatchThread")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.dispatch_once()
+            except Exception as e:
+                logger.error("[Finnhub] Dispatch cycle failed: %s", e)
+
+    def dispatch_once(self) -> int:
+        """Emit every due pending tick. Returns the number emitted."""
+        drained = self.ticks.drain()
+        if not drained:
+            return 0
+
+        now = time.perf_counter()
+        count = 0
+        for symbol, tick in drained.items():
+            if self.min_emit_interval and now - self._last_emit.get(symbol, 0.0) < self.min_emit_interval:
+                self.ticks.requeue(symbol, tick)
+                continue
+            price, ingested_at = tick
+            try:
+                self.emit(symbol, price)
+            except Exception as e:
+                self.emit_errors += 1
+                logger.debug("[Finnhub] Emit failed for %s: %s", symbol, e)
+            if self.min_emit_interval:
+                self._last_emit[symbol] = now
+            self._latencies.append(time.perf_counter() - ingested_at)
+            count += 1
+        self.emitted += count
+        if len(self._last_emit) > len(drained):
+            self._prune_last_emit(now)
+        return count
+
+    def forget(self, symbol: str) -> None:
+        """Drop per-symbol state for a symbol that lost its last watcher."""
+        self._last_emit.pop(symbol, None)
+
+    def _prune_last_emit(self, now: float) -> None:
+        for symbol, emitted_at in list(self._last_emit.items()):
+            if now - emitted_at >= self.min_emit_interval:
+                self._last_emit.pop(symbol, None)
+
+    def latency_percentiles(self) -> Dict[str, float]:
+        """Ingest-to-emit latency in milliseconds over the recent sample window."""
+        samples = sorted(self._latencies)
+        if not samples:
+            return {'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0, 'samples': 0}
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+        return {'p50_ms': pct(0.50), 'p99_ms': pct(0.99), 'max_ms': round(samples[-1] * 1000, 3),
+                'samples': len(samples)}
+
+    def stats(self) -> Dict:
+        return {
+            'ticks_in': self.ticks.ticks_in,
+            'ticks_conflated': self.ticks.ticks_conflated,
+            'emitted': self.emitted,
+            'emit_errors': self.emit_errors,
+            'pending': self.ticks.pending_count(),
+            'latency': self.latency_percentiles(),
+        }
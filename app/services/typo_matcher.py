@@ -0,0 +1,119 @@
+"""
+Typo-tolerant word lookup: a SymSpell-style deletion dictionary verified
+with a bounded Damerau-Levenshtein (optimal string alignment) distance.
+
+Every vocabulary word is indexed under each string reachable by deleting
+up to `max_distance` characters from its first `prefix_length` characters.
+Two words within edit distance d share such a delete, so a lookup only
+generates the deletes of the query term, reads the words filed under them
+and verifies those few candidates, instead of comparing against every word.
+
+Deletes are keyed by CRC32 in sorted NumPy arrays (collisions only add
+candidates, which verification drops), so the dictionary is a few flat
+arrays that can be saved with the symbol index and memory-mapped back.
+
+Words and terms are expected to be normalised already (upper-case ASCII).
+"""
+
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+
+def typo_budget(term: str) -> int:
+    """Edits tolerated for a term: none below 4 characters, 1 up to 7, then 2."""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+def damerau_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance, or max_distance + 1 once it is exceeded."""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+
+    return min(previous[-1], max_distance + 1)
+
+
+def _deletes(word: str, max_distance: int) -> set:
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+def _key(text: str) -> int:
+    return zlib.crc32(text.encode("ascii"))
+
+
+class TypoMatcher:
+    """Immutable deletion dictionary over a vocabulary of normalised words."""
+
+    def __init__(self, words: Iterable[str] = (), max_distance: int = MAX_DISTANCE,
+                 prefix_length: int = PREFIX_LENGTH, arrays: Optional[Dict[str, np.ndarray]] = None):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        arrays = arrays if arrays is not None else self._build(sorted(set(words)))
+        self.words = arrays["typo_words"]
+        self._delete_keys = arrays["typo_delete_keys"]
+        self._delete_words = arrays["typo_delete_words"]
+
+    def _build(self, words: List[str]) -> Dict[str, np.ndarray]:
+        pairs = sorted(
+            (_key(delete), i)
+            for i, word in enumerate(words)
+            for delete in _deletes(word[:self.prefix_length], self.max_distance)
+        )
+        return {
+            "typo_words": np.array([w.encode("ascii") for w in words], dtype=bytes) if words else np.empty(0, dtype="S1"),
+            "typo_delete_keys": np.fromiter((key for key, _ in pairs), dtype=np.uint32, count=len(pairs)),
+            "typo_delete_words": np.fromiter((i for _, i in pairs), dtype=np.int32, count=len(pairs)),
+        }
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"typo_words": self.words, "typo_delete_keys": self._delete_keys,
+                "typo_delete_words": self._delete_words}
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Vocabulary words within max_distance (default: typo_budget) of term, closest first."""
+        max_distance = typo_budget(term) if max_distance is None else min(max_distance, self.max_distance)
+        keys = np.fromiter((_key(d) for d in _deletes(term[:self.prefix_length], max_distance)), dtype=np.uint32)
+        lo = np.searchsorted(self._delete_keys, keys, side="left")
+        hi = np.searchsorted(self._delete_keys, keys, side="right")
+        candidates = {int(i) for start, end in zip(lo.tolist(), hi.tolist()) for i in self._delete_words[start:end]}
+
+        matches = []
+        for i in candidates:
+            word = self.words[i].decode("ascii")
+            distance = damerau_levenshtein(term, word, max_distance)
+            if distance <= max_distance:
+                matches.append((word, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
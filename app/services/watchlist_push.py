@@ -0,0 +1,97 @@
+"""
+Delta tracking for `watchlist_updated` socket pushes.
+
+The server remembers the last entry it sent for every symbol in every
+`watchlist_{user_id}` room and only re-sends a symbol when its price moved
+by more than PUSH_PRICE_EPSILON. Full snapshots go out only when a socket
+joins or asks to resync.
+
+Entries use a compact schema the dashboard already understands:
+    {'symbol', 'price', 'price_change', 'price_change_percent'}
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PUSH_PRICE_EPSILON = float(os.getenv('PUSH_PRICE_EPSILON', '0.005'))
+
+
+def compact_price_entry(symbol: str, price: float, original_price: Optional[float] = None) -> Dict:
+    """Build the compact per-symbol push entry, with change vs the price when it was added."""
+    price_change = price_change_percent = 0.0
+    if original_price and original_price > 0 and price > 0:
+        price_change = price - original_price
+        price_change_percent = (price_change / original_price) * 100
+    return {
+        'symbol': symbol,
+        'price': round(price, 4),
+        'price_change': round(price_change, 4),
+        'price_change_percent': round(price_change_percent, 4),
+    }
+
+
+class WatchlistPushTracker:
+    """Remembers the last payload sent per room and filters out unchanged symbols."""
+
+    def __init__(self, epsilon: float = None):
+        self.epsilon = PUSH_PRICE_EPSILON if epsilon is None else epsilon
+        self._last: Dict[str, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+        self.stats_counters = {'entries_sent': 0, 'entries_suppressed': 0, 'snapshots': 0}
+
+    def diff(self, room: str, entries: Iterable[Dict]) -> List[Dict]:
+        """Return the entries that changed since the last push to room, and record them as sent."""
+        changed = []
+        with self._lock:
+            sent = self._last.setdefault(room, {})
+            for entry in entries:
+                previous = sent.get(entry['symbol'])
+                if previous is not None and abs(previous['price'] - entry['price']) <= self.epsilon:
+                    self.stats_counters['entries_suppressed'] += 1
+                    continue
+                sent[entry['symbol']] = entry
+                changed.append(entry)
+            self.stats_counters['entries_sent'] += len(changed)
+        return changed
+
+    def record(self, room: str, entry: Dict) -> None:
+        """Record an entry delivered to room by another channel (e.g. a per-symbol tick)."""
+        with self._lock:
+            self._last.setdefault(room, {})[entry['symbol']] = entry
+
+    def snapshot(self, room: str) -> List[Dict]:
+        """Everything last sent to room, for a joining or resyncing socket."""
+        with self._lock:
+            entries = list(self._last.get(room, {}).values())
+            if entries:
+                self.stats_counters['snapshots'] += 1
+            return entries
+
+    def retain(self, room: str, symbols: Iterable[str]) -> None:
+        """Drop remembered entries for symbols no longer in the room's watchlist."""
+        keep = set(symbols)
+        with self._lock:
+            sent = self._last.get(room)
+            if sent:
+                for symbol in [s for s in sent if s not in keep]:
+                    del sent[symbol]
+
+    def retain_rooms(self, rooms: Iterable[str]) -> None:
+        """Forget rooms that no longer have connected subscribers."""
+        keep = set(rooms)
+        with self._lock:
+            for room in [r for r in self._last if r not in keep]:
+                del self._last[room]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.stats_counters['entries_sent'] + self.stats_counters['entries_suppressed']
+            return {
+                **self.stats_counters,
+                'rooms': len(self._last),
+                'suppressed_ratio': round(self.stats_counters['entries_suppressed'] / total, 3) if total else 0.0,
+            }
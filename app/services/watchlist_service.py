@@ -8,12 +8,94 @@ from firebase_admin import firestore
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 import uuid
+import os
+import time
 import logging
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import threading
 
 logger = logging.getLogger(__name__)
 
+# Callbacks run after successful watchlist writes: fn(user_id, event, symbol, item)
+# with event one of 'added', 'updated', 'removed', 'cleared', or 'snapshot' when a
+# realtime listener delivers the full watchlist (item is then the list of items).
+_change_listeners = []
+
+
+def register_change_listener(callback):
+    """Subscribe to watchlist writes (used to keep in-memory subscriber indexes current)."""
+    if callback not in _change_listeners:
+        _change_listeners.append(callback)
+
+
+def _notify_change(user_id: str, event: str, symbol: Optional[str] = None, item: Optional[Dict[str, Any]] = None):
+    for callback in list(_change_listeners):
+        try:
+            callback(user_id, event, symbol, item)
+        except Exception as e:
+            logger.warning("Watchlist change listener failed for %s/%s: %s", user_id, event, e)
+
+
+def _doc_to_item(doc) -> Dict[str, Any]:
+    item_data = doc.to_dict() or {}
+    item_data['id'] = doc.id
+    # Ensure symbol field exists (use id as fallback)
+    if 'symbol' not in item_data and doc.id:
+        item_data['symbol'] = doc.id
+    return item_data
+
+
+def _sort_watchlist(watchlist: List[Dict[str, Any]]) -> None:
+    """Sort by priority and added date, in place"""
+    priority_order = {'high': 0, 'medium': 1, 'low': 2}
+    watchlist.sort(key=lambda x: (priority_order.get(x.get('priority', 'medium'), 1), x.get('added_at', datetime.max)))
+
+
+class _LiveWatchlist:
+    """Materialised copy of one user's watchlist, kept current by a Firestore snapshot listener.
+
+    This process's own writes are applied to `items` straight away and kept in
+    `pending` until a snapshot reflects them (or they expire), so a read right
+    after a write sees it and a snapshot taken before the write cannot undo it.
+    """
+
+    def __init__(self):
+        self.watch = None
+        self.items: Dict[str, Dict[str, Any]] = {}
+        # symbol -> (event, fields or None when removed, monotonic time written)
+        self.pending: Dict[str, tuple] = {}
+        self.ready = threading.Event()
+
+    def apply(self, event: str, symbol: str, fields: Optional[Dict[str, Any]]) -> None:
+        previous = self.pending.get(symbol)
+        if fields is not None and previous is not None and previous[1] is not None:
+            # Consecutive writes to one symbol: keep 'added' so its confirmation rule still applies
+            event, fields = (previous[0] if previous[0] == 'added' else event), {**previous[1], **fields}
+        self.pending[symbol] = (event, fields, time.monotonic())
+        self._overlay(symbol, fields, self.items)
+
+    def reconcile(self, items: Dict[str, Dict[str, Any]], hold_seconds: float) -> None:
+        """Drop pending writes the snapshot confirms or that expired; overlay the rest onto items."""
+        now = time.monotonic()
+        present = {key.upper() for key in items}
+        for symbol, (event, fields, written_at) in list(self.pending.items()):
+            confirmed = (fields is None and symbol not in present) or (event == 'added' and symbol in present)
+            if confirmed or now - written_at >= hold_seconds:
+                del self.pending[symbol]
+            else:
+                self._overlay(symbol, fields, items)
+        self.items = items
+
+    @staticmethod
+    def _overlay(symbol: str, fields: Optional[Dict[str, Any]], items: Dict[str, Dict[str, Any]]) -> None:
+        # Legacy documents may have a non-uppercased id
+        key = next((k for k in items if k.upper() == symbol), symbol)
+        if fields is None:
+            items.pop(key, None)
+        else:
+            items[key] = {'id': key, 'symbol': symbol, **items.get(key, {}), **fields}
+
+
 class WatchlistItem:
     """Represents a single stock in a user's watchlist"""
 
@@ -89,9 +171,19 @@ class WatchlistService:
     _executor = None
     _executor_lock = threading.Lock()
 
-    def __init__(self, db_client=None):
+    # How long get_watchlist waits for a freshly attached listener's first snapshot
+    LIVE_READY_TIMEOUT = 2.0
+    # How long a local write overrides snapshots that do not reflect it yet
+    LIVE_WRITE_HOLD_SECONDS = 10.0
+
+    def __init__(self, db_client=None, realtime_listeners: Optional[bool] = None):
         """Initialize with Firestore client"""
         self.db = db_client or firestore.client()
+        if realtime_listeners is None:
+            realtime_listeners = os.getenv('WATCHLIST_REALTIME_LISTENERS', 'true').lower() == 'true'
+        self.realtime_listeners = realtime_listeners
+        self._live: Dict[str, _LiveWatchlist] = {}
+        self._live_lock = threading.Lock()
         self._ensure_indexes()
     
     @classmethod
@@ -194,6 +286,7 @@ class WatchlistService:
             self._update_watchlist_metadata(user_id)
 
             logger.info("Added %s to watchlist", symbol)
+            self._apply_write(user_id, 'added', item.symbol, item.to_dict())
             return {
                 'success': True,
                 'message': f'{company_name} added to watchlist',
@@ -246,6 +339,7 @@ class WatchlistService:
             self._update_watchlist_metadata(user_id)
 
             logger.info("Removed %s from watchlist", normalized_symbol)
+            self._apply_write(user_id, 'removed', normalized_symbol)
             return {
                 'success': True,
                 'message': f'{normalized_symbol} removed from watchlist'
@@ -258,9 +352,110 @@ class WatchlistService:
                 'message': 'Failed to remove stock from watchlist'
             }
 
+    def attach_listener(self, user_id: str) -> bool:
+        """
+        Keep user's watchlist materialised in memory via a Firestore snapshot listener.
+        Called when the user's first socket connects; returns False if listeners are disabled or fail.
+        """
+        if not self.realtime_listeners:
+            return False
+
+        with self._live_lock:
+            if user_id in self._live:
+                return True
+            live = _LiveWatchlist()
+            self._live[user_id] = live
+
+        try:
+            watchlist_ref = self.db.collection('users').document(user_id).collection('watchlist')
+            watch = watchlist_ref.on_snapshot(
+                lambda docs, changes, read_time: self._on_watchlist_snapshot(user_id, live, docs)
+            )
+        except Exception as e:
+            logger.error(f"Error attaching watchlist listener for user {user_id}: {e}")
+            with self._live_lock:
+                if self._live.get(user_id) is live:
+                    del self._live[user_id]
+            return False
+
+        with self._live_lock:
+            attached = self._live.get(user_id) is live
+            if attached:
+                live.watch = watch
+        if not attached:
+            # Detached while the listener was being set up
+            watch.unsubscribe()
+            return False
+
+        logger.info(f"Attached watchlist listener for user {user_id}")
+        return True
+
+    def detach_listener(self, user_id: str) -> None:
+        """Stop the snapshot listener for user's watchlist (their last socket disconnected)"""
+        with self._live_lock:
+            live = self._live.pop(user_id, None)
+        if live is None:
+            return
+        try:
+            if live.watch is not None:
+                live.watch.unsubscribe()
+            logger.info(f"Detached watchlist listener for user {user_id}")
+        except Exception as e:
+            logger.warning(f"Error detaching watchlist listener for user {user_id}: {e}")
+
+    def has_listener(self, user_id: str) -> bool:
+        with self._live_lock:
+            return user_id in self._live
+
+    def _on_watchlist_snapshot(self, user_id: str, live: _LiveWatchlist, docs) -> None:
+        items = {}
+        for doc in docs:
+            try:
+                items[doc.id] = _doc_to_item(doc)
+            except Exception as doc_error:
+                logger.warning(f"Error processing document {doc.id}: {doc_error}")
+
+        with self._live_lock:
+            if self._live.get(user_id) is not live:
+                return
+            live.reconcile(items, self.LIVE_WRITE_HOLD_SECONDS)
+            current = list(items.values())
+        live.ready.set()
+        _notify_change(user_id, 'snapshot', None, current)
+
+    def _apply_write(self, user_id: str, event: str, symbol: Optional[str] = None,
+                     item: Optional[Dict[str, Any]] = None) -> None:
+        """Mirror a successful write into the user's live copy, then notify change listeners."""
+        with self._live_lock:
+            live = self._live.get(user_id)
+            if live is not None:
+                if event == 'cleared':
+                    for key in list(live.items):
+                        live.apply('removed', key.upper(), None)
+                else:
+                    live.apply(event, symbol.upper(), None if event == 'removed' else dict(item or {}))
+        _notify_change(user_id, event, symbol, item)
+
+    def _get_live_watchlist(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        with self._live_lock:
+            live = self._live.get(user_id)
+        if live is None or not live.ready.wait(self.LIVE_READY_TIMEOUT):
+            return None
+        with self._live_lock:
+            return [dict(item) for item in live.items.values()]
+
     def get_watchlist(self, user_id: str, category: Optional[str] = None,
                      priority: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get user's watchlist with optional filtering"""
+        live_items = self._get_live_watchlist(user_id)
+        if live_items is not None:
+            if category:
+                live_items = [item for item in live_items if item.get('category') == category]
+            if priority:
+                live_items = [item for item in live_items if item.get('priority') == priority]
+            _sort_watchlist(live_items)
+            return live_items[:100 if limit is None else limit]
+
         try:
             watchlist_ref = self.db.collection('users').document(user_id).collection('watchlist')
 
@@ -312,15 +507,7 @@ class WatchlistService:
                 # Process documents
                 for doc in docs:
                     try:
-                        item_data = doc.to_dict()
-                        item_data['id'] = doc.id
-                        
-                        # Ensure symbol field exists (use id as fallback)
-                        if 'symbol' not in item_data and doc.id:
-                            item_data['symbol'] = doc.id
-                            logger.warning(f"Stock missing 'symbol' field, using doc.id: {doc.id}")
-                        
-                        watchlist.append(item_data)
+                        watchlist.append(_doc_to_item(doc))
                     except Exception as doc_error:
                         logger.warning(f"Error processing document {doc.id}: {doc_error}")
                         # Skip problematic documents
@@ -333,9 +520,7 @@ class WatchlistService:
                 # Return empty list if query fails
                 return []
 
-            # Sort by priority and added date
-            priority_order = {'high': 0, 'medium': 1, 'low': 2}
-            watchlist.sort(key=lambda x: (priority_order.get(x.get('priority', 'medium'), 1), x.get('added_at', datetime.max)))
+            _sort_watchlist(watchlist)
 
             logger.info(f"Retrieved {len(watchlist)} items from watchlist for user {user_id}")
             # Log first few symbols for debugging
@@ -399,6 +584,7 @@ class WatchlistService:
             doc_ref.update(update_data)
 
             logger.info(f"Updated {symbol} in watchlist for user {user_id}")
+            self._apply_write(user_id, 'updated', symbol, updated_item.to_dict())
             return {
                 'success': True,
                 'message': f'{symbol} updated successfully',
@@ -412,6 +598,26 @@ class WatchlistService:
                 'message': 'Failed to update stock'
             }
 
+    def get_all_symbols(self, timeout: float = 30) -> List[str]:
+        """Distinct symbols across every user's watchlist (collection-group scan, symbol field only)"""
+        try:
+            query = self.db.collection_group('watchlist').select(['symbol'])
+            future = self._get_executor().submit(query.get)
+            docs = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.error("Watchlist symbol scan timed out after %s seconds", timeout)
+            return []
+        except Exception as e:
+            logger.error(f"Error scanning watchlist symbols: {e}")
+            return []
+
+        symbols = set()
+        for doc in docs:
+            symbol = (doc.to_dict() or {}).get('symbol') or doc.id
+            if isinstance(symbol, str) and symbol:
+                symbols.add(symbol.upper())
+        return sorted(symbols)
+
     def get_categories(self, user_id: str) -> List[str]:
         """Get all categories used by user"""
         try:
@@ -573,6 +779,7 @@ class WatchlistService:
             self._update_watchlist_metadata(user_id)
 
             logger.info(f"Cleared {deleted_count} items from watchlist for user {user_id}")
+            self._apply_write(user_id, 'cleared')
             return {
                 'success': True,
                 'message': f'Cleared {deleted_count} stocks from watchlist'
@@ -593,6 +800,7 @@ class WatchlistService:
         try:
             batch = self.db.batch()
             updated_count = 0
+            applied = {}
 
             for symbol, update_data in updates.items():
                 symbol = symbol.upper()
@@ -603,8 +811,11 @@ class WatchlistService:
                     update_data['last_updated'] = datetime.utcnow()
                     batch.update(doc_ref, update_data)
                     updated_count += 1
+                    applied[symbol] = update_data
 
             batch.commit()
+            for symbol, update_data in applied.items():
+                self._apply_write(user_id, 'updated', symbol, update_data)
 
             # Update metadata
             self._update_watchlist_metadata(user_id)
@@ -4,7 +4,6 @@ import os
 import time
 import threading
 import gc
-from collections import defaultdict
 from datetime import datetime
 
 from flask import request
@@ -17,9 +16,15 @@ from app.services.services import (
     ACTIVE_STOCK_TIMEOUT,
     cleanup_inactive_connections, limit_connections,
     get_watchlist_service_lazy, get_market_status,
-    get_stock_alpaca_only, yahoo_finance_api,
+    get_stock_alpaca_only, quote_service, subscription_registry, watchlist_push_tracker,
+    price_fetch_scheduler, returns_matrix,
     USE_ALPACA_API, alpaca_api,
 )
+from app.services.quote_service import SOURCE_YAHOO
+from app.services.market_calendar import poll_interval
+from app.services.watchlist_push import compact_price_entry
+from app.services.tick_pipeline import ConflationMap, TickDispatcher
+from app.services.finnhub_subscriptions import FinnhubSubscriptionManager
 
 logger = logging.getLogger(__name__)
 
@@ -27,74 +32,83 @@ logger = logging.getLogger(__name__)
 # Finnhub real-time price feed (WebSocket)
 # ---------------------------------------------------------------------------
 
-# symbol -> {user_id -> original_price}  (used to compute price_change per user)
-symbol_to_users = defaultdict(dict)
-symbol_to_users_lock = threading.Lock()
-
-# throttle: only emit once per second per symbol to avoid flooding
-_last_emitted = {}  # symbol -> (timestamp, price)
+# throttle: only emit once per second per symbol to avoid flooding (enforced by the dispatcher)
 _EMIT_THROTTLE = 1.0
+# symbol -> last emitted price; written by the dispatcher thread, entries dropped
+# when a symbol loses its last watcher
+_last_emitted = {}
+
+
+def symbol_room(symbol):
+    """Socket.IO room every socket watching `symbol` is joined to."""
+    return f"sym_{symbol}"
+
+
+def _join_symbol_rooms(sid, symbols):
+    for symbol in symbols:
+        socketio.server.enter_room(sid, symbol_room(symbol), namespace='/')
+
+
+def _leave_symbol_rooms(sid, symbols):
+    for symbol in symbols:
+        socketio.server.leave_room(sid, symbol_room(symbol), namespace='/')
 
 
 def _emit_finnhub_price(symbol, price):
-    """Called from Finnhub WS thread. Emits price to all users watching symbol."""
-    now = time.time()
-    last_ts, _ = _last_emitted.get(symbol, (0, 0))
-    if now - last_ts < _EMIT_THROTTLE:
+    """Called from the tick dispatcher thread. Broadcasts one tick to the symbol's room."""
+    last_price = _last_emitted.get(symbol)
+    if last_price is not None and abs(price - last_price) <= watchlist_push_tracker.epsilon:
         return
-    _last_emitted[symbol] = (now, price)
 
-    with symbol_to_users_lock:
-        user_map = dict(symbol_to_users.get(symbol, {}))
+    # {user_id -> original_price}
+    user_map = subscription_registry.users_for(symbol)
 
     if not user_map:
+        _last_emitted.pop(symbol, None)
+        return
+    _last_emitted[symbol] = price
+
+    # Encoded once for all watchers; clients compute P&L from their own original_price
+    try:
+        socketio.emit('price_tick', {
+            'symbol': symbol,
+            'price': round(price, 4),
+            'timestamp': datetime.now().isoformat(),
+        }, room=symbol_room(symbol))
+    except Exception as e:
+        logger.debug("[Finnhub] Emit error for %s: %s", symbol, e)
         return
 
-    ts = datetime.now().isoformat()
+    # Record what each watcher has now seen so the poll loop does not resend it
     for user_id, original_price in user_map.items():
-        price_change = price_change_pct = 0.0
-        if original_price and original_price > 0:
-            price_change = price - original_price
-            price_change_pct = (price_change / original_price) * 100
-        try:
-            socketio.emit('watchlist_updated', {
-                'prices': [{
-                    'symbol': symbol,
-                    'price': price,
-                    'price_change': round(price_change, 4),
-                    'price_change_percent': round(price_change_pct, 4),
-                    'change_percent': round(price_change_pct, 4),
-                    'priceChangePercent': round(price_change_pct, 4),
-                    'last_updated': ts,
-                    '_fresh': True,
-                }],
-                'timestamp': ts,
-            }, room=f"watchlist_{user_id}")
-        except Exception as e:
-            logger.debug("[Finnhub] Emit error for %s → %s: %s", symbol, user_id, e)
+        watchlist_push_tracker.record(f"watchlist_{user_id}", compact_price_entry(symbol, price, original_price))
 
 
-class FinnhubPriceFeed:
-    """Persistent WebSocket client for Finnhub real-time trade data."""
+def _finnhub_api_keys():
+    """FINNHUB_API_KEY plus any extra comma-separated FINNHUB_API_KEYS, one WS connection each."""
+    keys = [os.getenv('FINNHUB_API_KEY', '')] + os.getenv('FINNHUB_API_KEYS', '').split(',')
+    unique = []
+    for key in (k.strip() for k in keys):
+        if key and key != 'demo' and key not in unique:
+            unique.append(key)
+    return unique
 
-    MAX_SYMBOLS = 50  # free tier limit
 
-    def __init__(self):
-        self.api_key = os.getenv('FINNHUB_API_KEY', '')
-        self.available = bool(self.api_key and self.api_key != 'demo')
+class FinnhubConnection:
+    """One persistent Finnhub WebSocket (one API key) feeding the shared tick map."""
+
+    def __init__(self, index, api_key, ticks):
+        self.index = index
+        self.api_key = api_key
+        self.ticks = ticks
         self.ws = None
         self.connected = False
         self.subscribed = set()
-        self.latest_prices = {}          # symbol -> latest price (used as fallback by poll loop)
         self._lock = threading.Lock()
 
     def start(self):
-        if not self.available:
-            logger.info("[Finnhub] FINNHUB_API_KEY not set — WS feed disabled, using poll fallback")
-            return
-        t = threading.Thread(target=self._run_forever, daemon=True, name="FinnhubWSThread")
+        t = threading.Thread(target=self._run_forever, daemon=True, name=f"FinnhubWSThread-{self.index}")
         t.start()
-        logger.info("[Finnhub] WebSocket thread started")
 
     def _run_forever(self):
         backoff = 10
@@ -113,15 +127,15 @@ class FinnhubPriceFeed:
                 ws.run_forever(ping_interval=30, ping_timeout=10)
                 backoff = 10  # reset on clean disconnect
             except Exception as e:
-                logger.error("[Finnhub] WS connection error: %s", e)
+                logger.error("[Finnhub] WS #%s connection error: %s", self.index, e)
             self.connected = False
-            logger.info("[Finnhub] Reconnecting in %ss...", backoff)
+            logger.info("[Finnhub] WS #%s reconnecting in %ss...", self.index, backoff)
             time.sleep(backoff)
             backoff = min(backoff * 2, 300)  # cap at 5 minutes
 
     def _on_open(self, ws):
         self.connected = True
-        logger.info("[Finnhub] WebSocket connected")
+        logger.info("[Finnhub] WebSocket #%s connected", self.index)
         with self._lock:
             for sym in list(self.subscribed):
                 self._send(ws, {"type": "subscribe", "symbol": sym})
@@ -131,23 +145,23 @@ class FinnhubPriceFeed:
             msg = json.loads(raw)
             if msg.get('type') != 'trade':
                 return
+            now = time.perf_counter()
             for trade in msg.get('data', []):
                 symbol = trade.get('s')
                 price = trade.get('p')
                 if symbol and price:
-                    self.latest_prices[symbol] = float(price)
-                    _emit_finnhub_price(symbol, float(price))
+                    self.ticks.put(symbol, float(price), now)
         except Exception as e:
             logger.debug("[Finnhub] Message parse error: %s", e)
 
     def _on_error(self, ws, error):
-        logger.warning("[Finnhub] WS error: %s", error)
+        logger.warning("[Finnhub] WS #%s error: %s", self.index, error)
         if "429" in str(error):
             logger.warning("[Finnhub] Rate limited — will back off on next reconnect")
 
     def _on_close(self, ws, code, msg):
         self.connected = False
-        logger.info("[Finnhub] WS closed (code=%s)", code)
+        logger.info("[Finnhub] WS #%s closed (code=%s)", self.index, code)
 
     def _send(self, ws, payload):
         try:
@@ -155,28 +169,129 @@ class FinnhubPriceFeed:
         except Exception:
             pass
 
-    def subscribe_symbols(self, symbols):
-        """Subscribe to new symbols (respects MAX_SYMBOLS cap)."""
+    def subscribe(self, symbol):
         with self._lock:
-            for sym in symbols:
-                if sym in self.subscribed:
-                    continue
-                if len(self.subscribed) >= self.MAX_SYMBOLS:
-                    logger.debug("[Finnhub] Cap reached (%s), skipping %s", self.MAX_SYMBOLS, sym)
-                    break
-                self.subscribed.add(sym)
-                if self.ws and self.connected:
-                    self._send(self.ws, {"type": "subscribe", "symbol": sym})
+            self.subscribed.add(symbol)
+            if self.ws and self.connected:
+                self._send(self.ws, {"type": "subscribe", "symbol": symbol})
 
-    def unsubscribe_symbol(self, symbol):
-        """Unsubscribe from a symbol."""
+    def unsubscribe(self, symbol):
         with self._lock:
             self.subscribed.discard(symbol)
             if self.ws and self.connected:
                 self._send(self.ws, {"type": "unsubscribe", "symbol": symbol})
 
 
-finnhub_feed = FinnhubPriceFeed()
+class FinnhubPriceFeed:
+    """
+    Finnhub real-time trade data over one WebSocket per configured API key.
+
+    Each socket carries at most MAX_SYMBOLS symbols (free tier limit), so a
+    FinnhubSubscriptionManager keeps the hottest symbols (actively viewed,
+    most watchers, most recent interest) subscribed and rotates colder ones
+    back to the poll path.
+    """
+
+    MAX_SYMBOLS = 50  # free tier limit, per connection
+
+    def __init__(self, api_keys=None, watcher_count=None):
+        api_keys = _finnhub_api_keys() if api_keys is None else api_keys
+        self.available = bool(api_keys)
+        # Latest tick per symbol; the WS threads only write here, the dispatcher emits
+        self.ticks = ConflationMap()
+        self.dispatcher = TickDispatcher(self.ticks, _emit_finnhub_price, min_emit_interval=_EMIT_THROTTLE)
+        self.connections = [FinnhubConnection(i, key, self.ticks) for i, key in enumerate(api_keys)]
+        self.subscriptions = FinnhubSubscriptionManager(
+            connections=len(self.connections),
+            capacity_per_connection=self.MAX_SYMBOLS,
+        )
+        self._watcher_count = watcher_count or (lambda symbol: 0)
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def latest_price(self, symbol):
+        """Latest traded price for symbol (used by the poll loop); None once rotated off the socket."""
+        if not self.subscriptions.is_subscribed(symbol):
+            return None
+        return self.ticks.latest(symbol)
+
+    def start(self):
+        if not self.available:
+            logger.info("[Finnhub] FINNHUB_API_KEY not set — WS feed disabled, using poll fallback")
+            return
+        self.dispatcher.start()
+        for connection in self.connections:
+            connection.start()
+        logger.info("[Finnhub] %s WebSocket thread(s) started (%s symbol slots)",
+                    len(self.connections), self.subscriptions.capacity)
+
+    def subscribe_symbols(self, symbols):
+        """Symbols gained their first watcher; subscribed if they rank within capacity."""
+        self.subscriptions.touch(symbols)
+        self.rebalance()
+
+    def unsubscribe_symbol(self, symbol):
+        """Symbol lost its last watcher."""
+        with self._lock:
+            if symbol not in self._active:
+                self._forget_locked(symbol)
+        self.rebalance()
+
+    def rebalance(self, active=None):
+        """
+        Re-rank wanted symbols and apply the resulting unsubscribe/subscribe
+        messages. `active` is the set of symbols users are viewing right now;
+        omitted, the set from the last call is reused.
+        """
+        if not self.available:
+            return
+        with self._lock:
+            if active is not None:
+                active = set(active)
+                for symbol in self._active - active:
+                    if not self._watcher_count(symbol):
+                        self._forget_locked(symbol)
+                self._active = active
+            subscribe, unsubscribe = self.subscriptions.plan(self._watcher_count, self._active)
+            for conn, symbol in unsubscribe:
+                self.connections[conn].unsubscribe(symbol)
+                # Its last tick would read as current if the symbol is rotated back in
+                self.ticks.forget(symbol)
+            for conn, symbol in subscribe:
+                self.connections[conn].subscribe(symbol)
+
+    def _forget_locked(self, symbol):
+        """Nobody wants symbol any more: drop it from planning and every per-symbol map."""
+        self.subscriptions.forget(symbol)
+        self.ticks.forget(symbol)
+        self.dispatcher.forget(symbol)
+        _last_emitted.pop(symbol, None)
+
+    def coverage(self):
+        return self.subscriptions.coverage()
+
+    def stats(self):
+        return {
+            **self.subscriptions.stats(),
+            'connected': sum(1 for c in self.connections if c.connected),
+            'dispatch': self.dispatcher.stats(),
+        }
+
+
+finnhub_feed = FinnhubPriceFeed(watcher_count=subscription_registry.watcher_count)
+subscription_registry.set_symbol_hooks(finnhub_feed.subscribe_symbols, finnhub_feed.unsubscribe_symbol)
+subscription_registry.set_room_hooks(_join_symbol_rooms, _leave_symbol_rooms)
+
+
+def _emit_watchlist_snapshot(user_id):
+    """Send every price last pushed to the user's room to the current socket only."""
+    prices = watchlist_push_tracker.snapshot(f"watchlist_{user_id}")
+    if prices:
+        emit('watchlist_updated', {
+            'prices': prices,
+            'timestamp': datetime.now().isoformat(),
+            'full': True,
+        })
 
 
 def register_socketio_events():
@@ -203,6 +318,9 @@ def register_socketio_events():
         if request.sid in connection_timestamps:
             del connection_timestamps[request.sid]
 
+        # Drops the user's subscriptions (and orphaned Finnhub symbols) with their last socket
+        subscription_registry.remove_connection(request.sid)
+
         if user_id:
             if user_id in active_stocks:
                 del active_stocks[user_id]
@@ -210,17 +328,6 @@ def register_socketio_events():
                 del active_stocks_timestamps[user_id]
             logger.info("Cleaned up active stocks for user %s", user_id)
 
-            # Remove user from symbol→users index; unsubscribe orphaned symbols
-            with symbol_to_users_lock:
-                orphaned = []
-                for symbol, users in symbol_to_users.items():
-                    users.pop(user_id, None)
-                    if not users:
-                        orphaned.append(symbol)
-                for symbol in orphaned:
-                    del symbol_to_users[symbol]
-                    finnhub_feed.unsubscribe_symbol(symbol)
-
     @socketio.on('join_user_room')
     def handle_join_user_room(data):
         """Join user to their personal room for private updates"""
@@ -242,28 +349,39 @@ def register_socketio_events():
                 return
             join_room(f"watchlist_{user_id}")
             logger.info("User %s joined watchlist updates", user_id)
+            _emit_watchlist_snapshot(user_id)
 
-            # Build symbol→users index and subscribe to Finnhub WS
+            # Load the watchlist once per user; later changes arrive via WatchlistService events
+            if not subscription_registry.add_connection(request.sid, user_id):
+                return
             try:
                 service = get_watchlist_service_lazy()
                 if service:
+                    # Keeps the watchlist materialised in memory while the user is connected
+                    service.attach_listener(user_id)
                     watchlist = service.get_watchlist(user_id, limit=None) or []
-                    symbols = []
-                    with symbol_to_users_lock:
-                        for item in watchlist:
-                            symbol = item.get('symbol') or item.get('id')
-                            if symbol:
-                                original_price = float(item.get('original_price') or 0)
-                                symbol_to_users[symbol][user_id] = original_price
-                                symbols.append(symbol)
-                    if symbols:
-                        finnhub_feed.subscribe_symbols(symbols)
-                        logger.info("[Finnhub] Subscribed %s symbols for user %s", len(symbols), user_id)
+                    symbols = subscription_registry.load_watchlist(user_id, watchlist)
+                    logger.info("[SUBSCRIPTIONS] Registered %s symbols for user %s", len(symbols), user_id)
             except Exception as e:
-                logger.error("[Finnhub] Error loading watchlist for %s: %s", user_id, e)
+                logger.error("[SUBSCRIPTIONS] Error loading watchlist for %s: %s", user_id, e)
         except Exception as e:
             logger.error("Error joining watchlist updates: %s", e)
 
+    @socketio.on('resync_watchlist')
+    def handle_resync_watchlist(data):
+        """Resend the full last-known watchlist prices to the requesting socket."""
+        try:
+            # Only the user this socket joined as; never another user_id from the payload
+            user_id = connected_users.get(request.sid)
+            requested = (data or {}).get('user_id')
+            if requested and requested != user_id:
+                logger.warning("Rejected watchlist resync for %s from socket %s", requested, request.sid)
+                return
+            if user_id:
+                _emit_watchlist_snapshot(user_id)
+        except Exception as e:
+            logger.error("Error resyncing watchlist: %s", e)
+
     @socketio.on('join_market_updates')
     def handle_join_market_updates():
         """Join user to market updates room"""
@@ -331,6 +449,32 @@ def register_socketio_events():
             logger.error("Error tracking search stocks: %s", e)
 
 
+def _fetch_single_price(symbol):
+    """Per-symbol fallback for the poll loop: Alpaca, then Yahoo. Returns {'name', 'price'} or None."""
+    stock, api_used = get_stock_alpaca_only(symbol)
+
+    if not stock or not stock.price or stock.price == 0:
+        logger.warning("[REALTIME] Alpaca failed for %s, trying Yahoo fallback...", symbol)
+        try:
+            stock = Stock(symbol, quote_service.source(SOURCE_YAHOO))
+            stock.retrieve_data()
+            api_used = 'yahoo'
+            if stock and stock.price:
+                logger.info("[REALTIME] Yahoo fallback successful for %s: $%.2f", symbol, stock.price)
+            else:
+                logger.warning("[REALTIME] Yahoo fallback also failed for %s", symbol)
+                return None
+        except Exception as yahoo_error:
+            logger.error("[REALTIME] Yahoo fallback failed for %s: %s", symbol, yahoo_error)
+            return None
+
+    logger.info("[REALTIME] Updated %s: $%.2f (Source: %s)", symbol, stock.price, api_used.upper() if api_used else 'ALPACA')
+
+    if stock.name and 'not found' not in stock.name.lower():
+        return {'name': stock.name, 'price': stock.price}
+    return None
+
+
 def update_stock_prices():
     """Memory-optimized background task to update stock prices"""
     logger.info("Starting memory-optimized price update task...")
@@ -353,7 +497,6 @@ def update_stock_prices():
             logger.info("=" * 80)
 
             all_symbols = set()
-            user_watchlists = {}
             priority_symbols = set()
 
             current_time = time.time()
@@ -366,38 +509,26 @@ def update_stock_prices():
                     active_stocks[user_id].discard(sym)
                     active_stocks_timestamps[user_id].pop(sym, None)
 
-            for sid, user_id in list(connected_users.items()):
-                if user_id:
-                    try:
-                        service = get_watchlist_service_lazy()
-                        if service is None:
-                            continue
-                        watchlist = service.get_watchlist(user_id, limit=None)
-                        if watchlist:
-                            logger.info("[REALTIME] Loaded %s stocks for user %s", len(watchlist), user_id)
-                            user_watchlists[user_id] = watchlist
-                            for item in watchlist:
-                                symbol = item.get('symbol') or item.get('id')
-                                if symbol:
-                                    all_symbols.add(symbol)
-                                    logger.debug("  Added %s to update queue", symbol)
-                                else:
-                                    logger.debug("  Skipping item without symbol: %s", item.keys())
-                        else:
-                            logger.debug("[REALTIME] No watchlist found for user %s", user_id)
-
-                        if user_id in active_stocks:
-                            for symbol in active_stocks[user_id]:
-                                priority_symbols.add(symbol)
-                                all_symbols.add(symbol)
-                    except Exception as e:
-                        logger.error("Error getting watchlist for user %s: %s", user_id, e)
-                        import traceback
-                        traceback.print_exc()
-                        continue
+            # Watchlists come from the in-memory registry, not a Firestore query per socket
+            user_watchlists = subscription_registry.user_watchlists()
+            for watchlist in user_watchlists.values():
+                for item in watchlist:
+                    all_symbols.add(item['symbol'])
+
+            for user_id in set(connected_users.values()):
+                if user_id and user_id in active_stocks:
+                    for symbol in active_stocks[user_id]:
+                        priority_symbols.add(symbol)
+                        all_symbols.add(symbol)
 
             updated_symbols = {}
 
+            # Rotate the Finnhub socket slots toward what users are viewing now
+            if finnhub_feed.available:
+                finnhub_feed.rebalance(priority_symbols)
+                logger.info("[REALTIME] Finnhub coverage: %.0f%% of %s symbols",
+                            finnhub_feed.coverage() * 100, len(all_symbols))
+
             priority_to_fetch = [s for s in all_symbols if s in priority_symbols]
             regular_to_fetch = [s for s in all_symbols if s not in priority_symbols]
             all_symbols_to_fetch = priority_to_fetch + regular_to_fetch
@@ -408,9 +539,9 @@ def update_stock_prices():
                 logger.debug("   Symbols: %s%s", ', '.join(list(all_symbols_to_fetch)[:20]), '...' if len(all_symbols_to_fetch) > 20 else '')
 
             # Use Finnhub cached prices first (set by WS thread) — avoids hitting Alpaca
-            if finnhub_feed.available and finnhub_feed.latest_prices:
+            if finnhub_feed.available and len(finnhub_feed.ticks):
                 for symbol in list(all_symbols_to_fetch):
-                    price = finnhub_feed.latest_prices.get(symbol)
+                    price = finnhub_feed.latest_price(symbol)
                     if price and price > 0:
                         updated_symbols[symbol] = {
                             'symbol': symbol,
@@ -423,143 +554,49 @@ def update_stock_prices():
 
             symbols_not_covered = [s for s in all_symbols_to_fetch if s not in updated_symbols]
 
-            batch_failed_symbols = set()
-            if symbols_not_covered and USE_ALPACA_API and alpaca_api:
-                all_symbols_to_fetch = symbols_not_covered  # only fetch what Finnhub missed
-
-            if all_symbols_to_fetch and USE_ALPACA_API and alpaca_api:
-                try:
-                    logger.info("[REALTIME] Batch updating %s symbols (%s priority) via Alpaca batch API...", len(all_symbols_to_fetch), len(priority_to_fetch))
-                    batch_size = 50
-                    for i in range(0, len(all_symbols_to_fetch), batch_size):
-                        batch = all_symbols_to_fetch[i:i+batch_size]
-                        batch_results = alpaca_api.get_batch_snapshots(batch)
-
-                        batch_success_symbols = set()
-
-                        for symbol, data in batch_results.items():
-                            if data and 'price' in data and data.get('price') and data['price'] > 0:
-                                stock_data = {
-                                    'symbol': symbol,
-                                    'name': data.get('name', symbol),
-                                    'price': data['price'],
-                                    'last_updated': datetime.now().isoformat(),
-                                    'is_priority': symbol in priority_symbols
-                                }
-                                updated_symbols[symbol] = stock_data
-                                batch_success_symbols.add(symbol)
-
-                        for symbol in batch:
-                            if symbol not in batch_success_symbols:
-                                batch_failed_symbols.add(symbol)
-
-                        if i + batch_size < len(all_symbols_to_fetch):
-                            time.sleep(0.1)
-
-                    logger.info("[REALTIME] Batch updated %s symbols (%s priority)", len(updated_symbols), len(priority_to_fetch))
-                    if batch_failed_symbols:
-                        logger.warning("[REALTIME] %s symbols failed in batch, will retry individually: %s", len(batch_failed_symbols), list(batch_failed_symbols)[:10])
-
-                except Exception as e:
-                    logger.error("[REALTIME] Batch update failed, falling back to individual calls: %s", e)
-                    import traceback
-                    logger.error("[REALTIME] Batch error traceback: %s", traceback.format_exc())
-                    batch_failed_symbols = set(all_symbols_to_fetch)
-
-            if batch_failed_symbols:
-                symbols_needing_individual_fetch = batch_failed_symbols
-            elif not (USE_ALPACA_API and alpaca_api):
-                symbols_needing_individual_fetch = all_symbols_to_fetch
-            else:
-                symbols_needing_individual_fetch = []
-
-            if symbols_needing_individual_fetch:
-                priority_failed = [s for s in symbols_needing_individual_fetch if s in priority_symbols]
-                regular_failed = [s for s in symbols_needing_individual_fetch if s not in priority_symbols]
-                symbols_to_process = priority_failed + regular_failed
-
-                logger.info("[REALTIME] Fetching %s symbols individually (%s priority)...", len(symbols_to_process), len(priority_failed))
-
-                for symbol in symbols_to_process[:50]:
-                    try:
-                        delay = 0.05 if symbol in priority_symbols else 0.1
-                        time.sleep(delay)
-
-                        logger.debug("[REALTIME] Updating price for %s %s...", symbol, '(PRIORITY)' if symbol in priority_symbols else '')
-                        stock, api_used = get_stock_alpaca_only(symbol)
-
-                        if not stock or not stock.price or stock.price == 0:
-                            logger.warning("[REALTIME] Alpaca failed for %s, trying Yahoo fallback...", symbol)
-                            try:
-                                stock = Stock(symbol, yahoo_finance_api)
-                                stock.retrieve_data()
-                                api_used = 'yahoo'
-                                if stock and stock.price:
-                                    logger.info("[REALTIME] Yahoo fallback successful for %s: $%.2f", symbol, stock.price)
-                                else:
-                                    logger.warning("[REALTIME] Yahoo fallback also failed for %s", symbol)
-                                    continue
-                            except Exception as yahoo_error:
-                                logger.error("[REALTIME] Yahoo fallback failed for %s: %s", symbol, yahoo_error)
-                                continue
-
-                        logger.info("[REALTIME] Updated %s: $%.2f (Source: %s)", symbol, stock.price, api_used.upper() if api_used else 'ALPACA')
-
-                        if stock.name and 'not found' not in stock.name.lower():
-                            stock_data = {
-                                'symbol': symbol,
-                                'name': stock.name,
-                                'price': stock.price,
-                                'last_updated': datetime.now().isoformat(),
-                                'is_priority': symbol in priority_symbols
-                            }
-                            updated_symbols[symbol] = stock_data
-
-                    except Exception as e:
-                        logger.error("Error updating %s: %s", symbol, e)
-                        continue
-
+            # Batch first, then per-symbol fallback, all on the scheduler's worker pool;
+            # priority symbols are submitted first and the Alpaca budget caps the call count
+            use_batch = USE_ALPACA_API and alpaca_api
+            if symbols_not_covered:
+                logger.info("[REALTIME] Fetching %s symbols (%s priority)%s...", len(symbols_not_covered),
+                            len(priority_to_fetch), " via Alpaca batch API" if use_batch else "")
+            fetched = price_fetch_scheduler.run(
+                [s for s in symbols_not_covered if s in priority_symbols],
+                [s for s in symbols_not_covered if s not in priority_symbols],
+                fetch_batch=quote_service.get_batch_quotes if use_batch else None,
+                fetch_one=_fetch_single_price,
+            )
+            for symbol, data in fetched.items():
+                updated_symbols[symbol] = {
+                    'symbol': symbol,
+                    'name': data.get('name', symbol),
+                    'price': data['price'],
+                    'last_updated': datetime.now().isoformat(),
+                    'is_priority': symbol in priority_symbols,
+                }
+            logger.info("[REALTIME] Updated %s/%s symbols", len(updated_symbols), len(all_symbols))
+
+            watchlist_push_tracker.retain_rooms(f"watchlist_{user_id}" for user_id in user_watchlists)
             for user_id, watchlist in user_watchlists.items():
                 try:
-                    user_updates = []
-                    for item in watchlist:
-                        symbol = item['symbol']
-
-                        if symbol in updated_symbols:
-                            stock_data = updated_symbols[symbol]
-
-                            original_price = item.get('original_price', 0)
-                            current_price = stock_data.get('price', 0)
-                            price_change = 0
-                            price_change_percent = 0
-
-                            if original_price and original_price > 0 and current_price > 0:
-                                price_change = current_price - original_price
-                                price_change_percent = (price_change / original_price) * 100
-
-                            user_updates.append({
-                                **stock_data,
-                                'price_change': price_change,
-                                'price_change_percent': price_change_percent,
-                                'change_percent': price_change_percent,
-                                'priceChangePercent': price_change_percent,
-                                'category': item.get('category', 'General'),
-                                'priority': item.get('priority', 'medium'),
-                                '_fresh': True
-                            })
-                        else:
-                            logger.debug("[REALTIME] Symbol %s not in updated_symbols for user %s, may need fallback fetch", symbol, user_id)
+                    room_name = f"watchlist_{user_id}"
+                    entries = [
+                        compact_price_entry(item['symbol'], updated_symbols[item['symbol']]['price'], item.get('original_price'))
+                        for item in watchlist if item['symbol'] in updated_symbols
+                    ]
+                    watchlist_push_tracker.retain(room_name, (item['symbol'] for item in watchlist))
+                    # Only symbols whose price moved since the last push to this room
+                    user_updates = watchlist_push_tracker.diff(room_name, entries)
 
                     if user_updates:
-                        room_name = f"watchlist_{user_id}"
                         socketio.emit('watchlist_updated', {
                             'prices': user_updates,
                             'timestamp': datetime.now().isoformat(),
                             'cycle': update_cycle_count
                         }, room=room_name)
-                        logger.info("[REALTIME] Sent %s stock updates to user %s (Cycle #%s)", len(user_updates), user_id, update_cycle_count)
+                        logger.info("[REALTIME] Sent %s/%s changed prices to user %s (Cycle #%s)", len(user_updates), len(entries), user_id, update_cycle_count)
                     else:
-                        logger.debug("[REALTIME] No updates to send for user %s (watchlist has %s stocks, updated_symbols has %s symbols)", user_id, len(watchlist), len(updated_symbols))
+                        logger.debug("[REALTIME] No price changes for user %s (watchlist has %s stocks)", user_id, len(watchlist))
 
                 except Exception as e:
                     logger.error("Error sending updates to user %s: %s", user_id, e)
@@ -573,6 +610,7 @@ def update_stock_prices():
 
             cycle_end_time = time.time()
             cycle_duration = cycle_end_time - current_time
+            price_fetch_scheduler.record_cycle(cycle_duration)
             logger.info("Update cycle completed in %.2f seconds", cycle_duration)
 
             if USE_ALPACA_API and alpaca_api and hasattr(alpaca_api, 'get_queue_stats'):
@@ -584,9 +622,10 @@ def update_stock_prices():
                 except:
                     pass
 
-            logger.info("Sleeping for 30 seconds before next update...")
-            logger.info("Next update at: %s", datetime.fromtimestamp(time.time() + 30).strftime('%H:%M:%S'))
-            time.sleep(30)
+            interval = poll_interval()
+            logger.info("Sleeping for %s seconds before next update...", interval)
+            logger.info("Next update at: %s", datetime.fromtimestamp(time.time() + interval).strftime('%H:%M:%S'))
+            time.sleep(interval)
 
         except Exception as e:
             logger.error("Error in price update loop: %s", e)
@@ -599,6 +638,10 @@ def start_price_updates():
     """Start price update tasks: Finnhub WS (primary) + poll loop (fallback)"""
     logger.info("Starting price update tasks...")
     finnhub_feed.start()
+    returns_matrix.start()
+
+    from app.routes.market import market_overview
+    market_overview.start()
 
     def cleanup_memory():
         """Enhanced periodic memory cleanup"""
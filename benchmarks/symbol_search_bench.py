@@ -0,0 +1,135 @@
+"""
+Per-query latency of StockSymbolIndexService.search (full scan vs candidate
+index) and per-keystroke latency of the typeahead mode.
+
+    python -m benchmarks.symbol_search_bench
+    python -m benchmarks.symbol_search_bench --entries /tmp/stock_symbol_index_cache.json
+    python -m benchmarks.symbol_search_bench --entries company_tickers_exchange.json --repeat 20
+
+--entries accepts either SEC download (company_tickers_exchange.json or
+company_tickers.json) or the service's own cache file. Without it a
+synthetic list the size of the SEC ticker file (~10k entries) is used.
+The query cache is bypassed so every run measures a cold query.
+"""
+import argparse
+import json
+import random
+import string
+import time
+
+import numpy as np
+
+from app.services.stock_symbol_index import StockSymbolIndexService
+
+QUERIES = [
+    'A', 'AP', 'AAP', 'AAPL', 'M', 'MS', 'MSF', 'NVDA', 'BRK',
+    'apple', 'micro', 'microsoft', 'bank', 'bank of america', 'holdings', 'pharma',
+    'google', 'coca cola', 'energy trust', 'inc', 'capital',
+    'micorsoft', 'nvidai', 'amazn', 'tesle',
+]
+
+TYPED = ['APPLE', 'MICROSOFT', 'NVDA', 'BANK', 'GOLDMAN', 'TESLA']
+
+_WORDS = [
+    'Apple', 'Micro', 'Global', 'American', 'First', 'Capital', 'Energy', 'Pharma', 'Bio', 'Tech',
+    'Systems', 'Holdings', 'Financial', 'Bank', 'Trust', 'Realty', 'Health', 'Therapeutics', 'Digital',
+    'Networks', 'Solutions', 'Industries', 'Resources', 'Mining', 'Gold', 'Silver', 'Oil', 'Gas',
+    'Semiconductor', 'Software', 'Medical', 'Foods', 'Brands', 'Motors', 'Aerospace', 'Defense',
+    'Pacific', 'Atlantic', 'National', 'United', 'General', 'Advanced', 'Quantum', 'Solar', 'Wind',
+    'Water', 'Partners', 'Group', 'Acquisition', 'Ventures', 'Labs', 'Genomics', 'Insurance',
+]
+_SUFFIXES = ['Inc.', 'Corp', 'Corporation', 'Ltd', 'Co', 'Plc', 'LP', 'ETF', 'Fund', 'Holdings Inc.']
+
+
+def synthetic_entries(count, seed=7):
+    rng = random.Random(seed)
+    seen = set()
+    entries = []
+    while len(entries) < count:
+        symbol = ''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.choice([1, 2, 3, 3, 4, 4, 4, 5])))
+        if rng.random() < 0.03:
+            symbol += rng.choice(['.A', '.B', '-WT', '-U'])
+        if symbol in seen:
+            continue
+        seen.add(symbol)
+        words = rng.sample(_WORDS, rng.choice([1, 2, 2, 3]))
+        entries.append({
+            'symbol': symbol,
+            'name': f"{' '.join(words)} {rng.choice(_SUFFIXES)}",
+            'exchange': rng.choice(['NASDAQ', 'NYSE', 'OTC', 'CBOE']),
+            'type': 'EQUITY',
+        })
+    return entries
+
+
+def load_entries(path):
+    payload = json.loads(open(path, encoding='utf-8').read())
+    if isinstance(payload, dict) and 'entries' in payload:
+        return payload['entries']
+    if isinstance(payload, dict) and 'fields' in payload:
+        fields = [f.lower() for f in payload['fields']]
+        return [dict(zip(('cik', 'name', 'symbol', 'exchange'), (row[fields.index(k)] for k in ('cik', 'name', 'ticker', 'exchange'))))
+                for row in payload['data']]
+    return [{'symbol': v['ticker'], 'name': v['title']} for v in payload.values()]
+
+
+def full_scan(service, query, limit=10):
+    """The search loop before the candidate index: score every entry."""
+    normalized = service._normalize_text(query)
+    table = service._table
+    typos = service._index.typo_matches(normalized)
+    scored = [(score, i) for i in range(len(table))
+              if (score := service._score_entry(*table.normalized(i), normalized, typos.get(i))) > 0]
+    scored.sort(key=lambda pair: (-pair[0], table.public(pair[1])['symbol']))
+    return [table.public(i) for _, i in scored[:limit]]
+
+
+def timings(fn, queries, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', help='SEC ticker JSON or symbol index cache file')
+    parser.add_argument('--count', type=int, default=10_500, help='synthetic entry count')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    entries = load_entries(args.entries) if args.entries else synthetic_entries(args.count)
+    service = StockSymbolIndexService(autostart=False)
+    start = time.perf_counter()
+    service._set_entries(entries, source='benchmark')
+    build_ms = (time.perf_counter() - start) * 1000
+
+    def indexed(query):
+        service._query_cache.clear()
+        return service.search(query)
+
+    differing = [q for q in QUERIES if indexed(q) != full_scan(service, q)]
+    print(f"{len(service._table)} entries, index build {build_ms:.0f} ms")
+    print(f"queries whose top 10 differ from the full scan: {differing or 'none'}")
+    print(f"{'query':<18}{'scan p50':>10}{'scan p99':>10}{'index p50':>11}{'index p99':>11}")
+    for query in QUERIES + ['<all>']:
+        queries = QUERIES if query == '<all>' else [query]
+        scan = timings(lambda q: full_scan(service, q), queries, args.repeat)
+        fast = timings(indexed, queries, args.repeat)
+        print(f"{query:<18}{scan[0]:>10.2f}{scan[1]:>10.2f}{fast[0]:>11.3f}{fast[1]:>11.3f}")
+
+    keystrokes = [word[:n] for word in TYPED for n in range(1, len(word) + 1)]
+    start = time.perf_counter()
+    prefixes = service._index.warm_typeahead(service._score_entry)
+    print(f"\ntypeahead warm-up: {prefixes} prefixes in {(time.perf_counter() - start) * 1000:.0f} ms")
+    search = timings(indexed, keystrokes, args.repeat)
+    typeahead = timings(service.typeahead, keystrokes, args.repeat)
+    print(f"per keystroke ({len(keystrokes)}): search p50 {search[0]:.3f} / p99 {search[1]:.3f} ms, "
+          f"typeahead p50 {typeahead[0]:.3f} / p99 {typeahead[1]:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Replay a burst of Finnhub trade messages through the tick pipeline and report
+ingest-to-emit latency.
+
+    python -m benchmarks.tick_pipeline_bench                      # synthetic 10k trades/s
+    python -m benchmarks.tick_pipeline_bench --record burst.jsonl # replay raw WS messages
+
+The reader loop mirrors FinnhubPriceFeed._on_message (json.loads + ConflationMap.put);
+emits are JSON-encoded like the socket payload but not sent anywhere.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from app.services.tick_pipeline import ConflationMap, TickDispatcher
+
+
+def synthetic_burst(rate, seconds, symbols, trades_per_message, seed=7):
+    """Finnhub-shaped trade messages totalling `rate` trades/s for `seconds`."""
+    rng = random.Random(seed)
+    universe = [f"SYM{i}" for i in range(symbols)]
+    # Skewed popularity, like real tape: a few tickers dominate
+    weights = [1.0 / (i + 1) for i in range(symbols)]
+    prices = {s: 100.0 + i for i, s in enumerate(universe)}
+    messages = []
+    for _ in range(int(rate * seconds / trades_per_message)):
+        data = []
+        for symbol in rng.choices(universe, weights=weights, k=trades_per_message):
+            prices[symbol] += rng.uniform(-0.05, 0.05)
+            data.append({"s": symbol, "p": round(prices[symbol], 2), "t": int(time.time() * 1000), "v": 100})
+        messages.append(json.dumps({"type": "trade", "data": data}))
+    return messages
+
+
+def load_recording(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def replay(messages, rate, trades_per_message, interval, min_emit_interval):
+    ticks = ConflationMap()
+    emitted_bytes = [0]
+
+    def emit(symbol, price):
+        emitted_bytes[0] += len(json.dumps({"symbol": symbol, "price": price, "timestamp": time.time()}))
+
+    dispatcher = TickDispatcher(ticks, emit, interval=interval, min_emit_interval=min_emit_interval,
+                                latency_samples=1_000_000)
+    dispatcher.start()
+
+    reader_costs = []
+    message_gap = trades_per_message / rate
+    start = time.perf_counter()
+    for i, raw in enumerate(messages):
+        # Pace the replay at the recorded rate
+        due = start + i * message_gap
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t0 = time.perf_counter()
+        msg = json.loads(raw)
+        if msg.get("type") == "trade":
+            now = time.perf_counter()
+            for trade in msg.get("data", []):
+                if trade.get("s") and trade.get("p"):
+                    ticks.put(trade["s"], float(trade["p"]), now)
+        reader_costs.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    # Let the dispatcher flush everything still pending
+    deadline = time.perf_counter() + max(2.0, min_emit_interval * 3)
+    while ticks.pending_count() and time.perf_counter() < deadline:
+        time.sleep(interval)
+    dispatcher.stop()
+
+    reader_costs.sort()
+    stats = dispatcher.stats()
+    return {
+        "trades": stats["ticks_in"],
+        "achieved_trades_per_s": round(stats["ticks_in"] / elapsed),
+        "conflated": stats["ticks_conflated"],
+        "emitted": stats["emitted"],
+        "emitted_kb": round(emitted_bytes[0] / 1024, 1),
+        "reader_p99_us": round(reader_costs[int(0.99 * (len(reader_costs) - 1))] * 1e6, 1),
+        "ingest_to_emit": stats["latency"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=int, default=10_000, help="trades per second")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--trades-per-message", type=int, default=20)
+    parser.add_argument("--interval-ms", type=float, default=100.0, help="dispatcher drain cadence")
+    parser.add_argument("--throttle-ms", type=float, default=0.0, help="per-symbol minimum emit interval")
+    parser.add_argument("--record", help="JSONL file of raw Finnhub WS messages to replay instead")
+    args = parser.parse_args()
+
+    if args.record:
+        messages = load_recording(args.record)
+    else:
+        messages = synthetic_burst(args.rate, args.seconds, args.symbols, args.trades_per_message)
+
+    result = replay(messages, args.rate, args.trades_per_message,
+                    interval=args.interval_ms / 1000.0, min_emit_interval=args.throttle_ms / 1000.0)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -458,6 +458,40 @@ const DashboardRedesign = ({ routeView = 'overview', onRouteChange = null }: { r
                 }
             });
 
+            // Real-time trade ticks, broadcast once per symbol room (sym_<SYMBOL>).
+            // P&L is computed here from the stock's own original_price.
+            socketRef.current.on('price_tick', (tick: any) => {
+                if (!tick || !tick.symbol || !(tick.price > 0)) return;
+
+                if (livePricingRef.current) {
+                    livePricingRef.current.priceCache.set(tick.symbol, tick.price);
+                }
+
+                setWatchlistData(prevData => prevData.map((stock: any) => {
+                    if (stock.symbol !== tick.symbol) return stock;
+
+                    const originalPrice = stock.original_price || 0;
+                    const priceChange = originalPrice > 0 ? tick.price - originalPrice : 0;
+                    const priceChangePercent = originalPrice > 0 ? (priceChange / originalPrice) * 100 : 0;
+                    const oldPrice = stock.current_price || stock.price || 0;
+
+                    return {
+                        ...stock,
+                        price: tick.price,
+                        current_price: tick.price,
+                        price_change: priceChange,
+                        change: priceChange,
+                        change_percent: priceChangePercent,
+                        priceChangePercent: priceChangePercent,
+                        _updated: oldPrice > 0 && Math.abs(oldPrice - tick.price) > 0.01,
+                        _fresh: true,
+                        _last_updated: new Date().toISOString(),
+                        _updating: false
+                    };
+                }));
+                setLastUpdate(new Date());
+            });
+
             socketRef.current.on('disconnect', () => {
                 setSocketConnected(false);
             });
@@ -0,0 +1,187 @@
+"""
+In-memory Firestore fake covering the client surface WatchlistService uses:
+nested collection/document references, get/stream/limit queries, batches
+and collection `on_snapshot` listeners.
+
+Like the real client, listeners receive snapshots on a background thread:
+each write queues a snapshot of the collection as it is at that moment.
+`flush()` waits for queued snapshots; `pause()`/`resume()` hold them back so
+tests can observe state before a listener catches up.
+"""
+import threading
+from collections import defaultdict, deque
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeWatch:
+    def __init__(self, db, path, callback):
+        self._db = db
+        self._path = path
+        self.callback = callback
+        self.active = True
+
+    def unsubscribe(self):
+        self.active = False
+        self._db._watchers[self._path].remove(self)
+
+
+class FakeQuery:
+    def __init__(self, collection, limit=None):
+        self._collection = collection
+        self._limit = limit
+
+    def where(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        return FakeQuery(self._collection, count)
+
+    def get(self):
+        docs = self._collection._snapshots()
+        return docs if self._limit is None else docs[:self._limit]
+
+    def stream(self):
+        return iter(self.get())
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, db, path):
+        super().__init__(self)
+        self._db = db
+        self._path = path
+
+    def document(self, doc_id):
+        return FakeDocumentReference(self._db, self._path, doc_id)
+
+    def on_snapshot(self, callback):
+        watch = FakeWatch(self._db, self._path, callback)
+        self._db._watchers[self._path].append(watch)
+        self._db._deliver(watch, self._snapshots())
+        return watch
+
+    def _snapshots(self):
+        return [
+            FakeDocumentSnapshot(self.document(doc_id), dict(data))
+            for doc_id, data in self._db._docs[self._path].items()
+        ]
+
+
+class FakeDocumentReference:
+    def __init__(self, db, collection_path, doc_id):
+        self._db = db
+        self._collection_path = collection_path
+        self.id = doc_id
+
+    def collection(self, name):
+        return FakeCollectionReference(self._db, self._collection_path + (self.id, name))
+
+    def get(self):
+        return FakeDocumentSnapshot(self, self._db._docs[self._collection_path].get(self.id))
+
+    def set(self, data, merge=False):
+        docs = self._db._docs[self._collection_path]
+        docs[self.id] = {**docs.get(self.id, {}), **data} if merge else dict(data)
+        self._db._changed(self._collection_path)
+
+    def update(self, data):
+        docs = self._db._docs[self._collection_path]
+        if self.id not in docs:
+            raise KeyError(f"No document to update: {self.id}")
+        docs[self.id].update(data)
+        self._db._changed(self._collection_path)
+
+    def delete(self):
+        if self._db._docs[self._collection_path].pop(self.id, None) is not None:
+            self._db._changed(self._collection_path)
+
+
+class FakeWriteBatch:
+    def __init__(self):
+        self._ops = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(lambda: ref.set(data, merge=merge))
+
+    def update(self, ref, data):
+        self._ops.append(lambda: ref.update(data))
+
+    def delete(self, ref):
+        self._ops.append(ref.delete)
+
+    def commit(self):
+        for op in self._ops:
+            op()
+        self._ops = []
+
+
+class FakeFirestore:
+    def __init__(self):
+        self._docs = defaultdict(dict)
+        self._watchers = defaultdict(list)
+        self.reads = 0
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._paused = False
+        self._delivering = False
+        threading.Thread(target=self._run_deliveries, daemon=True, name="fake-firestore-watch").start()
+
+    def collection(self, name):
+        return FakeCollectionReference(self, (name,))
+
+    def batch(self):
+        return FakeWriteBatch()
+
+    def listener_count(self):
+        return sum(len(watchers) for watchers in self._watchers.values())
+
+    def flush(self, timeout=2.0):
+        """Wait until every queued snapshot has been delivered (or delivery is paused)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: (self._paused or not self._queue) and not self._delivering, timeout)
+
+    def pause(self):
+        with self._cond:
+            self._paused = True
+            self._cond.wait_for(lambda: not self._delivering)
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def _changed(self, path):
+        snapshots = FakeCollectionReference(self, path)._snapshots()
+        for watch in list(self._watchers[path]):
+            self._deliver(watch, snapshots)
+
+    def _deliver(self, watch, snapshots):
+        with self._cond:
+            self._queue.append((watch, snapshots))
+            self._cond.notify_all()
+
+    def _run_deliveries(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue and not self._paused)
+                watch, snapshots = self._queue.popleft()
+                self._delivering = True
+            try:
+                if watch.active:
+                    watch.callback(snapshots, [], None)
+            finally:
+                with self._cond:
+                    self._delivering = False
+                    self._cond.notify_all()
@@ -0,0 +1,124 @@
+"""
+Unit tests for AssetCatalog and its use by ImprovedAlpacaAPI batch snapshots.
+"""
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from app.services.asset_catalog import AssetCatalog
+from app.services.stock import ImprovedAlpacaAPI
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _catalog(tmp_path, monkeypatch, symbol_index=None):
+    monkeypatch.setenv("ASSET_CATALOG_CACHE_PATH", str(tmp_path / "assets.json"))
+    return AssetCatalog(api_key="k", secret_key="s", symbol_index=symbol_index, autostart=False)
+
+
+def _response(status=200, payload=None):
+    resp = MagicMock()
+    resp.status_code = status
+    resp.json.return_value = payload
+    resp.raise_for_status.return_value = None
+    return resp
+
+
+# ---------------------------------------------------------------------------
+# Catalogue loading
+# ---------------------------------------------------------------------------
+
+class TestAssetCatalog:
+    def test_refresh_loads_all_assets_in_one_call_and_persists(self, tmp_path, monkeypatch):
+        catalog = _catalog(tmp_path, monkeypatch)
+        assets = [
+            {"symbol": "AAPL", "name": "Apple Inc. Common Stock"},
+            {"symbol": "msft", "name": "Microsoft Corporation Common Stock"},
+            {"symbol": "", "name": "Broken"},
+        ]
+        with patch("app.services.asset_catalog.http_client.get", return_value=_response(payload=assets)) as get:
+            assert catalog.refresh_now() is True
+
+        get.assert_called_once()
+        assert catalog.get_name("aapl") == "Apple Inc. Common Stock"
+        assert catalog.get_name("MSFT") == "Microsoft Corporation Common Stock"
+        saved = json.loads((tmp_path / "assets.json").read_text())
+        assert set(saved["names"]) == {"AAPL", "MSFT"}
+
+    def test_loads_from_cache_file_on_startup(self, tmp_path, monkeypatch):
+        (tmp_path / "assets.json").write_text(json.dumps({
+            "refreshed_at": 1.0, "source": "alpaca_assets", "names": {"TSLA": "Tesla, Inc."},
+        }))
+        catalog = _catalog(tmp_path, monkeypatch)
+
+        assert catalog.get_name("TSLA") == "Tesla, Inc."
+        assert catalog.stats()["last_refresh_ts"] == 1.0
+
+    def test_unknown_symbol_falls_back_to_symbol_index(self, tmp_path, monkeypatch):
+        symbol_index = MagicMock()
+        symbol_index.get_entry.return_value = {"symbol": "XYZ", "name": "Block Inc."}
+        catalog = _catalog(tmp_path, monkeypatch, symbol_index=symbol_index)
+
+        assert catalog.get_name("XYZ") == "Block Inc."
+
+    def test_failed_refresh_keeps_existing_names(self, tmp_path, monkeypatch):
+        catalog = _catalog(tmp_path, monkeypatch)
+        catalog._set_names({"AAPL": "Apple"}, source="test")
+        with patch("app.services.asset_catalog.http_client.get", side_effect=RuntimeError("down")):
+            assert catalog.refresh_now() is False
+
+        assert catalog.get_name("AAPL") == "Apple"
+
+
+# ---------------------------------------------------------------------------
+# Batch snapshots
+# ---------------------------------------------------------------------------
+
+class TestBatchSnapshotNames:
+    def test_batch_makes_a_single_request_for_cold_symbols(self, tmp_path, monkeypatch):
+        catalog = _catalog(tmp_path, monkeypatch)
+        catalog._set_names({"AAPL": "Apple Inc."}, source="test")
+        api = ImprovedAlpacaAPI(api_key="k", secret_key="s", asset_catalog=catalog)
+        snapshots = {
+            "AAPL": {"latestTrade": {"p": 190.0}},
+            "NEWCO": {"latestTrade": {"p": 12.5}},
+        }
+        with patch("app.services.stock.http_client.get", return_value=_response(payload=snapshots)) as get:
+            results = api.get_batch_snapshots(["AAPL", "NEWCO"], use_cache=False)
+
+        assert get.call_count == 1
+        assert results["AAPL"] == {"name": "Apple Inc.", "price": 190.0}
+        assert results["NEWCO"] == {"name": "NEWCO", "price": 12.5}
+
+    def test_requests_run_on_the_queue_workers(self, tmp_path, monkeypatch):
+        catalog = _catalog(tmp_path, monkeypatch)
+        api = ImprovedAlpacaAPI(api_key="k", secret_key="s", asset_catalog=catalog)
+        threads = []
+
+        def get(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return _response(payload={"latestTrade": {"p": 190.0}})
+
+        with patch("app.services.stock.http_client.get", side_effect=get):
+            result = api.get_real_time_data("AAPL", use_cache=False)
+
+        assert result["price"] == 190.0
+        assert threads[0].startswith("AlpacaRequest")
+        assert api.get_queue_stats()["total_requests"] == 1
+
+    def test_throttled_interactive_request_serves_stale_price_without_waiting(self, tmp_path, monkeypatch):
+        catalog = _catalog(tmp_path, monkeypatch)
+        api = ImprovedAlpacaAPI(api_key="k", secret_key="s", asset_catalog=catalog)
+        api.cache._store("price:AAPL", {"name": "Apple Inc.", "price": 189.0}, time.time() - 3600)
+        api.request_queue.note_rate_limited()
+
+        started = time.monotonic()
+        with patch("app.services.stock.http_client.get") as get:
+            result = api.get_real_time_data("AAPL", use_cache=False)
+
+        assert result == {"name": "Apple Inc.", "price": 189.0}
+        assert time.monotonic() - started < 1
+        get.assert_not_called()
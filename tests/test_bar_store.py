@@ -0,0 +1,373 @@
+"""
+Unit tests for the on-disk OHLCV bar store: incremental tail/head fetches and range queries.
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.bar_store import BAR_DTYPE, BarStore, bars_to_frame, frame_to_bars, merge_bars, split_download
+from app.services.stock import YahooFinanceAPI
+
+DAY = 86400
+BASE = int(datetime(2024, 1, 1, 5, tzinfo=timezone.utc).timestamp())  # NY midnight
+
+
+def _bars(first_day, last_day, close_offset=0.0, scale=1.0):
+    days = np.arange(first_day, last_day + 1)
+    bars = np.zeros(len(days), dtype=BAR_DTYPE)
+    bars['t'] = BASE + days * DAY
+    bars['o'] = bars['h'] = bars['l'] = (100 + days) * scale
+    bars['c'] = (100 + days + close_offset) * scale
+    bars['v'] = 1000
+    return bars
+
+
+def _date(day):
+    return (datetime(2024, 1, 1) + timedelta(days=day)).strftime('%Y-%m-%d')
+
+
+class _FakeUpstream:
+    """Serves days 0..last_day; records each requested (start, end) range."""
+
+    def __init__(self, last_day):
+        self.last_day = last_day
+        self.calls = []
+        self.closes = {}  # day -> close overriding 100 + day
+        self.scale = 1.0  # adjustment factor applied to every bar, as after a split
+        self.unknown = False
+
+    def __call__(self, symbol, interval, start_ts, end_ts):
+        self.calls.append((start_ts, end_ts))
+        if self.unknown:
+            return _bars(1, 0)
+        first = max(0, -(-(start_ts - BASE) // DAY))
+        last = self.last_day if end_ts is None else min(self.last_day, (end_ts - BASE) // DAY)
+        bars = _bars(first, last, scale=self.scale)
+        for day, close in self.closes.items():
+            bars['c'][bars['t'] == BASE + day * DAY] = close
+        return bars
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _store(tmp_path, upstream, clock=None):
+    return BarStore(root=str(tmp_path), fetcher=upstream, refresh_seconds=900, clock=clock or _Clock())
+
+
+class TestBarStore:
+    def test_first_query_fetches_then_serves_from_disk(self, tmp_path):
+        upstream = _FakeUpstream(last_day=30)
+        store = _store(tmp_path, upstream)
+
+        first = store.get_bars('AAPL', '1d', _date(10), _date(20))
+        second = store.get_bars('aapl', '1d', _date(12), _date(15))
+
+        assert len(upstream.calls) == 1
+        assert list(first['c']) == [100 + d for d in range(10, 20)]
+        assert list(second['c']) == [112, 113, 114]
+        assert store.stats()['disk_hits'] == 1
+
+    def test_survives_restart(self, tmp_path):
+        upstream = _FakeUpstream(last_day=30)
+        _store(tmp_path, upstream).get_bars('AAPL', '1d', _date(0), _date(30))
+
+        reopened = _store(tmp_path, upstream)
+        bars = reopened.get_bars('AAPL', '1d', _date(5), _date(10))
+
+        assert len(upstream.calls) == 1
+        assert len(bars) == 5
+
+    def test_only_missing_tail_is_fetched_after_refresh(self, tmp_path):
+        upstream = _FakeUpstream(last_day=20)
+        clock = _Clock()
+        store = _store(tmp_path, upstream, clock)
+        store.get_bars('AAPL', '1d', _date(0))
+
+        upstream.last_day = 25
+        upstream.closes = {20: 120.5}  # last stored bar was partial; it gets replaced
+        clock.now += 901
+        bars = store.get_bars('AAPL', '1d', _date(0))
+
+        # The tail overlaps the last complete bar, which is unchanged
+        tail_start = upstream.calls[-1][0]
+        assert tail_start == BASE + 19 * DAY
+        assert len(upstream.calls) == 2
+        assert len(bars) == 26
+        assert bars['c'][19] == 119
+        assert bars['c'][20] == 120.5
+        assert store.stats()['tail_fetches'] == 1
+
+    def test_no_tail_fetch_within_refresh_window(self, tmp_path):
+        upstream = _FakeUpstream(last_day=20)
+        store = _store(tmp_path, upstream)
+        store.get_bars('AAPL', '1d', _date(0))
+        store.get_bars('AAPL', '1d', _date(0))
+
+        assert len(upstream.calls) == 1
+
+    def test_corporate_action_refetches_the_whole_key(self, tmp_path):
+        upstream = _FakeUpstream(last_day=20)
+        clock = _Clock()
+        store = _store(tmp_path, upstream, clock)
+        store.get_bars('AAPL', '1d', _date(0))
+
+        upstream.last_day = 25
+        upstream.scale = 0.1  # 10:1 split: yfinance rescales all earlier bars
+        clock.now += 901
+        bars = store.get_bars('AAPL', '1d', _date(0))
+
+        assert upstream.calls[-1] == (BASE - 5 * 3600, None)
+        assert store.stats()['adjust_refetches'] == 1
+        assert list(bars['c']) == pytest.approx([(100 + d) * 0.1 for d in range(26)])
+        assert list(store.get_bars('AAPL', '1d', _date(0))['c']) == list(bars['c'])
+
+    def test_unknown_symbol_is_not_persisted_as_coverage(self, tmp_path):
+        upstream = _FakeUpstream(last_day=20)
+        upstream.unknown = True
+        store = _store(tmp_path, upstream)
+
+        assert len(store.get_bars('NOPE', '1d', _date(0))) == 0
+        assert len(store.get_bars('NOPE', '1d', _date(5))) == 0
+
+        assert len(upstream.calls) == 1
+        assert store.stats()['no_data_skips'] == 1
+        assert not list(tmp_path.rglob('*.npy'))
+        # An older start may reach data the first fetch did not cover
+        store.get_bars('NOPE', '1d', '2023-06-01')
+        assert len(upstream.calls) == 2
+
+    def test_older_start_fetches_only_the_head_gap(self, tmp_path):
+        upstream = _FakeUpstream(last_day=30)
+        store = _store(tmp_path, upstream)
+        store.get_bars('AAPL', '1d', _date(10), _date(20))
+
+        bars = store.get_bars('AAPL', '1d', _date(2), _date(20))
+
+        assert upstream.calls[-1] == (BASE - 5 * 3600 + 2 * DAY, BASE - 5 * 3600 + 10 * DAY)
+        assert list(bars['t']) == list(BASE + np.arange(2, 20) * DAY)
+
+    def test_failed_fetch_is_not_persisted(self, tmp_path):
+        def down(*args):
+            raise RuntimeError('yahoo down')
+
+        store = _store(tmp_path, down)
+        assert len(store.get_bars('AAPL', '1d', _date(0))) == 0
+        assert store.stats()['errors'] == 1
+        assert not list(tmp_path.rglob('*.npy'))
+
+
+class _FakeBatchUpstream:
+    """Batch counterpart of _FakeUpstream; MSFT closes are offset by 1 to tell symbols apart."""
+
+    def __init__(self, last_day):
+        self.last_day = last_day
+        self.calls = []
+        self.unknown = set()
+
+    def __call__(self, symbols, interval, start_ts, end_ts):
+        self.calls.append((tuple(symbols), start_ts, end_ts))
+        first = max(0, -(-(start_ts - BASE) // DAY))
+        last = self.last_day if end_ts is None else min(self.last_day, (end_ts - BASE) // DAY)
+        return {symbol: _bars(first, last, close_offset=float(symbol == 'MSFT'))
+                for symbol in symbols if symbol not in self.unknown}
+
+
+class TestBarStoreBatch:
+    def _store(self, tmp_path, clock=None):
+        single = _FakeUpstream(last_day=30)
+        batch = _FakeBatchUpstream(last_day=30)
+        store = BarStore(root=str(tmp_path), fetcher=single, batch_fetcher=batch,
+                         refresh_seconds=900, clock=clock or _Clock())
+        return store, single, batch
+
+    def test_missing_symbols_share_one_fetch(self, tmp_path):
+        store, single, batch = self._store(tmp_path)
+
+        result = store.get_bars_batch(['msft', 'AAPL', 'NVDA'], '1d', _date(0))
+
+        assert batch.calls == [(('AAPL', 'MSFT', 'NVDA'), BASE - 5 * 3600, None)]
+        assert single.calls == []
+        assert sorted(result) == ['AAPL', 'MSFT', 'NVDA']
+        assert len(result['MSFT']) == 31
+
+        store.get_bars_batch(['AAPL', 'MSFT', 'NVDA'], '1d', _date(0))
+        assert len(batch.calls) == 1
+        assert store.stats()['disk_hits'] == 3
+
+    def test_only_stale_or_missing_symbols_are_fetched(self, tmp_path):
+        store, single, batch = self._store(tmp_path)
+        store.get_bars('AAPL', '1d', _date(0))
+
+        result = store.get_bars_batch(['AAPL', 'MSFT'], '1d', _date(5), _date(10))
+
+        assert [call[0] for call in batch.calls] == [('MSFT',)]
+        assert list(result['AAPL']['t']) == list(BASE + np.arange(5, 10) * DAY)
+        # Single-symbol queries see the bars the batch stored
+        store.get_bars('MSFT', '1d', _date(5))
+        assert len(single.calls) == 1
+
+    def test_cold_symbol_does_not_widen_the_tail_download(self, tmp_path):
+        clock = _Clock()
+        store, _, batch = self._store(tmp_path, clock)
+        batch.last_day = 20
+        store.get_bars_batch(['AAPL', 'MSFT'], '1d', _date(0))
+
+        batch.last_day = 25
+        clock.now += 901
+        result = store.get_bars_batch(['AAPL', 'MSFT', 'NVDA'], '1d', _date(0))
+
+        assert batch.calls[1:] == [(('AAPL', 'MSFT'), BASE + 19 * DAY, None),
+                                   (('NVDA',), BASE - 5 * 3600, None)]
+        assert len(result['AAPL']) == len(result['NVDA']) == 26
+
+    def test_symbol_without_data_is_remembered(self, tmp_path):
+        clock = _Clock()
+        store, _, batch = self._store(tmp_path, clock)
+        batch.unknown = {'BRK.B'}
+
+        first = store.get_bars_batch(['AAPL', 'BRK.B'], '1d', _date(0))
+        clock.now += 901
+        store.get_bars_batch(['AAPL', 'BRK.B'], '1d', _date(0))
+
+        assert len(first['BRK.B']) == 0
+        assert [call[0] for call in batch.calls] == [('AAPL', 'BRK.B'), ('AAPL',)]
+        assert batch.calls[1][1] == BASE + 29 * DAY
+        assert store.stats()['no_data_skips'] == 1
+        assert not list(tmp_path.rglob('BRK.B*'))
+
+        clock.now += store.no_data_seconds
+        store.get_bars_batch(['BRK.B'], '1d', _date(0))
+        assert batch.calls[-1][0] == ('BRK.B',)
+
+    def test_corporate_action_in_batch_tail_refetches_that_key(self, tmp_path):
+        clock = _Clock()
+        store, _, batch = self._store(tmp_path, clock)
+        store.get_bars_batch(['AAPL', 'MSFT'], '1d', _date(0))
+
+        def split_msft(symbols, interval, start_ts, end_ts):
+            result = batch(symbols, interval, start_ts, end_ts)
+            if 'MSFT' in result:
+                result['MSFT'] = result['MSFT'].copy()
+                for field in 'ohlc':
+                    result['MSFT'][field] /= 2
+            return result
+
+        store.batch_fetcher = split_msft
+        clock.now += 901
+        result = store.get_bars_batch(['AAPL', 'MSFT'], '1d', _date(0))
+
+        assert batch.calls[1:] == [(('AAPL', 'MSFT'), BASE + 29 * DAY, None), (('MSFT',), BASE - 5 * 3600, None)]
+        assert store.stats()['adjust_refetches'] == 1
+        assert result['MSFT']['c'][0] == pytest.approx(101 / 2)
+        assert result['AAPL']['c'][0] == 100
+
+    def test_failed_batch_is_not_persisted(self, tmp_path):
+        def down(*args):
+            raise RuntimeError('yahoo down')
+
+        store = BarStore(root=str(tmp_path), fetcher=_FakeUpstream(30), batch_fetcher=down,
+                         refresh_seconds=900, clock=_Clock())
+
+        result = store.get_bars_batch(['AAPL'], '1d', _date(0))
+
+        assert len(result['AAPL']) == 0
+        assert store.stats()['errors'] == 1
+        assert not list(tmp_path.rglob('*.npy'))
+
+    def test_day_change_percents_use_one_batch(self, tmp_path):
+        store, _, batch = self._store(tmp_path)
+        api = YahooFinanceAPI(bar_store=store)
+
+        changes = api.get_day_change_percents(['AAPL', 'MSFT', 'AAPL'], _date(20))
+
+        assert len(batch.calls) == 1
+        assert list(changes) == ['AAPL', 'MSFT']
+        # closes are 100 + day (+1 for MSFT); the window includes the requested day 20
+        assert changes['AAPL'] == pytest.approx((120 / 119 - 1) * 100)
+        assert changes['MSFT'] == pytest.approx((121 / 120 - 1) * 100)
+
+    def test_locks_are_a_fixed_striped_pool(self, tmp_path):
+        import threading
+        store, _, _ = self._store(tmp_path)
+        symbols = [f"S{i}" for i in range(300)]
+        store.get_bars_batch(symbols, '1d', _date(0))
+
+        workers = [threading.Thread(target=store.get_bars, args=(symbol, '1d', _date(0)))
+                   for symbol in symbols[:50]]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(2)
+
+        assert len(store._locks) == 64
+        assert store.stats()['queries'] == 350
+        assert store.stats()['disk_hits'] == 50
+
+
+class TestConversions:
+    def test_frame_round_trip(self):
+        index = pd.date_range('2024-01-02', periods=3, freq='D', tz='America/New_York')
+        frame = pd.DataFrame({'Open': [1.0, 2, 3], 'High': [2.0, 3, 4], 'Low': [0.5, 1, 2],
+                              'Close': [1.5, 2.5, 3.5], 'Volume': [10, float('nan'), 30]}, index=index)
+
+        bars = frame_to_bars(frame)
+        back = bars_to_frame(bars)
+
+        assert list(bars['v']) == [10, 0, 30]
+        assert list(back['Close']) == [1.5, 2.5, 3.5]
+        assert back.index[0].strftime('%Y-%m-%d') == '2024-01-02'
+
+    def test_merge_prefers_new_bars(self):
+        merged = merge_bars(_bars(0, 3), _bars(3, 5, close_offset=1.0))
+
+        assert len(merged) == 6
+        assert merged['c'][3] == 104.0
+
+    def test_split_download_grouped_by_ticker(self):
+        index = pd.date_range('2024-01-02', periods=2, freq='D', tz='America/New_York')
+        columns = pd.MultiIndex.from_product([['AAPL', 'MSFT'], ['Open', 'High', 'Low', 'Close', 'Volume']])
+        data = pd.DataFrame(np.arange(20, dtype='f8').reshape(2, 10), index=index, columns=columns)
+        data.loc[index[0], 'MSFT'] = np.nan
+
+        frames = split_download(data, ['AAPL', 'MSFT', 'NVDA'])
+
+        assert sorted(frames) == ['AAPL', 'MSFT']
+        assert list(frames['AAPL']['Close']) == [3.0, 13.0]
+        assert len(frames['MSFT']) == 1
+
+
+class TestHistoryBatchEndpoint:
+    def _post(self, client, **body):
+        return client.post('/api/history/batch', json={'symbols': ['AAPL'], **body})
+
+    def test_rejects_reversed_and_oversized_ranges(self, client):
+        from app.services.services import RateLimiter
+        with patch('app.routes.stock_data.rate_limiter', RateLimiter(max_requests=100)), \
+                patch('app.routes.stock_data.yahoo_finance_api') as api:
+            api.get_history_batch.return_value = {}
+            reversed_range = self._post(client, start='2024-03-01', end='2024-02-01')
+            intraday = self._post(client, start='2024-01-01', end='2024-04-01', interval='5m')
+            daily = self._post(client, start='2024-01-01', end='2024-04-01')
+
+        assert reversed_range.status_code == 400
+        assert intraday.status_code == 400
+        assert daily.status_code == 200
+        assert api.get_history_batch.call_count == 1
+
+    def test_is_rate_limited(self, client):
+        from app.services.services import RateLimiter
+        with patch('app.routes.stock_data.rate_limiter', RateLimiter(max_requests=2)), \
+                patch('app.routes.stock_data.yahoo_finance_api') as api:
+            api.get_history_batch.return_value = {}
+            statuses = [self._post(client, start='2024-01-01').status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
@@ -0,0 +1,71 @@
+"""
+Unit tests for chart downsampling (LTTB and OHLC buckets).
+"""
+import numpy as np
+import pandas as pd
+
+from app.services.chart_downsample import downsample, lttb_indices, ohlc_buckets
+
+
+def _hist(n):
+    index = pd.date_range('2024-01-02', periods=n, freq='B', tz='America/New_York')
+    close = np.sin(np.linspace(0, 6, n)) * 10 + 100
+    return pd.DataFrame({
+        'Open': close - 0.5, 'High': close + 1, 'Low': close - 1,
+        'Close': close, 'Volume': np.full(n, 10.0),
+    }, index=index)
+
+
+class TestLttb:
+    def test_keeps_endpoints_and_requested_count(self):
+        y = np.random.default_rng(1).normal(size=1000)
+        idx = lttb_indices(y, 100)
+
+        assert len(idx) == 100
+        assert idx[0] == 0 and idx[-1] == 999
+        assert np.all(np.diff(idx) > 0)
+
+    def test_preserves_spikes(self):
+        y = np.zeros(500)
+        y[123] = 50.0
+        y[321] = -40.0
+
+        idx = lttb_indices(y, 20)
+
+        assert 123 in idx and 321 in idx
+
+    def test_small_series_unchanged(self):
+        assert list(lttb_indices(np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+
+
+class TestOhlcBuckets:
+    def test_aggregates_candles(self):
+        hist = _hist(10)
+        hist['High'] = np.arange(10.0)
+        hist['Low'] = -np.arange(10.0)
+
+        out = ohlc_buckets(hist, 2)
+
+        assert len(out) == 2
+        assert out.index[1] == hist.index[5]
+        assert list(out['Open']) == [hist['Open'].iloc[0], hist['Open'].iloc[5]]
+        assert list(out['Close']) == [hist['Close'].iloc[4], hist['Close'].iloc[9]]
+        assert list(out['High']) == [4.0, 9.0]
+        assert list(out['Low']) == [-4.0, -9.0]
+        assert list(out['Volume']) == [50.0, 50.0]
+
+
+class TestDownsample:
+    def test_methods_return_bar_frames(self):
+        hist = _hist(2520)
+
+        lttb = downsample(hist, 300)
+        ohlc = downsample(hist, 300, method='ohlc')
+
+        assert len(lttb) == 300 and len(ohlc) == 300
+        assert list(lttb.columns) == list(hist.columns)
+        assert lttb.index[0] == hist.index[0] and lttb.index[-1] == hist.index[-1]
+
+    def test_noop_when_already_small(self):
+        hist = _hist(50)
+        assert downsample(hist, 300) is hist
@@ -0,0 +1,82 @@
+"""
+Unit tests for the poll-loop fetch scheduler: ordering, fallback, budget sharing and metrics.
+"""
+import threading
+import time
+
+from app.services.fetch_scheduler import PriceFetchScheduler
+
+
+class _Budget:
+    def __init__(self, available):
+        self.available = available
+
+    def available_requests(self):
+        return self.available
+
+
+class TestPriceFetchScheduler:
+    def test_batch_results_and_individual_fallback(self):
+        scheduler = PriceFetchScheduler(max_workers=2, batch_size=2)
+        batch = lambda symbols: {s: {'price': 10.0} for s in symbols if s != 'MISS'}
+        single = lambda symbol: {'name': symbol, 'price': 5.0}
+
+        results = scheduler.run(['AAPL'], ['MSFT', 'MISS'], fetch_batch=batch, fetch_one=single)
+
+        assert results == {'AAPL': {'price': 10.0}, 'MSFT': {'price': 10.0}, 'MISS': {'name': 'MISS', 'price': 5.0}}
+        assert scheduler.stats_counters['batch_calls'] == 2
+        assert scheduler.stats_counters['single_calls'] == 1
+
+    def test_priority_symbols_batched_separately_and_first(self):
+        scheduler = PriceFetchScheduler(max_workers=1, batch_size=50)
+        calls = []
+        scheduler.run(['TSLA'], ['AAPL', 'MSFT'], fetch_batch=lambda b: calls.append(list(b)) or {})
+
+        assert calls[0] == ['TSLA']
+        assert calls[1] == ['AAPL', 'MSFT']
+
+    def test_individual_fetches_run_in_parallel(self):
+        scheduler = PriceFetchScheduler(max_workers=4)
+        barrier = threading.Barrier(4, timeout=2)
+
+        def single(symbol):
+            barrier.wait()
+            return {'price': 1.0}
+
+        results = scheduler.run([], ['A', 'B', 'C', 'D'], fetch_one=single)
+
+        assert len(results) == 4
+
+    def test_budget_caps_calls_and_defers_regular_first(self):
+        scheduler = PriceFetchScheduler(budget=_Budget(2), max_workers=2, batch_size=1)
+        called = []
+
+        def batch(symbols):
+            called.extend(symbols)
+            return {}
+
+        scheduler.run(['P1'], ['R1', 'R2'], fetch_batch=batch, fetch_one=lambda s: called.append(s))
+
+        assert sorted(called) == ['P1', 'R1']
+        # R2 never batched; P1/R1 have no headroom left for the individual fallback
+        assert scheduler.stats_counters['deferred'] == 3
+        assert scheduler.stats_counters['single_calls'] == 0
+
+    def test_errors_are_counted_not_raised(self):
+        scheduler = PriceFetchScheduler(max_workers=2)
+
+        def boom(_):
+            raise RuntimeError('upstream down')
+
+        assert scheduler.run(['AAPL'], [], fetch_batch=boom, fetch_one=boom) == {}
+        assert scheduler.stats_counters['errors'] == 2
+
+    def test_cycle_time_metrics(self):
+        scheduler = PriceFetchScheduler()
+        scheduler.run([], ['A'], fetch_one=lambda s: time.sleep(0.01) or {'price': 1.0})
+        scheduler.record_cycle(0.5)
+
+        stats = scheduler.stats()
+        assert stats['fetch_time']['samples'] == 1
+        assert stats['fetch_time']['p50_ms'] >= 10
+        assert stats['cycle_time']['p50_ms'] == 500.0
@@ -0,0 +1,104 @@
+"""
+Unit tests for Finnhub subscription ranking, rotation and multi-connection packing.
+"""
+import threading
+
+from app.services.finnhub_subscriptions import FinnhubSubscriptionManager
+
+
+def _manager(**kwargs):
+    kwargs.setdefault('capacity_per_connection', 2)
+    kwargs.setdefault('min_hold_seconds', 0)
+    return FinnhubSubscriptionManager(clock=lambda: 0.0, **kwargs)
+
+
+class TestPlanning:
+    def test_subscribes_hottest_symbols_within_capacity(self):
+        manager = _manager()
+        watchers = {'AAPL': 5, 'MSFT': 3, 'TSLA': 1}
+        manager.touch(watchers, now=1.0)
+
+        subscribe, unsubscribe = manager.plan(watchers.get, now=1.0)
+
+        assert sorted(s for _, s in subscribe) == ['AAPL', 'MSFT']
+        assert unsubscribe == []
+        assert manager.coverage() == 2 / 3
+
+    def test_active_symbol_outranks_watcher_count(self):
+        manager = _manager()
+        watchers = {'AAPL': 5, 'MSFT': 3, 'TSLA': 0}
+        manager.touch(['AAPL', 'MSFT'], now=1.0)
+        manager.plan(watchers.get, now=1.0)
+
+        subscribe, unsubscribe = manager.plan(watchers.get, active={'TSLA'}, now=2.0)
+
+        assert subscribe == [(0, 'TSLA')]
+        assert unsubscribe == [(0, 'MSFT')]
+        assert manager.rotations == 1
+
+    def test_recency_breaks_watcher_ties(self):
+        manager = _manager(capacity_per_connection=1)
+        manager.touch(['AAPL'], now=1.0)
+        manager.touch(['MSFT'], now=2.0)
+
+        subscribe, _ = manager.plan(lambda s: 1, now=2.0)
+
+        assert subscribe == [(0, 'MSFT')]
+
+    def test_min_hold_prevents_immediate_rotation(self):
+        manager = _manager(capacity_per_connection=1, min_hold_seconds=30)
+        manager.touch(['AAPL'], now=0.0)
+        manager.plan(lambda s: 1, now=0.0)
+
+        manager.touch(['MSFT'], now=10.0)
+        assert manager.plan(lambda s: 5 if s == 'MSFT' else 1, now=10.0) == ([], [])
+
+        subscribe, unsubscribe = manager.plan(lambda s: 5 if s == 'MSFT' else 1, now=31.0)
+        assert subscribe == [(0, 'MSFT')]
+        assert unsubscribe == [(0, 'AAPL')]
+
+    def test_forgotten_symbol_is_unsubscribed_and_slot_reused(self):
+        manager = _manager(capacity_per_connection=1, min_hold_seconds=300)
+        manager.touch(['AAPL', 'MSFT'], now=0.0)
+        manager.plan({'AAPL': 2, 'MSFT': 1}.get, now=0.0)
+
+        manager.forget('AAPL')
+        subscribe, unsubscribe = manager.plan({'MSFT': 1}.get, now=1.0)
+
+        assert unsubscribe == [(0, 'AAPL')]
+        assert subscribe == [(0, 'MSFT')]
+        assert manager.coverage() == 1.0
+
+    def test_spreads_symbols_across_connections(self):
+        manager = _manager(connections=2)
+        symbols = ['A', 'B', 'C', 'D', 'E']
+        manager.touch(symbols, now=0.0)
+
+        subscribe, _ = manager.plan(lambda s: 1, now=0.0)
+
+        assert len(subscribe) == 4
+        assert len(manager.subscribed(0)) == 2
+        assert len(manager.subscribed(1)) == 2
+        assert manager.stats()['coverage'] == 0.8
+
+    def test_coverage_is_full_when_nothing_wanted(self):
+        assert _manager().coverage() == 1.0
+
+    def test_touch_from_another_thread_waits_for_plan(self):
+        manager = _manager()
+        manager.touch(['AAPL'], now=0.0)
+        toucher = threading.Thread(target=manager.touch, args=(['MSFT'],))
+        blocked = []
+
+        def watchers(symbol):
+            if not toucher.is_alive() and not blocked:
+                toucher.start()
+                toucher.join(0.1)
+                blocked.append(toucher.is_alive())
+            return 1
+
+        manager.plan(watchers, now=0.0)
+        toucher.join()
+
+        assert blocked == [True]
+        assert manager.stats()['wanted'] == 2
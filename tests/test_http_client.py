@@ -0,0 +1,120 @@
+"""
+Tests for the pooled upstream HTTP client, run against a local stub server.
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.http_client import HttpClient, LatencyRecorder, AsyncHttpClient
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        if self.path.startswith('/fail'):
+            self._reply(503, {'error': 'unavailable'})
+        else:
+            self._reply(200, {'path': self.path})
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        length = int(self.headers.get('Content-Length', 0))
+        self._reply(200, json.loads(self.rfile.read(length) or b'{}'))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.connections = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpClient:
+    def test_get_and_post_round_trip(self, stub_server):
+        _, base = stub_server
+        client = HttpClient()
+
+        assert client.get(f"{base}/quote", params={'s': 'AAPL'}, timeout=2).json() == {'path': '/quote?s=AAPL'}
+        assert client.post(f"{base}/chat", json={'q': 1}, timeout=2).json() == {'q': 1}
+
+    def test_sequential_calls_reuse_one_connection(self, stub_server):
+        server, base = stub_server
+        client = HttpClient()
+
+        for _ in range(5):
+            assert client.get(f"{base}/ping", timeout=2).status_code == 200
+
+        assert len(server.connections) == 1
+
+    def test_latency_and_errors_recorded_per_host(self, stub_server):
+        _, base = stub_server
+        recorder = LatencyRecorder()
+        client = HttpClient(recorder=recorder)
+
+        client.get(f"{base}/ok", timeout=2)
+        response = client.get(f"{base}/fail", timeout=2)
+
+        assert response.status_code == 503
+        stats = recorder.stats()[base.split('//')[1]]
+        assert stats['calls'] == 2
+        assert stats['errors'] == 1
+        assert stats['p99_ms'] > 0
+
+    def test_connection_errors_are_raised_and_counted(self):
+        recorder = LatencyRecorder()
+        client = HttpClient(recorder=recorder)
+
+        with pytest.raises(Exception):
+            client.get('http://127.0.0.1:9/unreachable', timeout=0.5)
+
+        assert recorder.stats()['127.0.0.1:9']['errors'] == 1
+
+
+class TestAsyncHttpClient:
+    def test_async_get(self, stub_server):
+        pytest.importorskip('httpx')
+        _, base = stub_server
+        recorder = LatencyRecorder()
+
+        async def fetch():
+            client = AsyncHttpClient(recorder)
+            try:
+                return (await client.get(f"{base}/async")).json()
+            finally:
+                await client.aclose()
+
+        assert asyncio.run(fetch()) == {'path': '/async'}
+        assert recorder.stats()[base.split('//')[1]]['calls'] == 1
+
+    def test_missing_httpx_raises_runtime_error(self, monkeypatch):
+        import builtins
+        real_import = builtins.__import__
+
+        def no_httpx(name, *args, **kwargs):
+            if name == 'httpx':
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, '__import__', no_httpx)
+        with pytest.raises(RuntimeError):
+            AsyncHttpClient(LatencyRecorder())
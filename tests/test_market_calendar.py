@@ -0,0 +1,62 @@
+"""
+Unit tests for the NYSE calendar and the market-hours-aware TTL/poll timings.
+"""
+from datetime import date, datetime
+
+from app.services import market_calendar as cal
+
+
+def _et(*args):
+    return datetime(*args, tzinfo=cal.ET)
+
+
+class TestHolidays:
+    def test_2024_full_closures(self):
+        assert set(cal.holidays(2024)) == {
+            date(2024, 1, 1), date(2024, 1, 15), date(2024, 2, 19), date(2024, 3, 29),
+            date(2024, 5, 27), date(2024, 6, 19), date(2024, 7, 4), date(2024, 9, 2),
+            date(2024, 11, 28), date(2024, 12, 25),
+        }
+
+    def test_weekend_holidays_are_observed(self):
+        # Juneteenth 2022 fell on a Sunday; New Year's Day 2022 on a Saturday is not observed
+        assert date(2022, 6, 20) in cal.holidays(2022)
+        assert cal.is_trading_day(date(2021, 12, 31))
+
+    def test_early_closes(self):
+        assert set(cal.early_closes(2024)) == {date(2024, 7, 3), date(2024, 11, 29), date(2024, 12, 24)}
+
+
+class TestSessions:
+    def test_sessions_through_a_trading_day(self):
+        assert cal.current_session(_et(2024, 3, 5, 3, 0)) == cal.SESSION_CLOSED
+        assert cal.current_session(_et(2024, 3, 5, 8, 0)) == cal.SESSION_PRE
+        assert cal.current_session(_et(2024, 3, 5, 9, 30)) == cal.SESSION_REGULAR
+        assert cal.current_session(_et(2024, 3, 5, 16, 0)) == cal.SESSION_POST
+        assert cal.current_session(_et(2024, 3, 5, 20, 0)) == cal.SESSION_CLOSED
+
+    def test_early_close_day(self):
+        assert cal.current_session(_et(2024, 11, 29, 13, 30)) == cal.SESSION_POST
+
+    def test_holiday_status_points_to_next_open(self):
+        status = cal.market_status(_et(2024, 3, 29, 11, 0))
+
+        assert status['isOpen'] is False
+        assert status['holiday'] == "Good Friday"
+        assert status['next_open'] == _et(2024, 4, 1, 9, 30).isoformat()
+
+
+class TestAdaptiveTimings:
+    def test_quote_ttl_by_session(self):
+        assert cal.quote_ttl(_et(2024, 3, 5, 11, 0)) == cal.QUOTE_TTL_REGULAR_SECONDS
+        assert cal.quote_ttl(_et(2024, 3, 5, 17, 0)) == cal.QUOTE_TTL_EXTENDED_SECONDS
+
+    def test_closed_quote_ttl_covers_time_since_last_session(self):
+        # Saturday noon: last session ended Friday 20:00
+        assert cal.quote_ttl(_et(2024, 3, 9, 12, 0)) == 16 * 3600
+
+    def test_poll_interval_backs_off_when_closed(self):
+        assert cal.poll_interval(_et(2024, 3, 5, 11, 0)) == cal.POLL_INTERVAL_REGULAR_SECONDS
+        assert cal.poll_interval(_et(2024, 3, 9, 12, 0)) == cal.POLL_INTERVAL_CLOSED_SECONDS
+        # Just before pre-market opens the loop wakes up in time
+        assert cal.poll_interval(_et(2024, 3, 5, 3, 59)) == 60
@@ -0,0 +1,61 @@
+"""
+Unit tests for vectorised OHLCV serialisation.
+"""
+import pandas as pd
+
+from app.services.ohlcv_serializer import close_records, ohlcv_columns, ohlcv_records
+
+
+def _hist(index):
+    n = len(index)
+    return pd.DataFrame({
+        'Open': [1.5 + i for i in range(n)],
+        'High': [2.0 + i for i in range(n)],
+        'Low': [1.0 + i for i in range(n)],
+        'Close': [1.75 + i for i in range(n)],
+        'Volume': [100.0 * (i + 1) for i in range(n)],
+    }, index=index)
+
+
+def _row_loop(hist, fmt):
+    return [{
+        'date': date.strftime(fmt),
+        'open': float(row['Open']), 'high': float(row['High']),
+        'low': float(row['Low']), 'close': float(row['Close']),
+        'volume': int(row['Volume']) if row['Volume'] else 0,
+    } for date, row in hist.iterrows()]
+
+
+class TestOhlcvSerializer:
+    def test_daily_records_match_row_loop(self):
+        hist = _hist(pd.date_range('2024-03-01', periods=5, freq='B', tz='America/New_York'))
+        assert ohlcv_records(hist) == _row_loop(hist, '%Y-%m-%d')
+
+    def test_intraday_records_use_market_wall_time(self):
+        hist = _hist(pd.date_range('2024-03-01 09:30', periods=4, freq='5min', tz='America/New_York'))
+        records = ohlcv_records(hist, intraday=True)
+
+        assert records == _row_loop(hist, '%Y-%m-%d %H:%M')
+        assert records[0]['date'] == '2024-03-01 09:30'
+
+    def test_naive_index_and_missing_volume(self):
+        hist = _hist(pd.date_range('2024-03-01', periods=2, freq='D'))
+        hist.loc[hist.index[1], 'Volume'] = float('nan')
+
+        records = ohlcv_records(hist)
+        assert [r['volume'] for r in records] == [100, 0]
+        assert isinstance(records[0]['volume'], int)
+
+    def test_columnar_shape(self):
+        hist = _hist(pd.date_range('2024-03-01', periods=3, freq='B', tz='America/New_York'))
+        columns = ohlcv_columns(hist)
+
+        assert set(columns) == {'t', 'o', 'h', 'l', 'c', 'v'}
+        assert columns['t'] == ['2024-03-01', '2024-03-04', '2024-03-05']
+        assert columns['c'] == [1.75, 2.75, 3.75]
+        assert columns['v'] == [100, 200, 300]
+
+    def test_close_records_and_empty_frame(self):
+        hist = _hist(pd.date_range('2024-03-01', periods=2, freq='D', tz='America/New_York'))
+        assert close_records(hist) == [{'date': '2024-03-01', 'close': 1.75}, {'date': '2024-03-02', 'close': 2.75}]
+        assert ohlcv_records(hist.iloc[0:0]) == []
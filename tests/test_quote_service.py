@@ -0,0 +1,125 @@
+"""
+Unit tests for QuoteService: source routing, Alpaca→Yahoo fallback and
+in-flight coalescing of concurrent lookups.
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+
+from app.services.quote_service import QuoteService, SOURCE_ALPACA, SOURCE_YAHOO
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class SlowApi:
+    """Fake upstream that blocks until released and counts calls."""
+
+    def __init__(self, price=100.0):
+        self.calls = 0
+        self.price = price
+        self.release = threading.Event()
+
+    def get_real_time_data(self, symbol):
+        self.calls += 1
+        self.release.wait(timeout=2)
+        return {'name': symbol, 'price': self.price}
+
+
+def _run_concurrently(fn, count):
+    results = [None] * count
+
+    def worker(i):
+        results[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+# ---------------------------------------------------------------------------
+# Source routing
+# ---------------------------------------------------------------------------
+
+class TestSourceRouting:
+    def test_auto_prefers_alpaca(self):
+        alpaca = MagicMock()
+        alpaca.get_real_time_data.return_value = {'name': 'Apple', 'price': 190.0}
+        yahoo = MagicMock()
+        svc = QuoteService(yahoo, alpaca)
+
+        result = svc.get_real_time_data('aapl')
+
+        assert result['price'] == 190.0
+        alpaca.get_real_time_data.assert_called_once_with('AAPL')
+        yahoo.get_real_time_data.assert_not_called()
+
+    def test_auto_falls_back_to_yahoo(self):
+        alpaca = MagicMock()
+        alpaca.get_real_time_data.return_value = None
+        yahoo = MagicMock()
+        yahoo.get_real_time_data.return_value = {'name': 'Apple', 'price': 189.0}
+        svc = QuoteService(yahoo, alpaca)
+
+        assert svc.get_real_time_data('AAPL')['price'] == 189.0
+
+    def test_alpaca_source_without_alpaca_returns_none(self):
+        svc = QuoteService(MagicMock(), None)
+        assert svc.get_real_time_data('AAPL', source=SOURCE_ALPACA) is None
+
+    def test_upstream_exception_returns_none(self):
+        yahoo = MagicMock()
+        yahoo.get_real_time_data.side_effect = RuntimeError("boom")
+        svc = QuoteService(yahoo)
+
+        assert svc.get_real_time_data('AAPL', source=SOURCE_YAHOO) is None
+        assert svc.get_stats()['errors'] == 1
+
+
+# ---------------------------------------------------------------------------
+# Coalescing
+# ---------------------------------------------------------------------------
+
+class TestCoalescing:
+    def test_concurrent_requests_share_one_upstream_call(self):
+        yahoo = SlowApi()
+        svc = QuoteService(yahoo)
+
+        threads, results = _run_concurrently(
+            lambda: svc.get_real_time_data('AAPL', source=SOURCE_YAHOO), 10
+        )
+        time.sleep(0.1)
+        yahoo.release.set()
+        for t in threads:
+            t.join()
+
+        assert yahoo.calls == 1
+        assert all(r == {'name': 'AAPL', 'price': 100.0} for r in results)
+        stats = svc.get_stats()
+        assert stats['coalesced'] == 9
+        assert stats['in_flight'] == 0
+
+    def test_sequential_requests_are_not_coalesced(self):
+        yahoo = SlowApi()
+        yahoo.release.set()
+        svc = QuoteService(yahoo)
+
+        svc.get_real_time_data('AAPL', source=SOURCE_YAHOO)
+        svc.get_real_time_data('AAPL', source=SOURCE_YAHOO)
+
+        assert yahoo.calls == 2
+
+    def test_batch_dedupes_symbols_and_returns_prices(self):
+        alpaca = MagicMock()
+        alpaca.get_batch_snapshots.return_value = {
+            'AAPL': {'name': 'Apple', 'price': 190.0},
+        }
+        svc = QuoteService(MagicMock(), alpaca)
+
+        result = svc.get_batch_quotes(['AAPL', 'aapl', 'MSFT'])
+
+        alpaca.get_batch_snapshots.assert_called_once_with(['AAPL', 'MSFT'])
+        assert result == {'AAPL': {'name': 'Apple', 'price': 190.0}}
+        assert svc.get_stats()['in_flight'] == 0
@@ -0,0 +1,124 @@
+"""
+Unit tests for the refresh-ahead cache: stale-while-revalidate, single-flight and scheduled refreshes.
+"""
+import threading
+import time
+
+from app.services.refresh_ahead import RefreshAheadCache
+from app.services.stock import SmartCache
+
+
+def _cache(namespace):
+    return SmartCache(default_ttl=600, namespace=namespace, retention=3600, sweep=False)
+
+
+def _age(cache, key, value, seconds):
+    cache._store(key, value, time.time() - seconds)
+
+
+class TestRefreshAheadCache:
+    def test_cold_key_is_computed_once_for_concurrent_readers(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return ['movers']
+
+        overview = RefreshAheadCache(_cache('ra-cold'), ttl=600, refresh_ahead=60)
+        overview.register('top_movers', compute)
+        results = []
+        readers = [threading.Thread(target=lambda: results.append(overview.get('top_movers'))) for _ in range(5)]
+        readers[0].start()
+        started.wait(2)
+        for reader in readers[1:]:
+            reader.start()
+        time.sleep(0.05)
+        release.set()
+        for reader in readers:
+            reader.join(2)
+
+        assert calls == [1]
+        assert results == [['movers']] * 5
+        assert overview.stats()['coalesced'] == 4
+
+    def test_stale_value_is_served_while_one_refresh_runs(self):
+        cache = _cache('ra-stale')
+        _age(cache, 'top_movers', ['old'], 700)
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(2)
+            return ['new']
+
+        overview = RefreshAheadCache(cache, ttl=600, refresh_ahead=60)
+        overview.register('top_movers', compute)
+
+        assert overview.get('top_movers') == ['old']
+        assert overview.get('top_movers') == ['old']
+        release.set()
+        for _ in range(100):
+            if cache.get('top_movers', max_age=600) is not None:
+                break
+            time.sleep(0.01)
+
+        assert calls == [1]
+        assert overview.get('top_movers') == ['new']
+
+    def test_failed_refresh_keeps_previous_value(self):
+        cache = _cache('ra-fail')
+        _age(cache, 'sectors', ['old'], 700)
+
+        def compute():
+            raise RuntimeError('yahoo down')
+
+        overview = RefreshAheadCache(cache, ttl=600, refresh_ahead=60)
+        overview.register('sectors', compute)
+
+        assert overview.refresh('sectors') == ['old']
+        assert cache.get_stale('sectors') == ['old']
+        assert overview.stats()['errors'] == 1
+
+    def test_refresh_due_only_touches_keys_close_to_expiry(self):
+        cache = _cache('ra-due')
+        _age(cache, 'young', 1, 100)
+        _age(cache, 'nearly_expired', 1, 560)
+        calls = []
+        overview = RefreshAheadCache(cache, ttl=600, refresh_ahead=60)
+        overview.register('young', lambda: calls.append('young') or 2)
+        overview.register('nearly_expired', lambda: calls.append('nearly_expired') or 2)
+        overview.get('young')
+        overview.get('nearly_expired')
+
+        overview.refresh_due()
+
+        assert calls == ['nearly_expired']
+        assert cache.get('nearly_expired', max_age=60) == 2
+
+    def test_refresh_due_skips_unread_keys_and_inactive_periods(self):
+        cache = _cache('ra-idle')
+        _age(cache, 'read', 1, 560)
+        _age(cache, 'unread', 1, 560)
+        calls = []
+        open_market = [False]
+        overview = RefreshAheadCache(cache, ttl=600, refresh_ahead=60, active=lambda: open_market[0])
+        overview.register('read', lambda: calls.append('read') or 2)
+        overview.register('unread', lambda: calls.append('unread') or 2)
+        overview.get('read')
+
+        overview.refresh_due()
+        assert calls == []
+
+        open_market[0] = True
+        overview.refresh_due()
+        assert calls == ['read']
+
+        overview._last_read['read'] -= 601
+        _age(cache, 'read', 1, 560)
+        overview.refresh_due()
+        assert calls == ['read']
@@ -0,0 +1,133 @@
+"""
+Unit tests for the Alpaca token-bucket RequestQueue: pacing, priority lanes, futures and stats.
+"""
+import threading
+
+from app.services.stock import (
+    RequestQueue, request_lane, current_lane,
+    LANE_INTERACTIVE, LANE_SOCKET_PRIORITY, LANE_BACKGROUND,
+)
+
+
+def _drained(rate_per_minute=1200):
+    queue = RequestQueue(max_requests_per_minute=rate_per_minute, burst=1)
+    assert queue.acquire(LANE_INTERACTIVE)
+    return queue
+
+
+class TestTokenBucket:
+    def test_burst_is_served_immediately_then_paced(self):
+        queue = RequestQueue(max_requests_per_minute=60, burst=2)
+
+        assert queue.acquire(LANE_INTERACTIVE, timeout=0)
+        assert queue.acquire(LANE_INTERACTIVE, timeout=0)
+        assert not queue.can_make_request()
+        assert 0 < queue.get_wait_time() <= 1.0
+
+    def test_acquire_times_out_and_counts_drop(self):
+        queue = _drained(rate_per_minute=6)
+
+        assert queue.acquire(LANE_BACKGROUND, timeout=0.05) is False
+        assert queue.get_stats()['dropped_requests'] == 1
+        assert queue.queue_depth() == 0
+
+    def test_rate_limited_response_empties_bucket(self):
+        queue = RequestQueue(max_requests_per_minute=60, burst=5)
+        queue.note_rate_limited()
+
+        assert not queue.can_make_request()
+        assert queue.get_stats()['rate_limited'] == 1
+
+    def test_get_stats_does_not_deadlock(self):
+        queue = RequestQueue()
+        queue.record_request()
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(queue.get_stats()))
+        worker.start()
+        worker.join(timeout=2)
+
+        assert not worker.is_alive()
+        assert result['total_requests'] == 1
+        assert result['requests_last_minute'] == 1
+        assert queue.available_requests() == queue.burst
+
+    def test_available_requests_follow_tokens_and_queue(self):
+        queue = RequestQueue(max_requests_per_minute=6, burst=3)
+        queue.acquire(LANE_INTERACTIVE, timeout=0)
+
+        assert queue.available_requests() == 2
+        queue.acquire(LANE_INTERACTIVE, timeout=0)
+        queue.acquire(LANE_INTERACTIVE, timeout=0)
+        queue.submit(lambda: None)
+        assert queue.available_requests() == 0
+
+
+class TestLanes:
+    def test_submit_returns_future_with_result(self):
+        queue = RequestQueue()
+        assert queue.submit(lambda: 42).result(timeout=2) == 42
+
+    def test_submit_propagates_exceptions(self):
+        queue = RequestQueue()
+
+        def boom():
+            raise ValueError('bad')
+
+        future = queue.submit(boom)
+        assert isinstance(future.exception(timeout=2), ValueError)
+
+    def test_interactive_lane_is_served_before_background(self):
+        queue = _drained()
+        order = []
+        background = queue.submit(lambda: order.append('background'), lane=LANE_BACKGROUND)
+        socket = queue.submit(lambda: order.append('socket'), lane=LANE_SOCKET_PRIORITY)
+        interactive = queue.submit(lambda: order.append('interactive'), lane=LANE_INTERACTIVE)
+
+        for future in (background, socket, interactive):
+            future.result(timeout=2)
+
+        assert order == ['interactive', 'socket', 'background']
+
+    def test_cancel_withdraws_a_queued_request(self):
+        queue = _drained(rate_per_minute=6)
+        ran = []
+        future = queue.submit(lambda: ran.append(True))
+
+        assert queue.cancel(future) is True
+        assert queue.queue_depth() == 0
+        assert queue.get_stats()['dropped_requests'] == 1
+        assert queue.cancel(queue.submit(lambda: None)) is True
+        assert ran == []
+
+    def test_try_submit_runs_only_when_a_token_is_free(self):
+        queue = RequestQueue(max_requests_per_minute=6, burst=1)
+
+        assert queue.try_submit(lambda: 42).result(timeout=2) == 42
+        assert queue.try_submit(lambda: 43) is None
+        assert queue.get_stats()['dropped_requests'] == 1
+        assert queue.queue_depth() == 0
+
+    def test_stats_expose_depth_and_wait_histogram(self):
+        queue = _drained()
+        futures = [queue.submit(lambda: None, lane=LANE_BACKGROUND) for _ in range(3)]
+        for future in futures:
+            future.result(timeout=2)
+
+        lanes = queue.get_stats()['lanes']
+        assert lanes['background']['max_depth'] == 3
+        assert lanes['background']['depth'] == 0
+        assert sum(lanes['background']['wait_histogram'].values()) == 3
+        assert sum(lanes['interactive']['wait_histogram'].values()) == 1
+
+
+class TestRequestLaneContext:
+    def test_default_lane_is_interactive(self):
+        assert current_lane() == LANE_INTERACTIVE
+
+    def test_context_sets_and_restores_lane(self):
+        with request_lane(LANE_BACKGROUND):
+            assert current_lane() == LANE_BACKGROUND
+            with request_lane(LANE_SOCKET_PRIORITY):
+                assert current_lane() == LANE_SOCKET_PRIORITY
+            assert current_lane() == LANE_BACKGROUND
+        assert current_lane() == LANE_INTERACTIVE
@@ -0,0 +1,200 @@
+"""
+Unit tests for the precomputed returns / correlation matrices.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.market_calendar import ET
+from app.services.returns_matrix import ReturnsMatrix
+
+INDEX = pd.bdate_range('2024-01-02', '2024-03-28', tz='America/New_York')
+
+
+def _closes():
+    n = len(INDEX)
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        'AAPL': 100 * 1.01 ** np.arange(n),
+        'MSFT': 300 - np.arange(n, dtype='f8'),
+        'NVDA': 500 + rng.normal(0, 5, n).cumsum(),
+    }, index=INDEX)
+
+
+class _Provider:
+    def __init__(self, closes):
+        self.closes = closes
+        self.calls = []
+
+    def __call__(self, symbols, start_date):
+        self.calls.append((tuple(symbols), start_date))
+        return self.closes[[s for s in symbols if s in self.closes.columns]]
+
+
+def _matrix(tmp_path, now=datetime(2024, 3, 28, 18, 0, tzinfo=ET)):
+    provider = _Provider(_closes())
+    matrix = ReturnsMatrix(root=str(tmp_path), close_provider=provider,
+                           universe_provider=lambda: ['AAPL', 'MSFT', 'NVDA'], now=lambda: now)
+    assert matrix.rebuild()
+    return matrix, provider
+
+
+class TestReturnsMatrix:
+    def test_day_changes_read_the_session_column(self, tmp_path):
+        matrix, _ = _matrix(tmp_path)
+
+        changes = matrix.day_changes(['msft', 'AAPL'], '2024-03-27')
+
+        assert list(changes) == ['MSFT', 'AAPL']
+        assert changes['AAPL'] == pytest.approx(1.0)
+        # MSFT closes fall by 1 a day; 2024-03-27 is the 62nd bar (index 61)
+        assert changes['MSFT'] == pytest.approx((239 / 240 - 1) * 100)
+
+    def test_weekend_date_uses_previous_session(self, tmp_path):
+        matrix, _ = _matrix(tmp_path)
+
+        assert matrix.day_changes(['MSFT'], '2024-03-24') == matrix.day_changes(['MSFT'], '2024-03-22')
+
+    def test_unknown_symbols_and_open_sessions_go_to_fallback(self, tmp_path):
+        matrix, _ = _matrix(tmp_path, now=datetime(2024, 3, 28, 12, 0, tzinfo=ET))
+        calls = []
+
+        def fallback(symbols, date_str):
+            calls.append((tuple(symbols), date_str))
+            return {s: 9.0 for s in symbols}
+
+        changes = matrix.day_changes(['AAPL', 'TSLA'], '2024-03-27', fallback=fallback)
+        assert changes == {'AAPL': pytest.approx(1.0), 'TSLA': 9.0}
+
+        # 2024-03-28 has not closed yet at noon, so the whole query is live
+        changes = matrix.day_changes(['AAPL', 'TSLA'], '2024-03-28', fallback=fallback)
+        assert changes == {'AAPL': 9.0, 'TSLA': 9.0}
+        assert calls == [(('TSLA',), '2024-03-27'), (('AAPL', 'TSLA'), '2024-03-28')]
+
+    def test_correlation_is_a_slice_of_the_trailing_window(self, tmp_path):
+        matrix, _ = _matrix(tmp_path)
+        closes = _closes()
+        window = closes[closes.index >= closes.index[-1] - pd.Timedelta(days=90)]
+
+        corr = matrix.correlation(['NVDA', 'AAPL'])
+
+        np.testing.assert_allclose(corr, window[['NVDA', 'AAPL']].corr().to_numpy())
+        assert matrix.correlation(['AAPL', 'TSLA']) is None
+
+    def test_matrices_are_reloaded_from_disk(self, tmp_path):
+        matrix, _ = _matrix(tmp_path)
+
+        reloaded = ReturnsMatrix(root=str(tmp_path))
+
+        assert isinstance(reloaded._snapshot.returns, np.memmap)
+        assert reloaded.day_changes(['AAPL', 'NVDA'], '2024-02-14') == matrix.day_changes(['AAPL', 'NVDA'], '2024-02-14')
+        assert reloaded.stats()['complete_through'] == '2024-03-28'
+
+    def test_needs_rebuild_after_next_close_or_new_symbol(self, tmp_path):
+        now = [datetime(2024, 3, 28, 18, 0, tzinfo=ET)]
+        matrix = ReturnsMatrix(root=str(tmp_path), close_provider=_Provider(_closes()), now=lambda: now[0])
+        assert matrix.needs_rebuild()
+        matrix.rebuild(['AAPL', 'MSFT'])
+
+        assert not matrix.needs_rebuild(['AAPL'])
+        assert matrix.needs_rebuild(['AAPL', 'NVDA'])
+        # Good Friday is a holiday; the next close is Monday's
+        now[0] = datetime(2024, 3, 29, 18, 0, tzinfo=ET)
+        assert not matrix.needs_rebuild()
+        now[0] = datetime(2024, 4, 1, 16, 30, tzinfo=ET)
+        assert matrix.needs_rebuild()
+
+    def test_unresolvable_symbols_do_not_force_rebuilds(self, tmp_path):
+        now = datetime(2024, 3, 28, 18, 0, tzinfo=ET)
+        matrix = ReturnsMatrix(root=str(tmp_path), close_provider=_Provider(_closes()), now=lambda: now)
+        matrix.rebuild(['AAPL', 'DELISTED'])
+
+        assert not matrix.needs_rebuild(['AAPL', 'DELISTED'])
+        assert matrix.needs_rebuild(['AAPL', 'DELISTED', 'MSFT'])
+        assert matrix.stats()['unresolved'] == 1
+        assert not ReturnsMatrix(root=str(tmp_path), now=lambda: now).needs_rebuild(['DELISTED'])
+
+    def test_full_universe_is_only_read_once_per_session(self, tmp_path):
+        now = [datetime(2024, 3, 27, 18, 0, tzinfo=ET)]
+        reads, recent = [], []
+
+        def universe():
+            reads.append(now[0])
+            return ['AAPL', 'MSFT']
+
+        provider = _Provider(_closes())
+        matrix = ReturnsMatrix(root=str(tmp_path), close_provider=provider, universe_provider=universe,
+                               recent_symbols_provider=lambda: recent, now=lambda: now[0])
+
+        assert matrix.refresh() is True
+        assert matrix.refresh() is False
+        recent.append('NVDA')
+        assert matrix.refresh() is True
+        assert provider.calls[-1][0] == ('AAPL', 'MSFT', 'NVDA')
+        assert len(reads) == 1
+
+        now[0] = datetime(2024, 3, 28, 18, 0, tzinfo=ET)
+        assert matrix.refresh() is True
+        assert len(reads) == 2
+
+
+class TestUniverse:
+    def test_share_classes_are_requested_with_yahoo_tickers(self, tmp_path):
+        from app.services.bar_store import BarStore
+        from app.services.stock import YahooFinanceAPI
+        requested = []
+
+        def batch(symbols, interval, start_ts, end_ts):
+            requested.extend(symbols)
+            return {s: _closes_bars() for s in symbols}
+
+        store = BarStore(root=str(tmp_path), fetcher=lambda *a: None, batch_fetcher=batch)
+        closes = YahooFinanceAPI(bar_store=store).get_close_frame(['BRK.B', 'AAPL'], '2024-01-02')
+
+        assert sorted(requested) == ['AAPL', 'BRK-B']
+        assert sorted(closes.columns) == ['AAPL', 'BRK.B']
+
+    def test_constituents_fall_back_to_snapshot_and_retry_daily(self):
+        from app.services.index_constituents import SP500_SYMBOLS, ConstituentCache
+        calls = []
+        clock = [0.0]
+
+        def premium_only():
+            calls.append(clock[0])
+            return [] if len(calls) == 1 else ['aapl', 'MSFT']
+
+        cache = ConstituentCache(premium_only, clock=lambda: clock[0])
+
+        assert cache.get() == list(SP500_SYMBOLS)
+        assert 'BRK.B' in cache.get()
+        assert len(calls) == 1
+        clock[0] += cache.refresh_seconds
+        assert cache.get() == ['AAPL', 'MSFT']
+
+    def test_sp500_top_performer_uses_the_cached_constituents(self, client):
+        from unittest.mock import patch
+        import app.routes.market as market
+        seen = []
+
+        def day_changes(symbols, date_str, fallback=None):
+            seen.extend(symbols)
+            return {'AAPL': 1.5, 'MSFT': 2.5}
+
+        with patch.object(market.sp500_constituents, 'get', return_value=['AAPL', 'MSFT']), \
+                patch.object(market.finnhub_api, 'get_index_constituents',
+                             side_effect=AssertionError("asked Finnhub")), \
+                patch.object(market.returns_matrix, 'day_changes', side_effect=day_changes):
+            resp = client.get('/api/market/top-performer?date=2024-03-27&universe=sp500')
+
+        assert resp.status_code == 200
+        assert resp.get_json()['top_symbol'] == 'MSFT'
+        assert seen == ['AAPL', 'MSFT']
+
+
+def _closes_bars():
+    from app.services.bar_store import frame_to_bars
+    frame = pd.DataFrame({'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': np.arange(5, dtype='f8') + 1,
+                          'Volume': 10}, index=INDEX[:5])
+    return frame_to_bars(frame)
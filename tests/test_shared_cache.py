@@ -0,0 +1,86 @@
+"""
+Unit tests for the shared (L2) SmartCache tier and its in-memory stand-in.
+"""
+import time
+
+from app.services.shared_cache import InMemoryCacheBackend
+from app.services.stock import SmartCache
+
+
+# ---------------------------------------------------------------------------
+# Backend
+# ---------------------------------------------------------------------------
+
+class TestInMemoryBackend:
+    def test_round_trip_keeps_write_timestamp(self):
+        backend = InMemoryCacheBackend()
+        backend.set("k", {"price": 1.5}, timestamp=123.0, ttl=60)
+
+        assert backend.get("k") == ({"price": 1.5}, 123.0)
+
+    def test_expired_entries_are_dropped(self):
+        backend = InMemoryCacheBackend()
+        backend.set("k", 1, timestamp=time.time(), ttl=0)
+
+        assert backend.get("k") is None
+
+    def test_unserialisable_values_are_skipped(self):
+        backend = InMemoryCacheBackend()
+
+        assert backend.set("k", object(), timestamp=time.time(), ttl=60) is False
+        assert backend.get("k") is None
+
+
+# ---------------------------------------------------------------------------
+# SmartCache L1/L2
+# ---------------------------------------------------------------------------
+
+class TestSmartCacheSharedTier:
+    def test_second_worker_reads_value_written_by_first(self):
+        backend = InMemoryCacheBackend()
+        worker_a = SmartCache(default_ttl=30, namespace="yahoo", shared=backend)
+        worker_b = SmartCache(default_ttl=30, namespace="yahoo", shared=backend)
+
+        worker_a.set("price:AAPL", {"price": 190.0})
+
+        assert worker_b.get("price:AAPL") == {"price": 190.0}
+        assert "price:AAPL" in worker_b.cache
+
+    def test_shared_entry_respects_callers_max_age(self):
+        backend = InMemoryCacheBackend()
+        backend.set("smartcache:yahoo:price:AAPL", {"price": 1.0}, timestamp=time.time() - 60, ttl=3600)
+        cache = SmartCache(default_ttl=30, namespace="yahoo", shared=backend)
+
+        assert cache.get("price:AAPL", max_age=30) is None
+        assert cache.get("price:AAPL", max_age=120) == {"price": 1.0}
+
+    def test_namespaces_are_isolated(self):
+        backend = InMemoryCacheBackend()
+        SmartCache(namespace="yahoo", shared=backend).set("k", 1)
+
+        assert SmartCache(namespace="alpaca", shared=backend).get("k") is None
+
+    def test_invalidate_removes_from_both_tiers(self):
+        backend = InMemoryCacheBackend()
+        worker_a = SmartCache(namespace="market", shared=backend)
+        worker_b = SmartCache(namespace="market", shared=backend)
+        worker_a.set("top_movers", [1, 2])
+
+        worker_a.invalidate("top_movers")
+
+        assert worker_b.get("top_movers") is None
+
+    def test_retention_keeps_stale_value_for_fallback(self):
+        cache = SmartCache(default_ttl=60, retention=3600)
+        cache.cache["k"] = ({"messages": []}, time.time() - 120)
+
+        assert cache.get("k") is None
+        assert cache.get_stale("k") == {"messages": []}
+
+    def test_without_shared_backend_behaves_as_local_cache(self):
+        cache = SmartCache(default_ttl=30)
+        cache.set("k", "v")
+        cache.cache["k"] = ("v", time.time() - 60)
+
+        assert cache.get("k") is None
+        assert "k" not in cache.cache
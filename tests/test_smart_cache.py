@@ -0,0 +1,118 @@
+"""
+Unit tests for SmartCache bounds: LRU eviction, byte cap, expiry sweep and counters.
+"""
+import json
+import time
+
+from app.services.stock import SmartCache, _estimate_size, get_cache_stats
+
+
+def _cache(**kwargs):
+    kwargs.setdefault("sweep", False)
+    return SmartCache(**kwargs)
+
+
+class TestBounds:
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = _cache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_byte_cap_evicts_oldest_entries(self):
+        cache = _cache(max_bytes=250)
+        for i in range(5):
+            cache.set(f"k{i}", "x" * 100)
+
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["bytes"] <= 250
+        assert cache.get("k4") == "x" * 100
+
+    def test_oversized_single_entry_is_still_kept(self):
+        cache = _cache(max_bytes=10)
+        cache.set("big", "x" * 100)
+
+        assert cache.get("big") == "x" * 100
+
+    def test_overwrite_does_not_double_count_bytes(self):
+        cache = _cache()
+        cache.set("a", "x" * 50)
+        cache.set("a", "x" * 50)
+
+        assert cache.stats()["bytes"] == len('"' + "x" * 50 + '"')
+
+
+class TestEstimateSize:
+    def test_scalars_and_strings_match_their_json_length(self):
+        assert _estimate_size("x" * 50) == len('"' + "x" * 50 + '"')
+        assert _estimate_size(12.5) == len("12.5")
+        assert _estimate_size(None) == len("null")
+
+    def test_large_uniform_containers_are_estimated_from_a_sample(self):
+        rows = [{"t": 1700000000 + i, "c": 101.25} for i in range(10000)]
+        actual = len(json.dumps(rows))
+
+        assert 0.5 * actual < _estimate_size(rows) < 1.5 * actual
+
+    def test_empty_and_unknown_values(self):
+        assert _estimate_size([]) == 2
+        assert _estimate_size({}) == 2
+        assert _estimate_size(object()) > 0
+
+
+class TestSweep:
+    def test_sweep_removes_entries_older_than_longest_max_age(self):
+        cache = _cache(default_ttl=30)
+        cache.set("fresh", 1)
+        cache.set("old", 2)
+        cache.cache["old"] = (2, time.time() - 60)
+
+        assert cache.sweep() == 1
+        assert "old" not in cache.cache
+        assert cache.stats()["bytes"] == _estimate_size(1)
+
+    def test_sweep_honours_longer_max_age_used_by_callers(self):
+        cache = _cache(default_ttl=30)
+        cache.get("info", max_age=300)
+        cache.set("info", {"name": "Apple"})
+        cache.cache["info"] = ({"name": "Apple"}, time.time() - 120)
+
+        assert cache.sweep() == 0
+
+    def test_long_max_age_only_widens_the_sweep_for_two_windows(self):
+        cache = _cache(default_ttl=30)
+        cache.get("info", max_age=300)
+        cache.set("info", {"name": "Apple"})
+        cache.cache["info"] = ({"name": "Apple"}, time.time() - 120)
+
+        assert cache.sweep() == 0
+        assert cache.sweep() == 0
+        assert cache.sweep() == 1
+
+    def test_sweep_uses_retention_when_set(self):
+        cache = _cache(default_ttl=60, retention=3600)
+        cache.set("k", 1)
+        cache.cache["k"] = (1, time.time() - 600)
+
+        assert cache.sweep() == 0
+
+
+class TestCounters:
+    def test_hits_misses_and_ratio(self):
+        cache = _cache(namespace="counters-test")
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+        assert get_cache_stats()["counters-test"]["entries"] == 1
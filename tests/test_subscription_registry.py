@@ -0,0 +1,141 @@
+"""
+Unit tests for SubscriptionRegistry: connection ref-counting, watchlist change
+events and the Finnhub subscribe/unsubscribe hooks.
+"""
+from unittest.mock import MagicMock
+
+from app.services.subscription_registry import SubscriptionRegistry
+
+
+def _registry():
+    registry = SubscriptionRegistry()
+    added, removed = MagicMock(), MagicMock()
+    registry.set_symbol_hooks(added, removed)
+    return registry, added, removed
+
+
+def _item(symbol, original_price=100.0, **extra):
+    return {'symbol': symbol, 'original_price': original_price, 'company_name': symbol, **extra}
+
+
+class TestConnections:
+    def test_first_socket_needs_load_second_does_not(self):
+        registry, _, _ = _registry()
+
+        assert registry.add_connection('sid-1', 'u1') is True
+        registry.load_watchlist('u1', [_item('AAPL')])
+        assert registry.add_connection('sid-2', 'u1') is False
+
+    def test_watchlist_kept_until_last_socket_disconnects(self):
+        registry, _, removed = _registry()
+        registry.add_connection('sid-1', 'u1')
+        registry.add_connection('sid-2', 'u1')
+        registry.load_watchlist('u1', [_item('AAPL')])
+
+        registry.remove_connection('sid-1')
+        assert registry.users_for('AAPL') == {'u1': 100.0}
+        removed.assert_not_called()
+
+        registry.remove_connection('sid-2')
+        assert registry.all_symbols() == set()
+        removed.assert_called_once_with('AAPL')
+
+    def test_shared_symbol_is_not_orphaned_while_another_user_watches_it(self):
+        registry, added, removed = _registry()
+        for sid, user in (('s1', 'u1'), ('s2', 'u2')):
+            registry.add_connection(sid, user)
+            registry.load_watchlist(user, [_item('AAPL', original_price=50.0 if user == 'u1' else 80.0)])
+
+        registry.remove_connection('s1')
+
+        assert registry.users_for('AAPL') == {'u2': 80.0}
+        added.assert_called_once_with(['AAPL'])
+        removed.assert_not_called()
+
+    def test_load_for_disconnected_user_is_ignored(self):
+        registry, _, _ = _registry()
+
+        assert registry.load_watchlist('ghost', [_item('AAPL')]) == []
+        assert registry.user_watchlists() == {}
+
+
+class TestChangeEvents:
+    def _loaded(self):
+        registry, added, removed = _registry()
+        registry.add_connection('sid', 'u1')
+        registry.load_watchlist('u1', [_item('AAPL')])
+        added.reset_mock()
+        return registry, added, removed
+
+    def test_added_symbol_is_subscribed(self):
+        registry, added, _ = self._loaded()
+
+        registry.apply_change('u1', 'added', 'msft', _item('MSFT', original_price=300.0))
+
+        added.assert_called_once_with(['MSFT'])
+        assert registry.users_for('MSFT') == {'u1': 300.0}
+
+    def test_updated_fields_are_merged(self):
+        registry, _, _ = self._loaded()
+
+        registry.apply_change('u1', 'updated', 'AAPL', {'category': 'Tech'})
+
+        [item] = registry.user_watchlists()['u1']
+        assert item == {'symbol': 'AAPL', 'original_price': 100.0, 'category': 'Tech'}
+
+    def test_removed_and_cleared(self):
+        registry, _, removed = self._loaded()
+        registry.apply_change('u1', 'added', 'MSFT', _item('MSFT'))
+
+        registry.apply_change('u1', 'removed', 'AAPL')
+        removed.assert_called_once_with('AAPL')
+
+        registry.apply_change('u1', 'cleared')
+        assert registry.all_symbols() == set()
+        assert registry.user_watchlists() == {}
+
+    def test_events_for_unloaded_users_are_ignored(self):
+        registry, added, _ = _registry()
+
+        registry.apply_change('u9', 'added', 'AAPL', _item('AAPL'))
+
+        added.assert_not_called()
+        assert registry.stats()['changes_applied'] == 0
+
+
+class TestRoomHooks:
+    def _registry(self):
+        registry = SubscriptionRegistry()
+        join, leave = MagicMock(), MagicMock()
+        registry.set_room_hooks(join, leave)
+        return registry, join, leave
+
+    def test_load_joins_every_socket_of_the_user(self):
+        registry, join, _ = self._registry()
+        registry.add_connection('s1', 'u1')
+        registry.load_watchlist('u1', [_item('AAPL'), _item('MSFT')])
+
+        join.assert_called_once_with('s1', ['AAPL', 'MSFT'])
+
+    def test_extra_tab_joins_existing_symbols(self):
+        registry, join, _ = self._registry()
+        registry.add_connection('s1', 'u1')
+        registry.load_watchlist('u1', [_item('AAPL')])
+        join.reset_mock()
+
+        registry.add_connection('s2', 'u1')
+
+        join.assert_called_once_with('s2', ['AAPL'])
+
+    def test_add_and_remove_update_rooms(self):
+        registry, join, leave = self._registry()
+        registry.add_connection('s1', 'u1')
+        registry.load_watchlist('u1', [_item('AAPL')])
+        join.reset_mock()
+
+        registry.apply_change('u1', 'added', 'TSLA', _item('TSLA'))
+        registry.apply_change('u1', 'updated', 'TSLA', {'category': 'EV'})
+        registry.apply_change('u1', 'removed', 'AAPL')
+
+        join.assert_called_once_with('s1', ['TSLA'])
+        leave.assert_called_once_with('s1', ['AAPL'])
@@ -0,0 +1,79 @@
+"""
+Unit tests for the per-symbol Finnhub tick fan-out.
+"""
+from unittest.mock import patch
+
+import app.socketio_events as events
+from app.services.finnhub_subscriptions import FinnhubSubscriptionManager
+from app.services.subscription_registry import SubscriptionRegistry
+from app.services.watchlist_push import WatchlistPushTracker
+
+
+def _setup(watchers):
+    registry = SubscriptionRegistry()
+    for i in range(watchers):
+        registry.add_connection(f"sid{i}", f"u{i}")
+        registry.load_watchlist(f"u{i}", [{'symbol': 'AAPL', 'original_price': 100.0 + i}])
+    return registry, WatchlistPushTracker()
+
+
+class TestSymbolRoomFanOut:
+    def test_tick_is_emitted_once_to_the_symbol_room(self):
+        registry, tracker = _setup(300)
+        with patch.object(events, 'subscription_registry', registry), \
+                patch.object(events, 'watchlist_push_tracker', tracker), \
+                patch.object(events, '_last_emitted', {}), \
+                patch.object(events.socketio, 'emit') as emit:
+            events._emit_finnhub_price('AAPL', 190.0)
+
+        emit.assert_called_once_with('price_tick', {
+            'symbol': 'AAPL', 'price': 190.0, 'timestamp': emit.call_args[0][1]['timestamp'],
+        }, room='sym_AAPL')
+
+    def test_tick_is_recorded_so_poll_loop_does_not_resend(self):
+        registry, tracker = _setup(2)
+        with patch.object(events, 'subscription_registry', registry), \
+                patch.object(events, 'watchlist_push_tracker', tracker), \
+                patch.object(events, '_last_emitted', {}), \
+                patch.object(events.socketio, 'emit'):
+            events._emit_finnhub_price('AAPL', 190.0)
+
+        [entry] = tracker.snapshot('watchlist_u1')
+        assert entry['price_change'] == 89.0
+        assert tracker.diff('watchlist_u1', [entry]) == []
+
+    def test_unwatched_symbol_is_not_emitted(self):
+        registry, tracker = _setup(0)
+        last_emitted = {}
+        with patch.object(events, 'subscription_registry', registry), \
+                patch.object(events, '_last_emitted', last_emitted), \
+                patch.object(events.socketio, 'emit') as emit:
+            events._emit_finnhub_price('AAPL', 190.0)
+
+        emit.assert_not_called()
+        assert last_emitted == {}
+
+    def test_last_watcher_leaving_drops_per_symbol_state(self):
+        feed = events.FinnhubPriceFeed(api_keys=[])
+        feed.ticks.put('AAPL', 190.0)
+        feed.subscriptions.touch(['AAPL'])
+        with patch.object(events, '_last_emitted', {'AAPL': 190.0}) as last_emitted:
+            feed.unsubscribe_symbol('AAPL')
+
+        assert last_emitted == {}
+        assert feed.ticks.latest('AAPL') is None
+        assert feed.subscriptions.stats()['wanted'] == 0
+
+    def test_symbol_rotated_back_in_does_not_serve_its_old_tick(self):
+        feed = events.FinnhubPriceFeed(api_keys=['key'], watcher_count=lambda symbol: 1)
+        feed.subscriptions = FinnhubSubscriptionManager(connections=1, capacity_per_connection=1, min_hold_seconds=0)
+        feed.subscriptions.touch(['AAPL', 'MSFT'])
+        feed.rebalance(active={'AAPL'})
+        feed.ticks.put('AAPL', 100.0)
+        assert feed.latest_price('AAPL') == 100.0
+
+        feed.rebalance(active={'MSFT'})
+        feed.rebalance(active={'AAPL'})
+
+        assert feed.subscriptions.is_subscribed('AAPL')
+        assert feed.latest_price('AAPL') is None
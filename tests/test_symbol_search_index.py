@@ -0,0 +1,167 @@
+"""
+Unit tests for the symbol search candidate index: results must match scoring every entry.
+"""
+import json
+import random
+import string
+from unittest.mock import patch
+
+import pytest
+
+from app.services.stock_symbol_index import StockSymbolIndexService
+
+_WORDS = ['Apple', 'Micro', 'Bank', 'America', 'Capital', 'Energy', 'Trust', 'Of', 'Holdings',
+          'Pharma', 'Digital', 'Gold', 'Solar', 'United', 'General', 'Networks']
+_SUFFIXES = ['Inc.', 'Corp', 'Ltd', 'Co', 'ETF']
+
+
+def _entries(count=600, seed=3):
+    rng = random.Random(seed)
+    entries, seen = [], set()
+    while len(entries) < count:
+        symbol = ''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.choice([1, 2, 3, 4, 5])))
+        if symbol in seen:
+            continue
+        seen.add(symbol)
+        name = ' '.join(rng.sample(_WORDS, rng.choice([1, 2, 3]))) + ' ' + rng.choice(_SUFFIXES)
+        entries.append({'symbol': symbol, 'name': name, 'exchange': 'NYSE', 'type': 'EQUITY'})
+    return entries
+
+
+def _full_scan(service, query, limit, substring_only=False):
+    normalized = service._normalize_text(query)
+    table = service._table
+    rows = range(len(table))
+    if substring_only:
+        # Typeahead skips fuzzy-only matches
+        rows = [i for i in rows if normalized in '|'.join(table.normalized(i))
+                or table.normalized(i)[0] == service._index.aliases.get(normalized)]
+    typos = {} if substring_only else service._index.typo_matches(normalized)
+    scored = [(score, i) for i in rows
+              if (score := service._score_entry(*table.normalized(i), normalized, typos.get(i))) > 0]
+    scored.sort(key=lambda pair: (-pair[0], table.public(pair[1])['symbol']))
+    return [table.public(i) for _, i in scored[:limit]]
+
+
+@pytest.fixture(scope='module')
+def service():
+    service = StockSymbolIndexService(autostart=False)
+    service._set_entries(_entries() + service._seed_entries(), source='test')
+    return service
+
+
+class TestSymbolSearchIndex:
+    @pytest.mark.parametrize('query', [
+        'A', 'Q', 'AB', 'ZZ', 'APP', 'AAPL', 'apple', 'micro', 'bank of america', 'of',
+        'capital trust', 'gold co', 'holdings', 'google', 'coca cola', 'spdr s&p',
+    ])
+    @pytest.mark.parametrize('limit', [3, 10, 50])
+    def test_matches_full_scan(self, service, query, limit):
+        service._query_cache.clear()
+        assert service.search(query, limit=limit) == _full_scan(service, query, limit)
+
+    def test_short_query_scores_a_fraction_of_entries(self, service):
+        primary, secondary, bound = service._index.candidates('MS')
+
+        assert len(primary) < len(service._table) / 5
+        assert bound == 360
+
+    def test_rebuild_swaps_the_index(self, service):
+        fresh = StockSymbolIndexService(autostart=False)
+        fresh._set_entries([{'symbol': 'ZZZQ', 'name': 'Zebra Quartz Inc.'}], source='test')
+
+        assert [r['symbol'] for r in fresh.search('zebra')] == ['ZZZQ']
+        assert fresh.search('apple') == []
+
+
+class TestTypeahead:
+    def test_each_keystroke_matches_full_scan(self, service):
+        for query in ('A', 'AP', 'APP', 'APPL', 'APPLE', 'APPLE I', 'GO', 'GOLD', 'HOLDINGS', 'micro'):
+            assert service.typeahead(query, limit=10) == _full_scan(service, query, 10, substring_only=True)
+
+    def test_longer_prefix_narrows_the_previous_set(self, service):
+        index = service._index
+        service.typeahead('hold')
+        before = dict(index.typeahead_counters)
+
+        service.typeahead('holdi')
+        service.typeahead('holdin')
+
+        assert index.typeahead_counters['narrowed'] == before['narrowed'] + 2
+        assert index.typeahead_counters['from_postings'] == before['from_postings']
+
+    def test_warm_precomputes_short_prefixes(self):
+        fresh = StockSymbolIndexService(autostart=False)
+        fresh._set_entries(_entries(200), source='test')
+
+        fresh._index.warm_typeahead(fresh._score_entry)
+
+        assert {'A', 'AP', 'APP', 'GOL'} <= set(fresh._index._prefix_top)
+        assert fresh.typeahead('gol', limit=5) == _full_scan(fresh, 'gol', 5, substring_only=True)
+
+    def test_endpoint_sets_cache_headers_and_revalidates(self, client, service):
+        with patch('app.routes.stock_data.stock_symbol_index_service', service):
+            first = client.get('/api/search/typeahead?q=ap&limit=5')
+            again = client.get('/api/search/typeahead?q=ap&limit=5', headers={'If-None-Match': first.headers['ETag']})
+            longer = client.get('/api/search/typeahead?q=apple')
+
+        assert first.status_code == 200
+        assert first.get_json()['results'] == service.typeahead('ap', limit=5)
+        assert 'max-age=3600' in first.headers['Cache-Control']
+        assert again.status_code == 304
+        assert again.headers['ETag'] == first.headers['ETag']
+        assert 'max-age=300' in longer.headers['Cache-Control']
+
+
+class TestSymbolTableCacheFile:
+    def test_binary_cache_round_trip(self, service, tmp_path, monkeypatch):
+        monkeypatch.setenv('SYMBOL_INDEX_CACHE_PATH', str(tmp_path / 'index.bin'))
+        writer = StockSymbolIndexService(autostart=False)
+        writer._set_entries(_entries() + [{'symbol': 'NSTL', 'name': 'Nestlé S.A.', 'exchange': 'OTC'}], source='test')
+        writer._save_to_cache_file()
+
+        reader = StockSymbolIndexService(autostart=False)
+
+        assert reader.stats()['last_refresh_source'] == 'test'
+        assert reader.version == writer.version
+        assert reader.get_entry('nstl') == {'symbol': 'NSTL', 'name': 'Nestlé S.A.', 'exchange': 'OTC', 'type': 'EQUITY'}
+        for query in ('A', 'GO', 'micro', 'bank of america', 'nestle'):
+            assert reader.search(query) == writer.search(query)
+
+    def test_legacy_json_cache_is_still_read(self, tmp_path, monkeypatch):
+        path = tmp_path / 'index.json'
+        path.write_text(json.dumps({'source': 'sec_company_tickers', 'refreshed_at': 1.0,
+                                    'entries': [{'symbol': 'AAPL', 'name': 'Apple Inc.'}]}))
+        monkeypatch.setenv('SYMBOL_INDEX_CACHE_PATH', str(path))
+
+        service = StockSymbolIndexService(autostart=False)
+
+        assert service.stats()['entries'] == 1
+        assert service.search('apple')[0]['symbol'] == 'AAPL'
+
+
+class TestQueryCache:
+    def test_repeat_query_is_a_cache_hit_until_the_index_changes(self):
+        fresh = StockSymbolIndexService(autostart=False)
+        fresh._set_entries(_entries(100), source='test')
+
+        first = fresh.search('gold')
+        assert fresh.search('gold') is first
+        assert fresh.stats()['query_cache']['hit_ratio'] == 0.5
+
+        fresh._set_entries(_entries(100, seed=4), source='test')
+        assert fresh.search('gold') is not first
+
+    def test_cache_is_shared_with_yahoo_search_fallback(self):
+        from app.services.stock import SmartCache, YahooFinanceAPI
+
+        search_cache = SmartCache(default_ttl=300, namespace='search-test', max_entries=3, sweep=False)
+        fresh = StockSymbolIndexService(autostart=False, query_cache=search_cache)
+        yahoo = YahooFinanceAPI(search_cache=search_cache)
+        search_cache.set('yahoo:zebra:10', [{'symbol': 'ZZZQ'}])
+
+        assert yahoo.search_stocks('zebra') == [{'symbol': 'ZZZQ'}]
+        for query in ('apple', 'microsoft', 'tesla'):
+            fresh.search(query)
+        assert search_cache.stats()['entries'] == 3
+        assert search_cache.get('yahoo:zebra:10') is None
@@ -0,0 +1,117 @@
+"""
+Unit tests for the Finnhub tick pipeline: conflation, dispatch cadence and throttling.
+"""
+import threading
+import time
+
+from app.services.tick_pipeline import ConflationMap, TickDispatcher
+
+
+class TestConflationMap:
+    def test_keeps_latest_price_and_oldest_ingest_time(self):
+        ticks = ConflationMap(stripes=4)
+        ticks.put('AAPL', 190.0, ingested_at=1.0)
+        ticks.put('AAPL', 191.0, ingested_at=2.0)
+
+        assert ticks.drain() == {'AAPL': (191.0, 1.0)}
+        assert ticks.ticks_conflated == 1
+        assert ticks.latest('AAPL') == 191.0
+
+    def test_drain_empties_pending_but_keeps_latest(self):
+        ticks = ConflationMap()
+        ticks.put('AAPL', 190.0)
+        ticks.drain()
+
+        assert ticks.drain() == {}
+        assert ticks.latest('AAPL') == 190.0
+        assert len(ticks) == 1
+
+    def test_requeue_does_not_overwrite_newer_price(self):
+        ticks = ConflationMap()
+        ticks.put('AAPL', 190.0, ingested_at=1.0)
+        drained = ticks.drain()
+        ticks.put('AAPL', 192.0, ingested_at=3.0)
+
+        ticks.requeue('AAPL', drained['AAPL'])
+
+        assert ticks.drain() == {'AAPL': (192.0, 1.0)}
+
+    def test_concurrent_writers_do_not_lose_symbols(self):
+        ticks = ConflationMap()
+
+        def writer(offset):
+            for i in range(1000):
+                ticks.put(f'S{offset}_{i % 50}', float(i))
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(ticks.drain()) == 200
+        assert ticks.ticks_in == 4000
+        assert ticks.ticks_conflated == 4000 - 200
+
+    def test_forget_drops_latest_and_pending(self):
+        ticks = ConflationMap()
+        ticks.put('AAPL', 190.0)
+
+        ticks.forget('AAPL')
+
+        assert ticks.latest('AAPL') is None
+        assert ticks.drain() == {}
+
+
+class TestTickDispatcher:
+    def test_emits_one_update_per_symbol_per_cycle(self):
+        ticks = ConflationMap()
+        emitted = []
+        dispatcher = TickDispatcher(ticks, lambda s, p: emitted.append((s, p)))
+        for price in (1.0, 2.0, 3.0):
+            ticks.put('AAPL', price)
+        ticks.put('MSFT', 10.0)
+
+        assert dispatcher.dispatch_once() == 2
+        assert sorted(emitted) == [('AAPL', 3.0), ('MSFT', 10.0)]
+        assert dispatcher.latency_percentiles()['samples'] == 2
+
+    def test_throttled_symbol_stays_pending_until_due(self):
+        ticks = ConflationMap()
+        emitted = []
+        dispatcher = TickDispatcher(ticks, lambda s, p: emitted.append(p), min_emit_interval=60)
+        ticks.put('AAPL', 1.0)
+        dispatcher.dispatch_once()
+        ticks.put('AAPL', 2.0)
+
+        assert dispatcher.dispatch_once() == 0
+        assert ticks.pending_count() == 1
+        assert emitted == [1.0]
+
+    def test_emit_errors_are_counted_not_raised(self):
+        ticks = ConflationMap()
+
+        def boom(symbol, price):
+            raise RuntimeError("socket gone")
+
+        dispatcher = TickDispatcher(ticks, boom)
+        ticks.put('AAPL', 1.0)
+
+        assert dispatcher.dispatch_once() == 1
+        assert dispatcher.stats()['emit_errors'] == 1
+
+    def test_expired_emit_times_are_pruned(self):
+        ticks = ConflationMap()
+        dispatcher = TickDispatcher(ticks, lambda s, p: None, min_emit_interval=0.05)
+        for i in range(20):
+            ticks.put(f'S{i}', 1.0)
+        dispatcher.dispatch_once()
+        assert len(dispatcher._last_emit) == 20
+
+        time.sleep(0.06)
+        ticks.put('AAPL', 1.0)
+        dispatcher.dispatch_once()
+
+        assert set(dispatcher._last_emit) == {'AAPL'}
+        dispatcher.forget('AAPL')
+        assert dispatcher._last_emit == {}
@@ -0,0 +1,79 @@
+"""
+Unit tests for the typo matcher and the typo-tolerant company / CEO search built on it.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from app.services.stock_symbol_index import StockSymbolIndexService
+from app.services.typo_matcher import TypoMatcher, damerau_levenshtein, typo_budget
+
+
+class TestDamerauLevenshtein:
+    @pytest.mark.parametrize('a, b, expected', [
+        ('NVIDIA', 'NVIDIA', 0),
+        ('NVIDAI', 'NVIDIA', 1),      # transposition
+        ('MICORSOFT', 'MICROSOFT', 1),
+        ('AMAZN', 'AMAZON', 1),       # deletion
+        ('TESLE', 'TESLA', 1),        # substitution
+        ('JPMORGEN', 'JPMORGAN', 1),
+        ('ALPHBTE', 'ALPHABET', 2),
+    ])
+    def test_distance(self, a, b, expected):
+        assert damerau_levenshtein(a, b, 2) == expected
+
+    def test_stops_past_the_bound(self):
+        assert damerau_levenshtein('APPLE', 'ORACLE', 1) == 2
+        assert damerau_levenshtein('AB', 'ABCDEF', 2) == 3
+
+
+class TestTypoMatcher:
+    def test_lookup_returns_words_within_budget_closest_first(self):
+        matcher = TypoMatcher(['MICROSOFT', 'MICRON', 'MICROCHIP', 'NVIDIA', 'TESLA', 'TESCO'])
+
+        assert matcher.lookup('MICORSOFT') == [('MICROSOFT', 1)]
+        assert matcher.lookup('TESLE') == [('TESLA', 1)]
+        assert matcher.lookup('NVDIA') == [('NVIDIA', 1)]
+        assert matcher.lookup('TES') == []  # too short for a typo budget
+
+    def test_budget_grows_with_term_length(self):
+        assert [typo_budget(t) for t in ('IBM', 'AMZN', 'NVIDAI', 'MICORSOFT')] == [0, 1, 1, 2]
+
+    def test_round_trips_through_arrays(self):
+        matcher = TypoMatcher(['AMAZON', 'APPLE'])
+        restored = TypoMatcher(arrays=matcher.to_arrays())
+
+        assert restored.lookup('AMAZN') == [('AMAZON', 1)]
+
+
+@pytest.fixture(scope='module')
+def seeded():
+    service = StockSymbolIndexService(autostart=False)
+    service._set_entries(service._seed_entries(), source='seed')
+    return service
+
+
+class TestTypoTolerantSearch:
+    @pytest.mark.parametrize('query, symbol', [
+        ('nvidai', 'NVDA'), ('micorsoft', 'MSFT'), ('amazn', 'AMZN'), ('tesle', 'TSLA'),
+        ('netflx', 'NFLX'), ('bank of amerca', 'BAC'),
+    ])
+    def test_typos_find_the_company(self, seeded, query, symbol):
+        assert seeded.search(query)[0]['symbol'] == symbol
+
+    def test_exact_matches_outrank_typo_matches(self, seeded):
+        results = [r['symbol'] for r in seeded.search('intel')]
+        assert results[0] == 'INTC'
+
+    def test_companies_endpoint_is_typo_tolerant(self, client, seeded):
+        with patch('app.routes.stock_data.stock_symbol_index_service', seeded):
+            response = client.get('/api/search/companies?q=micorsoft')
+
+        assert response.get_json()['results'][0]['symbol'] == 'MSFT'
+
+    def test_ceo_search_tolerates_typos(self, client):
+        names = [r['ceo_name'] for r in client.get('/api/search/ceo?q=jensn huang').get_json()]
+        assert names[0] == 'Jensen Huang'
+
+        names = [r['ceo_name'] for r in client.get('/api/search/ceo?q=satya nadela').get_json()]
+        assert names == ['Satya Nadella']
@@ -0,0 +1,154 @@
+"""
+Unit tests for WatchlistService realtime listeners, run against the in-memory
+Firestore fake, and their wiring into SubscriptionRegistry.
+"""
+from unittest.mock import patch
+
+from app.services.subscription_registry import SubscriptionRegistry
+from app.services.watchlist_service import WatchlistService
+from tests.firestore_fake import FakeFirestore
+
+
+def _service(db=None, **kwargs):
+    return WatchlistService(db or FakeFirestore(), **kwargs)
+
+
+def _seed(db, user_id, *symbols):
+    ref = db.collection('users').document(user_id).collection('watchlist')
+    for i, symbol in enumerate(symbols):
+        ref.document(symbol).set({'symbol': symbol, 'company_name': symbol, 'priority': 'medium',
+                                  'original_price': 10.0 * (i + 1)})
+
+
+class TestLiveWatchlist:
+    def test_get_watchlist_is_served_from_memory_once_attached(self):
+        db = FakeFirestore()
+        _seed(db, 'u1', 'AAPL', 'MSFT')
+        service = _service(db)
+
+        assert service.attach_listener('u1') is True
+        with patch.object(WatchlistService, '_get_executor', side_effect=AssertionError("queried Firestore")):
+            items = service.get_watchlist('u1')
+
+        assert {item['symbol'] for item in items} == {'AAPL', 'MSFT'}
+
+    def test_writes_from_elsewhere_are_reflected(self):
+        db = FakeFirestore()
+        _seed(db, 'u1', 'AAPL')
+        service = _service(db)
+        service.attach_listener('u1')
+
+        # Another worker adds a stock directly in Firestore
+        _seed(db, 'u1', 'AAPL', 'TSLA')
+        db.flush()
+
+        assert {item['symbol'] for item in service.get_watchlist('u1')} == {'AAPL', 'TSLA'}
+
+    def test_filters_and_limit_apply_to_live_items(self):
+        db = FakeFirestore()
+        _seed(db, 'u1', 'AAPL', 'MSFT', 'NVDA')
+        service = _service(db)
+        service.attach_listener('u1')
+        service.update_stock('u1', 'NVDA', priority='high')
+
+        assert [item['symbol'] for item in service.get_watchlist('u1', limit=1)] == ['NVDA']
+        assert [item['symbol'] for item in service.get_watchlist('u1', priority='high')] == ['NVDA']
+
+    def test_own_writes_are_read_before_the_snapshot_arrives(self):
+        db = FakeFirestore()
+        _seed(db, 'u1', 'AAPL', 'MSFT')
+        service = _service(db)
+        service.attach_listener('u1')
+        db.flush()
+
+        db.pause()
+        service.add_stock('u1', 'TSLA', 'Tesla', 250.0)
+        service.remove_stock('u1', 'MSFT')
+        service.update_stock('u1', 'AAPL', priority='high')
+        items = service.get_watchlist('u1')
+
+        assert [item['symbol'] for item in items] == ['AAPL', 'TSLA']
+        assert items[0]['priority'] == 'high'
+        db.resume()
+        db.flush()
+        assert service.get_watchlist('u1') == items
+        assert service._live['u1'].pending == {'AAPL': service._live['u1'].pending['AAPL']}
+
+    def test_snapshot_taken_before_a_write_does_not_undo_it(self):
+        db = FakeFirestore()
+        _seed(db, 'u1', 'AAPL')
+        service = _service(db)
+        service.attach_listener('u1')
+        db.flush()
+
+        db.pause()
+        _seed(db, 'u1', 'AAPL', 'MSFT')  # queued snapshot: AAPL, MSFT
+        service.add_stock('u1', 'TSLA', 'Tesla', 250.0)
+        service.remove_stock('u1', 'AAPL')
+        db.resume()
+        db.flush()
+
+        assert {item['symbol'] for item in service.get_watchlist('u1')} == {'MSFT', 'TSLA'}
+
+    def test_clear_empties_the_live_copy(self):
+        db = FakeFirestore()
+        _seed(db, 'u1', 'AAPL', 'MSFT')
+        service = _service(db)
+        service.attach_listener('u1')
+        db.flush()
+
+        db.pause()
+        service.clear_watchlist('u1')
+
+        assert service.get_watchlist('u1') == []
+        db.resume()
+
+    def test_returned_items_are_copies(self):
+        db = FakeFirestore()
+        _seed(db, 'u1', 'AAPL')
+        service = _service(db)
+        service.attach_listener('u1')
+
+        service.get_watchlist('u1')[0]['symbol'] = 'MUTATED'
+
+        assert service.get_watchlist('u1')[0]['symbol'] == 'AAPL'
+
+    def test_detach_unsubscribes(self):
+        db = FakeFirestore()
+        service = _service(db)
+        service.attach_listener('u1')
+
+        service.detach_listener('u1')
+
+        assert db.listener_count() == 0
+        assert service.has_listener('u1') is False
+
+    def test_disabled_listeners_fall_back_to_queries(self):
+        db = FakeFirestore()
+        service = _service(db, realtime_listeners=False)
+
+        assert service.attach_listener('u1') is False
+        assert db.listener_count() == 0
+
+
+class TestRegistryWiring:
+    def test_snapshots_feed_registry_and_last_socket_detaches(self):
+        db = FakeFirestore()
+        _seed(db, 'u1', 'AAPL')
+        service = _service(db)
+        registry = SubscriptionRegistry()
+        registry.set_user_hook(service.detach_listener)
+
+        with patch('app.services.watchlist_service._change_listeners', [registry.apply_change]):
+            registry.add_connection('sid', 'u1')
+            service.attach_listener('u1')
+            registry.load_watchlist('u1', service.get_watchlist('u1'))
+
+            _seed(db, 'u1', 'AAPL', 'AMD')
+            db.flush()
+            assert registry.all_symbols() == {'AAPL', 'AMD'}
+
+            registry.remove_connection('sid')
+
+        assert db.listener_count() == 0
+        assert registry.all_symbols() == set()
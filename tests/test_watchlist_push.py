@@ -0,0 +1,110 @@
+"""
+Unit tests for delta-only watchlist pushes.
+"""
+import json
+
+from app.services.watchlist_push import WatchlistPushTracker, compact_price_entry
+
+
+def _entries(prices):
+    return [compact_price_entry(symbol, price, original_price=100.0) for symbol, price in prices.items()]
+
+
+class TestCompactEntry:
+    def test_change_is_relative_to_original_price(self):
+        assert compact_price_entry('AAPL', 110.0, 100.0) == {
+            'symbol': 'AAPL', 'price': 110.0, 'price_change': 10.0, 'price_change_percent': 10.0,
+        }
+
+    def test_missing_original_price_reports_no_change(self):
+        entry = compact_price_entry('AAPL', 110.0, None)
+        assert entry['price_change'] == 0.0 and entry['price_change_percent'] == 0.0
+
+
+class TestDiff:
+    def test_first_push_sends_everything_then_only_changes(self):
+        tracker = WatchlistPushTracker(epsilon=0.005)
+        room = 'watchlist_u1'
+
+        assert len(tracker.diff(room, _entries({'AAPL': 190.0, 'MSFT': 400.0}))) == 2
+        changed = tracker.diff(room, _entries({'AAPL': 190.001, 'MSFT': 401.0}))
+
+        assert [e['symbol'] for e in changed] == ['MSFT']
+        assert tracker.stats()['entries_suppressed'] == 1
+
+    def test_small_moves_accumulate_against_last_sent_price(self):
+        tracker = WatchlistPushTracker(epsilon=0.01)
+        room = 'watchlist_u1'
+        tracker.diff(room, _entries({'AAPL': 100.0}))
+
+        assert tracker.diff(room, _entries({'AAPL': 100.008})) == []
+        assert len(tracker.diff(room, _entries({'AAPL': 100.016}))) == 1
+
+    def test_rooms_are_independent(self):
+        tracker = WatchlistPushTracker()
+        tracker.diff('watchlist_u1', _entries({'AAPL': 100.0}))
+
+        assert len(tracker.diff('watchlist_u2', _entries({'AAPL': 100.0}))) == 1
+
+
+class TestSnapshots:
+    def test_snapshot_returns_last_sent_entries(self):
+        tracker = WatchlistPushTracker()
+        tracker.diff('watchlist_u1', _entries({'AAPL': 100.0, 'MSFT': 300.0}))
+        tracker.diff('watchlist_u1', _entries({'AAPL': 101.0}))
+
+        prices = {e['symbol']: e['price'] for e in tracker.snapshot('watchlist_u1')}
+        assert prices == {'AAPL': 101.0, 'MSFT': 300.0}
+
+    def test_retain_forgets_removed_symbols_and_rooms(self):
+        tracker = WatchlistPushTracker()
+        tracker.diff('watchlist_u1', _entries({'AAPL': 100.0, 'MSFT': 300.0}))
+        tracker.diff('watchlist_u2', _entries({'AAPL': 100.0}))
+
+        tracker.retain('watchlist_u1', ['AAPL'])
+        tracker.retain_rooms(['watchlist_u1'])
+
+        assert [e['symbol'] for e in tracker.snapshot('watchlist_u1')] == ['AAPL']
+        assert tracker.snapshot('watchlist_u2') == []
+
+    def test_resync_only_sends_the_sockets_own_watchlist(self, app):
+        from unittest.mock import patch
+        import app.socketio_events as events
+        from app.extensions import socketio
+
+        tracker = WatchlistPushTracker()
+        tracker.record('watchlist_u1', compact_price_entry('AAPL', 190.0, 100.0))
+        tracker.record('watchlist_u2', compact_price_entry('TSLA', 250.0, 100.0))
+        with patch.object(events, 'watchlist_push_tracker', tracker):
+            sio = socketio.test_client(app)
+            sio.emit('join_user_room', {'user_id': 'u1'})
+            sio.get_received()
+
+            sio.emit('resync_watchlist', {'user_id': 'u2'})
+            assert sio.get_received() == []
+
+            sio.emit('resync_watchlist', {'user_id': 'u1'})
+            [update] = sio.get_received()
+            sio.disconnect()
+
+        assert [entry['symbol'] for entry in update['args'][0]['prices']] == ['AAPL']
+
+
+class TestBandwidth:
+    def test_steady_watchlist_sends_far_less_than_full_legacy_payloads(self):
+        symbols = {f'SYM{i}': 100.0 + i for i in range(200)}
+        legacy_item = {
+            'symbol': 'SYM0', 'name': 'SYM0', 'price': 100.0, 'last_updated': '2024-03-05T11:00:00.000000',
+            'is_priority': False, 'price_change': 0.0, 'price_change_percent': 0.0, 'change_percent': 0.0,
+            'priceChangePercent': 0.0, 'category': 'General', 'priority': 'medium', '_fresh': True,
+        }
+        legacy_bytes = len(json.dumps(legacy_item)) * len(symbols) * 10
+
+        tracker = WatchlistPushTracker()
+        sent_bytes = 0
+        for cycle in range(10):
+            # ~10% of symbols move each cycle
+            prices = {s: p + (cycle * 0.05 if i % 10 == cycle % 10 else 0) for i, (s, p) in enumerate(symbols.items())}
+            sent_bytes += len(json.dumps(tracker.diff('watchlist_u1', _entries(prices))))
+
+        assert sent_bytes < legacy_bytes / 2